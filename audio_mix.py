@@ -0,0 +1,374 @@
+"""
+Mixagem de áudio: normalização de loudness (EBU R128) e trilha de fundo com ducking
+Tudo é calculado com NumPy sobre o buffer inteiro (sem loops por amostra)
+"""
+
+import numpy as np
+import random
+import os
+import threading
+
+SAMPLE_RATE = 44100
+MUSIC_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.m4a', '.flac')
+
+# Músicas já decodificadas (a mesma trilha serve para vários vídeos, ex: partes de uma série)
+_MUSIC_ARRAYS = {}
+_MUSIC_LOCK = threading.Lock()
+
+# Parâmetros do filtro K (ITU-R BS.1770): shelf de alta + passa-altas RLB
+_SHELF_FC = 1681.974450955533
+_SHELF_GAIN_DB = 3.999843853973347
+_SHELF_Q = 0.7071752369554196
+_HIGHPASS_FC = 38.13547087602444
+_HIGHPASS_Q = 0.5003270373238773
+
+def _biquad_coefficients(sample_rate):
+    """
+    Calcula os dois biquads do filtro K para a taxa de amostragem dada
+    (mesma derivação do libebur128, válida para qualquer taxa)
+
+    Args:
+        sample_rate: Taxa de amostragem em Hz
+
+    Returns:
+        Lista de tuplas (b, a) com coeficientes normalizados
+    """
+    # Shelf de alta frequência (+4 dB acima de ~1.7 kHz)
+    K = np.tan(np.pi * _SHELF_FC / sample_rate)
+    Vh = 10 ** (_SHELF_GAIN_DB / 20)
+    Vb = Vh ** 0.4996667741545416
+    a0 = 1 + K / _SHELF_Q + K * K
+    b_shelf = np.array([(Vh + Vb * K / _SHELF_Q + K * K) / a0, 2 * (K * K - Vh) / a0, (Vh - Vb * K / _SHELF_Q + K * K) / a0])
+    a_shelf = np.array([1.0, 2 * (K * K - 1) / a0, (1 - K / _SHELF_Q + K * K) / a0])
+
+    # Passa-altas RLB (remove graves abaixo de ~38 Hz)
+    K = np.tan(np.pi * _HIGHPASS_FC / sample_rate)
+    a0 = 1 + K / _HIGHPASS_Q + K * K
+    b_hp = np.array([1.0, -2.0, 1.0])
+    a_hp = np.array([1.0, 2 * (K * K - 1) / a0, (1 - K / _HIGHPASS_Q + K * K) / a0])
+
+    return [(b_shelf, a_shelf), (b_hp, a_hp)]
+
+def _as_2d(samples):
+    """Garante formato (amostras, canais) em float64"""
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim == 1:
+        samples = samples[:, np.newaxis]
+    return samples
+
+def k_weight(samples, sample_rate=SAMPLE_RATE):
+    """
+    Aplica o filtro K no domínio da frequência (uma FFT por canal)
+
+    Args:
+        samples: Array (amostras, canais) ou (amostras,)
+        sample_rate: Taxa de amostragem em Hz
+
+    Returns:
+        Array filtrado com o mesmo formato (amostras, canais)
+    """
+    samples = _as_2d(samples)
+    n = samples.shape[0]
+
+    # Padding de 1s evita que a cauda do IIR "dê a volta" na convolução circular
+    nfft = 1 << int(np.ceil(np.log2(n + sample_rate)))
+
+    freqs = np.arange(nfft // 2 + 1)
+    z_inv = np.exp(-2j * np.pi * freqs / nfft)
+    response = np.ones_like(z_inv)
+    for b, a in _biquad_coefficients(sample_rate):
+        response *= (b[0] + b[1] * z_inv + b[2] * z_inv ** 2) / (a[0] + a[1] * z_inv + a[2] * z_inv ** 2)
+
+    spectrum = np.fft.rfft(samples, n=nfft, axis=0)
+    return np.fft.irfft(spectrum * response[:, np.newaxis], n=nfft, axis=0)[:n]
+
+def measure_integrated_loudness(samples, sample_rate=SAMPLE_RATE):
+    """
+    Mede o loudness integrado (LUFS) segundo EBU R128 / ITU-R BS.1770
+
+    Args:
+        samples: Array (amostras, canais) com valores entre -1 e 1
+        sample_rate: Taxa de amostragem em Hz
+
+    Returns:
+        Loudness integrado em LUFS (-inf para silêncio ou áudio curto demais)
+    """
+    weighted = k_weight(samples, sample_rate)
+
+    block = int(0.4 * sample_rate)  # Blocos de 400 ms
+    step = int(0.1 * sample_rate)   # 75% de sobreposição
+    if weighted.shape[0] < block:
+        return float("-inf")
+
+    # Média quadrática de todos os blocos de uma vez via soma acumulada
+    energy = np.concatenate([np.zeros((1, weighted.shape[1])), np.cumsum(weighted ** 2, axis=0)])
+    starts = np.arange(0, weighted.shape[0] - block + 1, step)
+    block_power = (energy[starts + block] - energy[starts]) / block
+
+    # Canais L/R têm peso 1 (sem canais surround aqui)
+    total_power = block_power.sum(axis=1)
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(total_power)
+
+    # Gate absoluto (-70 LUFS)
+    gated = block_loudness > -70.0
+    if not gated.any():
+        return float("-inf")
+
+    # Gate relativo (-10 LU abaixo da média dos blocos acima do gate absoluto)
+    relative_threshold = -0.691 + 10 * np.log10(total_power[gated].mean()) - 10.0
+    gated &= block_loudness > relative_threshold
+
+    return float(-0.691 + 10 * np.log10(total_power[gated].mean()))
+
+def normalize_loudness(samples, sample_rate=SAMPLE_RATE, target_lufs=-14.0, peak_ceiling_db=-1.0):
+    """
+    Normaliza o áudio para o loudness alvo, respeitando um teto de pico
+
+    Args:
+        samples: Array (amostras, canais)
+        sample_rate: Taxa de amostragem em Hz
+        target_lufs: Loudness alvo (-14 LUFS = padrão YouTube/TikTok)
+        peak_ceiling_db: Pico máximo permitido em dBFS
+
+    Returns:
+        Tupla (array normalizado, ganho aplicado em dB)
+    """
+    samples = _as_2d(samples)
+    measured = measure_integrated_loudness(samples, sample_rate)
+
+    if not np.isfinite(measured):
+        return samples, 0.0
+
+    gain_db = target_lufs - measured
+
+    # Reduz o ganho se o pico resultante passar do teto
+    peak = np.abs(samples).max()
+    if peak > 0:
+        max_gain_db = peak_ceiling_db - 20 * np.log10(peak)
+        gain_db = min(gain_db, max_gain_db)
+
+    return samples * 10 ** (gain_db / 20), gain_db
+
+def _moving_average(values, window):
+    """Média móvel centrada via soma acumulada (mesmo tamanho da entrada)"""
+    window = max(1, int(window))
+    padded = np.pad(values, (window // 2, window - 1 - window // 2), mode="edge")
+    cumulative = np.concatenate([[0.0], np.cumsum(padded)])
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+def narration_envelope(samples, sample_rate=SAMPLE_RATE, hop=0.01, window=0.05):
+    """
+    Calcula o envelope RMS da narração em dBFS numa taxa de controle reduzida
+
+    Args:
+        samples: Array (amostras, canais)
+        sample_rate: Taxa de amostragem em Hz
+        hop: Intervalo entre pontos do envelope em segundos
+        window: Janela RMS em segundos
+
+    Returns:
+        Tupla (tempos em segundos, envelope em dBFS)
+    """
+    mono = _as_2d(samples).mean(axis=1)
+    hop_size = max(1, int(hop * sample_rate))
+    frames = int(np.ceil(len(mono) / hop_size))
+
+    # Potência média por hop e depois suavizada na janela RMS
+    padded = np.pad(mono ** 2, (0, frames * hop_size - len(mono)))
+    power = padded.reshape(frames, hop_size).mean(axis=1)
+    power = _moving_average(power, window / hop)
+
+    times = (np.arange(frames) + 0.5) * hop_size / sample_rate
+    with np.errstate(divide="ignore"):
+        envelope_db = 10 * np.log10(np.maximum(power, 1e-12))
+
+    return times, envelope_db
+
+def duck_gain_curve(envelope_db, hop=0.01, threshold_db=-40.0, duck_db=-12.0, attack=0.08, release=0.4):
+    """
+    Gera a curva de ganho da trilha (sidechain) a partir do envelope da narração
+
+    Args:
+        envelope_db: Envelope da narração em dBFS (um ponto por hop)
+        hop: Intervalo entre pontos do envelope em segundos
+        threshold_db: Nível a partir do qual a narração "abaixa" a música
+        duck_db: Redução aplicada na música enquanto há fala
+        attack: Tempo de transição ao abaixar (segundos)
+        release: Tempo que a música espera antes de voltar (segundos)
+
+    Returns:
+        Array de ganho linear (um ponto por hop)
+    """
+    speaking = (envelope_db > threshold_db).astype(np.float64)
+
+    # Release: mantém o ducking por alguns hops após a fala (dilatação por janela)
+    hold = max(1, int(release / hop))
+    held = np.convolve(speaking, np.ones(hold), mode="full")[:len(speaking)] > 0
+
+    # Attack: suaviza a transição (janela centrada = leve antecipação da fala)
+    duck_amount = _moving_average(held.astype(np.float64), attack / hop)
+
+    return 10 ** ((duck_db * duck_amount) / 20)
+
+def pick_music_track(music_dir="assets/music/"):
+    """
+    Escolhe uma trilha aleatória da biblioteca de músicas
+
+    Args:
+        music_dir: Diretório com as músicas de fundo
+
+    Returns:
+        Caminho da música ou None se a biblioteca estiver vazia
+    """
+    if not music_dir or not os.path.isdir(music_dir):
+        return None
+
+    # Ordenado: a ordem do listdir muda entre sistemas de arquivos (e a seed do job não cobriria)
+    tracks = sorted(f for f in os.listdir(music_dir) if f.lower().endswith(MUSIC_EXTENSIONS))
+    if not tracks:
+        return None
+
+    return os.path.join(music_dir, random.choice(tracks))
+
+def load_audio_array(audio_path, sample_rate=SAMPLE_RATE):
+    """
+    Decodifica um arquivo de áudio inteiro para um array estéreo
+
+    Args:
+        audio_path: Caminho do arquivo de áudio
+        sample_rate: Taxa de amostragem desejada
+
+    Returns:
+        Array (amostras, 2) em float64
+    """
+    from moviepy.audio.io.AudioFileClip import AudioFileClip
+
+    clip = AudioFileClip(audio_path, fps=sample_rate)
+    try:
+        # Junta os blocos manualmente (to_soundarray quebra com NumPy 2)
+        chunks = list(clip.iter_chunks(fps=sample_rate, chunksize=50000))
+        samples = _as_2d(np.vstack(chunks))
+    finally:
+        clip.close()
+
+    if samples.shape[1] == 1:
+        samples = np.repeat(samples, 2, axis=1)
+
+    return samples
+
+def load_music_array(music_path, sample_rate=SAMPLE_RATE):
+    """
+    Decodifica uma música uma única vez por processo (somente leitura)
+
+    Args:
+        music_path: Caminho da música
+        sample_rate: Taxa de amostragem desejada
+
+    Returns:
+        Array (amostras, 2) compartilhado entre as mixagens
+    """
+    key = (os.path.abspath(music_path), os.path.getmtime(music_path), sample_rate)
+    with _MUSIC_LOCK:
+        if key not in _MUSIC_ARRAYS:
+            music = load_audio_array(music_path, sample_rate)
+            music.setflags(write=False)
+            _MUSIC_ARRAYS[key] = music
+        return _MUSIC_ARRAYS[key]
+
+def mix_narration_with_music(narration, music, sample_rate=SAMPLE_RATE, music_level_db=-18.0, duck_db=-12.0, fade=1.5):
+    """
+    Mixa a narração com a trilha, aplicando ducking guiado pela narração
+
+    Args:
+        narration: Array (amostras, canais) da narração já normalizada
+        music: Array (amostras, canais) da música
+        sample_rate: Taxa de amostragem em Hz
+        music_level_db: Nível da música relativo à narração (em LU)
+        duck_db: Redução extra da música durante a fala
+        fade: Fade-in/fade-out da música em segundos
+
+    Returns:
+        Array (amostras, canais) com a mixagem final
+    """
+    narration = _as_2d(narration)
+    music = _as_2d(music)
+    n = narration.shape[0]
+
+    if music.shape[1] != narration.shape[1]:
+        music = np.repeat(music.mean(axis=1, keepdims=True), narration.shape[1], axis=1)
+
+    # Repete a música em loop até cobrir toda a narração
+    music = np.take(music, np.arange(n) % music.shape[0], axis=0)
+
+    # Nivela a música em relação ao loudness da narração
+    narration_lufs = measure_integrated_loudness(narration, sample_rate)
+    music_lufs = measure_integrated_loudness(music, sample_rate)
+    if np.isfinite(narration_lufs) and np.isfinite(music_lufs):
+        music = music * 10 ** ((narration_lufs + music_level_db - music_lufs) / 20)
+
+    # Curva de ducking numa taxa de controle e interpolada para cada amostra
+    hop = 0.01
+    times, envelope_db = narration_envelope(narration, sample_rate, hop=hop)
+    gain = duck_gain_curve(envelope_db, hop=hop, duck_db=duck_db)
+    sample_times = np.arange(n) / sample_rate
+    gain = np.interp(sample_times, times, gain)
+
+    # Fade-in / fade-out da trilha
+    fade_samples = min(int(fade * sample_rate), n // 2)
+    if fade_samples > 0:
+        ramp = np.linspace(0.0, 1.0, fade_samples)
+        gain[:fade_samples] *= ramp
+        gain[-fade_samples:] *= ramp[::-1]
+
+    mixed = narration + music * gain[:, np.newaxis]
+
+    # Proteção contra clipping na soma final
+    peak = np.abs(mixed).max()
+    if peak > 0.99:
+        mixed *= 0.99 / peak
+
+    return mixed
+
+def build_audio_track(audio_path, music_dir="assets/music/", target_lufs=-14.0, music_level_db=-18.0, duck_db=-12.0, sample_rate=SAMPLE_RATE, music_path=None):
+    """
+    Estágio completo de áudio: normaliza a narração e mixa a trilha (se houver)
+
+    Args:
+        audio_path: Caminho da narração gerada pelo TTS
+        music_dir: Biblioteca de músicas (None desativa a trilha)
+        target_lufs: Loudness alvo da narração
+        music_level_db: Nível da música relativo à narração
+        duck_db: Redução da música durante a fala
+        sample_rate: Taxa de amostragem da mixagem
+        music_path: Música específica (ignora music_dir; ex: mesma trilha em todas as partes)
+
+    Returns:
+        AudioArrayClip pronto para set_audio()
+    """
+    from moviepy.audio.AudioClip import AudioArrayClip
+
+    narration = load_audio_array(audio_path, sample_rate)
+    measured = measure_integrated_loudness(narration, sample_rate)
+    narration, gain_db = normalize_loudness(narration, sample_rate, target_lufs)
+    print(f"🔊 Loudness da narração: {measured:.1f} LUFS → {target_lufs:.1f} LUFS ({gain_db:+.1f} dB)")
+
+    mixed = narration
+    music_path = music_path or pick_music_track(music_dir)
+    if music_path:
+        print(f"🎵 Trilha de fundo: {os.path.basename(music_path)} (ducking {duck_db:.0f} dB)")
+        music = load_music_array(music_path, sample_rate)
+        mixed = mix_narration_with_music(narration, music, sample_rate, music_level_db, duck_db)
+
+    # set_duration também define o "end", exigido quando o áudio entra num CompositeVideoClip
+    return AudioArrayClip(mixed.astype(np.float32), fps=sample_rate).set_duration(mixed.shape[0] / sample_rate)
+
+if __name__ == "__main__":
+    # Teste: mede o loudness de um áudio existente
+    test_audio = "assets/output/audio.mp3"
+
+    if os.path.exists(test_audio):
+        samples = load_audio_array(test_audio)
+        print(f"🔊 Loudness integrado: {measure_integrated_loudness(samples):.1f} LUFS")
+    else:
+        print("⚠️ Crie um áudio de teste primeiro usando tts_generate.py")
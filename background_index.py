@@ -0,0 +1,366 @@
+"""
+🗂️ Índice de características dos vídeos de fundo
+Cada vídeo é amostrado uma única vez (frames reduzidos, já no recorte 9:16) e
+as características - brilho, movimento e cores dominantes - ficam num JSON ao
+lado dos vídeos. A seleção usa o índice para escolher fundos diferentes entre
+si, visualmente coerentes e que não atrapalham a leitura das legendas
+
+Uso:
+    python background_index.py            # Indexa vídeos novos/alterados e mostra a tabela
+    python background_index.py --rebuild  # Refaz o índice inteiro
+"""
+
+import json
+import os
+import random
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+INDEX_FILENAME = ".background_index.json"
+INDEX_VERSION = 3
+
+# Amostragem: 4 frames por segundo, reduzidos para 36x64 (mesma proporção do Shorts)
+SAMPLE_FPS = 4
+SAMPLE_SIZE = (36, 64)
+
+# Faixa vertical onde as legendas ficam (fração da altura, ver subtitle_whisper)
+CAPTION_BAND = (0.50, 0.66)
+
+# Grade grossa por amostra: faixas horizontais com luminância e "agitação" (textura)
+GRID_BANDS = 16
+
+# Troca de cena: distância entre histogramas de luminância de amostras consecutivas
+SCENE_HIST_BINS = 16
+SCENE_CUT_THRESHOLD = 0.4
+
+def index_path_for(videos_dir):
+    """Caminho do índice de um diretório de vídeos"""
+    return os.path.join(videos_dir, INDEX_FILENAME)
+
+def sample_frames(video_path, fps=SAMPLE_FPS, size=SAMPLE_SIZE):
+    """
+    Decodifica o vídeo uma vez, já recortado em 9:16 e reduzido
+
+    Args:
+        video_path: Caminho do vídeo
+        fps: Frames amostrados por segundo
+        size: (largura, altura) dos frames amostrados
+
+    Returns:
+        Array (frames, altura, largura, 3) uint8
+    """
+    from imageio_ffmpeg import get_ffmpeg_exe
+
+    width, height = size
+    # Mesmo recorte central de create_vertical_video, antes de reduzir
+    vf = f"crop=w='min(iw,ih*9/16)':h='min(ih,iw*16/9)',fps={fps},scale={width}:{height}:flags=area"
+    result = subprocess.run(
+        [get_ffmpeg_exe(), "-loglevel", "error", "-i", video_path, "-an", "-vf", vf,
+         "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        capture_output=True, check=True
+    )
+    frame_bytes = width * height * 3
+    count = len(result.stdout) // frame_bytes
+    if count == 0:
+        raise ValueError(f"Nenhum frame decodificado em {video_path}")
+    return np.frombuffer(result.stdout[:count * frame_bytes], dtype=np.uint8).reshape(count, height, width, 3)
+
+def luminance(frames):
+    """Luminância (Rec. 601) em 0..1 de um array (..., 3) uint8"""
+    return frames @ np.array([0.299, 0.587, 0.114], dtype=np.float32) / 255.0
+
+def color_histogram(frames, levels=4):
+    """
+    Histograma de cores quantizadas (levels³ caixas) de todos os pixels
+
+    Args:
+        frames: Array (..., 3) uint8
+        levels: Níveis por canal
+
+    Returns:
+        Array normalizado (soma 1)
+    """
+    quantized = (frames.reshape(-1, 3) // (256 // levels)).astype(np.int64)
+    bins = (quantized[:, 0] * levels + quantized[:, 1]) * levels + quantized[:, 2]
+    hist = np.bincount(bins, minlength=levels ** 3).astype(np.float64)
+    return hist / hist.sum()
+
+def dominant_colors(hist, levels=4, top=3):
+    """Cores (centro da caixa) e pesos das caixas mais frequentes do histograma"""
+    step = 256 // levels
+    colors = []
+    for bin_index in np.argsort(hist)[::-1][:top]:
+        r, rest = divmod(int(bin_index), levels * levels)
+        g, b = divmod(rest, levels)
+        center = [int(c * step + step // 2) for c in (r, g, b)]
+        colors.append(center + [round(float(hist[bin_index]), 4)])
+    return colors
+
+def band_grid(luma, bands=GRID_BANDS):
+    """
+    Luminância e agitação por faixa horizontal de cada amostra
+
+    Agitação = gradiente médio absoluto (textura/detalhe que compete com o texto)
+
+    Args:
+        luma: Array (frames, altura, largura) em 0..1
+        bands: Quantidade de faixas
+
+    Returns:
+        Tupla (luminância, agitação), cada uma (frames, faixas)
+    """
+    frames, height, width = luma.shape
+    rows = height // bands * bands
+    luma = luma[:, :rows]
+
+    grad = np.zeros_like(luma)
+    grad[:, :, 1:] += np.abs(np.diff(luma, axis=2))
+    grad[:, 1:, :] += np.abs(np.diff(luma, axis=1))
+
+    shape = (frames, bands, rows // bands * width)
+    return luma.reshape(shape).mean(axis=2), grad.reshape(shape).mean(axis=2)
+
+def scene_changes(luma, bins=SCENE_HIST_BINS):
+    """
+    Diferença entre amostras consecutivas: movimento e troca de cena
+
+    Args:
+        luma: Array (frames, altura, largura) em 0..1
+        bins: Faixas do histograma de luminância
+
+    Returns:
+        Tupla (movimento, distância dos histogramas), arrays (frames,) com 0 na
+        primeira amostra; a distância vai de 0 (mesma cena) a 1 (nada em comum)
+    """
+    frames = len(luma)
+    motion = np.zeros(frames, dtype=np.float32)
+    distance = np.zeros(frames, dtype=np.float32)
+    if frames < 2:
+        return motion, distance
+
+    motion[1:] = np.abs(np.diff(luma, axis=0)).mean(axis=(1, 2))
+
+    # Histogramas de todas as amostras com um único bincount
+    indices = np.minimum((luma * bins).astype(np.int64), bins - 1).reshape(frames, -1)
+    indices += np.arange(frames)[:, None] * bins
+    hists = np.bincount(indices.ravel(), minlength=frames * bins).reshape(frames, bins)
+    hists = hists / indices.shape[1]
+    distance[1:] = 0.5 * np.abs(np.diff(hists, axis=0)).sum(axis=1)
+    return motion, distance
+
+def compute_features(frames, fps=SAMPLE_FPS):
+    """
+    Características de um vídeo a partir dos frames amostrados (tudo vetorizado)
+
+    Args:
+        frames: Array (frames, altura, largura, 3) uint8
+        fps: Taxa de amostragem dos frames
+
+    Returns:
+        Dict com brilho, brilho da faixa da legenda, fração escura, movimento,
+        cores dominantes, histograma de cores, a grade de faixas por amostra
+        (usada por caption_layout.py) e movimento/trocas de cena por amostra
+        (usados por cut_planner.py)
+    """
+    luma = luminance(frames)
+    height = luma.shape[1]
+    band = luma[:, int(height * CAPTION_BAND[0]):int(height * CAPTION_BAND[1])]
+
+    # Energia de movimento: diferença média absoluta entre amostras consecutivas
+    motion = float(np.abs(np.diff(luma, axis=0)).mean()) if len(luma) > 1 else 0.0
+
+    hist = color_histogram(frames)
+    band_luma, band_busy = band_grid(luma)
+    sample_motion, scene_distance = scene_changes(luma)
+
+    # Trocas de cena: picos locais da distância acima do limiar
+    peaks = (scene_distance > SCENE_CUT_THRESHOLD)
+    peaks[1:-1] &= (scene_distance[1:-1] >= scene_distance[:-2]) & (scene_distance[1:-1] >= scene_distance[2:])
+    return {
+        "duration": round(len(frames) / fps, 2),
+        "brightness": round(float(luma.mean()), 4),
+        "caption_brightness": round(float(band.mean()), 4),
+        "dark_fraction": round(float((luma < 0.15).mean()), 4),
+        "motion": round(motion, 4),
+        "palette": dominant_colors(hist),
+        "histogram": [round(float(v), 4) for v in hist],
+        "sample_fps": fps,
+        "band_luma": np.round(band_luma, 2).tolist(),
+        "band_busy": np.round(band_busy, 3).tolist(),
+        "sample_motion": np.round(sample_motion, 4).tolist(),
+        "scene_cuts": [round(i / fps, 2) for i in np.flatnonzero(peaks)]
+    }
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+def load_index(videos_dir):
+    """Lê o índice do diretório (vazio se não existir ou for de outra versão)"""
+    path = index_path_for(videos_dir)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != INDEX_VERSION:
+        return {}
+    return data.get("videos", {})
+
+def save_index(videos_dir, entries):
+    """Grava o índice de forma atômica"""
+    path = index_path_for(videos_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "videos": entries}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def update_index(videos_dir, filenames, rebuild=False, max_workers=4):
+    """
+    Indexa só os vídeos novos ou alterados (tamanho/mtime) e grava o índice
+
+    Args:
+        videos_dir: Diretório dos vídeos
+        filenames: Arquivos de vídeo a manter no índice
+        rebuild: Se True, ignora o índice existente
+        max_workers: Vídeos decodificados ao mesmo tempo (um ffmpeg cada)
+
+    Returns:
+        Dict nome do arquivo -> características
+    """
+    entries = {} if rebuild else load_index(videos_dir)
+    pending = []
+    for name in filenames:
+        size, mtime = _file_signature(os.path.join(videos_dir, name))
+        entry = entries.get(name)
+        if not entry or entry.get("size") != size or entry.get("mtime") != mtime:
+            pending.append((name, size, mtime))
+
+    stale = set(entries) - set(filenames)
+    if not pending and not stale:
+        return entries
+
+    if pending:
+        print(f"🗂️ Indexando {len(pending)} vídeo(s) de fundo (só na primeira vez)...")
+
+    def analyze(item):
+        name, size, mtime = item
+        try:
+            features = compute_features(sample_frames(os.path.join(videos_dir, name)))
+        except Exception as e:
+            print(f"⚠️ Não foi possível indexar {name}: {e}")
+            return name, None
+        features.update({"size": size, "mtime": mtime})
+        return name, features
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for name, features in pool.map(analyze, pending):
+            if features:
+                entries[name] = features
+
+    for name in stale:
+        entries.pop(name, None)
+
+    save_index(videos_dir, entries)
+    return entries
+
+def caption_quality(entry, max_caption_brightness=0.65, min_brightness=0.12):
+    """
+    Nota (0..1] de um fundo para receber legendas brancas com contorno preto
+
+    Faixa da legenda muito clara apaga o texto branco; vídeos quase pretos
+    deixam o vídeo apagado. Os dois casos perdem nota, sem serem excluídos
+
+    Args:
+        entry: Características do vídeo
+        max_caption_brightness: Brilho máximo aceitável na faixa da legenda
+        min_brightness: Brilho médio mínimo do vídeo
+
+    Returns:
+        Nota do fundo
+    """
+    quality = 1.0
+    if entry["caption_brightness"] > max_caption_brightness:
+        quality *= max(0.05, 1.0 - 3 * (entry["caption_brightness"] - max_caption_brightness))
+    if entry["brightness"] < min_brightness:
+        quality *= max(0.05, entry["brightness"] / min_brightness)
+    return quality
+
+def similarity(a, b):
+    """Coerência visual entre dois fundos: paleta parecida e ritmo de movimento parecido"""
+    palette = float(np.minimum(a["histogram"], b["histogram"]).sum())
+    motion = 1.0 - abs(a["motion"] - b["motion"]) / max(a["motion"], b["motion"], 1e-3)
+    return palette * (0.5 + 0.5 * motion)
+
+def select_backgrounds(entries, count, rng=random, min_quality=0.5):
+    """
+    Escolhe fundos distintos, coerentes entre si e bons para legenda
+
+    O primeiro é sorteado pela nota; os seguintes priorizam a coerência com os
+    já escolhidos (com um pouco de sorte entre os melhores). Só repete arquivo
+    quando não há vídeos distintos suficientes
+
+    Args:
+        entries: Dict nome -> características
+        count: Quantidade de fundos
+        rng: Gerador aleatório (random ou random.Random)
+        min_quality: Nota mínima; se faltar vídeo, os piores também entram
+
+    Returns:
+        Lista de nomes de arquivo (pode repetir se count > vídeos disponíveis)
+    """
+    if not entries or count <= 0:
+        return []
+
+    scored = {name: caption_quality(entry) for name, entry in entries.items()}
+    candidates = [name for name in sorted(entries) if scored[name] >= min_quality]
+    if len(candidates) < count:
+        candidates = sorted(entries, key=lambda name: -scored[name])
+
+    first = rng.choices(candidates, weights=[scored[name] for name in candidates])[0]
+    chosen = [first]
+    remaining = [name for name in candidates if name != first]
+
+    while len(chosen) < count and remaining:
+        ranked = sorted(
+            remaining,
+            key=lambda name: -scored[name] * np.mean([similarity(entries[name], entries[c]) for c in chosen])
+        )
+        pick = rng.choice(ranked[:3])
+        chosen.append(pick)
+        remaining.remove(pick)
+
+    # Menos vídeos que o pedido: repete na mesma ordem (o decoder é compartilhado)
+    while len(chosen) < count:
+        chosen.append(chosen[len(chosen) % len(set(chosen))])
+
+    return chosen
+
+def main():
+    """Indexa o diretório e mostra as características"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Índice de características dos vídeos de fundo")
+    parser.add_argument("--dir", default="assets/videos/", help="Diretório dos vídeos de fundo")
+    parser.add_argument("--rebuild", action="store_true", help="Refaz o índice inteiro")
+    args = parser.parse_args()
+
+    from video_generate import list_backgrounds
+
+    entries = update_index(args.dir, list_backgrounds(args.dir), rebuild=args.rebuild)
+
+    print(f"\n{'Vídeo':<40} {'Brilho':>7} {'Legenda':>8} {'Movim.':>7} {'Nota':>5}  Cor dominante")
+    print("-" * 90)
+    for name in sorted(entries):
+        entry = entries[name]
+        color = "#%02x%02x%02x" % tuple(entry["palette"][0][:3])
+        print(f"{name[:40]:<40} {entry['brightness']:>7.2f} {entry['caption_brightness']:>8.2f} "
+              f"{entry['motion']:>7.3f} {caption_quality(entry):>5.2f}  {color}")
+    print(f"\n✅ {len(entries)} vídeos indexados em {index_path_for(args.dir)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+📈 Benchmark do recorte 9:16 + redimensionamento para 1080x1920
+Compara, frame a frame, o caminho antigo do MoviePy (crop + resize genérico,
+que no MoviePy 1.x é um Image.resize LANCZOS com cópias) com o
+VerticalFrameTransformer (mapas pré-calculados, NumPy ou Pillow)
+
+Uso:
+    python bench_frame_transform.py                    # 720p e 1080p, 60 frames
+    python bench_frame_transform.py --frames 200
+    python bench_frame_transform.py --sizes 1280x720,576x1024
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from provider_router import percentile
+from frame_transform import OUTPUT_SIZE, VerticalFrameTransformer, vertical_crop_box
+
+def synthetic_frames(size, count=8, seed=0):
+    """Frames com gradiente + ruído (o custo não depende do conteúdo, só do tamanho)"""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 200, width, dtype=np.float32)[None, :, None]
+    frames = []
+    for _ in range(count):
+        noise = rng.integers(0, 55, (height, width, 3), dtype=np.uint8)
+        frames.append((gradient + noise).astype(np.uint8))
+    return frames
+
+def moviepy_path(size):
+    """
+    Caminho antigo de create_vertical_video: clip.crop(...) + clip.resize(height=1920)
+
+    Reproduz os passos do fx de resize do MoviePy 1.x com Pillow (que no
+    Pillow >= 10 quebra por causa de Image.ANTIALIAS): fatia de crop,
+    Image.fromarray, resize LANCZOS e np.array
+    """
+    from PIL import Image
+
+    x0, y0, crop_w, crop_h = vertical_crop_box(size)
+    new_size = (int(crop_w * OUTPUT_SIZE[1] / crop_h), OUTPUT_SIZE[1])
+
+    def transform(frame):
+        cropped = frame[y0:y0 + crop_h, x0:x0 + crop_w]
+        return np.array(Image.fromarray(cropped).resize(new_size, Image.LANCZOS))
+
+    return transform
+
+def time_frames(transform, frames, count):
+    """Latência (s) de cada chamada, ciclando pelos frames"""
+    transform(frames[0])  # Aquecimento (cache, primeiras alocações)
+    samples = []
+    for index in range(count):
+        start = time.perf_counter()
+        transform(frames[index % len(frames)])
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_size(size, count):
+    """Mede os três caminhos para uma geometria de origem"""
+    frames = synthetic_frames(size)
+    out = np.empty((OUTPUT_SIZE[1], OUTPUT_SIZE[0], 3), dtype=np.uint8)
+
+    numpy_transformer = VerticalFrameTransformer(size, method="numpy")
+    pillow_transformer = VerticalFrameTransformer(size, method="pillow")
+    paths = {
+        "moviepy (crop+resize)": moviepy_path(size),
+        "numpy (mapas)": lambda frame: numpy_transformer(frame, out),
+        "pillow (box+bilinear)": lambda frame: pillow_transformer(frame, out),
+    }
+
+    results = {}
+    for name, transform in paths.items():
+        samples = time_frames(transform, frames, count)
+        results[name] = {"p50": percentile(samples, 50), "p90": percentile(samples, 90), "fps": len(samples) / sum(samples)}
+
+    # Diferença visual contra o caminho antigo (LANCZOS vs bilinear); o MoviePy
+    # arredonda a largura para baixo (1079 em vez de 1080 em alguns vídeos)
+    reference = moviepy_path(size)(frames[0])
+    candidate = VerticalFrameTransformer(size)(frames[0])
+    width = min(reference.shape[1], candidate.shape[1])
+    results["diff_mean"] = float(np.abs(reference[:, :width].astype(np.int16) - candidate[:, :width]).mean())
+    return results
+
+def parse_sizes(spec):
+    """'1280x720,1920x1080' -> [(1280, 720), (1920, 1080)]"""
+    return [tuple(int(v) for v in item.lower().split("x")) for item in spec.split(",") if item.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do recorte/redimensionamento 9:16")
+    parser.add_argument("--frames", type=int, default=60, help="Frames medidos por caminho")
+    parser.add_argument("--sizes", default="1280x720,1920x1080", help="Geometrias de origem (LxA, separadas por vírgula)")
+    args = parser.parse_args()
+
+    for size in parse_sizes(args.sizes):
+        results = bench_size(size, args.frames)
+        baseline = results["moviepy (crop+resize)"]["p50"]
+
+        print(f"\n📐 {size[0]}x{size[1]} → {OUTPUT_SIZE[0]}x{OUTPUT_SIZE[1]} ({args.frames} frames)")
+        print(f"   {'caminho':<24} {'p50 (ms)':>9} {'p90 (ms)':>9} {'fps':>7} {'ganho':>7}")
+        for name, stats in results.items():
+            if name == "diff_mean":
+                continue
+            print(f"   {name:<24} {stats['p50'] * 1000:>9.1f} {stats['p90'] * 1000:>9.1f} {stats['fps']:>7.1f} {baseline / stats['p50']:>6.2f}x")
+        print(f"   Diferença média por pixel contra o caminho antigo: {results['diff_mean']:.2f} (0-255)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+📈 Benchmark offline do pipeline
+Roda o fluxo completo de main() e cada etapa isolada com provedores locais
+(Reddit, Groq, TTS e Whisper de offline_providers.py) e grava latências
+(p50/p90/p99) e throughput em um arquivo de resultados, um registro por execução
+
+Uso:
+    python bench_pipeline.py                         # Etapas isoladas + 2 vídeos completos
+    python bench_pipeline.py --iterations 5 --full 0 # Só etapas isoladas
+    python bench_pipeline.py --stages fetch,tts      # Só algumas etapas
+    python bench_pipeline.py --llm-latency 0.3       # Simula latência da API
+    python bench_pipeline.py --seed 42               # Vídeos completos sempre com o mesmo trabalho
+    python bench_pipeline.py --replay assets/output/replays/<job> --full 3  # Job real gravado (replay.py)
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from provider_router import percentile
+
+RESULTS_PATH = "bench_results.jsonl"
+STAGES = ("fetch", "summarize", "metadata", "tts", "audio_mix", "subtitle_build", "render")
+
+def latency_stats(samples):
+    """Resumo de latências (segundos) de uma etapa"""
+    return {
+        "n": len(samples),
+        "mean": sum(samples) / len(samples),
+        "p50": percentile(samples, 50),
+        "p90": percentile(samples, 90),
+        "p99": percentile(samples, 99),
+        "min": min(samples),
+        "max": max(samples),
+        "throughput_per_s": len(samples) / sum(samples) if sum(samples) > 0 else None
+    }
+
+def git_commit():
+    """Commit atual do repositório (para comparar resultados entre commits)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def bench_stages(providers, stages, iterations, work_dir, background_dir):
+    """
+    Mede cada etapa isolada
+
+    Args:
+        providers: OfflineProviders já instalado
+        stages: Etapas a medir
+        iterations: Repetições por etapa
+        work_dir: Pasta temporária para arquivos gerados
+        background_dir: Pasta dos vídeos de fundo
+
+    Returns:
+        Dict etapa -> lista de latências (s)
+    """
+    from reddit_fetch import get_story_from_multiple_subs
+    from summarize import summarize_text, generate_title_and_hashtags
+    import tts_generate
+
+    story = get_story_from_multiple_subs()
+    script = summarize_text(story["title"], story["text"])
+    audio_path = tts_generate.generate_voice(script, os.path.join(work_dir, "stage_audio.mp3"))
+
+    def run_audio_mix():
+        from audio_mix import build_audio_track
+        build_audio_track(audio_path, music_dir=None)
+
+    def run_subtitle_build():
+        from moviepy.editor import ColorClip
+        from offline_providers import audio_key
+        from subtitle_whisper import add_subtitles_to_video
+        clip = ColorClip((1080, 1920), color=(0, 0, 0), duration=providers.timings[audio_key(audio_path)][-1]["end"])
+        add_subtitles_to_video(clip, audio_path)
+
+    def run_render():
+        from video_generate import create_video
+        create_video(audio_path, os.path.join(work_dir, "stage_render.mp4"), background_dir=background_dir)
+
+    runners = {
+        "fetch": get_story_from_multiple_subs,
+        "summarize": lambda: summarize_text(story["title"], story["text"]),
+        "metadata": lambda: generate_title_and_hashtags(script),
+        "tts": lambda: tts_generate.generate_voice(script, os.path.join(work_dir, "stage_tts.mp3")),
+        "audio_mix": run_audio_mix,
+        "subtitle_build": run_subtitle_build,
+        "render": run_render
+    }
+
+    results = {}
+    for name in stages:
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            runners[name]()
+            samples.append(time.perf_counter() - start)
+        results[name] = samples
+    return results
+
+def bench_full(count, work_dir, seed=None, options=None):
+    """
+    Roda main() completo várias vezes e coleta as etapas do tracer
+
+    Args:
+        count: Quantidade de vídeos
+        work_dir: Pasta de saída
+        seed: Seed de todas as execuções (None = cada vídeo sorteia a sua)
+        options: Argumentos extras de main() (ex: opções gravadas no bundle de replay)
+
+    Returns:
+        Tupla (latências por etapa do fluxo, latências totais por vídeo, vídeos gerados)
+    """
+    import tracing
+    from main import main
+
+    tracing.configure(trace_dir=os.path.join(work_dir, "traces"))
+    tracing.reset_history()
+
+    totals = []
+    produced = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        if main(output_dir=work_dir, seed=seed, **(options or {})):
+            produced += 1
+        totals.append(time.perf_counter() - start)
+
+    per_stage = {}
+    for tracer in tracing.job_history():
+        for record in tracer.records:
+            per_stage.setdefault(record["stage"], []).append(record["wall_s"])
+
+    tracing.reset_history()
+    return per_stage, totals, produced
+
+def load_previous(results_path):
+    """Último registro do arquivo de resultados (para comparação)"""
+    if not os.path.exists(results_path):
+        return None
+    with open(results_path, encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+def print_table(title, stats, previous=None):
+    """Imprime latências por etapa, com a variação do p50 contra a execução anterior"""
+    print(f"\n📊 {title}")
+    print(f"{'Etapa':<16} {'N':>3} {'p50 (s)':>9} {'p90 (s)':>9} {'p99 (s)':>9} {'ops/s':>8} {'Δ p50':>8}")
+    print("-" * 68)
+    for name, row in stats.items():
+        delta = ""
+        if previous and name in previous and previous[name]["p50"]:
+            delta = f"{100 * (row['p50'] / previous[name]['p50'] - 1):+.0f}%"
+        ops = f"{row['throughput_per_s']:.2f}" if row["throughput_per_s"] else "-"
+        print(f"{name:<16} {row['n']:>3} {row['p50']:>9.3f} {row['p90']:>9.3f} {row['p99']:>9.3f} {ops:>8} {delta:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do Reddit Shorts Bot")
+    parser.add_argument("--iterations", type=int, default=3, help="Repetições por etapa isolada")
+    parser.add_argument("--full", type=int, default=2, help="Vídeos completos via main() (0 = nenhum)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Etapas isoladas (separadas por vírgula)")
+    parser.add_argument("--backgrounds", default="assets/videos/", help="Pasta dos vídeos de fundo")
+    parser.add_argument("--reddit-latency", type=float, default=0.0, help="Latência simulada do Reddit (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latência simulada do LLM (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.0, help="Latência simulada do TTS (s)")
+    parser.add_argument("--results", default=RESULTS_PATH, help="Arquivo JSON lines de resultados")
+    parser.add_argument("--seed", type=int, help="Seed fixa dos vídeos completos (mesmo trabalho em toda execução)")
+    parser.add_argument("--replay", metavar="BUNDLE", help="Vídeos completos refazem um job gravado com --record")
+    args = parser.parse_args()
+
+    from offline_providers import OfflineProviders
+    from replay import ReplayProviders
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"Etapas desconhecidas: {', '.join(unknown)}")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    previous = load_previous(args.results)
+
+    # Jobs e histórico de histórias das fixtures ficam no catálogo temporário, nunca no de produção
+    import catalog
+    catalog.CATALOG_PATH = catalog.catalog_path(work_dir)
+    print(f"📈 Benchmark offline (commit {git_commit() or '?'}) - arquivos em {work_dir}")
+
+    with OfflineProviders(args.reddit_latency, args.llm_latency, args.tts_latency) as providers:
+        stage_samples = bench_stages(providers, stages, args.iterations, work_dir, args.backgrounds) if stages and args.iterations else {}
+        if not args.replay:
+            full_samples, totals, produced = bench_full(args.full, work_dir, args.seed) if args.full else ({}, [], 0)
+
+    workload = {"seed": args.seed, "replay": None}
+    if args.replay:
+        # Mesmo job real (Reddit, LLM, TTS e transcrição gravados) em todas as execuções
+        with ReplayProviders(args.replay) as replay:
+            workload = {"seed": replay.seed, "replay": replay.bundle["job_id"]}
+            full_samples, totals, produced = bench_full(args.full, work_dir, replay.seed, replay.options) if args.full else ({}, [], 0)
+
+    stage_stats = {name: latency_stats(samples) for name, samples in stage_samples.items()}
+    full_stats = {name: latency_stats(samples) for name, samples in full_samples.items()}
+
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "simulated_latency": {"reddit": args.reddit_latency, "llm": args.llm_latency, "tts": args.tts_latency},
+        "workload": workload,
+        "stages": stage_stats,
+        "full": {
+            "videos": args.full,
+            "produced": produced,
+            "videos_per_min": 60 * produced / sum(totals) if totals and sum(totals) > 0 else None,
+            "total": latency_stats(totals) if totals else None,
+            "stages": full_stats
+        }
+    }
+
+    if stage_stats:
+        print_table("ETAPAS ISOLADAS", stage_stats, previous and previous.get("stages"))
+    if full_stats:
+        print_table("FLUXO COMPLETO (main)", full_stats, previous and previous.get("full", {}).get("stages"))
+        rate = record["full"]["videos_per_min"]
+        print(f"\n🎬 {produced}/{args.full} vídeos - {rate:.2f} vídeos/min" if rate else f"\n🎬 {produced}/{args.full} vídeos")
+
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"\n💾 Resultado salvo em {args.results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Posição segura das legendas por trecho do fundo
+Usa a grade de faixas do índice de fundos (luminância e agitação por amostra)
+para escolher, antes da renderização, em que altura a legenda fica legível em
+cada trecho e se ela precisa de uma caixa escura por trás. Nada é analisado
+frame a frame durante o encode
+"""
+
+import numpy as np
+
+# Alturas candidatas do topo da caixa de legenda (fração da altura do vídeo)
+CAPTION_CANDIDATES = (0.50, 0.40, 0.60, 0.30, 0.68)
+DEFAULT_CAPTION_Y = 0.50
+
+# O texto ocupa o meio da caixa de 300px (em 1920): de +4% a +12% da altura
+TEXT_BAND = (0.04, 0.12)
+
+# Opacidade máxima da caixa escura atrás do texto e margem em volta das letras
+MAX_BOX_OPACITY = 0.6
+BOX_PADDING = 20
+
+def text_rows(caption_y, bands):
+    """Índices das faixas da grade cobertas pelo texto com a caixa no topo caption_y"""
+    top = int(np.floor((caption_y + TEXT_BAND[0]) * bands))
+    bottom = int(np.ceil((caption_y + TEXT_BAND[1]) * bands))
+    return slice(max(0, top), min(bands, max(bottom, top + 1)))
+
+def segment_stats(entry, source_start, duration):
+    """
+    Grade de faixas das amostras que aparecem em um trecho do vídeo final
+
+    Args:
+        entry: Características do vídeo (background_index)
+        source_start: Início do trecho no vídeo de origem (s)
+        duration: Duração do trecho (s)
+
+    Returns:
+        Dict com "luma" (p90 no tempo) e "busy" (média no tempo) por faixa
+    """
+    luma = np.asarray(entry["band_luma"], dtype=np.float32)
+    busy = np.asarray(entry["band_busy"], dtype=np.float32)
+    fps = entry.get("sample_fps", 4)
+
+    # Trechos maiores que o vídeo de origem dão a volta (o fundo é repetido em loop)
+    count = max(1, int(round(duration * fps)))
+    indices = (int(source_start * fps) + np.arange(count)) % len(luma)
+
+    return {
+        # Pior caso (p90): a legenda precisa ser legível mesmo nos frames mais claros
+        "luma": np.percentile(luma[indices], 90, axis=0),
+        "busy": busy[indices].mean(axis=0)
+    }
+
+def band_cost(stats, caption_y):
+    """
+    Custo de leitura de uma legenda branca com contorno em uma altura
+
+    Args:
+        stats: Resultado de segment_stats
+        caption_y: Topo da caixa de legenda (fração da altura)
+
+    Returns:
+        Custo (menor é melhor)
+    """
+    rows = text_rows(caption_y, len(stats["luma"]))
+    luma = float(stats["luma"][rows].max())
+    busy = float(stats["busy"][rows].mean())
+    # Fundo claro apaga o branco; textura compete com as letras
+    return 2.0 * max(0.0, luma - 0.35) + 3.0 * busy
+
+def box_opacity(stats, caption_y):
+    """
+    Opacidade da caixa escura atrás do texto (0 = sem caixa)
+
+    Arredondada em passos de 0.05 para que as caixas iguais sejam reaproveitadas
+    """
+    rows = text_rows(caption_y, len(stats["luma"]))
+    luma = float(stats["luma"][rows].max())
+    busy = float(stats["busy"][rows].mean())
+    opacity = 1.5 * (luma - 0.45) + 2.0 * (busy - 0.08)
+    return round(min(MAX_BOX_OPACITY, max(0.0, opacity)) * 20) / 20
+
+def plan_caption_layout(segments, entries, candidates=CAPTION_CANDIDATES, default_y=DEFAULT_CAPTION_Y, stickiness=0.03):
+    """
+    Escolhe altura e caixa da legenda para cada trecho do fundo
+
+    Args:
+        segments: Trechos do vídeo final ("name", "source_start", "start", "end")
+        entries: Índice de fundos (nome do arquivo -> características)
+        candidates: Alturas possíveis do topo da caixa
+        default_y: Altura preferida (empate fica com ela)
+        stickiness: Vantagem da altura do trecho anterior (evita pular à toa;
+            menor que a atração da altura padrão, para voltar a ela quando der)
+
+    Returns:
+        Lista de dicts com "start", "end", "caption_y", "box_opacity" e "stats"
+        (stats permite recalcular a caixa para outra altura); trechos sem
+        índice ficam na altura padrão sem caixa
+    """
+    layout = []
+    previous_y = default_y
+
+    for segment in segments:
+        entry = entries.get(segment["name"])
+        if not entry or "band_luma" not in entry:
+            layout.append({"start": segment["start"], "end": segment["end"], "caption_y": default_y, "box_opacity": 0.0, "stats": None})
+            previous_y = default_y
+            continue
+
+        stats = segment_stats(entry, segment["source_start"], segment["end"] - segment["start"])
+
+        def cost(y):
+            penalty = 0.25 * abs(y - default_y)
+            if y == previous_y:
+                penalty -= stickiness
+            return band_cost(stats, y) + penalty
+
+        best = min(candidates, key=cost)
+        layout.append({
+            "start": segment["start"],
+            "end": segment["end"],
+            "caption_y": best,
+            "box_opacity": box_opacity(stats, best),
+            "stats": stats
+        })
+        previous_y = best
+
+    return layout
+
+def layout_at(layout, t):
+    """Item do layout ativo no instante t (o último se t passar do fim)"""
+    for item in layout:
+        if t < item["end"]:
+            return item
+    return layout[-1] if layout else None
+
+def make_box_image(width, height, opacity, padding=BOX_PADDING, radius=24):
+    """
+    Caixa preta semitransparente com cantos arredondados
+
+    Args:
+        width, height: Tamanho do texto recortado
+        opacity: Opacidade (0..1)
+        padding: Margem em volta do texto
+        radius: Raio dos cantos
+
+    Returns:
+        Array RGBA (altura + 2*padding, largura + 2*padding, 4)
+    """
+    from PIL import Image, ImageDraw
+
+    size = (width + 2 * padding, height + 2 * padding)
+    img = Image.new("RGBA", size, (0, 0, 0, 0))
+    ImageDraw.Draw(img).rounded_rectangle([0, 0, size[0] - 1, size[1] - 1], radius=radius, fill=(0, 0, 0, int(255 * opacity)))
+    return np.array(img)
+
+def caption_placement(layout, t, fixed_y=None):
+    """
+    Altura e opacidade da caixa da legenda que começa no instante t
+
+    Args:
+        layout: Resultado de plan_caption_layout (None/vazio = padrão sem caixa)
+        t: Início da legenda (s); a legenda inteira fica no mesmo lugar
+        fixed_y: Altura imposta pelo formato (fração da altura do vídeo base);
+            None = usa a altura escolhida pelo planejador
+
+    Returns:
+        Tupla (caption_y, box_opacity)
+    """
+    item = layout_at(layout, t) if layout else None
+    if item is None:
+        return (DEFAULT_CAPTION_Y if fixed_y is None else fixed_y), 0.0
+    if fixed_y is None:
+        return item["caption_y"], item["box_opacity"]
+    if item["stats"] is None:
+        return fixed_y, 0.0
+    return fixed_y, box_opacity(item["stats"], fixed_y)
@@ -0,0 +1,569 @@
+"""
+📚 Catálogo dos vídeos produzidos (SQLite local)
+Cada job grava, em uma única transação no fim, de qual post veio o vídeo, a
+voz, os vídeos de fundo, as durações, os arquivos gerados e o tempo de cada
+etapa (do trace do job) - base para deduplicação, limpeza e métricas
+
+Uso:
+    python catalog.py list                     # Últimos 20 jobs
+    python catalog.py list --subreddit tifu --since 2026-10-01
+    python catalog.py show 20261019_101500     # Detalhes + etapas de um job
+    python catalog.py post abc123              # Jobs que usaram um post do Reddit
+    python catalog.py stats                    # Tempo médio por etapa, jobs por subreddit
+    python catalog.py review 20261019_101500 keep   # Decisão keep/discard (treino do story_score)
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+CATALOG_PATH = "assets/output/catalog.db"
+CATALOG_FILE = "catalog.db"
+DEFAULT_OUTPUT_DIR = "assets/output"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    post_id TEXT,
+    subreddit TEXT,
+    post_title TEXT,
+    post_score INTEGER,
+    post_url TEXT,
+    title TEXT,
+    hashtags TEXT,
+    tts_provider TEXT,
+    voice TEXT,
+    parts INTEGER,
+    video_path TEXT,
+    thumbnail TEXT,
+    preview TEXT,
+    outputs TEXT,
+    backgrounds TEXT,
+    audio_duration REAL,
+    wall_s REAL,
+    bytes_written INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_videos_post ON videos (post_id);
+CREATE INDEX IF NOT EXISTS idx_videos_created ON videos (created_at);
+CREATE INDEX IF NOT EXISTS idx_videos_subreddit ON videos (subreddit, created_at);
+
+CREATE TABLE IF NOT EXISTS stages (
+    job_id TEXT NOT NULL REFERENCES videos (job_id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    wall_s REAL,
+    cpu_s REAL,
+    peak_rss_mb REAL,
+    bytes_written INTEGER,
+    error TEXT,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_stages_stage ON stages (stage);
+
+CREATE TABLE IF NOT EXISTS posts (
+    job_id TEXT PRIMARY KEY REFERENCES videos (job_id) ON DELETE CASCADE,
+    post_id TEXT NOT NULL,
+    title TEXT,
+    body TEXT,
+    score INTEGER,
+    num_comments INTEGER,
+    created_utc REAL,
+    ranked_at REAL,
+    quality REAL
+);
+
+-- Decisão humana sobre o vídeo publicado (treino do story_score); sobrevive a regravações do job
+CREATE TABLE IF NOT EXISTS reviews (
+    job_id TEXT PRIMARY KEY,
+    verdict TEXT NOT NULL CHECK (verdict IN ('keep', 'discard')),
+    reviewed_at REAL NOT NULL
+);
+
+-- Histórico para detectar repetidas (story_dedup.py): assinatura MinHash e baldes LSH por post publicado
+CREATE TABLE IF NOT EXISTS story_signatures (
+    post_id TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS story_buckets (
+    bucket INTEGER NOT NULL,
+    post_id TEXT NOT NULL,
+    PRIMARY KEY (bucket, post_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_story_buckets_post ON story_buckets (post_id);
+"""
+
+def catalog_path(output_dir=None):
+    """
+    Catálogo da pasta de saída do job
+
+    Cada pasta de saída tem o seu (benchmark e testes em pasta temporária não
+    gravam jobs nem histórico de histórias no catálogo de produção)
+
+    Args:
+        output_dir: Pasta de saída (None ou a padrão = CATALOG_PATH)
+
+    Returns:
+        Caminho do banco SQLite
+    """
+    if output_dir is None or os.path.normpath(output_dir) == os.path.normpath(DEFAULT_OUTPUT_DIR):
+        return CATALOG_PATH
+    return os.path.join(output_dir, CATALOG_FILE)
+
+def connect(db_path=CATALOG_PATH):
+    """
+    Abre o catálogo (cria o banco se não existir)
+
+    Args:
+        db_path: Caminho do banco SQLite
+
+    Returns:
+        Conexão SQLite em modo autocommit (transações explícitas)
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+def job_outputs(result):
+    """
+    Todos os arquivos finais de um job (vídeo, formatos, partes, thumbnail, prévia, legendas)
+
+    Args:
+        result: Dict retornado por run_pipeline/run_series (ou None)
+
+    Returns:
+        Lista de caminhos, sem repetição
+    """
+    if not result:
+        return []
+    paths = [result.get("video")]
+    paths += list((result.get("formats") or {}).values())
+    for part in result.get("parts") or []:
+        paths.append(part.get("video"))
+    paths += [result.get("thumbnail"), result.get("preview")]
+    paths += list(result.get("subtitles") or [])
+    return list(dict.fromkeys(path for path in paths if path))
+
+def build_record(job, tracer=None, status="ok"):
+    """
+    Junta os dados do job e as etapas do trace em uma linha do catálogo
+
+    Args:
+        job: Dict preenchido pelo pipeline ("story", "metadata", "voice", "result")
+        tracer: JobTracer do job (etapas, vídeos de fundo e duração)
+        status: Resultado do job (ok, failed)
+
+    Returns:
+        Tupla (dict da linha de videos, lista de dicts de stages)
+    """
+    story = job.get("story") or {}
+    metadata = job.get("metadata") or {}
+    voice = job.get("voice") or {}
+    result = job.get("result") or {}
+    records = tracer.records if tracer else []
+
+    # Vídeos de fundo e duração vêm da etapa background_prep (uma por parte na série)
+    backgrounds = []
+    audio_duration = 0.0
+    for record in records:
+        if record["stage"] == "background_prep":
+            backgrounds += [name for name in record.get("backgrounds", []) if name not in backgrounds]
+            audio_duration += record.get("duration") or 0.0
+
+    row = {
+        "job_id": str(job.get("job_id") or (tracer.job_id if tracer else "")),
+        "status": status,
+        "created_at": tracer.started_at if tracer else time.time(),
+        "post_id": story.get("id"),
+        "subreddit": story.get("subreddit"),
+        "post_title": story.get("title"),
+        "post_score": story.get("score"),
+        "post_url": story.get("url"),
+        "title": metadata.get("title"),
+        "hashtags": json.dumps(metadata.get("hashtags") or [], ensure_ascii=False),
+        "tts_provider": voice.get("provider"),
+        "voice": voice.get("voice"),
+        "parts": len(result.get("parts") or []) or (1 if result else 0),
+        "video_path": result.get("video"),
+        "thumbnail": result.get("thumbnail"),
+        "preview": result.get("preview"),
+        "outputs": json.dumps(job_outputs(result), ensure_ascii=False),
+        "backgrounds": json.dumps(backgrounds, ensure_ascii=False),
+        "audio_duration": round(audio_duration, 3) if audio_duration else None,
+        "wall_s": round(time.time() - tracer.started_at, 3) if tracer else None,
+        "bytes_written": sum(record["bytes_written"] for record in records)
+    }
+    stages = [{
+        "job_id": row["job_id"],
+        "seq": seq,
+        "stage": record["stage"],
+        "wall_s": record["wall_s"],
+        "cpu_s": round(record["cpu_s"] + record["children_cpu_s"], 6),
+        "peak_rss_mb": record["peak_rss_mb"],
+        "bytes_written": record["bytes_written"],
+        "error": record["error"]
+    } for seq, record in enumerate(records)]
+    return row, stages
+
+def build_post(job):
+    """
+    Linha de posts do job: o texto e os números do post usados pela pré-triagem
+
+    O corpo é o selftext inteiro (o mesmo que rank_stories pontuou), não o
+    texto cortado em max_chars que vai para o LLM: o treino vê as mesmas features
+
+    Returns:
+        Dict da linha (None se o job não chegou a buscar um post)
+    """
+    story = job.get("story") or {}
+    if not story.get("id"):
+        return None
+    return {
+        "job_id": str(job.get("job_id")),
+        "post_id": story["id"],
+        "title": story.get("title"),
+        "body": story.get("selftext") or story.get("text"),
+        "score": story.get("score"),
+        "num_comments": story.get("num_comments"),
+        "created_utc": story.get("created_utc"),
+        "ranked_at": story.get("ranked_at"),
+        "quality": story.get("quality")
+    }
+
+def record_job(job, tracer=None, status="ok", db_path=None):
+    """
+    Grava um job no catálogo de forma atômica (linha + etapas na mesma transação)
+
+    Gravar o mesmo job de novo substitui a linha anterior. Falhas no catálogo
+    nunca derrubam o job: o erro é impresso e a função retorna None
+
+    Args:
+        job: Dict preenchido pelo pipeline
+        tracer: JobTracer do job
+        status: Resultado do job
+        db_path: Caminho do catálogo (None = CATALOG_PATH)
+
+    Returns:
+        ID do job gravado (None em caso de falha)
+    """
+    try:
+        row, stages = build_record(job, tracer, status)
+        post = build_post(dict(job, job_id=row["job_id"]))
+        conn = connect(db_path or CATALOG_PATH)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM videos WHERE job_id = ?", (row["job_id"],))
+                conn.execute(
+                    f"INSERT INTO videos ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                    list(row.values())
+                )
+                if stages:
+                    conn.executemany(
+                        f"INSERT INTO stages ({', '.join(stages[0])}) VALUES ({', '.join('?' * len(stages[0]))})",
+                        [list(stage.values()) for stage in stages]
+                    )
+                if post:
+                    conn.execute(f"INSERT INTO posts ({', '.join(post)}) VALUES ({', '.join('?' * len(post))})", list(post.values()))
+                    # Só o que foi publicado entra no histórico de repetidas
+                    if status == "ok":
+                        from story_dedup import add_story
+                        add_story(conn, post["post_id"], post["body"])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return row["job_id"]
+    except Exception as e:
+        print(f"⚠️ Erro ao gravar no catálogo: {e}")
+        return None
+
+def review_job(job_id, verdict, db_path=None):
+    """
+    Grava a decisão keep/discard sobre um vídeo (a última decisão vale)
+
+    Args:
+        job_id: ID do job no catálogo
+        verdict: "keep" ou "discard"
+        db_path: Caminho do catálogo (None = CATALOG_PATH)
+
+    Returns:
+        True se gravou (None em caso de falha ou job inexistente)
+    """
+    try:
+        conn = connect(db_path or CATALOG_PATH)
+        try:
+            if conn.execute("SELECT 1 FROM videos WHERE job_id = ?", (job_id,)).fetchone() is None:
+                print(f"❌ Job {job_id} não encontrado")
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO reviews (job_id, verdict, reviewed_at) VALUES (?, ?, ?)",
+                (job_id, verdict, time.time())
+            )
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        print(f"⚠️ Erro ao gravar a revisão: {e}")
+        return None
+
+def training_examples(conn):
+    """
+    Posts com decisão keep/discard, no formato de história do story_score
+
+    Returns:
+        Lista de dicts (title, text, score, num_comments, created_utc, ranked_at, verdict)
+    """
+    rows = conn.execute(
+        """
+        SELECT p.post_id AS id, p.title, p.body AS text, p.score, p.num_comments, p.created_utc,
+               COALESCE(p.ranked_at, v.created_at) AS ranked_at, r.verdict
+        FROM reviews r JOIN posts p ON p.job_id = r.job_id JOIN videos v ON v.job_id = r.job_id
+        ORDER BY v.created_at
+        """
+    )
+    return [dict(row) for row in rows]
+
+def relocate_output(old_path, new_path=None, db_path=None):
+    """
+    Atualiza os caminhos de um arquivo movido (arquivado) ou apagado
+
+    Args:
+        old_path: Caminho gravado no catálogo
+        new_path: Novo caminho (None = arquivo apagado)
+        db_path: Caminho do catálogo (None = CATALOG_PATH)
+
+    Returns:
+        Quantidade de jobs atualizados (None em caso de falha)
+    """
+    try:
+        db_path = db_path or CATALOG_PATH
+        if not os.path.exists(db_path):
+            return 0
+        conn = connect(db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # O LIKE no nome do arquivo só pré-filtra; a troca é feita nos campos decodificados
+                rows = conn.execute(
+                    "SELECT job_id, video_path, thumbnail, preview, outputs FROM videos WHERE outputs LIKE ?",
+                    (f"%{os.path.basename(old_path)}%",)
+                ).fetchall()
+                updated = 0
+                for row in rows:
+                    outputs = json.loads(row["outputs"] or "[]")
+                    if old_path not in outputs:
+                        continue
+                    outputs = [new_path if path == old_path else path for path in outputs if path != old_path or new_path]
+                    fields = {key: (new_path if row[key] == old_path else row[key]) for key in ("video_path", "thumbnail", "preview")}
+                    conn.execute(
+                        "UPDATE videos SET video_path = ?, thumbnail = ?, preview = ?, outputs = ? WHERE job_id = ?",
+                        (fields["video_path"], fields["thumbnail"], fields["preview"], json.dumps(outputs, ensure_ascii=False), row["job_id"])
+                    )
+                    updated += 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return updated
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar o catálogo: {e}")
+        return None
+
+def _decode(row):
+    """Linha do SQLite -> dict com os campos JSON já decodificados"""
+    item = dict(row)
+    for key in ("hashtags", "outputs", "backgrounds"):
+        if item.get(key):
+            item[key] = json.loads(item[key])
+    return item
+
+def list_videos(conn, subreddit=None, since=None, status=None, limit=20):
+    """
+    Jobs mais recentes primeiro
+
+    Args:
+        conn: Conexão do catálogo
+        subreddit: Filtra por subreddit
+        since: Só jobs a partir deste timestamp (epoch)
+        status: Filtra por status (ok, failed)
+        limit: Máximo de linhas
+
+    Returns:
+        Lista de dicts
+    """
+    where, params = [], []
+    if subreddit:
+        where.append("subreddit = ?")
+        params.append(subreddit)
+    if since is not None:
+        where.append("created_at >= ?")
+        params.append(since)
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    sql = "SELECT * FROM videos"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC LIMIT ?"
+    return [_decode(row) for row in conn.execute(sql, (*params, limit))]
+
+def get_video(conn, job_id):
+    """Retorna um job com suas etapas (ou None)"""
+    row = conn.execute("SELECT * FROM videos WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    item = _decode(row)
+    item["stages"] = [dict(stage) for stage in conn.execute("SELECT * FROM stages WHERE job_id = ? ORDER BY seq", (job_id,))]
+    return item
+
+def find_post(conn, post_id):
+    """Jobs que usaram um post do Reddit (mais recentes primeiro)"""
+    rows = conn.execute("SELECT * FROM videos WHERE post_id = ? ORDER BY created_at DESC", (post_id,))
+    return [_decode(row) for row in rows]
+
+def stage_stats(conn, since=None):
+    """
+    Tempo médio e máximo por etapa (só jobs concluídos)
+
+    Args:
+        conn: Conexão do catálogo
+        since: Só jobs a partir deste timestamp (epoch)
+
+    Returns:
+        Lista de dicts por etapa, da mais lenta para a mais rápida
+    """
+    rows = conn.execute(
+        """
+        SELECT s.stage, COUNT(*) AS count, AVG(s.wall_s) AS avg_wall_s, MAX(s.wall_s) AS max_wall_s,
+               AVG(s.cpu_s) AS avg_cpu_s, MAX(s.peak_rss_mb) AS peak_rss_mb
+        FROM stages s JOIN videos v ON v.job_id = s.job_id
+        WHERE v.status = 'ok' AND v.created_at >= ?
+        GROUP BY s.stage ORDER BY avg_wall_s DESC
+        """,
+        (since or 0,)
+    )
+    return [dict(row) for row in rows]
+
+def subreddit_stats(conn, since=None):
+    """Jobs, falhas e duração média por subreddit"""
+    rows = conn.execute(
+        """
+        SELECT subreddit, COUNT(*) AS jobs, SUM(status != 'ok') AS failed,
+               AVG(audio_duration) AS avg_duration, AVG(wall_s) AS avg_wall_s
+        FROM videos WHERE created_at >= ?
+        GROUP BY subreddit ORDER BY jobs DESC
+        """,
+        (since or 0,)
+    )
+    return [dict(row) for row in rows]
+
+def parse_date(value):
+    """'2026-10-01' ou '2026-10-01 14:00' -> epoch (horário local)"""
+    for pattern in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, pattern).timestamp()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Data inválida: {value} (use AAAA-MM-DD)")
+
+def _print_rows(rows):
+    if not rows:
+        print("📭 Nenhum job encontrado")
+        return
+    print(f"{'Job':<16} {'Status':<7} {'Subreddit':<20} {'Post':<9} {'Dur (s)':>7} {'Total (s)':>9}  Título")
+    print("-" * 100)
+    for row in rows:
+        duration = f"{row['audio_duration']:.1f}" if row["audio_duration"] else "-"
+        wall = f"{row['wall_s']:.1f}" if row["wall_s"] else "-"
+        print(f"{row['job_id']:<16} {row['status']:<7} {(row['subreddit'] or '-'):<20} {(row['post_id'] or '-'):<9} "
+              f"{duration:>7} {wall:>9}  {(row['title'] or '')[:40]}")
+
+def main():
+    """CLI de consulta do catálogo"""
+    parser = argparse.ArgumentParser(description="Catálogo dos vídeos produzidos")
+    parser.add_argument("--db", default=CATALOG_PATH, help="Caminho do catálogo SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = commands.add_parser("list", help="Lista os jobs mais recentes")
+    list_cmd.add_argument("--subreddit", help="Filtra por subreddit")
+    list_cmd.add_argument("--since", type=parse_date, help="A partir da data (AAAA-MM-DD)")
+    list_cmd.add_argument("--status", choices=("ok", "failed"), help="Filtra por status")
+    list_cmd.add_argument("--limit", type=int, default=20, help="Máximo de jobs")
+
+    show = commands.add_parser("show", help="Detalhes e etapas de um job")
+    show.add_argument("job_id")
+
+    post = commands.add_parser("post", help="Jobs que usaram um post do Reddit")
+    post.add_argument("post_id")
+
+    stats = commands.add_parser("stats", help="Tempo por etapa e jobs por subreddit")
+    stats.add_argument("--since", type=parse_date, help="A partir da data (AAAA-MM-DD)")
+
+    review = commands.add_parser("review", help="Marca um vídeo como keep/discard (treino do story_score)")
+    review.add_argument("job_id")
+    review.add_argument("verdict", choices=("keep", "discard"))
+
+    args = parser.parse_args()
+    if args.command == "review":
+        if review_job(args.job_id, args.verdict, args.db):
+            print(f"✅ {args.job_id}: {args.verdict}")
+        return
+    conn = connect(args.db)
+    try:
+        if args.command == "list":
+            _print_rows(list_videos(conn, args.subreddit, args.since, args.status, args.limit))
+
+        elif args.command == "post":
+            _print_rows(find_post(conn, args.post_id))
+
+        elif args.command == "show":
+            video = get_video(conn, args.job_id)
+            if not video:
+                print(f"❌ Job {args.job_id} não encontrado")
+                return
+            stages = video.pop("stages")
+            video["created_at"] = datetime.fromtimestamp(video["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            for key, value in video.items():
+                print(f"   {key}: {value}")
+            print("\n   ⏱️ Etapas:")
+            for stage in stages:
+                error = f"  ❌ {stage['error']}" if stage["error"] else ""
+                print(f"      {stage['stage']:<16} {stage['wall_s']:>8.2f}s  CPU {stage['cpu_s']:>8.2f}s{error}")
+
+        else:
+            print("📊 Tempo por etapa (jobs concluídos)")
+            print(f"{'Etapa':<16} {'N':>5} {'Média (s)':>10} {'Máx (s)':>9} {'CPU (s)':>9} {'RSS (MB)':>9}")
+            print("-" * 62)
+            for row in stage_stats(conn, args.since):
+                rss = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "-"
+                print(f"{row['stage']:<16} {row['count']:>5} {row['avg_wall_s']:>10.2f} {row['max_wall_s']:>9.2f} {row['avg_cpu_s']:>9.2f} {rss:>9}")
+
+            print("\n📊 Jobs por subreddit")
+            print(f"{'Subreddit':<24} {'Jobs':>5} {'Falhas':>7} {'Dur (s)':>8} {'Total (s)':>10}")
+            print("-" * 58)
+            for row in subreddit_stats(conn, args.since):
+                duration = f"{row['avg_duration']:.1f}" if row["avg_duration"] else "-"
+                wall = f"{row['avg_wall_s']:.1f}" if row["avg_wall_s"] else "-"
+                print(f"{(row['subreddit'] or '-'):<24} {row['jobs']:>5} {row['failed']:>7} {duration:>8} {wall:>10}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Pontos de corte entre os vídeos de fundo
+Em vez de dividir a duração em partes iguais e cortar em qualquer instante,
+coloca as trocas de fundo nos fins de frase da narração e escolhe, em cada
+vídeo de origem, um trecho que entra e sai em momentos de pouco movimento
+(usando o movimento/trocas de cena do índice de fundos)
+"""
+
+import os
+import random
+
+import numpy as np
+
+# Pausa entre palavras que já conta como fim de frase (s)
+MIN_PAUSE = 0.35
+
+# Quanto a troca pode se afastar da divisão igual (fração da duração de cada vídeo)
+SLACK = 0.35
+
+# Nenhum trecho de fundo fica menor que isso (s)
+MIN_SEGMENT = 1.5
+
+def sentence_boundaries(words, min_pause=MIN_PAUSE):
+    """
+    Instantes da narração bons para trocar de fundo
+
+    Args:
+        words: Palavras com "text", "start" e "end" (transcrição do Whisper)
+        min_pause: Pausa mínima (s) para contar como quebra
+
+    Returns:
+        Lista de (instante, força): 1.0 em fim de frase, 0.5 em pausa sem pontuação
+    """
+    boundaries = []
+    for word, following in zip(words, words[1:]):
+        text = word["text"].strip()
+        gap = following["start"] - word["end"]
+        if text.endswith((".", "!", "?", "…")):
+            strength = 1.0
+        elif gap >= min_pause or text.endswith((",", ";", ":")):
+            strength = 0.5
+        else:
+            continue
+        # Meio da pausa: a troca acontece no silêncio
+        boundaries.append(((word["end"] + following["start"]) / 2, strength))
+    return boundaries
+
+def plan_boundaries(duration, count, boundaries=(), slack=SLACK, min_segment=MIN_SEGMENT):
+    """
+    Instantes de troca entre os vídeos de fundo
+
+    Args:
+        duration: Duração total (s)
+        count: Quantidade de vídeos
+        boundaries: Quebras da narração (de sentence_boundaries)
+        slack: Afastamento máximo da divisão igual (fração de cada parte)
+        min_segment: Duração mínima de cada trecho (s)
+
+    Returns:
+        Lista com count + 1 instantes, de 0 até duration
+    """
+    if count <= 1:
+        return [0.0, duration]
+
+    part = duration / count
+    window = part * slack
+    # Áudio curto demais para o mínimo: a divisão igual é o melhor possível
+    min_segment = min(min_segment, part)
+    cuts = [0.0]
+    for index in range(1, count):
+        ideal = index * part
+        low = max(cuts[-1] + min_segment, ideal - window)
+        high = min(duration - min_segment * (count - index), ideal + window)
+
+        # Quebra mais forte e mais perto da divisão igual dentro da janela
+        best, best_score = min(max(ideal, low), max(high, low)), 0.0
+        for time, strength in boundaries:
+            if low <= time <= high:
+                score = strength - 0.5 * abs(time - ideal) / max(window, 1e-6)
+                if score > best_score:
+                    best, best_score = time, score
+        cuts.append(best)
+
+    cuts.append(duration)
+    return cuts
+
+def motion_curve(entry, window=0.5):
+    """
+    Movimento suavizado por amostra (média móvel circular, o fundo é repetido em loop)
+
+    Args:
+        entry: Características do vídeo (background_index)
+        window: Largura da média (s)
+
+    Returns:
+        Array de movimento por amostra (None se o índice não tiver os dados)
+    """
+    motion = entry.get("sample_motion") if entry else None
+    if not motion:
+        return None
+    motion = np.asarray(motion, dtype=np.float32)
+    width = max(1, int(round(window * entry.get("sample_fps", 4))))
+    padded = np.concatenate([motion[-width:], motion, motion[:width]])
+    smooth = np.convolve(padded, np.ones(2 * width + 1) / (2 * width + 1), mode="same")
+    return smooth[width:width + len(motion)]
+
+def choose_source_start(entry, source_duration, length, rng=random, choices=3):
+    """
+    Início do trecho de um vídeo de origem com entrada e saída calmas
+
+    Args:
+        entry: Características do vídeo (None = sorteio simples)
+        source_duration: Duração real do vídeo de origem (s)
+        length: Duração do trecho (s)
+        rng: Gerador aleatório
+        choices: Sorteia entre os N melhores inícios (variedade entre vídeos)
+
+    Returns:
+        Início do trecho (s), no vídeo já repetido em loop se ele for curto
+    """
+    looped = source_duration * (int(length / source_duration) + 1) if source_duration < length else source_duration
+    latest = max(0.0, looped - length)
+
+    motion = motion_curve(entry)
+    if motion is None or source_duration < length:
+        # Sem índice (ou vídeo em loop, que já tem um corte no meio): sorteio como antes
+        return rng.uniform(0, latest)
+
+    fps = entry.get("sample_fps", 4)
+    starts = np.arange(0, int(latest * fps) + 1)
+    ends = np.minimum(starts + int(round(length * fps)), len(motion) - 1)
+    cost = motion[np.minimum(starts, len(motion) - 1)] + motion[ends]
+
+    # Troca de cena logo depois da entrada ou logo antes da saída vira um "flash"
+    for cut in entry.get("scene_cuts", []):
+        flash = ((cut > starts / fps) & (cut - starts / fps < 0.75)) | ((cut < ends / fps) & (ends / fps - cut < 0.75))
+        cost = cost + flash * 1.0
+
+    best = np.argsort(cost, kind="stable")[:choices]
+    return float(starts[rng.choice(list(best))] / fps)
+
+def plan_background_segments(sources, duration, entries=None, words=None, overlap=0.0, rng=random):
+    """
+    Trechos do fundo: quando trocar de vídeo e de onde cortar cada um
+
+    Args:
+        sources: Lista de (caminho, duração real do vídeo) na ordem de uso
+        duration: Duração total (s)
+        entries: Índice de fundos (nome do arquivo -> características) ou None
+        words: Palavras da narração com timestamps (None = divisão igual)
+        overlap: Crossfade (s): cada trecho, menos o último, continua por esse
+            tempo por baixo do seguinte
+        rng: Gerador aleatório
+
+    Returns:
+        Lista de dicts com "path", "name", "source_start", "start", "end" e
+        "length" (tempo usado do vídeo de origem, incluindo o crossfade)
+    """
+    entries = entries or {}
+    boundaries = sentence_boundaries(words) if words else []
+    cuts = plan_boundaries(duration, len(sources), boundaries)
+
+    segments = []
+    for index, ((path, source_duration), start, end) in enumerate(zip(sources, cuts, cuts[1:])):
+        name = os.path.basename(path)
+        length = end - start + (overlap if index < len(sources) - 1 else 0.0)
+        segments.append({
+            "path": path,
+            "name": name,
+            "source_start": choose_source_start(entries.get(name), source_duration, length, rng),
+            "start": start,
+            "end": end,
+            "length": length
+        })
+    return segments
@@ -0,0 +1,315 @@
+"""
+Exportação em vários formatos a partir de uma única renderização
+Cada frame do vídeo base (1080x1920) é decodificado e composto uma vez e
+repassado para um encoder ffmpeg por formato; cada formato recorta sua área,
+desenha as legendas na sua posição e tem resolução/bitrate próprios
+"""
+
+import os
+import queue
+import threading
+import numpy as np
+
+# Formatos de saída (tamanhos e posições relativos ao vídeo base 1080x1920)
+#   crop: área recortada do vídeo base (centralizada)
+#   size: resolução final (o ffmpeg redimensiona se for diferente do crop)
+#   caption_y: topo da caixa de legenda, em fração da altura do crop
+#       (None = altura escolhida por trecho do fundo, ver caption_layout.py)
+#   crf / bitrate: qualidade do H.264 (bitrate fixo tem prioridade)
+OUTPUT_FORMATS = {
+    "shorts": {"crop": (1080, 1920), "size": (1080, 1920), "caption_y": None, "crf": 20, "bitrate": None},
+    # Reels e TikTok cobrem o terço de baixo com legenda/botões: texto mais alto
+    "reels": {"crop": (1080, 1920), "size": (1080, 1920), "caption_y": 0.40, "crf": 20, "bitrate": None},
+    "tiktok": {"crop": (1080, 1920), "size": (1080, 1920), "caption_y": 0.42, "crf": 20, "bitrate": None},
+    "lowres": {"crop": (1080, 1920), "size": (720, 1280), "caption_y": None, "crf": None, "bitrate": "1500k"},
+    "square": {"crop": (1080, 1080), "size": (1080, 1080), "caption_y": 0.60, "crf": 21, "bitrate": None},
+}
+
+def parse_formats(spec):
+    """
+    Converte "shorts,square" (ou lista) em nomes de formato válidos
+
+    Args:
+        spec: String separada por vírgulas ou lista de nomes
+
+    Returns:
+        Lista de nomes (sem repetição, na ordem pedida)
+    """
+    names = spec.split(",") if isinstance(spec, str) else list(spec)
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+
+    unknown = [name for name in names if name not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Formatos desconhecidos: {', '.join(unknown)} (disponíveis: {', '.join(OUTPUT_FORMATS)})")
+    return names
+
+def format_output_path(output_path, name):
+    """video_123.mp4 + square -> video_123_square.mp4"""
+    base, ext = os.path.splitext(output_path)
+    return f"{base}_{name}{ext or '.mp4'}"
+
+def crop_box(master_size, crop):
+    """
+    Área centralizada de um formato dentro do vídeo base
+
+    Args:
+        master_size: (largura, altura) do vídeo base
+        crop: (largura, altura) do recorte
+
+    Returns:
+        Tupla (x0, y0, x1, y1)
+    """
+    width = min(crop[0], master_size[0])
+    height = min(crop[1], master_size[1])
+    x0 = (master_size[0] - width) // 2
+    y0 = (master_size[1] - height) // 2
+    return x0, y0, x0 + width, y0 + height
+
+def paste_rgba(frame, image, x, y):
+    """
+    Desenha uma imagem RGBA sobre um frame RGB (in-place, recortando nas bordas)
+
+    Args:
+        frame: Array (altura, largura, 3) uint8 gravável
+        image: Array (altura, largura, 4) uint8
+        x, y: Canto superior esquerdo da imagem no frame
+    """
+    frame_h, frame_w = frame.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + image.shape[1], frame_w), min(y + image.shape[0], frame_h)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    patch = image[y0 - y:y1 - y, x0 - x:x1 - x]
+    alpha = patch[:, :, 3:4].astype(np.uint16)
+    region = frame[y0:y1, x0:x1]
+    blended = (patch[:, :, :3] * alpha + region * (255 - alpha) + 127) // 255
+    region[...] = blended.astype(np.uint8)
+
+class _FormatWriter:
+    """Encoder de um formato alimentado por uma thread própria (encodes em paralelo)"""
+
+    def __init__(self, name, spec, box, path, audio_file, fps, preset, threads, filters=()):
+        from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+        self.name = name
+        self.spec = spec
+        self.box = box
+        self.path = path
+        self.error = None
+
+        crop_size = (box[2] - box[0], box[3] - box[1])
+        params = []
+        # Redimensiona antes dos filtros extras: legendas do libass saem na resolução final
+        vf = list(filters)
+        if tuple(spec["size"]) != crop_size:
+            vf.insert(0, f"scale={spec['size'][0]}:{spec['size'][1]}:flags=area")
+        if vf:
+            params += ["-vf", ",".join(vf)]
+        if not spec.get("bitrate") and spec.get("crf") is not None:
+            params += ["-crf", str(spec["crf"])]
+
+        self.writer = FFMPEG_VideoWriter(
+            path, crop_size, fps, codec="libx264", audiofile=audio_file,
+            preset=preset, bitrate=spec.get("bitrate"), threads=threads,
+            ffmpeg_params=params
+        )
+        self.frames = queue.Queue(maxsize=4)
+        self.thread = threading.Thread(target=self._run, name=f"encode-{name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                break
+            if self.error is None:
+                try:
+                    self.writer.write_frame(frame)
+                except Exception as e:
+                    self.error = e
+
+    def put(self, frame):
+        if self.error is not None:
+            raise self.error
+        self.frames.put(frame)
+
+    def close(self):
+        self.frames.put(None)
+        self.thread.join()
+        self.writer.close()
+        if self.error is not None:
+            raise self.error
+
+def caption_placements(track, layout, writers, master_height, fps):
+    """
+    Posição (e caixa escura) de cada legenda em cada formato, calculada antes do encode
+
+    Args:
+        track: Trilha de legendas
+        layout: Layout por trecho do fundo (caption_layout.plan_caption_layout) ou None
+        writers: Encoders dos formatos (box e spec)
+        master_height: Altura do vídeo base
+        fps: Frames por segundo (a timeline está em frames)
+
+    Returns:
+        Lista (uma por legenda da timeline) de listas (uma por formato) de
+        tuplas (x, y, caixa RGBA ou None), em coordenadas do recorte
+    """
+    from caption_layout import caption_placement, make_box_image
+
+    boxes = {}
+    placements = []
+    for span in track["timeline"]:
+        key, (offset_x, offset_y) = span["key"]
+        text_h, text_w = track["store"].get(key).shape[:2]
+        start = span["start_frame"] / fps
+        row = []
+        for writer in writers:
+            x0, y0, x1, y1 = writer.box
+            x = ((x1 - x0) - track["box_width"]) // 2 + offset_x
+            if writer.spec["caption_y"] is None:
+                caption_y, opacity = caption_placement(layout, start)
+                y = int(master_height * caption_y) - y0 + offset_y
+            else:
+                # Altura fixa do formato; a caixa é medida no vídeo base (onde está a grade)
+                box_y = int((y1 - y0) * writer.spec["caption_y"])
+                _, opacity = caption_placement(layout, start, (y0 + box_y) / master_height)
+                y = box_y + offset_y
+            box = None
+            if opacity > 0:
+                box_key = (text_w, text_h, opacity)
+                if box_key not in boxes:
+                    boxes[box_key] = make_box_image(text_w, text_h, opacity)
+                box = boxes[box_key]
+            row.append((x, y, box))
+        placements.append(row)
+    return placements
+
+def render_formats(video_clip, audio_clip, output_path, formats, track=None, fps=30, preset="medium", threads=2, specs=None, layout=None, tap=None, ass_track=None):
+    """
+    Renderiza todos os formatos em uma única passada pelos frames
+
+    Args:
+        video_clip: Clip do fundo já composto (sem legendas), no tamanho base
+        audio_clip: Áudio final (codificado uma única vez e copiado em cada saída)
+        output_path: Caminho base dos arquivos
+        formats: Nomes dos formatos
+        track: Trilha de legendas de subtitle_whisper.build_subtitle_track (opcional)
+        fps: Frames por segundo
+        preset: Preset do x264
+        threads: Threads de cada encoder
+        specs: Tabela de formatos (padrão: OUTPUT_FORMATS)
+        layout: Altura/caixa das legendas por trecho do fundo (caption_layout.py)
+        tap: render_taps.RenderTap que recebe os frames do fundo e os do
+            primeiro formato (thumbnail e prévia na mesma passada)
+        ass_track: Legendas em ASS ("chunks", "style", "burn"): cada formato
+            grava o seu .ass ao lado do vídeo e, com burn, o ffmpeg o desenha
+            no encode (no lugar de track)
+
+    Returns:
+        Dict formato -> caminho do vídeo
+    """
+    from tracing import stage
+    from caption_layout import BOX_PADDING
+    from storage import commit_output, discard_output, partial_path
+    from subtitle_ass import ass_filter, layout_placement, sidecar_path, write_ass
+
+    specs = specs or OUTPUT_FORMATS
+    master_size = tuple(video_clip.size)
+    timeline = track["timeline"] if track else []
+
+    # Áudio codificado uma vez só; os encoders apenas copiam o stream
+    audio_file = None
+    if audio_clip is not None:
+        audio_file = os.path.splitext(output_path)[0] + "_audio.m4a"
+        audio_clip.write_audiofile(audio_file, fps=44100, codec="aac", bitrate="192k", logger=None)
+
+    writers = []
+    outputs = {}
+    sidecars = []
+    done = False
+    try:
+        with stage("encode", formats=len(formats)) as span:
+            for name in formats:
+                spec = specs[name]
+                box = crop_box(master_size, spec["crop"])
+                path = format_output_path(output_path, name)
+                filters = []
+                if ass_track:
+                    # Mesmas regras de posição de caption_placements, no recorte do formato
+                    crop_height = box[3] - box[1]
+                    placement = layout_placement(layout, master_size[1], box[1], crop_height, spec["caption_y"])
+                    ass_path = write_ass(sidecar_path(path), ass_track["chunks"], ass_track["style"], (box[2] - box[0], crop_height), placement)
+                    sidecars.append(ass_path)
+                    if ass_track.get("burn"):
+                        filters.append(ass_filter(ass_path))
+                writers.append(_FormatWriter(name, spec, box, partial_path(path), audio_file, fps, preset, threads, filters))
+                outputs[name] = path
+
+            # Posição de cada legenda em cada formato (calculada uma vez, antes dos frames)
+            placements = caption_placements(track, layout, writers, master_size[1], fps) if track else []
+
+            if tap:
+                # A prévia sai do primeiro formato: com burn, desenha o .ass dele
+                tap.start(audio_clip, ass_path=sidecars[0] if ass_track and ass_track.get("burn") else None)
+
+            span_index = 0
+            for frame_index, frame in enumerate(video_clip.iter_frames(fps=fps, dtype="uint8")):
+                if tap:
+                    tap.background(frame_index, frame)
+
+                # Legenda ativa neste frame (spans ordenados e sem sobreposição)
+                while span_index < len(timeline) and timeline[span_index]["end_frame"] <= frame_index:
+                    span_index += 1
+                caption = None
+                if span_index < len(timeline) and timeline[span_index]["start_frame"] <= frame_index:
+                    caption = timeline[span_index]
+
+                for writer_index, writer in enumerate(writers):
+                    x0, y0, x1, y1 = writer.box
+                    if caption is None:
+                        # Sem legenda: a fatia do frame base vai direto para o encoder
+                        out = frame[y0:y1, x0:x1]
+                    else:
+                        out = frame[y0:y1, x0:x1].copy()
+                        x, y, box = placements[span_index][writer_index]
+                        if box is not None:
+                            paste_rgba(out, box, x - BOX_PADDING, y - BOX_PADDING)
+                        paste_rgba(out, track["store"].get(caption["key"][0]), x, y)
+                    if tap and writer_index == 0:
+                        tap.output(frame_index, out)
+                    writer.put(out)
+
+            for writer in writers:
+                writer.close()
+            writers = []
+
+            # Todos os formatos prontos: só agora ganham o nome final
+            for path in outputs.values():
+                commit_output(partial_path(path), path)
+                span.record_output(path)
+            for path in sidecars:
+                span.record_output(path)
+            if tap:
+                for path in tap.finish().values():
+                    span.record_output(path)
+            done = True
+    finally:
+        for writer in writers:
+            try:
+                writer.close()
+            except Exception:
+                pass
+        for path in outputs.values():
+            discard_output(partial_path(path))
+        if not done:
+            # .ass sem o vídeo não serve para nada
+            for path in sidecars:
+                discard_output(path)
+        if tap:
+            tap.close()
+        if audio_file and os.path.exists(audio_file):
+            os.remove(audio_file)
+
+    return outputs
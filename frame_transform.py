@@ -0,0 +1,154 @@
+"""
+Recorte 9:16 + redimensionamento para 1080x1920 sem passar pelo resize genérico do MoviePy
+Os índices e pesos da interpolação são calculados uma vez por geometria de
+origem; cada frame só faz gathers e somas vetorizadas em buffers reaproveitados
+"""
+
+import numpy as np
+
+OUTPUT_SIZE = (1080, 1920)
+TARGET_RATIO = 9 / 16
+
+# Kernel padrão: o bilinear em C do Pillow (recorte + escala em uma chamada) ganhou
+# do NumPy em todas as geometrias de bench_frame_transform.py; o NumPy fica como
+# alternativa sem cópias intermediárias
+DEFAULT_METHOD = "pillow"
+
+# Pesos em ponto fixo (7 bits): diferença entre vizinhos * peso cabe em int16
+_WEIGHT_BITS = 7
+_WEIGHT_ONE = 1 << _WEIGHT_BITS
+_ROUNDING = _WEIGHT_ONE // 2
+
+def vertical_crop_box(size, ratio=TARGET_RATIO):
+    """
+    Recorte central 9:16 (mesma regra que create_vertical_video sempre usou)
+
+    Args:
+        size: (largura, altura) da origem
+        ratio: Proporção largura/altura do recorte
+
+    Returns:
+        Tupla (x0, y0, largura, altura)
+    """
+    w, h = size
+    if w / h > ratio:
+        # Vídeo muito largo - crop nas laterais
+        new_w = int(h * ratio)
+        return int(w / 2 - new_w / 2), 0, new_w, h
+    # Vídeo muito alto - crop em cima/baixo
+    new_h = int(w / ratio)
+    return 0, int(h / 2 - new_h / 2), w, new_h
+
+def _axis_map(src_length, dst_length):
+    """
+    Índices dos dois vizinhos e peso do segundo para cada posição de saída
+
+    Mesmo alinhamento de centros de pixel do Pillow/OpenCV
+    """
+    scale = src_length / dst_length
+    position = (np.arange(dst_length) + 0.5) * scale - 0.5
+    position = np.clip(position, 0, src_length - 1)
+    first = np.floor(position).astype(np.intp)
+    second = np.minimum(first + 1, src_length - 1)
+    weight = np.round((position - first) * _WEIGHT_ONE).astype(np.uint16)
+    return first, second, weight
+
+class VerticalFrameTransformer:
+    """
+    Converte frames de uma geometria de origem em frames 1080x1920 (bilinear)
+
+    Uso: transformer = VerticalFrameTransformer((1280, 720)); out = transformer(frame)
+    """
+
+    def __init__(self, src_size, out_size=OUTPUT_SIZE, method=DEFAULT_METHOD):
+        """
+        Args:
+            src_size: (largura, altura) dos frames de origem
+            out_size: (largura, altura) da saída
+            method: "numpy" (mapas pré-calculados) ou "pillow" (kernel C do Pillow)
+        """
+        self.src_size = tuple(src_size)
+        self.out_size = tuple(out_size)
+        self.method = method
+        self.box = vertical_crop_box(self.src_size)
+
+        x0, y0, crop_w, crop_h = self.box
+        out_w, out_h = self.out_size
+
+        # Mapas de amostragem: colunas no frame inteiro, linhas relativas ao recorte
+        self.x_first, self.x_second, wx = _axis_map(crop_w, out_w)
+        self.y_first, self.y_second, wy = _axis_map(crop_h, out_h)
+        self.x_first += x0
+        self.x_second += x0
+        self.wx = wx.astype(np.int16)[None, :, None]
+        self.wy = wy.astype(np.int16)[:, None, None]
+
+        # Buffers reaproveitados em todos os frames (nenhuma alocação por frame)
+        pixel = np.dtype((np.void, 3))
+        self._gather_a = np.empty((crop_h, out_w), dtype=pixel)
+        self._gather_b = np.empty_like(self._gather_a)
+        self._cols = np.empty((crop_h, out_w, 3), dtype=np.int16)
+        self._cols_delta = np.empty_like(self._cols)
+        self._rows = np.empty((out_h, out_w, 3), dtype=np.int16)
+        self._rows_delta = np.empty_like(self._rows)
+
+    def __call__(self, frame, out=None):
+        """
+        Recorta e redimensiona um frame
+
+        Args:
+            frame: Array (altura, largura, 3) uint8 com a geometria de origem
+            out: Array (1920, 1080, 3) uint8 para receber o resultado (None = novo)
+
+        Returns:
+            Frame 1080x1920 uint8
+        """
+        out_w, out_h = self.out_size
+        x0, y0, crop_w, crop_h = self.box
+        if frame.dtype != np.uint8:
+            # Clips gerados pelo MoviePy (ColorClip, composições) podem vir em int/float
+            frame = frame.astype(np.uint8)
+
+        if self.method == "pillow":
+            from PIL import Image
+            image = Image.fromarray(frame).resize(self.out_size, Image.BILINEAR, box=(x0, y0, x0 + crop_w, y0 + crop_h))
+            if out is None:
+                return np.asarray(image)
+            out[...] = np.asarray(image)
+            return out
+
+        if out is None:
+            out = np.empty((out_h, out_w, 3), dtype=np.uint8)
+
+        # Horizontal primeiro, só nas linhas recortadas: cada pixel (3 bytes) é
+        # copiado de uma vez, sem gather por canal
+        rows = np.ascontiguousarray(frame[y0:y0 + crop_h])
+        pixels = rows.reshape(crop_h, -1).view(np.dtype((np.void, 3)))
+        np.take(pixels, self.x_first, axis=1, out=self._gather_a)
+        np.take(pixels, self.x_second, axis=1, out=self._gather_b)
+        self._lerp(self._gather_a.view(np.uint8).reshape(self._cols.shape),
+                   self._gather_b.view(np.uint8).reshape(self._cols.shape),
+                   self.wx, self._cols, self._cols_delta)
+
+        # Vertical: linhas inteiras (gather contíguo) misturadas pelo peso
+        np.take(self._cols, self.y_first, axis=0, out=self._rows)
+        np.take(self._cols, self.y_second, axis=0, out=self._rows_delta)
+        np.subtract(self._rows_delta, self._rows, out=self._rows_delta)
+        np.multiply(self._rows_delta, self.wy, out=self._rows_delta)
+        np.add(self._rows_delta, _ROUNDING, out=self._rows_delta)
+        np.right_shift(self._rows_delta, _WEIGHT_BITS, out=self._rows_delta)
+        np.add(self._rows, self._rows_delta, out=self._rows)
+
+        np.copyto(out, self._rows, casting="unsafe")
+        return out
+
+    @staticmethod
+    def _lerp(first, second, weight, result, delta):
+        """result = first + (second - first) * weight / 128, arredondado (em int16, sem alocar)"""
+        np.copyto(result, first)
+        np.copyto(delta, second)
+        np.subtract(delta, result, out=delta)
+        np.multiply(delta, weight, out=delta)
+        np.add(delta, _ROUNDING, out=delta)
+        np.right_shift(delta, _WEIGHT_BITS, out=delta)
+        np.add(result, delta, out=result)
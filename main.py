@@ -4,26 +4,152 @@ Gera vídeos curtos automaticamente a partir de histórias do Reddit
 """
 
 import os
+import sys
+import uuid
 from datetime import datetime
-from reddit_fetch import get_story_from_multiple_subs
-from summarize import summarize_text, generate_title_and_hashtags
-from tts_generate import generate_voice
-from video_generate import create_video
 
-def main():
-    """Executa o fluxo completo de geração do vídeo"""
+# As etapas (praw, groq, moviepy, whisper/torch) são importadas dentro de run_pipeline():
+# --help e --check respondem em milissegundos, sem carregar dependências pesadas
+
+# Tentativas de buscar uma história que não esteja em uso/preparada (prefetch)
+FETCH_ATTEMPTS = 3
+
+def new_job_id():
+    """
+    Identificador do job (nome dos arquivos, trace, catálogo e bundle de replay)
+
+    Data/hora para ordenar e ler, mais um sufixo aleatório: workers e batches
+    que começam no mesmo segundo nunca gravam nos mesmos arquivos
+
+    Returns:
+        String como "20261019_101500_3f9a1c"
+    """
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+def main(videos_count=3, subtitle_style="tiktok", output_dir="assets/output/", formats=None, series_parts=None, crossfade=0.0, seed=None, record=False, captions="pil", prefetcher=None):
+    """
+    Executa o fluxo completo de geração do vídeo (com instrumentação por etapa)
     
-    print("=" * 60)
-    print("🤖 REDDIT SHORTS BOT - INICIANDO...")
-    print("=" * 60)
+    Args:
+        videos_count: Quantidade de vídeos de fundo diferentes
+        subtitle_style: Estilo das legendas (tiktok, youtube, minimal)
+        output_dir: Pasta onde áudio e vídeo são gravados
+        formats: Lista de formatos de saída (shorts, reels, tiktok, lowres, square);
+            None gera só o vídeo padrão
+        series_parts: Se definido, histórias longas viram uma série de até N partes
+        crossfade: Crossfade entre os vídeos de fundo (s); 0 = corte seco
+        seed: Seed das escolhas aleatórias (None = sorteia uma nova)
+        record: Se True, grava um bundle de replay do job (replay.py)
+        captions: Legendas desenhadas em Python ("pil"), pelo ffmpeg a partir
+            do .ass ("ass") ou só o .ass ao lado do vídeo ("sidecar")
+        prefetcher: prefetch.Prefetcher do batch (adianta o próximo job durante o render)
+    
+    Returns:
+        Dict com caminho do vídeo, título e hashtags (None em caso de falha)
+    """
+    from contextlib import nullcontext
+    import tracing
+    from catalog import catalog_path, record_job
+    from replay import JobRecorder, new_seed, seed_everything
+    from storage import prepare_space, purge_job_intermediates
+    from prefetch import claim_entry, pool_dir, prune_pool
+    
+    timestamp = new_job_id()
+    tracer = tracing.start_job(timestamp)
+    
+    # Seed fixa ou replay precisam buscar a própria história (o pool veio de outro sorteio)
+    use_pool = seed is None and not record and not series_parts
+    
+    # Mesma seed = mesmas escolhas (subreddit, post, fundos, trechos, trilha)
+    seed = new_seed() if seed is None else seed
+    seed_everything(seed)
+    print(f"🎲 Seed: {seed}")
+    
+    job = {"job_id": timestamp, "seed": seed}
+    recorder = None
+    if record:
+        options = {"videos_count": videos_count, "subtitle_style": subtitle_style, "formats": formats, "series_parts": series_parts, "crossfade": crossfade, "captions": captions}
+        recorder = JobRecorder(timestamp, seed, options)
+    result = None
+    
+    try:
+        # Retenção + orçamento de disco antes de gravar qualquer coisa (storage.py)
+        with tracing.stage("storage"):
+            prepare_space(output_dir)
+            prune_pool(pool_dir(output_dir))
+        
+        # História/roteiro/narração preparados em segundo plano (prefetch.py)
+        inputs = None
+        if use_pool:
+            with tracing.stage("prefetch") as span:
+                audio_path = os.path.join(output_dir, f"audio_{timestamp}.mp3")
+                inputs = prefetcher.take(audio_path) if prefetcher else claim_entry(pool_dir(output_dir), audio_path)
+                span.attrs["hit"] = bool(inputs)
+                if inputs:
+                    span.attrs.update(entry=inputs["entry_id"], age_s=inputs["age_s"], post_id=inputs["story"].get("id"))
+        on_render = (lambda: prefetcher.render_started(job.get("story"))) if prefetcher and use_pool else None
+        
+        with recorder or nullcontext():
+            if series_parts:
+                from series import run_series
+                result = run_series(timestamp, videos_count, subtitle_style, output_dir, max_parts=series_parts, formats=formats, crossfade=crossfade, job=job, captions=captions)
+            else:
+                result = run_pipeline(timestamp, videos_count, subtitle_style, output_dir, formats, crossfade, job=job, captions=captions, inputs=inputs, on_render=on_render)
+        return result
+    finally:
+        status = "ok" if result else "failed"
+        if result:
+            # Narração e temporários só ficam para depurar jobs que falharam
+            purge_job_intermediates(timestamp, output_dir)
+        tracing.end_job(status)
+        # Post, voz, fundos, arquivos e tempos por etapa (catalog.py)
+        job["result"] = result
+        record_job(job, tracer, status, db_path=catalog_path(output_dir))
+        if recorder:
+            recorder.save(tracer, status)
+
+def prepare_inputs(audio_path, job=None, exclude=(), db_path=None):
+    """
+    Etapas 1 a 4: história do Reddit → roteiro → metadados → narração
+    
+    Só rede e TTS (nada de render): é o trabalho que o prefetch adianta para o
+    próximo job enquanto o atual está no encode (ver prefetch.py)
+    
+    Args:
+        audio_path: Caminho da narração
+        job: Dict preenchido com história, metadados e voz (para o catálogo)
+        exclude: IDs de posts já em uso ou no pool (busca outra história)
+        db_path: Catálogo da pasta de saída (histórico de histórias já publicadas)
+    
+    Returns:
+        Dict com "story", "adapted_text", "metadata", "voice" e "audio_file"
+        (None em caso de falha)
+    """
+    from tracing import stage
+    from reddit_fetch import get_story_from_multiple_subs
+    from summarize import summarize_text, generate_title_and_hashtags
+    from tts_generate import generate_voice
+    
+    job = job if job is not None else {}
     
     # ETAPA 1: Buscar história do Reddit
     print("\n📖 [1/5] Buscando história no Reddit...")
-    story = get_story_from_multiple_subs()
+    with stage("fetch") as span:
+        for _ in range(FETCH_ATTEMPTS):
+            story = get_story_from_multiple_subs(db_path=db_path)
+            if not story or story.get("id") not in exclude:
+                break
+            print("♻️ História já preparada ou em uso, buscando outra...")
+        else:
+            story = None
+        if story:
+            span.attrs.update(subreddit=story["subreddit"], post_id=story.get("id"), quality=story.get("quality"))
+    
+    job["story"] = story
     
     if not story:
         print("❌ Falha ao buscar história. Encerrando.")
-        return
+        return None
     
     print(f"✅ História encontrada!")
     print(f"   📌 Subreddit: r/{story['subreddit']}")
@@ -32,18 +158,21 @@ def main():
     
     # ETAPA 2: Resumir e adaptar o texto
     print("\n✍️ [2/5] Adaptando texto para formato de vídeo...")
-    adapted_text = summarize_text(story['title'], story['text'], max_duration=60)
+    with stage("summarize"):
+        adapted_text = summarize_text(story['title'], story['text'], max_duration=60)
     
     if not adapted_text:
         print("❌ Falha ao adaptar texto. Encerrando.")
-        return
+        return None
     
     print(f"✅ Texto adaptado ({len(adapted_text.split())} palavras)")
     print(f"   Prévia: {adapted_text[:150]}...")
     
     # ETAPA 3: Gerar título e hashtags
     print("\n🏷️ [3/5] Gerando título e hashtags...")
-    metadata = generate_title_and_hashtags(adapted_text)
+    with stage("metadata"):
+        metadata = generate_title_and_hashtags(adapted_text)
+    job["metadata"] = metadata
     
     print(f"✅ Metadados gerados:")
     print(f"   📌 Título: {metadata['title']}")
@@ -52,34 +181,111 @@ def main():
     # ETAPA 4: Gerar áudio com IA
     print("\n🎙️ [4/5] Gerando narração com IA...")
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    audio_path = f"assets/output/audio_{timestamp}.mp3"
-    
     # Escolhe provider (Edge TTS = VOZ MASCULINA GRÁTIS!)
-    audio_file = generate_voice(
-        adapted_text,
-        output_path=audio_path,
-        provider="edge",  # Edge TTS da Microsoft - GRÁTIS!
-        voice="adam",  # Voz masculina brasileira (Antonio)
-        rate="+80%"  # Velocidade 1.8x (mais dinâmico para Shorts)
-    )
+    with stage("tts", provider="edge") as span:
+        audio_file, winner = generate_voice(
+            adapted_text,
+            output_path=audio_path,
+            provider="edge",  # Edge TTS da Microsoft - GRÁTIS!
+            voice="adam",  # Voz masculina brasileira (Antonio)
+            rate="+80%",  # Velocidade 1.8x (mais dinâmico para Shorts)
+            return_provider=True
+        )
+        span.record_output(audio_file)
+        # Failover/hedge podem trocar o provider: catálogo e trace guardam quem gerou
+        span.attrs["provider"] = winner or "edge"
+    job["voice"] = {"provider": winner or "edge", "voice": "adam"}
     
     if not audio_file:
         print("❌ Falha ao gerar áudio. Encerrando.")
+        return None
+    
+    return {
+        "story": story,
+        "adapted_text": adapted_text,
+        "metadata": metadata,
+        "voice": job["voice"],
+        "audio_file": audio_file
+    }
+
+def run_pipeline(timestamp, videos_count=3, subtitle_style="tiktok", output_dir="assets/output/", formats=None, crossfade=0.0, job=None, captions="pil", inputs=None, on_render=None):
+    """
+    Etapas do pipeline: Reddit → roteiro → metadados → narração → vídeo
+    
+    Args:
+        timestamp: Identificador do job (usado nos nomes dos arquivos)
+        videos_count: Quantidade de vídeos de fundo diferentes
+        subtitle_style: Estilo das legendas (tiktok, youtube, minimal)
+        output_dir: Pasta onde áudio e vídeo são gravados
+        formats: Formatos de saída renderizados juntos (None = só o vídeo padrão)
+        crossfade: Crossfade entre os vídeos de fundo (s); 0 = corte seco
+        job: Dict preenchido com história, metadados e voz (para o catálogo)
+        captions: "pil", "ass" ou "sidecar" (ver video_generate.create_video)
+        inputs: Etapas 1-4 já prontas (prefetch/pool); None = faz agora
+        on_render: Chamado quando o job entra no render (o prefetch começa aí)
+    
+    Returns:
+        Dict com caminho do vídeo, título e hashtags (None em caso de falha)
+    """
+    from video_generate import create_video, create_video_formats
+    from render_taps import extra_paths
+    from subtitle_ass import sidecar_path
+    from catalog import catalog_path
+    
+    print("=" * 60)
+    print("🤖 REDDIT SHORTS BOT - INICIANDO...")
+    print("=" * 60)
+    
+    job = job if job is not None else {}
+    if inputs is None:
+        inputs = prepare_inputs(os.path.join(output_dir, f"audio_{timestamp}.mp3"), job, db_path=catalog_path(output_dir))
+    else:
+        # História, roteiro e narração adiantados pelo prefetch
+        print(f"\n⚡ [1-4/5] Usando história já preparada: r/{inputs['story']['subreddit']} - {inputs['story']['title'][:60]}...")
+        job.update(story=inputs["story"], metadata=inputs["metadata"], voice=inputs["voice"])
+    
+    if not inputs:
         return
+    metadata = inputs["metadata"]
+    audio_file = inputs["audio_file"]
+    
+    if on_render:
+        on_render()
     
     # ETAPA 5: Criar vídeo final
     print("\n🎬 [5/5] Montando vídeo final...")
     
-    video_path = f"assets/output/video_{timestamp}.mp4"
-    final_video = create_video(
-        audio_path=audio_file,
-        output_path=video_path,
-        background_dir="assets/videos/",
-        videos_count=3,  # Usa 3 vídeos diferentes!
-        add_subtitles=True,  # Ativa legendas com Whisper
-        subtitle_style="tiktok"  # Estilo: tiktok, youtube ou minimal
-    )
+    video_path = os.path.join(output_dir, f"video_{timestamp}.mp4")
+    outputs = None
+    if formats:
+        # Uma renderização, um arquivo por plataforma
+        outputs = create_video_formats(
+            audio_path=audio_file,
+            output_path=video_path,
+            formats=formats,
+            background_dir="assets/videos/",
+            videos_count=videos_count,
+            add_subtitles=True,
+            subtitle_style=subtitle_style,
+            crossfade=crossfade,
+            title=metadata['title'],
+            captions=captions,
+            script=inputs["adapted_text"]
+        )
+        final_video = next(iter(outputs.values())) if outputs else None
+    else:
+        final_video = create_video(
+            audio_path=audio_file,
+            output_path=video_path,
+            background_dir="assets/videos/",
+            videos_count=videos_count,  # Vídeos de fundo diferentes (padrão: 3)
+            add_subtitles=True,  # Ativa legendas com Whisper
+            subtitle_style=subtitle_style,  # Estilo: tiktok, youtube ou minimal
+            crossfade=crossfade,  # Transição entre os fundos (0 = corte seco)
+            title=metadata['title'],  # Desenhado na thumbnail gerada junto com o vídeo
+            captions=captions,  # pil, ass (ffmpeg/libass) ou sidecar
+            script=inputs["adapted_text"]  # Legendas com o texto do roteiro (tempos do Whisper)
+        )
     
     if not final_video:
         print("❌ Falha ao gerar vídeo. Encerrando.")
@@ -90,6 +296,15 @@ def main():
     print("🎉 VÍDEO GERADO COM SUCESSO!")
     print("=" * 60)
     print(f"\n📁 Localização: {final_video}")
+    if outputs:
+        for name, path in outputs.items():
+            print(f"   🎞️ {name}: {path}")
+    extras = {name: path for name, path in extra_paths(video_path).items() if os.path.exists(path)}
+    for name, path in extras.items():
+        print(f"   🖼️ {name}: {path}")
+    subtitles = [sidecar_path(path) for path in (outputs or {"video": final_video}).values() if os.path.exists(sidecar_path(path))]
+    for path in subtitles:
+        print(f"   💬 Legendas: {path}")
     print(f"📌 Título sugerido: {metadata['title']}")
     print(f"🏷️ Hashtags: #{' #'.join(metadata['hashtags'][:8])}")
     print(f"\n💡 Próximos passos:")
@@ -97,15 +312,44 @@ def main():
     print(f"   2. Faça upload no YouTube Shorts / TikTok")
     print(f"   3. Use o título e hashtags gerados acima")
     print("\n✨ Rode novamente para gerar mais vídeos!")
+    
+    result = {
+        "video": final_video,
+        "title": metadata['title'],
+        "hashtags": metadata['hashtags']
+    }
+    if outputs:
+        result["formats"] = outputs
+    if subtitles:
+        result["subtitles"] = subtitles
+    result.update(extras)
+    return result
 
-def batch_generate(count=5):
+def batch_generate(count=5, formats=None, series_parts=None, crossfade=0.0, seed=None, record=False, captions="pil", prefetch=1, output_dir="assets/output/"):
     """
     Gera múltiplos vídeos em sequência
     
     Args:
         count: Quantidade de vídeos para gerar
+        formats: Formatos de saída de cada vídeo (None = só o padrão)
+        series_parts: Máximo de partes por história (None = vídeo único)
+        crossfade: Crossfade entre os vídeos de fundo (s)
+        seed: Seed do primeiro vídeo (o vídeo i usa seed + i); None = sorteia
+        record: Se True, grava um bundle de replay por vídeo
+        captions: Como as legendas são desenhadas (pil, ass ou sidecar)
+        prefetch: Quantas histórias adiantar durante o render (0 = desliga);
+            ignorado com seed, record ou séries
+        output_dir: Pasta onde áudio e vídeo são gravados
     """
+    import tracing
+    from prefetch import Prefetcher
+    
     print(f"🔄 Modo BATCH: Gerando {count} vídeos...")
+    tracing.reset_history()
+    
+    prefetcher = None
+    if prefetch > 0 and seed is None and not record and not series_parts:
+        prefetcher = Prefetcher(output_dir, depth=prefetch)
     
     for i in range(count):
         print(f"\n{'='*60}")
@@ -113,18 +357,104 @@ def batch_generate(count=5):
         print(f"{'='*60}")
         
         try:
-            main()
+            main(output_dir=output_dir, formats=formats, series_parts=series_parts, crossfade=crossfade, seed=seed + i if seed is not None else None, record=record, captions=captions, prefetcher=prefetcher)
         except Exception as e:
             print(f"❌ Erro no vídeo {i+1}: {e}")
             continue
     
+    if prefetcher:
+        # O que foi adiantado e não usado fica no pool para a próxima execução
+        prefetcher.close()
+    
     print(f"\n✅ Processo batch concluído! {count} vídeos gerados.")
+    tracing.print_summary()
 
-if __name__ == "__main__":
-    import sys
+def health_check(background_dir="assets/videos/", output_dir="assets/output/"):
+    """
+    Verifica a configuração sem importar as etapas pesadas (ideal para cron)
+    
+    Args:
+        background_dir: Diretório com vídeos de fundo
+        output_dir: Diretório de saída
+    
+    Returns:
+        True se tudo estiver pronto para gerar vídeos
+    """
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    ok = True
+    
+    for var in ("REDDIT_CLIENT_ID", "REDDIT_SECRET", "GROQ_API_KEY"):
+        if os.getenv(var):
+            print(f"✅ {var} configurada")
+        else:
+            print(f"❌ {var} não encontrada no .env")
+            ok = False
+    
+    videos = []
+    if os.path.isdir(background_dir):
+        videos = [f for f in os.listdir(background_dir) if f.endswith(('.mp4', '.mov', '.avi'))]
+    if videos:
+        print(f"✅ {len(videos)} vídeos de fundo em {background_dir}")
+    else:
+        print(f"❌ Nenhum vídeo de fundo em {background_dir}")
+        ok = False
+    
+    if os.path.isdir(output_dir) and os.access(output_dir, os.W_OK):
+        print(f"✅ Pasta de saída gravável: {output_dir}")
+    else:
+        print(f"❌ Pasta de saída indisponível: {output_dir}")
+        ok = False
+    
+    return ok
+
+def cli(argv=None):
+    """
+    Ponto de entrada da linha de comando
+    
+    Args:
+        argv: Argumentos (padrão: sys.argv[1:])
+    
+    Returns:
+        Código de saída do processo
+    """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="🤖 Reddit Shorts Bot - gera vídeos curtos a partir de histórias do Reddit")
+    parser.add_argument("count", type=int, nargs="?", help="Quantidade de vídeos (modo batch)")
+    parser.add_argument("--check", action="store_true", help="Verifica a configuração e sai (health check)")
+    parser.add_argument("--chrome-trace", action="store_true", help="Grava também um Chrome trace/Perfetto por vídeo")
+    parser.add_argument("--formats", help="Formatos renderizados juntos, ex: shorts,reels,lowres,square")
+    parser.add_argument("--series", type=int, metavar="N", help="Divide histórias longas em até N partes (Parte 1, Parte 2...)")
+    parser.add_argument("--crossfade", type=float, default=0.0, metavar="S", help="Crossfade de S segundos entre os vídeos de fundo (padrão: corte seco)")
+    parser.add_argument("--captions", choices=("pil", "ass", "sidecar"), default="pil", help="Legendas desenhadas em Python (pil), pelo ffmpeg/libass (ass) ou só o .ass ao lado do vídeo (sidecar)")
+    parser.add_argument("--seed", type=int, help="Seed das escolhas aleatórias (mesma seed = mesmo trabalho)")
+    parser.add_argument("--record", action="store_true", help="Grava um bundle de replay por vídeo (ver replay.py)")
+    parser.add_argument("--prefetch", type=int, default=1, metavar="N", help="Histórias preparadas em segundo plano durante o render no modo batch (0 = desliga)")
+    args = parser.parse_args(argv)
+    
+    if args.check:
+        return 0 if health_check() else 1
+    
+    if args.chrome_trace:
+        import tracing
+        tracing.configure(chrome_trace=True)
+    
+    formats = None
+    if args.formats:
+        from export_formats import parse_formats
+        try:
+            formats = parse_formats(args.formats)
+        except ValueError as e:
+            parser.error(str(e))
     
     # Verifica se foi passado argumento para batch
-    if len(sys.argv) > 1 and sys.argv[1].isdigit():
-        batch_generate(int(sys.argv[1]))
+    if args.count:
+        batch_generate(args.count, formats=formats, series_parts=args.series, crossfade=args.crossfade, seed=args.seed, record=args.record, captions=args.captions, prefetch=args.prefetch)
     else:
-        main()
+        main(formats=formats, series_parts=args.series, crossfade=args.crossfade, seed=args.seed, record=args.record, captions=args.captions)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(cli())
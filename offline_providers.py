@@ -0,0 +1,265 @@
+"""
+Provedores locais para rodar o pipeline sem rede
+Substitutos de praw (Reddit), Groq (LLM), TTS e Whisper usando as fixtures em
+fixtures/ e uma narração sintética gerada em WAV
+"""
+
+import json
+import os
+import time
+import wave
+import numpy as np
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_fixture(name):
+    """Carrega um arquivo JSON de fixtures/"""
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+def audio_key(path):
+    """Identifica uma narração pelo conteúdo (continua valendo se o pool mover o arquivo)"""
+    import hashlib
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class FakePost:
+    """Post do Reddit com os mesmos atributos usados do praw"""
+
+    def __init__(self, data):
+        self.id = data["id"]
+        self.title = data["title"]
+        self.selftext = data["selftext"]
+        self.score = data["score"]
+        self.num_comments = data.get("num_comments", 0)
+        self.created_utc = data.get("created_utc", 0)
+        self.stickied = data.get("stickied", False)
+        self.url = data["url"]
+        self.subreddit_name = data["subreddit"]
+
+class FakeSubreddit:
+    """Subreddit que devolve os posts das fixtures"""
+
+    def __init__(self, posts, latency=0.0):
+        self.posts = posts
+        self.latency = latency
+
+    def hot(self, limit=20):
+        time.sleep(self.latency)
+        return iter(self.posts[:limit])
+
+class FakeReddit:
+    """Substituto de praw.Reddit: todo subreddit devolve as histórias das fixtures"""
+
+    def __init__(self, stories=None, latency=0.0):
+        stories = stories if stories is not None else load_fixture("stories.json")
+        self.posts = [FakePost(story) for story in stories]
+        self.latency = latency
+
+    def subreddit(self, name):
+        return FakeSubreddit(self.posts, self.latency)
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+class _Response:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+class _Completions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model=None, messages=None, **kwargs):
+        return self.owner.respond(messages[-1]["content"])
+
+class _Chat:
+    def __init__(self, owner):
+        self.completions = _Completions(owner)
+
+def prompt_kind(prompt):
+    """Tipo do pedido ao LLM pelo texto do prompt (series, summaries ou metadata)"""
+    if "PARTE 1:" in prompt:
+        return "series"
+    if "HISTÓRIA ADAPTADA" in prompt:
+        return "summaries"
+    return "metadata"
+
+class FakeGroq:
+    """Substituto do cliente Groq com respostas prontas (roteiro, série e metadados)"""
+
+    def __init__(self, responses=None, latency=0.0):
+        self.responses = responses if responses is not None else load_fixture("llm_responses.json")
+        self.latency = latency
+        self.calls = {"summaries": 0, "metadata": 0}
+        self.chat = _Chat(self)
+
+    def respond(self, prompt):
+        time.sleep(self.latency)
+        kind = prompt_kind(prompt)
+        options = self.responses[kind]
+        content = options[self.calls.get(kind, 0) % len(options)]
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        return _Response(content)
+
+class FlakyProvider:
+    """
+    Provedor falso para o roteador (provider_router.py): latência e falhas programadas
+
+    Uso:
+        ProviderRouter("tts", {"lento": FlakyProvider("lento", latency=2.0), "rapido": FlakyProvider("rapido")})
+    """
+
+    def __init__(self, name, latency=0.0, fail_first=0, error_rate=0.0, seed=0):
+        """
+        Args:
+            name: Nome (vai no resultado)
+            latency: Segundos por chamada, ou lista por chamada (a última se repete)
+            fail_first: Quantas chamadas iniciais falham
+            error_rate: Chance de falha das outras chamadas
+            seed: Seed do sorteio das falhas
+        """
+        import random
+        import threading
+
+        self.name = name
+        self.latency = latency
+        self.fail_first = fail_first
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            fail = call <= self.fail_first or self.rng.random() < self.error_rate
+        latency = self.latency[min(call, len(self.latency)) - 1] if isinstance(self.latency, (list, tuple)) else self.latency
+        time.sleep(latency)
+        if fail:
+            raise ConnectionError(f"{self.name}: falha simulada")
+        return f"{self.name}:{call}"
+
+def synthesize_speech(text, output_path, sample_rate=24000, words_per_second=4.5):
+    """
+    Gera uma "fala" sintética: um pulso vozeado por palavra, com pausas nas frases
+
+    O resultado tem a mesma estrutura temporal de uma narração real (duração
+    proporcional ao texto, silêncio entre palavras) e os tempos exatos de cada
+    palavra, que servem como transcrição de referência
+
+    Args:
+        text: Texto a "narrar"
+        output_path: Caminho do WAV de saída
+        sample_rate: Taxa de amostragem
+        words_per_second: Velocidade média da fala
+
+    Returns:
+        Tupla (caminho do WAV, lista de palavras com start/end)
+    """
+    words = text.split()
+    base = 1.0 / words_per_second
+    pieces = []
+    timings = []
+    cursor = 0.0
+
+    for index, word in enumerate(words):
+        # Palavras longas duram mais; pontuação gera pausa maior
+        duration = base * (0.55 + 0.08 * min(len(word), 12))
+        pause = base * (1.2 if word[-1] in ".!?" else 0.25)
+
+        n = int(duration * sample_rate)
+        t = np.arange(n) / sample_rate
+        f0 = 110 + 25 * np.sin(index)  # Entonação variando por palavra
+        voiced = sum(np.sin(2 * np.pi * f0 * h * t) / h for h in range(1, 6))
+        envelope = np.hanning(n) if n > 1 else np.ones(n)
+        pieces.append(0.25 * voiced * envelope)
+        pieces.append(np.zeros(int(pause * sample_rate)))
+
+        timings.append({"text": word, "start": round(cursor, 3), "end": round(cursor + duration, 3)})
+        cursor += duration + pause
+
+    signal = np.concatenate(pieces) if pieces else np.zeros(sample_rate)
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with wave.open(output_path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+
+    return output_path, timings
+
+class OfflineProviders:
+    """
+    Instala os substitutos nos módulos do pipeline (e restaura depois)
+
+    Uso:
+        with OfflineProviders(llm_latency=0.2) as providers:
+            main()
+    """
+
+    def __init__(self, reddit_latency=0.0, llm_latency=0.0, tts_latency=0.0, fake_whisper=True, stories=None):
+        self.stories = stories
+        self.reddit_latency = reddit_latency
+        self.llm_latency = llm_latency
+        self.tts_latency = tts_latency
+        self.fake_whisper = fake_whisper
+        self.timings = {}
+        self._patches = []
+
+    def generate_voice(self, text, output_path="assets/output/audio.mp3", provider="edge", return_provider=False, **kwargs):
+        """Substituto de tts_generate.generate_voice (grava WAV sintético, "vencedor" = provider pedido)"""
+        time.sleep(self.tts_latency)
+        wav_path = os.path.splitext(output_path)[0] + ".wav"
+        path, timings = synthesize_speech(text, wav_path)
+        self.timings[audio_key(path)] = timings
+        print(f"✅ Áudio gerado (offline): {path}")
+        return (path, provider) if return_provider else path
+
+    def transcribe(self, audio_path, model_name="base"):
+        """Substituto do Whisper: devolve os tempos exatos da fala sintética"""
+        timings = self.timings.get(audio_key(audio_path)) if os.path.exists(audio_path) else None
+        if timings is None:
+            print("⚠️ Áudio desconhecido para a transcrição offline")
+            return None
+        return [dict(word) for word in timings]
+
+    def _patch(self, module, name, value):
+        self._patches.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    def __enter__(self):
+        import reddit_fetch
+        import story_dedup
+        import summarize
+        import tts_generate
+
+        self.reddit = FakeReddit(self.stories, latency=self.reddit_latency)
+        self.groq = FakeGroq(latency=self.llm_latency)
+
+        self._patch(reddit_fetch, "init_reddit", lambda: self.reddit)
+        self._patch(summarize, "init_groq", lambda: self.groq)
+        self._patch(tts_generate, "generate_voice", self.generate_voice)
+        # As fixtures se repetem de propósito: o histórico de publicadas não vale para elas
+        self._patch(story_dedup, "filter_duplicates", lambda stories, *args, **kwargs: stories)
+
+        if self.fake_whisper:
+            import subtitle_whisper
+            self._patch(subtitle_whisper, "transcribe_audio_with_whisper", self.transcribe)
+
+        return self
+
+    def __exit__(self, *exc):
+        while self._patches:
+            module, name, original = self._patches.pop()
+            setattr(module, name, original)
+        return False
@@ -0,0 +1,277 @@
+"""
+Prefetch do próximo job e pool de histórias preparadas
+Enquanto um job está no render (CPU/ffmpeg), uma thread busca a próxima
+história, gera roteiro/metadados e sintetiza a narração (rede e TTS). O
+resultado vai para assets/output/pool/: o próximo job pega de lá, e o que
+sobrar no fim do batch fica guardado para a próxima execução
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+POOL_SUBDIR = "pool"
+ENTRY_FILE = "entry.json"
+
+# Histórias preparadas ficam velhas (o post sai do "hot"); pastas temporárias de um crash somem antes
+POOL_DAYS = 3
+STALE_TMP_S = 3600
+
+# Espera máxima do próximo job pela entrada em andamento; depois ele prepara a sua
+TAKE_TIMEOUT_S = 180
+
+def pool_dir(output_dir="assets/output/"):
+    """Pasta do pool dentro da pasta de saída"""
+    return os.path.join(output_dir, POOL_SUBDIR)
+
+def new_entry_dir(pool):
+    """
+    Cria a pasta temporária de uma entrada (.tmp_<id>), invisível para quem consome o pool
+
+    Returns:
+        Caminho da pasta
+    """
+    entry_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    path = os.path.join(pool, f".tmp_{entry_id}")
+    os.makedirs(path)
+    return path
+
+def publish_entry(tmp_dir, inputs):
+    """
+    Publica uma entrada pronta no pool (rename atômico da pasta temporária)
+
+    Args:
+        tmp_dir: Pasta criada por new_entry_dir (com a narração dentro)
+        inputs: Resultado de main.prepare_inputs
+
+    Returns:
+        Caminho da entrada
+    """
+    entry = {
+        "story": inputs["story"],
+        "adapted_text": inputs["adapted_text"],
+        "metadata": inputs["metadata"],
+        "voice": inputs["voice"],
+        "audio": os.path.relpath(inputs["audio_file"], tmp_dir),
+        "created_at": time.time()
+    }
+    with open(os.path.join(tmp_dir, ENTRY_FILE), "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False, indent=2)
+
+    path = os.path.join(os.path.dirname(tmp_dir), os.path.basename(tmp_dir)[len(".tmp_"):])
+    os.replace(tmp_dir, path)
+    return path
+
+def pool_entries(pool):
+    """
+    Entradas prontas do pool, da mais antiga para a mais nova
+
+    Returns:
+        Lista de dicts de entry.json com "id" e "path"
+    """
+    entries = []
+    if not os.path.isdir(pool):
+        return entries
+    for item in os.scandir(pool):
+        if not item.is_dir() or item.name.startswith("."):
+            continue
+        try:
+            with open(os.path.join(item.path, ENTRY_FILE), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            continue  # Consumida por outro processo no meio da varredura
+        entry.update(id=item.name, path=item.path)
+        entries.append(entry)
+    return sorted(entries, key=lambda entry: entry["created_at"])
+
+def claim_entry(pool, audio_path):
+    """
+    Pega a entrada mais antiga do pool
+
+    A pasta é renomeada antes de ser lida (dois processos nunca pegam a mesma
+    entrada) e a narração é movida para o nome do job, onde a limpeza do
+    storage a encontra
+
+    Args:
+        pool: Pasta do pool
+        audio_path: Caminho da narração do job (a extensão vem da entrada)
+
+    Returns:
+        Dict no formato de main.prepare_inputs, mais "entry_id" e "age_s"
+        (None se o pool estiver vazio)
+    """
+    for entry in pool_entries(pool):
+        claimed = os.path.join(pool, f".claimed_{entry['id']}")
+        try:
+            os.replace(entry["path"], claimed)
+        except OSError:
+            continue  # Outro processo pegou primeiro
+
+        audio_file = os.path.splitext(audio_path)[0] + os.path.splitext(entry["audio"])[1]
+        os.makedirs(os.path.dirname(audio_file) or ".", exist_ok=True)
+        shutil.move(os.path.join(claimed, entry["audio"]), audio_file)
+        shutil.rmtree(claimed, ignore_errors=True)
+
+        return {
+            "story": entry["story"],
+            "adapted_text": entry["adapted_text"],
+            "metadata": entry["metadata"],
+            "voice": entry["voice"],
+            "audio_file": audio_file,
+            "entry_id": entry["id"],
+            "age_s": round(time.time() - entry["created_at"], 1)
+        }
+    return None
+
+def prune_pool(pool, max_age_days=POOL_DAYS, now=None):
+    """
+    Remove entradas velhas e pastas temporárias abandonadas
+
+    Returns:
+        Lista de pastas removidas
+    """
+    now = now if now is not None else time.time()
+    removed = []
+    if not os.path.isdir(pool):
+        return removed
+
+    for item in os.scandir(pool):
+        if not item.is_dir():
+            continue
+        if item.name.startswith("."):
+            expired = now - item.stat().st_mtime > STALE_TMP_S
+        else:
+            entry = next((e for e in pool_entries(pool) if e["id"] == item.name), None)
+            created = entry["created_at"] if entry else item.stat().st_mtime
+            expired = now - created > max_age_days * 86400
+        if expired:
+            shutil.rmtree(item.path, ignore_errors=True)
+            removed.append(item.path)
+    return removed
+
+class Prefetcher:
+    """
+    Prepara em segundo plano as entradas dos próximos jobs de um batch
+
+    O trabalho começa quando um job entra no render (render_started) e enche o
+    pool até `depth` entradas; take() entrega a próxima (esperando a que está
+    em andamento, se for o caso). Cada entrada tem o seu próprio trace
+    (trace_prefetch_<id>.jsonl), fora do job que estava renderizando
+    """
+
+    def __init__(self, output_dir="assets/output/", depth=1, take_timeout=TAKE_TIMEOUT_S):
+        from catalog import catalog_path
+
+        self.pool = pool_dir(output_dir)
+        self.catalog_db = catalog_path(output_dir)
+        self.depth = depth
+        self.take_timeout = take_timeout
+        self.prepared = 0
+        self._seen = set()
+        self._pending = False
+        self._cond = threading.Condition()
+        self._wanted = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def render_started(self, story=None):
+        """
+        Sinaliza que o job atual entrou no render: hora de adiantar o próximo
+
+        Args:
+            story: História do job atual (não é preparada de novo)
+        """
+        if story:
+            self._seen.add(story.get("id"))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+            self._thread.start()
+        with self._cond:
+            self._pending = True
+        self._wanted.set()
+
+    def take(self, audio_path):
+        """
+        Entrada para o próximo job (None = o job prepara a sua)
+
+        Args:
+            audio_path: Caminho da narração do job
+        """
+        inputs = claim_entry(self.pool, audio_path)
+        if inputs is None:
+            with self._cond:
+                finished = self._cond.wait_for(lambda: not self._pending, timeout=self.take_timeout)
+            if not finished:
+                print(f"⚠️ Prefetch não terminou em {self.take_timeout:.0f}s, preparando a história no job")
+            inputs = claim_entry(self.pool, audio_path)
+        if inputs:
+            self._seen.add(inputs["story"].get("id"))
+        return inputs
+
+    def close(self):
+        """Termina a entrada em andamento (ela fica no pool) e para a thread"""
+        self._stop.set()
+        self._wanted.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        try:
+            while True:
+                self._wanted.wait()
+                self._wanted.clear()
+                if self._stop.is_set():
+                    break
+                try:
+                    while not self._stop.is_set() and len(pool_entries(self.pool)) < self.depth:
+                        if not self._prepare_one():
+                            break
+                except Exception as e:
+                    # Disco cheio, corrida no rename...: o job seguinte prepara a sua história
+                    print(f"❌ Erro no prefetch: {e}")
+                finally:
+                    with self._cond:
+                        if not self._wanted.is_set():
+                            self._pending = False
+                            self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._pending = False
+                self._cond.notify_all()
+
+    def _prepare_one(self):
+        """Prepara e publica uma entrada; False se falhar"""
+        import tracing
+        from main import prepare_inputs
+
+        os.makedirs(self.pool, exist_ok=True)
+        tmp_dir = new_entry_dir(self.pool)
+        exclude = self._seen | {entry["story"].get("id") for entry in pool_entries(self.pool)}
+        tracer = tracing.JobTracer(f"prefetch_{os.path.basename(tmp_dir)[len('.tmp_'):]}")
+
+        print("\n⏩ Prefetch: preparando a próxima história durante o render...")
+        inputs = None
+        with tracing.use_tracer(tracer):
+            try:
+                inputs = prepare_inputs(os.path.join(tmp_dir, "audio.mp3"), exclude=exclude, db_path=self.catalog_db)
+            except Exception as e:
+                print(f"❌ Erro no prefetch: {e}")
+        tracer.close("ok" if inputs else "failed")
+
+        if not inputs:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        self._seen.add(inputs["story"].get("id"))
+        try:
+            publish_entry(tmp_dir, inputs)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.prepared += 1
+        print(f"✅ Prefetch pronto: r/{inputs['story']['subreddit']} ({len(pool_entries(self.pool))} no pool)")
+        return True
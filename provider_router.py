@@ -0,0 +1,288 @@
+"""
+Roteador de provedores externos (TTS e LLM) com failover por latência
+Guarda latência e taxa de erro recentes de cada provedor, impõe um prazo por
+chamada, dispara a mesma chamada em um segundo provedor quando o primeiro passa
+do percentil de latência dele (hedge) e abre um circuit breaker depois de
+falhas seguidas, pulando o provedor até o fim do cooldown
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+# Amostras recentes por provedor e mínimo para confiar no percentil
+WINDOW = 50
+MIN_SAMPLES = 5
+
+# Circuit breaker: falhas seguidas para abrir e tempo aberto antes de testar de novo (s)
+FAILURE_THRESHOLD = 3
+COOLDOWN_S = 60.0
+
+# Provedor com mais erros que isso na janela vai para o fim da fila
+MAX_ERROR_RATE = 0.5
+
+def percentile(values, p):
+    """
+    Percentil com interpolação linear
+
+    Args:
+        values: Lista de números
+        p: Percentil (0-100)
+
+    Returns:
+        Valor do percentil (None para lista vazia)
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+class ProviderStats:
+    """Latência e erros das últimas chamadas de um provedor"""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.samples.append((latency, ok))
+
+    def latency_percentile(self, p):
+        """Percentil da latência das chamadas com sucesso (None sem amostras)"""
+        with self.lock:
+            return percentile([latency for latency, ok in self.samples if ok], p)
+
+    @property
+    def count(self):
+        return len(self.samples)
+
+    @property
+    def error_rate(self):
+        with self.lock:
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+class CircuitBreaker:
+    """
+    Fechado → aberto depois de `threshold` falhas seguidas → meio-aberto no fim do cooldown
+
+    Meio-aberto deixa passar chamadas de teste: um sucesso fecha, uma falha reabre
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_S, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = self.clock()
+
+class _Attempt:
+    """Chamada de um provedor rodando em uma thread"""
+
+    def __init__(self, name, started):
+        self.name = name
+        self.started = started
+        self.recorded = False
+
+class ProviderRouter:
+    """
+    Escolhe e chama provedores equivalentes (mesma assinatura, mesmo resultado)
+
+    Uso:
+        router = ProviderRouter("tts", {"edge": falar_edge, "gtts": falar_gtts})
+        provider, path = router.call(texto, caminho)
+
+    Falha = exceção ou retorno None (o padrão das funções do pipeline)
+    """
+
+    def __init__(self, name, providers, deadline=60.0, hedge=True, hedge_percentile=90, hedge_after=None,
+                 min_hedge=0.5, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_S, on_discard=None, clock=time.monotonic):
+        """
+        Args:
+            name: Nome do roteador (nas mensagens)
+            providers: Dict nome -> função, na ordem de preferência
+            deadline: Prazo total de uma chamada (s)
+            hedge: Se True, chamadas lentas disparam o próximo provedor em paralelo
+            hedge_percentile: Percentil da latência do provedor que dispara o hedge
+            hedge_after: Espera antes do hedge enquanto não há amostras (padrão: metade do prazo)
+            min_hedge: Espera mínima antes do hedge (s)
+            threshold: Falhas seguidas que abrem o circuit breaker
+            cooldown: Tempo com o circuito aberto (s)
+            on_discard: Chamado com (provedor, resultado) para resultados que perderam a corrida
+            clock: Relógio monotônico (testes)
+        """
+        self.name = name
+        self.providers = dict(providers)
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after = hedge_after if hedge_after is not None else deadline / 2
+        self.min_hedge = min_hedge
+        self.on_discard = on_discard
+        self.clock = clock
+        self.stats = {provider: ProviderStats() for provider in self.providers}
+        self.breakers = {provider: CircuitBreaker(threshold, cooldown, clock) for provider in self.providers}
+        self.lock = threading.Lock()
+
+    def candidates(self, order=None):
+        """
+        Provedores na ordem em que serão tentados
+
+        Circuito aberto fica de fora; taxa de erro alta vai para o fim
+
+        Args:
+            order: Ordem desta chamada (padrão: a do construtor); nomes desconhecidos são ignorados
+        """
+        names = [name for name in (order or self.providers) if name in self.providers and self.breakers[name].allow()]
+        unhealthy = [name for name in names if self.stats[name].count >= MIN_SAMPLES and self.stats[name].error_rate > MAX_ERROR_RATE]
+        return [name for name in names if name not in unhealthy] + unhealthy
+
+    def hedge_delay(self, provider):
+        """Quanto esperar pelo provedor antes de disparar o próximo (s)"""
+        stats = self.stats[provider]
+        if stats.count < MIN_SAMPLES:
+            return self.hedge_after
+        latency = stats.latency_percentile(self.hedge_percentile)
+        return self.hedge_after if latency is None else max(self.min_hedge, latency)
+
+    def _record(self, attempt, latency, ok):
+        """Registra o resultado de uma tentativa (uma vez só)"""
+        with self.lock:
+            if attempt.recorded:
+                return
+            attempt.recorded = True
+        self.stats[attempt.name].record(latency, ok)
+        if ok:
+            self.breakers[attempt.name].record_success()
+        else:
+            self.breakers[attempt.name].record_failure()
+            if self.breakers[attempt.name].state != "closed":
+                print(f"🔌 {self.name}: circuito aberto para {attempt.name} ({self.breakers[attempt.name].cooldown:.0f}s)")
+
+    def call(self, *args, order=None, **kwargs):
+        """
+        Chama o melhor provedor disponível, com prazo, hedge e failover
+
+        Args:
+            *args, **kwargs: Argumentos repassados ao provedor
+            order: Ordem de preferência desta chamada
+
+        Returns:
+            (provedor, resultado); (None, None) se todos falharem ou o prazo acabar
+        """
+        pending = self.candidates(order)
+        if not pending:
+            print(f"❌ {self.name}: nenhum provedor disponível (circuitos abertos)")
+            return None, None
+
+        results = queue.Queue()
+        running = []
+        decided = threading.Event()
+
+        def run(attempt):
+            try:
+                result, error = self.providers[attempt.name](*args, **kwargs), None
+            except Exception as e:
+                result, error = None, e
+            ok = result is not None
+            self._record(attempt, self.clock() - attempt.started, ok)
+            with self.lock:
+                late = decided.is_set()
+                if not late:
+                    results.put((attempt, result, error))
+            if late and ok and self.on_discard:
+                self.on_discard(attempt.name, result)  # Terminou depois do vencedor
+
+        def launch():
+            attempt = _Attempt(pending.pop(0), self.clock())
+            running.append(attempt)
+            threading.Thread(target=run, args=(attempt,), name=f"{self.name}-{attempt.name}", daemon=True).start()
+            return self.clock() + self.hedge_delay(attempt.name)
+
+        start = self.clock()
+        deadline_at = start + self.deadline
+        hedge_at = launch()
+        winner = None
+
+        while running or pending:
+            now = self.clock()
+            if now >= deadline_at:
+                break
+            if not running:
+                hedge_at = launch()
+                continue
+            wait_until = min(deadline_at, hedge_at) if (self.hedge and pending and len(running) < 2) else deadline_at
+            try:
+                attempt, result, error = results.get(timeout=max(0.0, wait_until - now))
+            except queue.Empty:
+                if self.hedge and pending and len(running) < 2 and self.clock() >= hedge_at:
+                    print(f"⏱️ {self.name}: {running[0].name} lento, disparando {pending[0]} em paralelo...")
+                    hedge_at = launch()
+                continue
+
+            running.remove(attempt)
+            if result is not None:
+                winner = (attempt.name, result)
+                break
+            print(f"⚠️ {self.name}: {attempt.name} falhou ({error or 'sem resultado'})")
+            if pending and len(running) < 2:
+                hedge_at = launch()
+
+        with self.lock:
+            decided.set()
+        # Sucessos que chegaram junto com o vencedor também são descartados
+        while not results.empty():
+            attempt, result, _ = results.get_nowait()
+            if result is not None and self.on_discard:
+                self.on_discard(attempt.name, result)
+
+        if winner is None:
+            # Quem ainda está rodando estourou o prazo: conta como falha agora (um provedor travado abre o circuito)
+            for attempt in running:
+                self._record(attempt, self.deadline, False)
+            print(f"❌ {self.name}: nenhum provedor respondeu em {self.deadline:.0f}s")
+            return None, None
+
+        if winner[0] != (order or list(self.providers))[0]:
+            print(f"🔀 {self.name}: resposta de {winner[0]}")
+        return winner
+
+    def health(self):
+        """Estado de cada provedor (chamadas, erros, p50/p90 e circuito)"""
+        return {
+            name: {
+                "calls": self.stats[name].count,
+                "error_rate": round(self.stats[name].error_rate, 3),
+                "p50_s": self.stats[name].latency_percentile(50),
+                "p90_s": self.stats[name].latency_percentile(90),
+                "circuit": self.breakers[name].state
+            }
+            for name in self.providers
+        }
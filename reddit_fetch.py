@@ -1,4 +1,3 @@
-import praw
 import random
 import os
 from dotenv import load_dotenv
@@ -7,59 +6,88 @@ load_dotenv()
 
 def init_reddit():
     """Inicializa conexão com Reddit API"""
+    import praw
+    
     return praw.Reddit(
         client_id=os.getenv("REDDIT_CLIENT_ID"),
         client_secret=os.getenv("REDDIT_SECRET"),
         user_agent="reddit_shorts_bot/1.0"
     )
 
-def get_story(subreddit_name="AmItheAsshole", limit=20, min_length=200):
+def get_story(subreddit_name="AmItheAsshole", limit=20, min_length=200, max_chars=4000, top_k=None, db_path=None):
     """
-    Busca uma história aleatória do Reddit
+    Busca uma história do Reddit (sorteada entre as de melhor nota na pré-triagem)
     
     Args:
         subreddit_name: Nome do subreddit
         limit: Quantidade de posts para buscar
         min_length: Tamanho mínimo do texto
+        max_chars: Limite do texto enviado ao LLM (séries usam mais)
+        top_k: Quantos dos melhores candidatos entram no sorteio (None = story_score.TOP_K)
+        db_path: Catálogo com o histórico de histórias publicadas (None = CATALOG_PATH)
     
     Returns:
-        Dict com título e texto da história
+        Dict com título, texto, números do post e nota da história
     """
     try:
         reddit = init_reddit()
         subreddit = reddit.subreddit(subreddit_name)
         
         # Filtra posts válidos (não fixados, com texto suficiente)
-        valid_posts = []
+        candidates = []
         for post in subreddit.hot(limit=limit):
             if not post.stickied and len(post.selftext) >= min_length:
-                valid_posts.append(post)
+                candidates.append({
+                    "id": post.id,
+                    "title": post.title,
+                    "text": post.selftext,
+                    "url": post.url,
+                    "score": post.score,
+                    "num_comments": getattr(post, "num_comments", 0),
+                    "created_utc": getattr(post, "created_utc", 0),
+                    "subreddit": subreddit_name
+                })
         
-        if not valid_posts:
+        if not candidates:
             raise Exception("Nenhuma história válida encontrada")
         
-        # Escolhe um post aleatório
-        post = random.choice(valid_posts)
+        # Reposts e cross-posts de histórias já publicadas (mesmo texto com outro id)
+        from story_dedup import filter_duplicates
+        candidates = filter_duplicates(candidates, db_path=db_path)
+        if not candidates:
+            raise Exception("Todas as histórias já foram publicadas")
+        
+        # Pré-triagem local: só os melhores candidatos seguem para LLM, TTS e render
+        from story_score import TOP_K, rank_stories
+        reference_time = max(story["created_utc"] or 0 for story in candidates)
+        ranked = rank_stories(candidates, reference_time=reference_time)
+        if not ranked:
+            raise Exception("Nenhuma história passou na pré-triagem")
+        
+        # Escolhe um post aleatório entre os melhores
+        quality, story = random.choice(ranked[:top_k or TOP_K])
+        print(f"🧮 Nota {quality:.2f} ({len(ranked)}/{len(candidates)} candidatos aprovados)")
         
-        return {
-            "title": post.title,
-            "text": post.selftext[:4000],  # Limita tamanho
-            "url": post.url,
-            "score": post.score,
-            "subreddit": subreddit_name
-        }
+        # O LLM recebe o texto limitado; o catálogo guarda o texto inteiro, que foi o que a nota viu
+        story["selftext"] = story["text"]
+        story["text"] = story["text"][:max_chars]  # Limita tamanho
+        story["quality"] = round(quality, 4)
+        story["ranked_at"] = reference_time
+        return story
     
     except Exception as e:
         print(f"❌ Erro ao buscar história: {e}")
         return None
 
-def get_story_from_multiple_subs(subreddits=None, limit=20):
+def get_story_from_multiple_subs(subreddits=None, limit=20, max_chars=4000, db_path=None):
     """
     Busca história de múltiplos subreddits
     
     Args:
         subreddits: Lista de subreddits para buscar
         limit: Posts por subreddit
+        max_chars: Limite do texto da história
+        db_path: Catálogo com o histórico de histórias publicadas (None = CATALOG_PATH)
     
     Returns:
         Dict com história
@@ -77,7 +105,7 @@ def get_story_from_multiple_subs(subreddits=None, limit=20):
     chosen_sub = random.choice(subreddits)
     print(f"🔍 Buscando em r/{chosen_sub}...")
     
-    return get_story(chosen_sub, limit)
+    return get_story(chosen_sub, limit, max_chars=max_chars, db_path=db_path)
 
 if __name__ == "__main__":
     # Teste
@@ -0,0 +1,285 @@
+"""
+Thumbnail e prévia gerados durante a renderização
+Os frames são observados no caminho do encode (sem abrir o MP4 de novo):
+o fundo dos primeiros segundos é pontuado para escolher a thumbnail (com o
+título por cima) e os primeiros segundos do vídeo final vão para um encoder
+pequeno de prévia
+"""
+
+import os
+
+import numpy as np
+
+# Janela do gancho: a thumbnail sai dos primeiros segundos do vídeo (s)
+THUMBNAIL_WINDOW = (0.3, 3.0)
+
+# Faixa onde o título é desenhado na thumbnail (fração da altura)
+TITLE_BAND = (0.08, 0.30)
+
+PREVIEW_SECONDS = 3.0
+PREVIEW_SIZE = (540, 960)
+
+def extra_paths(output_path):
+    """video_123.mp4 -> video_123_thumb.jpg e video_123_preview.mp4"""
+    base = os.path.splitext(output_path)[0]
+    return {"thumbnail": f"{base}_thumb.jpg", "preview": f"{base}_preview.mp4"}
+
+def thumbnail_score(frame, stride=6):
+    """
+    Nota de um frame para thumbnail com título (tudo vetorizado, em uma amostra reduzida)
+
+    Contraste e nitidez contam a favor (evita frames de transição borrados);
+    faixa do título clara ou agitada conta contra (texto branco ilegível)
+
+    Args:
+        frame: Array (altura, largura, 3) uint8
+        stride: Passo da redução
+
+    Returns:
+        Nota (maior é melhor)
+    """
+    small = frame[::stride, ::stride].astype(np.float32)
+    luma = small @ np.array([0.299, 0.587, 0.114], dtype=np.float32) / 255.0
+
+    grad = np.abs(np.diff(luma, axis=1))
+    height = luma.shape[0]
+    top, bottom = int(height * TITLE_BAND[0]), int(height * TITLE_BAND[1])
+
+    contrast = float(luma.std())
+    sharpness = float(grad.mean())
+    band_luma = float(luma[top:bottom].mean())
+    band_busy = float(grad[top:bottom].mean())
+    return contrast + 0.5 * sharpness - 2.0 * max(0.0, band_luma - 0.45) - 3.0 * band_busy
+
+def wrap_title(title, font, max_width, draw, max_lines=3):
+    """Quebra o título em linhas que cabem na largura (reticências se passar do limite)"""
+    lines = []
+    current = ""
+    for word in title.split():
+        candidate = f"{current} {word}".strip()
+        if current and draw.textlength(candidate, font=font) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1].rstrip(".,;:!?") + "…"
+    return lines
+
+def render_thumbnail(frame, title, output_path, fontsize=84):
+    """
+    Desenha o título sobre o frame escolhido e grava o JPEG
+
+    Args:
+        frame: Array (altura, largura, 3) uint8
+        title: Título gerado (None = só o frame)
+        output_path: Caminho do JPEG
+        fontsize: Tamanho da fonte do título
+
+    Returns:
+        Caminho do JPEG
+    """
+    from PIL import Image, ImageDraw
+    from storage import atomic_output
+    from subtitle_whisper import load_caption_font
+
+    image = Image.fromarray(frame.astype(np.uint8))
+    width, height = image.size
+
+    if title:
+        # Degradê escuro atrás do título, mais forte no topo
+        top, bottom = int(height * TITLE_BAND[0]), int(height * TITLE_BAND[1])
+        shade = np.zeros((bottom, 1), dtype=np.float32)
+        shade[:top] = 0.55
+        shade[top:, 0] = np.linspace(0.55, 0.0, bottom - top)
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels[:bottom] *= 1.0 - shade[:, :, None]
+        image = Image.fromarray(pixels.astype(np.uint8))
+
+        draw = ImageDraw.Draw(image)
+        font = load_caption_font(fontsize)
+        lines = wrap_title(title, font, width * 0.88, draw)
+        line_height = int(fontsize * 1.15)
+        y = top
+        for line in lines:
+            x = (width - draw.textlength(line, font=font)) / 2
+            draw.text((x, y), line, font=font, fill="white", stroke_width=6, stroke_fill="black")
+            y += line_height
+
+    with atomic_output(output_path) as temp_path:
+        image.save(temp_path, "JPEG", quality=90)
+    return output_path
+
+class RenderTap:
+    """
+    Observa os frames do encode e produz thumbnail + prévia no fim
+
+    Os frames chegam por índice e só contam depois de start(); frames pedidos
+    antes (o MoviePy calcula o frame 0 ao montar os clips), repetidos ou fora
+    de ordem são ignorados
+    """
+
+    def __init__(self, output_path, fps=30, title=None, thumbnail=True, preview_seconds=PREVIEW_SECONDS, preview_size=PREVIEW_SIZE):
+        """
+        Args:
+            output_path: Caminho do vídeo (base dos nomes da thumbnail e da prévia)
+            fps: Frames por segundo do encode
+            title: Título desenhado na thumbnail
+            thumbnail: Se False, não gera thumbnail
+            preview_seconds: Duração da prévia (0 = sem prévia)
+            preview_size: Resolução da prévia
+        """
+        self.paths = extra_paths(output_path)
+        self.fps = fps
+        self.title = title
+        self.thumbnail = thumbnail
+        self.preview_frames = int(round(preview_seconds * fps))
+        self.preview_size = preview_size
+
+        self.window = (int(THUMBNAIL_WINDOW[0] * fps), int(THUMBNAIL_WINDOW[1] * fps))
+        self.best_score = None
+        self.best_frame = None
+        self.best_index = None
+
+        self._armed = False
+        self._next_background = 0
+        self._next_output = 0
+        self._writer = None
+        self._writer_factory = None
+        self._audio_file = None
+        self.error = None
+
+    def start(self, audio_clip=None, ass_path=None):
+        """
+        Começa a observar o encode e prepara a prévia (com o áudio dos primeiros segundos)
+
+        Args:
+            audio_clip: Áudio do vídeo (None = prévia muda)
+            ass_path: Legendas .ass que o ffmpeg desenha no encode (captions="ass"):
+                os frames observados chegam sem elas, então a prévia as desenha também
+        """
+        self._armed = True
+        if not self.preview_frames:
+            return
+        try:
+            from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+            from storage import partial_path
+            from subtitle_ass import ass_filter
+
+            # Legendas antes do scale, na resolução em que o .ass foi escrito
+            filters = [ass_filter(ass_path)] if ass_path else []
+            filters.append(f"scale={self.preview_size[0]}:{self.preview_size[1]}:flags=area")
+
+            if audio_clip is not None:
+                self._audio_file = os.path.splitext(self.paths["preview"])[0] + "_audio.m4a"
+                duration = min(self.preview_frames / self.fps, audio_clip.duration)
+                audio_clip.subclip(0, duration).write_audiofile(self._audio_file, fps=44100, codec="aac", bitrate="128k", logger=None)
+            self._writer_factory = lambda size: FFMPEG_VideoWriter(
+                partial_path(self.paths["preview"]), size, self.fps, codec="libx264", audiofile=self._audio_file,
+                preset="veryfast", threads=1,
+                ffmpeg_params=["-vf", ",".join(filters), "-crf", "26"]
+            )
+        except Exception as e:
+            self._fail(e)
+
+    def background(self, index, frame):
+        """Frame do fundo (sem legendas): candidato a thumbnail"""
+        if not self._armed or index != self._next_background:
+            return
+        self._next_background += 1
+        if not self.thumbnail or self.error or not (self.window[0] <= index < self.window[1]):
+            return
+        # Um frame a cada três já cobre a janela (a nota é barata, a cópia não)
+        if (index - self.window[0]) % 3:
+            return
+        try:
+            score = thumbnail_score(frame)
+            if self.best_score is None or score > self.best_score:
+                self.best_score = score
+                self.best_frame = np.array(frame, dtype=np.uint8)
+                self.best_index = index
+        except Exception as e:
+            self._fail(e)
+
+    def output(self, index, frame):
+        """Frame final (com legendas): vai para a prévia"""
+        if not self._armed or index != self._next_output:
+            return
+        self._next_output += 1
+        if self.error or index >= self.preview_frames or self._writer_factory is None:
+            return
+        try:
+            if self._writer is None:
+                # Tamanho só é conhecido no primeiro frame (formatos recortados)
+                self._writer = self._writer_factory((frame.shape[1], frame.shape[0]))
+            self._writer.write_frame(np.ascontiguousarray(frame, dtype=np.uint8))
+            if index == self.preview_frames - 1:
+                self._close_preview()
+        except Exception as e:
+            self._fail(e)
+
+    def watch_background(self, clip):
+        """Clip que repassa cada frame para background() sem alterá-lo"""
+        return clip.fl(lambda get_frame, t: self._observe(self.background, get_frame, t))
+
+    def watch_output(self, clip):
+        """Clip que repassa cada frame para output() sem alterá-lo"""
+        return clip.fl(lambda get_frame, t: self._observe(self.output, get_frame, t))
+
+    def _observe(self, callback, get_frame, t):
+        frame = get_frame(t)
+        callback(int(round(t * self.fps)), frame)
+        return frame
+
+    def finish(self):
+        """
+        Grava a thumbnail e fecha a prévia
+
+        Returns:
+            Dict com "thumbnail" e/ou "preview" (só os arquivos gerados)
+        """
+        from storage import commit_output, partial_path
+
+        outputs = {}
+        try:
+            self._close_preview()
+            temp_path = partial_path(self.paths["preview"])
+            if self._next_output and os.path.exists(temp_path) and not self.error:
+                outputs["preview"] = commit_output(temp_path, self.paths["preview"])
+            if self.best_frame is not None:
+                outputs["thumbnail"] = render_thumbnail(self.best_frame, self.title, self.paths["thumbnail"])
+                print(f"🖼️ Thumbnail: frame {self.best_index} ({self.best_index / self.fps:.1f}s)")
+        except Exception as e:
+            print(f"⚠️ Erro ao gerar thumbnail/prévia: {e}")
+        finally:
+            self.close()
+        return outputs
+
+    def close(self):
+        """Libera o encoder da prévia e os temporários (seguro chamar mais de uma vez)"""
+        from storage import discard_output, partial_path
+
+        try:
+            self._close_preview()
+        except Exception:
+            pass
+        discard_output(partial_path(self.paths["preview"]))
+        discard_output(self._audio_file)
+
+    def _close_preview(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _fail(self, error):
+        # Thumbnail/prévia nunca derrubam o vídeo principal
+        if self.error is None:
+            print(f"⚠️ Thumbnail/prévia desativadas: {error}")
+        self.error = error
+        try:
+            self._close_preview()
+        except Exception:
+            pass
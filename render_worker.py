@@ -0,0 +1,383 @@
+"""
+⚙️ Worker de renderização com fila local (SQLite)
+Mantém moviepy, Whisper e fontes carregados entre vídeos e puxa jobs de uma fila
+compartilhada - vários workers podem rodar na mesma máquina sem pegar o mesmo job.
+Enquanto renderiza, o worker renova um heartbeat; job 'running' sem heartbeat
+(worker que caiu ou foi morto) volta para a fila no próximo claim
+
+Uso:
+    python render_worker.py submit 5            # Enfileira 5 vídeos
+    python render_worker.py submit 1 --style youtube
+    python render_worker.py status              # Resumo da fila
+    python render_worker.py status 12           # Detalhes de um job
+    python render_worker.py work                # Inicia um worker
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+QUEUE_PATH = "assets/output/jobs.db"
+
+# Heartbeat do job em andamento; sem renovação por LEASE_S o worker é dado como morto
+HEARTBEAT_S = 30
+LEASE_S = 120
+# Job que derruba o worker esse número de vezes é marcado como failed (não volta para a fila)
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    payload TEXT NOT NULL,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+"""
+
+# Colunas adicionadas depois da primeira versão da fila (bancos antigos ganham na abertura)
+MIGRATIONS = {
+    "heartbeat_at": "REAL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0"
+}
+
+def connect(db_path=QUEUE_PATH):
+    """
+    Abre a fila (cria o banco se não existir)
+
+    Args:
+        db_path: Caminho do banco SQLite
+
+    Returns:
+        Conexão SQLite em modo autocommit (transações explícitas)
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for name, definition in MIGRATIONS.items():
+        if name not in columns:
+            try:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+            except sqlite3.OperationalError:
+                pass  # Outro worker migrou ao mesmo tempo
+    return conn
+
+def submit_job(conn, payload=None):
+    """
+    Enfileira um job de vídeo
+
+    Args:
+        conn: Conexão da fila
+        payload: Dict com opções repassadas para main() (ex: subtitle_style)
+
+    Returns:
+        ID do job criado
+    """
+    cursor = conn.execute(
+        "INSERT INTO jobs (payload, created_at) VALUES (?, ?)",
+        (json.dumps(payload or {}), time.time())
+    )
+    return cursor.lastrowid
+
+def requeue_stale_jobs(conn, lease=LEASE_S, now=None):
+    """
+    Devolve para a fila os jobs de workers que pararam de mandar heartbeat
+
+    Não abre transação: claim_job chama dentro da sua. Jobs que já passaram
+    por MAX_ATTEMPTS workers ficam como failed
+
+    Args:
+        conn: Conexão da fila
+        lease: Segundos sem heartbeat para considerar o worker morto
+        now: Horário de referência (epoch)
+
+    Returns:
+        Quantidade de jobs devolvidos para a fila
+    """
+    now = now if now is not None else time.time()
+    cutoff = now - lease
+    conn.execute(
+        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+        "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?",
+        (f"Worker parou de responder em {MAX_ATTEMPTS} tentativas", now, cutoff, MAX_ATTEMPTS)
+    )
+    cursor = conn.execute(
+        "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL, heartbeat_at = NULL "
+        "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?",
+        (cutoff,)
+    )
+    if cursor.rowcount:
+        print(f"♻️ {cursor.rowcount} job(s) de worker parado devolvido(s) para a fila")
+    return cursor.rowcount
+
+def claim_job(conn, worker_id, lease=LEASE_S):
+    """
+    Pega o job mais antigo da fila de forma atômica
+
+    BEGIN IMMEDIATE trava a escrita do banco durante a seleção + update,
+    então dois workers nunca recebem o mesmo job. Antes, jobs de workers
+    mortos (sem heartbeat há `lease` segundos) voltam para a fila
+
+    Args:
+        conn: Conexão da fila
+        worker_id: Identificação do worker (host:pid)
+        lease: Segundos sem heartbeat para considerar um worker morto
+
+    Returns:
+        Dict com id e payload do job, ou None se a fila estiver vazia
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        requeue_stale_jobs(conn, lease)
+        row = conn.execute(
+            "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+        ).fetchone()
+
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+            (worker_id, now, now, row["id"])
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return {"id": row["id"], "payload": json.loads(row["payload"])}
+
+def finish_job(conn, job_id, result=None, error=None, worker_id=None):
+    """
+    Marca um job como concluído ou com falha
+
+    Args:
+        conn: Conexão da fila
+        job_id: ID do job
+        result: Resultado serializável (sucesso)
+        error: Mensagem de erro (falha)
+        worker_id: Se definido, só grava se o job ainda for deste worker
+            (não sobrescreve um job que voltou para a fila e outro worker pegou)
+    """
+    status = "failed" if error else "done"
+    sql = "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?"
+    params = [status, json.dumps(result) if result is not None else None, error, time.time(), job_id]
+    if worker_id is not None:
+        sql += " AND worker = ?"
+        params.append(worker_id)
+    conn.execute(sql, params)
+
+def heartbeat(conn, job_id, worker_id):
+    """Renova o lease do job em andamento (False se o job não é mais deste worker)"""
+    cursor = conn.execute(
+        "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+        (time.time(), job_id, worker_id)
+    )
+    return cursor.rowcount == 1
+
+def release_job(conn, job_id, worker_id):
+    """Devolve um job interrompido (Ctrl-C) para a fila, sem contar como tentativa"""
+    conn.execute(
+        "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL, heartbeat_at = NULL, attempts = MAX(attempts - 1, 0) "
+        "WHERE id = ? AND worker = ? AND status = 'running'",
+        (job_id, worker_id)
+    )
+
+def _keep_alive(db_path, job_id, worker_id, stop, interval):
+    """Thread de heartbeat (conexão própria: o job roda na thread principal)"""
+    conn = connect(db_path)
+    try:
+        while not stop.wait(interval):
+            heartbeat(conn, job_id, worker_id)
+    except Exception as e:
+        print(f"⚠️ Heartbeat do job #{job_id} parou: {e}")
+    finally:
+        conn.close()
+
+def get_job(conn, job_id):
+    """Retorna os dados de um job (ou None)"""
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return dict(row) if row else None
+
+def queue_summary(conn):
+    """Retorna a contagem de jobs por status"""
+    rows = conn.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status").fetchall()
+    return {row["status"]: row["total"] for row in rows}
+
+def warm_up():
+    """
+    Carrega uma única vez o estado caro: moviepy, Whisper e o pipeline
+
+    Returns:
+        Função que executa um job (main do pipeline)
+    """
+    print("🔥 Aquecendo worker (moviepy, Whisper, fontes)...")
+    from main import main
+    import video_generate  # noqa: F401 - importa moviepy agora, não no primeiro job
+
+    try:
+        from subtitle_whisper import load_whisper_model, load_caption_font
+        load_whisper_model("base")
+        for fontsize in (70, 80, 85, 90):
+            load_caption_font(fontsize)
+    except Exception as e:
+        print(f"⚠️ Legendas não aquecidas: {e}")
+
+    return main
+
+def process_next_job(conn, worker_id, handler, heartbeat_interval=HEARTBEAT_S, lease=LEASE_S):
+    """
+    Pega e executa um job da fila, renovando o heartbeat enquanto ele roda
+
+    Args:
+        conn: Conexão da fila
+        worker_id: Identificação do worker
+        handler: Função chamada com o payload do job como kwargs
+        heartbeat_interval: Intervalo (s) entre heartbeats
+        lease: Segundos sem heartbeat para considerar um worker morto
+
+    Returns:
+        ID do job processado ou None se a fila estava vazia
+    """
+    job = claim_job(conn, worker_id, lease)
+    if job is None:
+        return None
+
+    print(f"\n📥 [{worker_id}] Job #{job['id']} iniciado")
+
+    # O worker não tem resumo de batch: o histórico de tracers não cresce job a job
+    import tracing
+    tracing.reset_history()
+
+    db_path = conn.execute("PRAGMA database_list").fetchone()["file"]
+    stop = threading.Event()
+    keep_alive = threading.Thread(target=_keep_alive, args=(db_path, job["id"], worker_id, stop, heartbeat_interval), daemon=True)
+    keep_alive.start()
+    try:
+        result = handler(**job["payload"])
+        if result:
+            finish_job(conn, job["id"], result=result, worker_id=worker_id)
+            print(f"✅ Job #{job['id']} concluído")
+        else:
+            finish_job(conn, job["id"], error="Pipeline não gerou vídeo", worker_id=worker_id)
+            print(f"❌ Job #{job['id']} falhou")
+    except KeyboardInterrupt:
+        release_job(conn, job["id"], worker_id)
+        print(f"↩️ Job #{job['id']} devolvido para a fila")
+        raise
+    except Exception as e:
+        finish_job(conn, job["id"], error=str(e), worker_id=worker_id)
+        print(f"❌ Job #{job['id']} falhou: {e}")
+    finally:
+        stop.set()
+        keep_alive.join()
+
+    return job["id"]
+
+def run_worker(db_path=QUEUE_PATH, poll_interval=5.0, once=False):
+    """
+    Loop principal do worker: aquece o estado e consome a fila
+
+    Args:
+        db_path: Caminho da fila
+        poll_interval: Espera (s) quando a fila está vazia
+        once: Se True, sai quando a fila esvaziar
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    handler = warm_up()
+    conn = connect(db_path)
+
+    print(f"👷 Worker {worker_id} aguardando jobs em {db_path}...")
+
+    try:
+        while True:
+            if process_next_job(conn, worker_id, handler) is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\n👋 Worker encerrado")
+    finally:
+        conn.close()
+
+def main():
+    """CLI da fila de renderização"""
+    parser = argparse.ArgumentParser(description="Fila de renderização do Reddit Shorts Bot")
+    parser.add_argument("--db", default=QUEUE_PATH, help="Caminho da fila SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Enfileira vídeos")
+    submit.add_argument("count", type=int, nargs="?", default=1)
+    submit.add_argument("--style", default="tiktok", help="Estilo das legendas")
+    submit.add_argument("--backgrounds", type=int, default=3, help="Vídeos de fundo por vídeo")
+    submit.add_argument("--formats", help="Formatos renderizados juntos, ex: shorts,lowres,square")
+    submit.add_argument("--series", type=int, metavar="N", help="Divide histórias longas em até N partes")
+    submit.add_argument("--crossfade", type=float, metavar="S", help="Crossfade de S segundos entre os vídeos de fundo")
+
+    status = commands.add_parser("status", help="Mostra a fila ou um job")
+    status.add_argument("job_id", type=int, nargs="?")
+
+    work = commands.add_parser("work", help="Inicia um worker")
+    work.add_argument("--once", action="store_true", help="Sai quando a fila esvaziar")
+    work.add_argument("--poll", type=float, default=5.0, help="Intervalo de polling (s)")
+
+    args = parser.parse_args()
+
+    if args.command == "work":
+        run_worker(args.db, args.poll, args.once)
+        return
+
+    conn = connect(args.db)
+    try:
+        if args.command == "submit":
+            payload = {"subtitle_style": args.style, "videos_count": args.backgrounds}
+            if args.formats:
+                from export_formats import parse_formats
+                try:
+                    payload["formats"] = parse_formats(args.formats)
+                except ValueError as e:
+                    parser.error(str(e))
+            if args.series:
+                payload["series_parts"] = args.series
+            if args.crossfade:
+                payload["crossfade"] = args.crossfade
+            ids = [submit_job(conn, payload) for _ in range(args.count)]
+            print(f"📥 {len(ids)} job(s) enfileirado(s): {', '.join(f'#{i}' for i in ids)}")
+
+        elif args.job_id is not None:
+            job = get_job(conn, args.job_id)
+            if not job:
+                print(f"❌ Job #{args.job_id} não encontrado")
+                return
+            for key, value in job.items():
+                print(f"   {key}: {value}")
+
+        else:
+            summary = queue_summary(conn)
+            print("📊 Fila de renderização:")
+            for state in ("queued", "running", "done", "failed"):
+                print(f"   {state}: {summary.get(state, 0)}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+🎲 Execuções determinísticas e replay de jobs
+Cada job roda com uma seed (sorteada ou passada com --seed) que fixa todas as
+escolhas aleatórias: subreddit, post, vídeos de fundo, trechos e trilha.
+Com --record, as respostas externas (listagem do Reddit, posts descartados
+como repetidos, respostas do LLM, áudio do TTS e a transcrição) vão para um bundle em assets/output/replays/
+<job>/, que refaz exatamente o mesmo job sem rede - base para comparar
+desempenho em cargas idênticas
+
+Uso:
+    python main.py --seed 42 --record                          # Grava o bundle
+    python replay.py list                                      # Bundles gravados
+    python replay.py run assets/output/replays/20261019_101500 # Refaz offline
+    python replay.py run <bundle> --whisper                    # Refaz a transcrição também
+    python bench_pipeline.py --replay <bundle> --full 3        # Mede o mesmo job 3 vezes
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import threading
+import time
+
+from offline_providers import FakeGroq, FakePost, FakeReddit, FakeSubreddit, prompt_kind
+
+REPLAY_DIR = "assets/output/replays"
+BUNDLE_FILE = "bundle.json"
+BUNDLE_VERSION = 1
+
+# Atributos do trace que registram as escolhas aleatórias de cada etapa
+DECISION_KEYS = {
+    "fetch": ("subreddit", "post_id"),
+    "background_prep": ("backgrounds", "source_starts"),
+    "audio_mix": ("music",)
+}
+
+def new_seed():
+    """Seed nova para um job (do gerador do sistema, não do random global)"""
+    return random.SystemRandom().getrandbits(32)
+
+def seed_everything(seed):
+    """
+    Fixa os geradores globais (random e NumPy) usados pelo pipeline
+
+    Args:
+        seed: Inteiro da execução
+    """
+    import numpy as np
+
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+
+def text_key(text):
+    """Chave estável de um texto (roteiro enviado ao TTS)"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def file_key(path):
+    """Chave estável do conteúdo de um arquivo (áudio enviado ao Whisper)"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def job_decisions(records):
+    """
+    Escolhas aleatórias de um job, tiradas dos registros do trace
+
+    Etapas que rodam em paralelo (partes de uma série) são ordenadas, então a
+    comparação não depende de qual thread terminou primeiro
+
+    Args:
+        records: JobTracer.records
+
+    Returns:
+        Dict etapa -> lista de escolhas
+    """
+    decisions = {}
+    for record in records:
+        keys = DECISION_KEYS.get(record["stage"])
+        if keys:
+            decisions.setdefault(record["stage"], []).append({key: record.get(key) for key in keys})
+    return {stage: sorted(items, key=lambda item: json.dumps(item, sort_keys=True)) for stage, items in decisions.items()}
+
+def compare_decisions(recorded, replayed):
+    """
+    Diferenças entre as escolhas gravadas e as do replay
+
+    Returns:
+        Lista de mensagens (vazia quando o replay fez exatamente o mesmo trabalho)
+    """
+    differences = []
+    for stage in sorted(set(recorded) | set(replayed)):
+        if recorded.get(stage) != replayed.get(stage):
+            differences.append(f"{stage}: gravado {recorded.get(stage)} / replay {replayed.get(stage)}")
+    return differences
+
+def post_to_dict(post, subreddit):
+    """Post do praw -> dict no formato das fixtures (offline_providers.FakePost)"""
+    return {
+        "id": post.id,
+        "subreddit": subreddit,
+        "title": post.title,
+        "selftext": post.selftext,
+        "score": post.score,
+        "num_comments": getattr(post, "num_comments", 0),
+        "created_utc": getattr(post, "created_utc", 0),
+        "stickied": post.stickied,
+        "url": post.url
+    }
+
+class _Patcher:
+    """Troca funções dos módulos do pipeline e restaura na saída (como OfflineProviders)"""
+
+    def __init__(self):
+        self._patches = []
+
+    def _patch(self, module, name, value):
+        self._patches.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    def _original(self, module, name):
+        for patched_module, patched_name, original in self._patches:
+            if patched_module is module and patched_name == name:
+                return original
+        return getattr(module, name)
+
+    def __exit__(self, *exc):
+        while self._patches:
+            module, name, original = self._patches.pop()
+            setattr(module, name, original)
+        return False
+
+class _RecordingSubreddit:
+    def __init__(self, subreddit, name, recorder):
+        self.subreddit = subreddit
+        self.name = name
+        self.recorder = recorder
+
+    def hot(self, limit=20):
+        posts = [post_to_dict(post, self.name) for post in self.subreddit.hot(limit=limit)]
+        with self.recorder.lock:
+            self.recorder.bundle["listings"][self.name] = posts
+        return iter([FakePost(post) for post in posts])
+
+class _RecordingReddit:
+    def __init__(self, reddit, recorder):
+        self.reddit = reddit
+        self.recorder = recorder
+
+    def subreddit(self, name):
+        return _RecordingSubreddit(self.reddit.subreddit(name), name, self.recorder)
+
+class ReplayReddit(FakeReddit):
+    """Cada subreddit devolve a listagem gravada dele"""
+
+    def __init__(self, listings):
+        self.listings = listings
+        self.latency = 0.0
+
+    def subreddit(self, name):
+        return FakeSubreddit([FakePost(post) for post in self.listings.get(name, [])])
+
+class _RecordingCompletions:
+    def __init__(self, completions, recorder):
+        self.completions = completions
+        self.recorder = recorder
+
+    def create(self, **kwargs):
+        response = self.completions.create(**kwargs)
+        kind = prompt_kind(kwargs["messages"][-1]["content"])
+        with self.recorder.lock:
+            self.recorder.bundle["llm"].setdefault(kind, []).append(response.choices[0].message.content)
+        return response
+
+class _RecordingChat:
+    def __init__(self, chat, recorder):
+        self.completions = _RecordingCompletions(chat.completions, recorder)
+
+class _RecordingGroq:
+    def __init__(self, client, recorder):
+        self.chat = _RecordingChat(client.chat, recorder)
+
+class JobRecorder(_Patcher):
+    """
+    Grava as respostas externas de um job em um bundle de replay
+
+    Uso:
+        with JobRecorder(job_id, seed, options) as recorder:
+            run_pipeline(...)
+        recorder.save(tracer, status)
+    """
+
+    def __init__(self, job_id, seed, options, replay_dir=None):
+        """
+        Args:
+            job_id: Identificador do job (nome da pasta do bundle)
+            seed: Seed da execução
+            options: Argumentos de main() que definem o job
+            replay_dir: Pasta dos bundles (None = REPLAY_DIR)
+        """
+        super().__init__()
+        self.path = os.path.join(replay_dir or REPLAY_DIR, str(job_id))
+        self.lock = threading.Lock()
+        self.bundle = {
+            "version": BUNDLE_VERSION,
+            "job_id": str(job_id),
+            "seed": seed,
+            "options": options,
+            "created_at": time.time(),
+            "listings": {},
+            "duplicates": [],
+            "llm": {},
+            "tts": {},
+            "transcripts": {}
+        }
+
+    def __enter__(self):
+        import reddit_fetch
+        import story_dedup
+        import subtitle_whisper
+        import summarize
+        import tts_generate
+
+        os.makedirs(os.path.join(self.path, "tts"), exist_ok=True)
+        init_reddit = reddit_fetch.init_reddit
+        init_groq = summarize.init_groq
+        self._patch(reddit_fetch, "init_reddit", lambda: _RecordingReddit(init_reddit(), self))
+        self._patch(story_dedup, "filter_duplicates", self.filter_duplicates)
+        self._patch(summarize, "init_groq", lambda: _RecordingGroq(init_groq(), self))
+        self._patch(tts_generate, "generate_voice", self.generate_voice)
+        self._patch(subtitle_whisper, "transcribe_audio_with_whisper", self.transcribe)
+        return self
+
+    def filter_duplicates(self, stories, *args, **kwargs):
+        """Consulta o histórico de verdade e guarda quais posts saíram como repetidos"""
+        import story_dedup
+
+        fresh = self._original(story_dedup, "filter_duplicates")(stories, *args, **kwargs)
+        kept = {story.get("id") for story in fresh}
+        with self.lock:
+            self.bundle["duplicates"] += [story.get("id") for story in stories if story.get("id") not in kept]
+        return fresh
+
+    def generate_voice(self, text, output_path="assets/output/audio.mp3", provider="edge", return_provider=False, **kwargs):
+        """Chama o TTS de verdade e guarda uma cópia do áudio no bundle (com o provider que venceu)"""
+        import tts_generate
+
+        path, winner = self._original(tts_generate, "generate_voice")(text, output_path, provider, return_provider=True, **kwargs)
+        if path and os.path.exists(path):
+            key = text_key(text)
+            name = f"{key}{os.path.splitext(path)[1]}"
+            shutil.copyfile(path, os.path.join(self.path, "tts", name))
+            with self.lock:
+                self.bundle["tts"][key] = {"file": f"tts/{name}", "provider": winner, "options": kwargs}
+        return (path, winner) if return_provider else path
+
+    def transcribe(self, audio_path, model_name="base"):
+        """Chama o Whisper de verdade e guarda as palavras (chave = conteúdo do áudio)"""
+        import subtitle_whisper
+
+        words = self._original(subtitle_whisper, "transcribe_audio_with_whisper")(audio_path, model_name=model_name)
+        if words:
+            with self.lock:
+                self.bundle["transcripts"][file_key(audio_path)] = words
+        return words
+
+    def save(self, tracer=None, status="ok"):
+        """
+        Grava o bundle.json (com as escolhas do trace para conferir o replay)
+
+        Returns:
+            Caminho do bundle (None em caso de falha)
+        """
+        try:
+            from storage import atomic_output
+
+            self.bundle["status"] = status
+            self.bundle["decisions"] = job_decisions(tracer.records) if tracer else {}
+            bundle_path = os.path.join(self.path, BUNDLE_FILE)
+            with atomic_output(bundle_path) as temp_path:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.bundle, f, ensure_ascii=False, indent=1)
+            print(f"🎲 Bundle de replay: {self.path}")
+            return bundle_path
+        except Exception as e:
+            print(f"⚠️ Erro ao gravar o bundle de replay: {e}")
+            return None
+
+def load_bundle(path):
+    """Lê um bundle (pasta ou caminho do bundle.json)"""
+    if os.path.isdir(path):
+        path = os.path.join(path, BUNDLE_FILE)
+    with open(path, encoding="utf-8") as f:
+        bundle = json.load(f)
+    if bundle.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"Versão de bundle não suportada: {bundle.get('version')}")
+    return bundle
+
+class ReplayProviders(_Patcher):
+    """
+    Substitui Reddit, LLM, TTS e Whisper pelas respostas gravadas em um bundle
+
+    Uso:
+        with ReplayProviders(bundle_dir) as replay:
+            main(seed=replay.seed, **replay.options)
+    """
+
+    def __init__(self, bundle_dir, whisper=False):
+        """
+        Args:
+            bundle_dir: Pasta do bundle
+            whisper: Se True, roda o Whisper de novo em vez de usar a transcrição gravada
+        """
+        super().__init__()
+        if bundle_dir.endswith(BUNDLE_FILE):
+            bundle_dir = os.path.dirname(bundle_dir)
+        self.bundle_dir = bundle_dir
+        self.bundle = load_bundle(bundle_dir)
+        self.seed = self.bundle["seed"]
+        self.options = self.bundle["options"]
+        self.whisper = whisper
+
+    def __enter__(self):
+        import reddit_fetch
+        import story_dedup
+        import summarize
+        import tts_generate
+
+        self.reddit = ReplayReddit(self.bundle["listings"])
+        self.groq = FakeGroq(responses=self.bundle["llm"])
+        self._patch(reddit_fetch, "init_reddit", lambda: self.reddit)
+        # O histórico mudou depois da gravação (o próprio job entrou nele): vale o que foi descartado na época
+        self._patch(story_dedup, "filter_duplicates", self.filter_duplicates)
+        self._patch(summarize, "init_groq", lambda: self.groq)
+        self._patch(tts_generate, "generate_voice", self.generate_voice)
+        if not self.whisper:
+            import subtitle_whisper
+            self._patch(subtitle_whisper, "transcribe_audio_with_whisper", self.transcribe)
+        return self
+
+    def filter_duplicates(self, stories, *args, **kwargs):
+        """Descarta os mesmos posts que o histórico descartou na gravação"""
+        duplicates = set(self.bundle.get("duplicates", []))
+        return [story for story in stories if story.get("id") not in duplicates]
+
+    def generate_voice(self, text, output_path="assets/output/audio.mp3", provider="edge", return_provider=False, **kwargs):
+        """Copia o áudio gravado para o roteiro (mesmo texto = mesmo áudio)"""
+        entry = self.bundle["tts"].get(text_key(text))
+        if entry is None:
+            print("❌ Roteiro sem áudio gravado no bundle (o LLM do replay divergiu?)")
+            return (None, None) if return_provider else None
+        source = os.path.join(self.bundle_dir, entry["file"])
+        path = os.path.splitext(output_path)[0] + os.path.splitext(source)[1]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        shutil.copyfile(source, path)
+        print(f"✅ Áudio gerado (replay): {path}")
+        return (path, entry.get("provider")) if return_provider else path
+
+    def transcribe(self, audio_path, model_name="base"):
+        """Transcrição gravada do mesmo áudio"""
+        words = self.bundle["transcripts"].get(file_key(audio_path))
+        if words is None:
+            print("⚠️ Áudio sem transcrição gravada no bundle")
+            return None
+        return [dict(word) for word in words]
+
+def replay_job(bundle_dir, output_dir="assets/output/", whisper=False):
+    """
+    Refaz um job gravado, offline, com a mesma seed, e confere as escolhas
+
+    Args:
+        bundle_dir: Pasta do bundle
+        output_dir: Pasta de saída do replay
+        whisper: Se True, transcreve de novo com o Whisper
+
+    Returns:
+        Tupla (resultado de main(), lista de divergências)
+    """
+    import tracing
+    from main import main
+
+    with ReplayProviders(bundle_dir, whisper=whisper) as replay:
+        print(f"🎲 Replay de {replay.bundle['job_id']} (seed {replay.seed})")
+        result = main(output_dir=output_dir, seed=replay.seed, **replay.options)
+
+    history = tracing.job_history()
+    replayed = job_decisions(history[-1].records) if history else {}
+    differences = compare_decisions(replay.bundle.get("decisions", {}), replayed)
+    if differences:
+        print("⚠️ O replay não fez as mesmas escolhas:")
+        for difference in differences:
+            print(f"   {difference}")
+    else:
+        print("✅ Replay idêntico ao job gravado (mesmas escolhas)")
+    return result, differences
+
+def list_bundles(replay_dir=REPLAY_DIR):
+    """Bundles gravados, mais recentes primeiro"""
+    bundles = []
+    if not os.path.isdir(replay_dir):
+        return bundles
+    for name in sorted(os.listdir(replay_dir), reverse=True):
+        try:
+            bundles.append((os.path.join(replay_dir, name), load_bundle(os.path.join(replay_dir, name))))
+        except (OSError, ValueError):
+            continue
+    return bundles
+
+def main():
+    """CLI dos bundles de replay"""
+    parser = argparse.ArgumentParser(description="Replay determinístico de jobs gravados")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = commands.add_parser("list", help="Lista os bundles gravados")
+    list_cmd.add_argument("--dir", default=REPLAY_DIR, help="Pasta dos bundles")
+
+    run = commands.add_parser("run", help="Refaz um job offline")
+    run.add_argument("bundle", help="Pasta do bundle")
+    run.add_argument("--output", default="assets/output/", help="Pasta de saída do replay")
+    run.add_argument("--whisper", action="store_true", help="Transcreve de novo (mede o Whisper também)")
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        bundles = list_bundles(args.dir)
+        if not bundles:
+            print("📭 Nenhum bundle gravado")
+        for path, bundle in bundles:
+            fetch = (bundle.get("decisions", {}).get("fetch") or [{}])[0]
+            print(f"   {path}  seed={bundle['seed']}  {bundle.get('status', '?')}  "
+                  f"r/{fetch.get('subreddit') or '?'} {fetch.get('post_id') or ''}  {bundle['options']}")
+        return
+
+    result, differences = replay_job(args.bundle, args.output, args.whisper)
+    raise SystemExit(0 if result and not differences else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+📚 Modo série: histórias longas viram Parte 1, Parte 2...
+Roteiro de todas as partes em uma chamada ao LLM, narração e transcrição em
+lote e renderização em paralelo com a mesma seleção de fundos e trilha
+"""
+
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+# Séries aproveitam mais do post original (o vídeo único corta em 4000)
+SERIES_MAX_CHARS = 12000
+
+def part_title(title, index, total):
+    """Título de uma parte: "Título (Parte 2/3)" (série de uma parte fica só com o título)"""
+    return f"{title} (Parte {index}/{total})" if total > 1 else title
+
+def synthesize_parts(scripts, output_dir, timestamp, max_workers=3):
+    """
+    Gera a narração de todas as partes em paralelo (TTS é limitado pela rede)
+
+    Args:
+        scripts: Roteiros das partes
+        output_dir: Pasta de saída
+        timestamp: Identificador do job
+        max_workers: Requisições de TTS simultâneas
+
+    Returns:
+        Tupla (caminhos de áudio, providers que geraram cada parte), com None
+        nas partes que falharam
+    """
+    import tts_generate
+
+    def synthesize(index, script):
+        audio_path = os.path.join(output_dir, f"audio_{timestamp}_parte{index + 1}.mp3")
+        return tts_generate.generate_voice(
+            script,
+            output_path=audio_path,
+            provider="edge",
+            voice="adam",
+            rate="+80%",
+            return_provider=True
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(scripts)))) as pool:
+        results = list(pool.map(synthesize, range(len(scripts)), scripts))
+    return [path for path, _ in results], [provider for _, provider in results]
+
+def transcribe_parts(audio_files, model_name="base", scripts=None):
+    """
+    Transcreve todas as partes com o mesmo modelo Whisper carregado
+
+    Args:
+        audio_files: Caminhos dos áudios
+        model_name: Modelo do Whisper
+        scripts: Roteiro de cada parte (legendas com o texto dele, ver text_normalize.align_words)
+
+    Returns:
+        Lista de palavras com timestamps por parte ([] se a transcrição falhar)
+    """
+    import subtitle_whisper
+    from text_normalize import align_words
+
+    results = []
+    for index, audio_path in enumerate(audio_files):
+        segments = subtitle_whisper.transcribe_audio_with_whisper(audio_path, model_name=model_name) or []
+        if scripts and segments:
+            segments = align_words(segments, scripts[index])
+        results.append(segments)
+    return results
+
+def render_parts(audio_files, segments, output_dir, timestamp, videos_count=3, subtitle_style="tiktok", formats=None, background_dir="assets/videos/", music_dir="assets/music/", max_workers=2, crossfade=0.0, title=None, captions="pil"):
+    """
+    Renderiza as partes em paralelo reaproveitando fundos, trilha e caches
+
+    Args:
+        audio_files: Narrações das partes
+        segments: Transcrição de cada parte (de transcribe_parts)
+        output_dir: Pasta de saída
+        timestamp: Identificador do job
+        videos_count: Vídeos de fundo por parte
+        subtitle_style: Estilo das legendas
+        formats: Formatos de saída (None = só o vídeo padrão)
+        background_dir: Diretório com vídeos de fundo
+        music_dir: Biblioteca de músicas
+        max_workers: Partes renderizadas ao mesmo tempo
+        crossfade: Crossfade entre os vídeos de fundo (s)
+        title: Título da série (cada thumbnail recebe "(Parte N/total)")
+        captions: Como as legendas são desenhadas (pil, ass ou sidecar)
+
+    Returns:
+        Lista com o caminho do vídeo de cada parte (None nas que falharam)
+    """
+    import video_generate
+    from audio_mix import pick_music_track
+
+    # Mesma seleção para todas as partes: a série tem cara de série
+    background_paths = video_generate.get_random_backgrounds(background_dir, videos_count)
+    music_path = pick_music_track(music_dir)
+    # Um gerador por parte, sorteado antes das threads: as escolhas não dependem da ordem de execução
+    rngs = [random.Random(random.getrandbits(64)) for _ in audio_files]
+
+    def render(index):
+        video_path = os.path.join(output_dir, f"video_{timestamp}_parte{index + 1}.mp4")
+        options = dict(
+            audio_path=audio_files[index],
+            output_path=video_path,
+            background_dir=background_dir,
+            videos_count=videos_count,
+            add_subtitles=True,
+            subtitle_style=subtitle_style,
+            music_dir=music_dir,
+            background_paths=background_paths,
+            music_path=music_path,
+            segments=segments[index],
+            crossfade=crossfade,
+            title=part_title(title, index + 1, len(audio_files)) if title else None,
+            rng=rngs[index],
+            captions=captions
+        )
+        if formats:
+            outputs = video_generate.create_video_formats(formats=formats, **options)
+            return next(iter(outputs.values())) if outputs else None
+        return video_generate.create_video(**options)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(audio_files)))) as pool:
+        return list(pool.map(render, range(len(audio_files))))
+
+def run_series(timestamp, videos_count=3, subtitle_style="tiktok", output_dir="assets/output/", max_parts=3, formats=None, render_workers=2, crossfade=0.0, job=None, captions="pil"):
+    """
+    Pipeline da série: Reddit → roteiros das partes → metadados → narrações → vídeos
+
+    Args:
+        timestamp: Identificador do job
+        videos_count: Vídeos de fundo por parte
+        subtitle_style: Estilo das legendas
+        output_dir: Pasta de saída
+        max_parts: Máximo de partes (histórias curtas continuam com 1)
+        formats: Formatos de saída de cada parte
+        render_workers: Partes renderizadas ao mesmo tempo
+        crossfade: Crossfade entre os vídeos de fundo (s)
+        job: Dict preenchido com história, metadados e voz (para o catálogo)
+        captions: Como as legendas são desenhadas (pil, ass ou sidecar)
+
+    Returns:
+        Dict com vídeo da parte 1, título, hashtags e lista de partes (None em caso de falha)
+    """
+    from tracing import stage
+    from catalog import catalog_path
+    from reddit_fetch import get_story_from_multiple_subs
+    from subtitle_ass import sidecar_path
+    from summarize import plan_series_parts, summarize_series, generate_title_and_hashtags
+
+    print("=" * 60)
+    print("📚 REDDIT SHORTS BOT - MODO SÉRIE")
+    print("=" * 60)
+
+    print("\n📖 [1/5] Buscando história no Reddit...")
+    with stage("fetch") as span:
+        story = get_story_from_multiple_subs(max_chars=SERIES_MAX_CHARS, db_path=catalog_path(output_dir))
+        if story:
+            span.attrs.update(subreddit=story["subreddit"], post_id=story.get("id"))
+
+    job = job if job is not None else {}
+    job["story"] = story
+
+    if not story:
+        print("❌ Falha ao buscar história. Encerrando.")
+        return
+
+    parts = plan_series_parts(story["text"], max_parts=max_parts)
+    print(f"✅ História encontrada: r/{story['subreddit']} ({len(story['text'].split())} palavras → {parts} parte(s))")
+
+    print(f"\n✍️ [2/5] Adaptando texto em {parts} parte(s)...")
+    with stage("summarize", parts=parts):
+        scripts = summarize_series(story["title"], story["text"], parts=parts, max_duration=60)
+
+    if not scripts:
+        print("❌ Falha ao adaptar texto. Encerrando.")
+        return
+
+    for index, script in enumerate(scripts, 1):
+        print(f"   Parte {index}: {len(script.split())} palavras")
+
+    print("\n🏷️ [3/5] Gerando título e hashtags...")
+    with stage("metadata"):
+        metadata = generate_title_and_hashtags(" ".join(scripts))
+    job["metadata"] = metadata
+
+    print(f"\n🎙️ [4/5] Gerando narração e legendas das {len(scripts)} partes...")
+    with stage("tts", provider="edge", parts=len(scripts)) as span:
+        audio_files, providers = synthesize_parts(scripts, output_dir, timestamp)
+        for audio_file in audio_files:
+            span.record_output(audio_file)
+        # Cada parte pode ter saído de um provider (failover/hedge): ficam os distintos, na ordem
+        provider = ",".join(dict.fromkeys(name for name in providers if name)) or "edge"
+        span.attrs.update(provider=provider, part_providers=providers)
+    job["voice"] = {"provider": provider, "voice": "adam"}
+
+    if not all(audio_files):
+        print("❌ Falha ao gerar áudio de alguma parte. Encerrando.")
+        return
+
+    with stage("transcribe", model="base", parts=len(audio_files)):
+        segments = transcribe_parts(audio_files, scripts=scripts)
+
+    print(f"\n🎬 [5/5] Renderizando {len(audio_files)} partes em paralelo...")
+    with stage("render", parts=len(audio_files)):
+        videos = render_parts(
+            audio_files, segments, output_dir, timestamp,
+            videos_count=videos_count,
+            subtitle_style=subtitle_style,
+            formats=formats,
+            max_workers=render_workers,
+            crossfade=crossfade,
+            title=metadata['title'],
+            captions=captions
+        )
+
+    if not all(videos):
+        print("❌ Falha ao gerar o vídeo de alguma parte. Encerrando.")
+        return
+
+    total = len(videos)
+    series = [{
+        "part": index,
+        "video": video,
+        "title": part_title(metadata['title'], index, total)
+    } for index, video in enumerate(videos, 1)]
+
+    print("\n" + "=" * 60)
+    print(f"🎉 SÉRIE GERADA COM SUCESSO! ({total} partes)")
+    print("=" * 60)
+    for item in series:
+        print(f"   📁 {item['title']}: {item['video']}")
+    print(f"🏷️ Hashtags: #{' #'.join(metadata['hashtags'][:8])}")
+
+    result = {
+        "video": videos[0],
+        "title": series[0]["title"],
+        "hashtags": metadata['hashtags'],
+        "parts": series
+    }
+    subtitles = [sidecar_path(video) for video in videos if os.path.exists(sidecar_path(video))]
+    if subtitles:
+        result["subtitles"] = subtitles
+    return result
@@ -0,0 +1,405 @@
+"""
+🗄️ Ciclo de vida dos arquivos de saída (assets/output/)
+Classifica o que o pipeline grava e aplica a retenção por camada:
+intermediários (narração, áudio temporário) somem quando o job dá certo,
+finais ficam N dias e depois vão para o arquivo (versão compacta 540x960),
+e o arquivo expira depois de M dias. Antes de cada job um orçamento de disco
+é aplicado, do que é mais barato perder para o mais caro
+
+Todo arquivo de saída é gravado como <nome>.partial.<ext> e renomeado no fim
+(atomic_output), então nenhum processo pega um arquivo pela metade
+
+Uso:
+    python storage.py status                 # Uso por camada e espaço livre
+    python storage.py clean --dry-run        # Mostra o que seria feito
+    python storage.py clean --budget-gb 10   # Aplica retenção + orçamento
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+
+OUTPUT_DIR = "assets/output/"
+ARCHIVE_SUBDIR = "archive"
+TRACE_SUBDIR = "traces"
+
+# Retenção por camada (dias) e orçamento de disco (assets/output inteiro)
+RETENTION = {
+    "intermediate_days": 2,   # Narração/áudio de jobs que falharam (debug)
+    "final_days": 14,         # Vídeos, thumbnails e prévias em qualidade cheia
+    "archive_days": 90,       # Versão compacta no arquivo
+    "trace_days": 30          # JSON lines / Chrome traces
+}
+BUDGET_GB = float(os.getenv("STORAGE_BUDGET_GB", "20"))
+MIN_FREE_GB = float(os.getenv("STORAGE_MIN_FREE_GB", "2"))
+
+# Arquivos .partial mais novos que isso podem ser de um worker em andamento
+STALE_PARTIAL_S = 3600
+
+# Versão compacta do arquivo (~1/4 do tamanho de um Shorts 1080x1920)
+ARCHIVE_SIZE = (540, 960)
+ARCHIVE_CRF = 30
+ARCHIVE_RATIO = 0.25
+
+_PATTERNS = [
+    ("partial", re.compile(r"\.partial[._]|TEMP_MPY_")),
+    ("preview", re.compile(r"^video_.+_preview\.mp4$")),
+    ("thumbnail", re.compile(r"^video_.+_thumb\.jpg$")),
+    ("captions", re.compile(r"^video_.+\.ass$")),
+    ("final", re.compile(r"^video_.+\.mp4$")),
+    ("intermediate", re.compile(r"^audio_.+\.(mp3|wav)$|_audio\.m4a$"))
+]
+
+def partial_path(path):
+    """video_1.mp4 -> video_1.partial.mp4 (mesma extensão: o ffmpeg escolhe o formato por ela)"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.partial{ext}"
+
+def commit_output(temp_path, path):
+    """Publica o arquivo temporário com o nome final (rename atômico no mesmo diretório)"""
+    os.replace(temp_path, path)
+    return path
+
+def discard_output(temp_path):
+    """Remove um temporário que não chegou ao fim (se existir)"""
+    if temp_path and os.path.exists(temp_path):
+        os.remove(temp_path)
+
+@contextmanager
+def atomic_output(path):
+    """
+    Grava em <nome>.partial.<ext> e renomeia para o nome final só se o bloco terminar sem erro
+
+    Uso:
+        with atomic_output("video.mp4") as temp_path:
+            clip.write_videofile(temp_path)
+    """
+    temp_path = partial_path(path)
+    try:
+        yield temp_path
+    except BaseException:
+        discard_output(temp_path)
+        raise
+    if os.path.exists(temp_path):
+        commit_output(temp_path, path)
+
+def classify(name):
+    """
+    Camada de um arquivo de assets/output pelo nome
+
+    Returns:
+        "partial", "preview", "thumbnail", "captions", "final", "intermediate" ou None
+        (bancos, LEIA-ME, PNGs de teste e outros arquivos nunca são tocados)
+    """
+    for kind, pattern in _PATTERNS:
+        if pattern.search(name):
+            return kind
+    return None
+
+def scan(output_dir=OUTPUT_DIR):
+    """
+    Lista os artefatos conhecidos de assets/output (raiz, traces/ e archive/)
+
+    Returns:
+        Lista de dicts com path, kind, size e mtime
+    """
+    artifacts = []
+
+    def add(path, kind):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return  # Removido por outro processo no meio da varredura
+        artifacts.append({"path": path, "kind": kind, "size": stat.st_size, "mtime": stat.st_mtime})
+
+    if os.path.isdir(output_dir):
+        for entry in os.scandir(output_dir):
+            if entry.is_file():
+                kind = classify(entry.name)
+                if kind:
+                    add(entry.path, kind)
+
+    trace_dir = os.path.join(output_dir, TRACE_SUBDIR)
+    if os.path.isdir(trace_dir):
+        for entry in os.scandir(trace_dir):
+            if entry.is_file() and entry.name.startswith("trace_"):
+                add(entry.path, "trace")
+
+    archive_dir = os.path.join(output_dir, ARCHIVE_SUBDIR)
+    for root, _, files in os.walk(archive_dir):
+        for name in files:
+            add(os.path.join(root, name), "partial" if classify(name) == "partial" else "archive")
+
+    return artifacts
+
+def plan_retention(artifacts, now=None, policy=None):
+    """
+    Ações da retenção por idade (sem tocar em nada)
+
+    Args:
+        artifacts: Saída de scan()
+        now: Timestamp de referência (padrão: agora)
+        policy: Dias por camada (padrão: RETENTION)
+
+    Returns:
+        Lista de tuplas (ação, artefato); ação é "delete" ou "archive"
+    """
+    now = time.time() if now is None else now
+    policy = {**RETENTION, **(policy or {})}
+    day = 86400
+    limits = {
+        "partial": STALE_PARTIAL_S,
+        "intermediate": policy["intermediate_days"] * day,
+        "trace": policy["trace_days"] * day,
+        "archive": policy["archive_days"] * day,
+        "final": policy["final_days"] * day,
+        "thumbnail": policy["final_days"] * day,
+        "captions": policy["final_days"] * day,
+        "preview": policy["final_days"] * day
+    }
+
+    actions = []
+    for artifact in artifacts:
+        if now - artifact["mtime"] < limits[artifact["kind"]]:
+            continue
+        # Finais, thumbnails e legendas vão para o arquivo; a prévia sai da versão arquivada se precisar
+        action = "archive" if artifact["kind"] in ("final", "thumbnail", "captions") else "delete"
+        actions.append((action, artifact))
+    return actions
+
+def plan_budget(artifacts, planned=(), budget_bytes=None, free_bytes=None, min_free_bytes=0):
+    """
+    Ações extras para caber no orçamento de disco (depois da retenção por idade)
+
+    Libera do mais barato para o mais caro: temporários, intermediários,
+    traces, prévias; depois arquiva os finais mais antigos; por último apaga
+    o arquivo mais antigo. Vídeos finais nunca são apagados sem arquivar
+
+    Args:
+        artifacts: Saída de scan()
+        planned: Ações já planejadas (não são repetidas; contam no espaço liberado)
+        budget_bytes: Tamanho máximo de assets/output (None = sem limite)
+        free_bytes: Espaço livre atual no disco (None = ignora)
+        min_free_bytes: Espaço livre mínimo exigido
+
+    Returns:
+        Lista de tuplas (ação, artefato)
+    """
+    def saved(action, artifact):
+        if action == "delete":
+            return artifact["size"]
+        return artifact["size"] * (1 - ARCHIVE_RATIO) if artifact["kind"] == "final" else 0
+
+    used = sum(artifact["size"] for artifact in artifacts)
+    freed = sum(saved(action, artifact) for action, artifact in planned)
+    touched = {artifact["path"] for _, artifact in planned}
+
+    def excess():
+        over_budget = used - freed - budget_bytes if budget_bytes is not None else 0
+        short_free = min_free_bytes - (free_bytes + freed) if free_bytes is not None else 0
+        return max(over_budget, short_free, 0)
+
+    order = [
+        ("delete", ("partial", "intermediate", "trace", "preview")),
+        ("archive", ("final", "thumbnail", "captions")),
+        ("delete", ("archive",))
+    ]
+    actions = []
+    for action, kinds in order:
+        candidates = sorted(
+            (artifact for artifact in artifacts if artifact["kind"] in kinds and artifact["path"] not in touched),
+            key=lambda artifact: artifact["mtime"]
+        )
+        for artifact in candidates:
+            if excess() <= 0:
+                return actions
+            if artifact["kind"] == "partial" and time.time() - artifact["mtime"] < STALE_PARTIAL_S:
+                continue  # Pode ser um encode em andamento
+            actions.append((action, artifact))
+            touched.add(artifact["path"])
+            freed += saved(action, artifact)
+    return actions
+
+def archive_path(path, output_dir=OUTPUT_DIR, mtime=None):
+    """assets/output/video_1.mp4 -> assets/output/archive/AAAA-MM/video_1.mp4"""
+    month = time.strftime("%Y-%m", time.localtime(mtime if mtime is not None else os.path.getmtime(path)))
+    return os.path.join(output_dir, ARCHIVE_SUBDIR, month, os.path.basename(path))
+
+def compact_video(src, dst, size=ARCHIVE_SIZE, crf=ARCHIVE_CRF):
+    """
+    Reencoda um vídeo final na versão compacta do arquivo (gravação atômica)
+
+    Args:
+        src: Vídeo original
+        dst: Caminho no arquivo
+        size: Resolução do arquivo
+        crf: Qualidade do x264 (maior = menor)
+
+    Returns:
+        Caminho gerado
+    """
+    from imageio_ffmpeg import get_ffmpeg_exe
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    with atomic_output(dst) as temp_path:
+        subprocess.run(
+            [get_ffmpeg_exe(), "-y", "-loglevel", "error", "-i", src,
+             "-vf", f"scale={size[0]}:{size[1]}:force_original_aspect_ratio=decrease:flags=area",
+             "-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf),
+             "-c:a", "aac", "-b:a", "64k", "-movflags", "+faststart", temp_path],
+            check=True, capture_output=True
+        )
+    return dst
+
+def apply_actions(actions, output_dir=OUTPUT_DIR, dry_run=False):
+    """
+    Executa as ações planejadas e atualiza os caminhos no catálogo
+
+    Um arquivamento que falha mantém o original (nada é apagado sem cópia)
+
+    Args:
+        actions: Lista de (ação, artefato)
+        output_dir: Pasta de saída (base do arquivo)
+        dry_run: Se True, só imprime
+
+    Returns:
+        Bytes liberados
+    """
+    from catalog import relocate_output
+
+    freed = 0
+    for action, artifact in actions:
+        path = artifact["path"]
+        if dry_run:
+            print(f"   🔎 {action}: {path} ({artifact['size'] / 1e6:.1f} MB)")
+            continue
+        try:
+            if action == "delete":
+                os.remove(path)
+                freed += artifact["size"]
+                if artifact["kind"] in ("archive", "preview"):
+                    relocate_output(path, None)
+            else:
+                target = archive_path(path, output_dir, artifact["mtime"])
+                if artifact["kind"] == "final":
+                    compact_video(path, target)
+                    os.remove(path)
+                else:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.move(path, target)
+                freed += artifact["size"] - os.path.getsize(target)
+                relocate_output(path, target)
+        except FileNotFoundError:
+            continue  # Já removido por outro worker
+        except Exception as e:
+            print(f"⚠️ Não foi possível {'apagar' if action == 'delete' else 'arquivar'} {path}: {e}")
+    return freed
+
+def disk_free(path=OUTPUT_DIR):
+    """Espaço livre (bytes) no disco de path"""
+    return shutil.disk_usage(path if os.path.exists(path) else ".").free
+
+def prepare_space(output_dir=OUTPUT_DIR, budget_gb=BUDGET_GB, min_free_gb=MIN_FREE_GB, policy=None, dry_run=False):
+    """
+    Retenção por idade + orçamento de disco (chamado antes de cada job)
+
+    Args:
+        output_dir: Pasta de saída
+        budget_gb: Tamanho máximo de assets/output (None = sem limite)
+        min_free_gb: Espaço livre mínimo no disco
+        policy: Dias por camada (padrão: RETENTION)
+        dry_run: Se True, só mostra o que seria feito
+
+    Returns:
+        Bytes liberados (None em caso de falha)
+    """
+    try:
+        artifacts = scan(output_dir)
+        actions = plan_retention(artifacts, policy=policy)
+        actions += plan_budget(
+            artifacts, actions,
+            budget_bytes=budget_gb * 1e9 if budget_gb is not None else None,
+            free_bytes=disk_free(output_dir),
+            min_free_bytes=min_free_gb * 1e9
+        )
+        if not actions:
+            return 0
+
+        print(f"🗄️ Armazenamento: {len(actions)} ação(ões) de retenção em {output_dir}")
+        freed = apply_actions(actions, output_dir, dry_run)
+        if not dry_run:
+            print(f"   ✅ {freed / 1e6:.1f} MB liberados")
+        return freed
+    except Exception as e:
+        print(f"⚠️ Erro na limpeza de {output_dir}: {e}")
+        return None
+
+def purge_job_intermediates(job_id, output_dir=OUTPUT_DIR):
+    """
+    Remove narrações e temporários de um job que terminou com sucesso
+
+    Args:
+        job_id: Identificador do job (timestamp dos nomes dos arquivos)
+        output_dir: Pasta de saída
+
+    Returns:
+        Lista de arquivos removidos
+    """
+    removed = []
+    if not os.path.isdir(output_dir):
+        return removed
+    for entry in os.scandir(output_dir):
+        if entry.is_file() and job_id in entry.name and classify(entry.name) in ("intermediate", "partial"):
+            try:
+                os.remove(entry.path)
+                removed.append(entry.path)
+            except OSError:
+                pass
+    return removed
+
+def usage_summary(artifacts):
+    """Bytes e quantidade de arquivos por camada"""
+    summary = {}
+    for artifact in artifacts:
+        entry = summary.setdefault(artifact["kind"], {"files": 0, "bytes": 0})
+        entry["files"] += 1
+        entry["bytes"] += artifact["size"]
+    return summary
+
+def main():
+    """CLI do ciclo de vida dos arquivos"""
+    parser = argparse.ArgumentParser(description="Retenção e orçamento de disco de assets/output")
+    parser.add_argument("--dir", default=OUTPUT_DIR, help="Pasta de saída")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("status", help="Uso por camada e espaço livre")
+
+    clean = commands.add_parser("clean", help="Aplica retenção e orçamento de disco")
+    clean.add_argument("--dry-run", action="store_true", help="Só mostra o que seria feito")
+    clean.add_argument("--budget-gb", type=float, default=BUDGET_GB, help="Tamanho máximo da pasta de saída")
+    clean.add_argument("--min-free-gb", type=float, default=MIN_FREE_GB, help="Espaço livre mínimo no disco")
+    clean.add_argument("--final-days", type=int, default=RETENTION["final_days"], help="Dias até arquivar os finais")
+    clean.add_argument("--archive-days", type=int, default=RETENTION["archive_days"], help="Dias até apagar o arquivo")
+
+    args = parser.parse_args()
+
+    if args.command == "status":
+        summary = usage_summary(scan(args.dir))
+        total = sum(entry["bytes"] for entry in summary.values())
+        print(f"🗄️ {args.dir}: {total / 1e9:.2f} GB de {BUDGET_GB:.0f} GB ({disk_free(args.dir) / 1e9:.1f} GB livres no disco)")
+        for kind in ("final", "thumbnail", "captions", "preview", "intermediate", "partial", "trace", "archive"):
+            entry = summary.get(kind, {"files": 0, "bytes": 0})
+            print(f"   {kind:<13} {entry['files']:>6} arquivo(s) {entry['bytes'] / 1e6:>10.1f} MB")
+        return
+
+    policy = {"final_days": args.final_days, "archive_days": args.archive_days}
+    freed = prepare_space(args.dir, args.budget_gb, args.min_free_gb, policy, args.dry_run)
+    if freed == 0:
+        print("✅ Nada a fazer")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+🪞 Detecção de histórias quase repetidas (MinHash + LSH no catálogo SQLite)
+Reposts e cross-posts do Reddit chegam com outro id e outro título, mas quase
+o mesmo texto. Cada história publicada vira uma assinatura MinHash (64
+valores sobre trechos de 4 palavras do texto); a assinatura é cortada em 16
+bandas e cada banda vira um balde indexado no SQLite. Um candidato só é
+comparado com as histórias que caem em algum balde igual ao dele - a busca
+custa 2 consultas indexadas, com qualquer tamanho de histórico
+
+Uso:
+    python story_dedup.py rebuild                  # Reindexa os posts publicados do catálogo
+    python story_dedup.py check abc123             # Histórias parecidas com um post do catálogo
+    python story_dedup.py stats                    # Tamanho do índice
+    python story_dedup.py bench --stories 200000   # Tempo de busca num índice sintético
+"""
+
+import argparse
+import os
+import re
+import time
+import zlib
+from hashlib import blake2b
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Jaccard estimado a partir do qual o candidato é descartado como repetido.
+# Com 16 bandas de 4 valores, pares com Jaccard 0.7 caem no mesmo balde em 99% dos casos
+DUPLICATE_THRESHOLD = 0.7
+
+SHINGLE_WORDS = 4
+# Só o começo do texto entra nas assinaturas (candidatos e catálogo recebem o selftext inteiro):
+# o mesmo corte dos dois lados mantém a comparação justa e limita o custo em posts enormes
+SHINGLE_CHARS = 4000
+
+# Permutações fixas: assinaturas gravadas continuam comparáveis entre execuções
+HASH_SEED = 20261019
+MERSENNE_PRIME = (1 << 61) - 1
+
+WORD = re.compile(r"\w+")
+
+_permutations = None
+
+def _get_permutations():
+    """Coeficientes (a, b) das NUM_PERM funções de hash (a*x + b mod p)"""
+    global _permutations
+    if _permutations is None:
+        import numpy as np
+        rng = np.random.default_rng(HASH_SEED)
+        # a, x < 2^32: o produto cabe em uint64 sem estourar
+        a = rng.integers(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+        b = rng.integers(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+        _permutations = (a, b)
+    return _permutations
+
+def shingles(text):
+    """
+    Trechos de SHINGLE_WORDS palavras do texto normalizado (minúsculas, sem pontuação)
+
+    Returns:
+        Conjunto de hashes crc32 dos trechos
+    """
+    words = WORD.findall(text[:SHINGLE_CHARS].lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {zlib.crc32(" ".join(words).encode())} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode()) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def minhash(text):
+    """
+    Assinatura MinHash do texto
+
+    Returns:
+        Array uint32 com NUM_PERM valores (None para texto sem palavras)
+    """
+    import numpy as np
+
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    a, b = _get_permutations()
+    x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    values = ((a[:, None] * x[None, :]) % MERSENNE_PRIME + b[:, None]) % MERSENNE_PRIME
+    return (values.min(axis=1) & 0xFFFFFFFF).astype(np.uint32)
+
+def band_keys(signature):
+    """Chave de cada banda (inclui o número da banda: bandas diferentes nunca colidem)"""
+    raw = signature.astype("<u4").tobytes()
+    size = ROWS * 4
+    return [
+        int.from_bytes(blake2b(bytes([band]) + raw[band * size:(band + 1) * size], digest_size=8).digest(), "little", signed=True)
+        for band in range(BANDS)
+    ]
+
+def similarity(first, second):
+    """Jaccard estimado: fração de valores iguais entre duas assinaturas"""
+    return float((first == second).mean())
+
+def add_signature(conn, post_id, signature):
+    """
+    Grava a assinatura e os baldes de uma história (substitui se já existir)
+
+    Não abre transação: quem chama decide (record_job grava junto com o job)
+    """
+    conn.execute("DELETE FROM story_buckets WHERE post_id = ?", (post_id,))
+    conn.execute(
+        "INSERT OR REPLACE INTO story_signatures (post_id, signature, added_at) VALUES (?, ?, ?)",
+        (post_id, signature.astype("<u4").tobytes(), time.time())
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO story_buckets (bucket, post_id) VALUES (?, ?)",
+        [(key, post_id) for key in band_keys(signature)]
+    )
+
+def add_story(conn, post_id, text):
+    """
+    Indexa uma história publicada
+
+    Returns:
+        True se indexou (False para texto vazio)
+    """
+    signature = minhash(text or "")
+    if signature is None:
+        return False
+    add_signature(conn, post_id, signature)
+    return True
+
+def find_similar(conn, signature, threshold=DUPLICATE_THRESHOLD, exclude_id=None):
+    """
+    Histórias do índice parecidas com a assinatura
+
+    Args:
+        conn: Conexão do catálogo
+        signature: Assinatura MinHash do candidato
+        threshold: Jaccard estimado mínimo
+        exclude_id: Post a ignorar (o próprio candidato)
+
+    Returns:
+        Lista de (post_id, similaridade), da mais parecida para a menos
+    """
+    import numpy as np
+
+    keys = band_keys(signature)
+    rows = conn.execute(
+        f"""
+        SELECT s.post_id, s.signature FROM story_signatures s
+        WHERE s.post_id IN (SELECT post_id FROM story_buckets WHERE bucket IN ({', '.join('?' * len(keys))}))
+        """,
+        keys
+    ).fetchall()
+
+    matches = []
+    for row in rows:
+        if row["post_id"] == exclude_id:
+            continue
+        score = similarity(signature, np.frombuffer(row["signature"], dtype="<u4"))
+        if score >= threshold:
+            matches.append((row["post_id"], score))
+    matches.sort(key=lambda item: -item[1])
+    return matches
+
+def find_duplicate(conn, story, threshold=DUPLICATE_THRESHOLD):
+    """
+    Motivo para descartar a história como repetida (None = inédita)
+
+    Args:
+        conn: Conexão do catálogo
+        story: Dict com "id" e "text"
+        threshold: Jaccard estimado mínimo para considerar repetida
+
+    Returns:
+        Tupla (post_id já publicado, similaridade) ou None
+    """
+    post_id = story.get("id")
+    if post_id and conn.execute(
+        "SELECT 1 FROM story_signatures WHERE post_id = ? UNION ALL SELECT 1 FROM videos WHERE post_id = ? AND status = 'ok' LIMIT 1",
+        (post_id, post_id)
+    ).fetchone():
+        return post_id, 1.0
+
+    signature = minhash(story.get("text") or "")
+    if signature is None:
+        return None
+    matches = find_similar(conn, signature, threshold, exclude_id=post_id)
+    return matches[0] if matches else None
+
+def filter_duplicates(stories, db_path=None, threshold=DUPLICATE_THRESHOLD):
+    """
+    Remove da lista as histórias já publicadas (mesmo post ou texto quase igual)
+
+    Sem catálogo ainda não há histórico: a lista volta inteira. Falhas no
+    índice nunca impedem a busca: o erro é impresso e a lista volta inteira
+
+    Args:
+        stories: Dicts de história (get_story)
+        db_path: Caminho do catálogo (None = CATALOG_PATH)
+        threshold: Jaccard estimado mínimo para considerar repetida
+
+    Returns:
+        Lista de histórias inéditas, na mesma ordem
+    """
+    import catalog
+
+    db_path = db_path or catalog.CATALOG_PATH
+    if not os.path.exists(db_path):
+        return stories
+    try:
+        conn = catalog.connect(db_path)
+        try:
+            fresh = []
+            for story in stories:
+                duplicate = find_duplicate(conn, story, threshold)
+                if duplicate:
+                    print(f"   🪞 {story.get('id')}: repetida de {duplicate[0]} ({duplicate[1]:.0%})")
+                else:
+                    fresh.append(story)
+            return fresh
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ Erro no índice de repetidas: {e}")
+        return stories
+
+def rebuild(conn):
+    """
+    Reindexa todos os posts de jobs concluídos do catálogo
+
+    Returns:
+        Quantidade de histórias indexadas
+    """
+    rows = conn.execute(
+        "SELECT p.post_id, p.body FROM posts p JOIN videos v ON v.job_id = p.job_id WHERE v.status = 'ok'"
+    ).fetchall()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM story_buckets")
+        conn.execute("DELETE FROM story_signatures")
+        indexed = sum(1 for row in rows if add_story(conn, row["post_id"], row["body"]))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return indexed
+
+def bench(stories=200000, lookups=200, db_path=None):
+    """
+    Mede a busca num índice sintético (assinaturas aleatórias + algumas quase repetidas)
+
+    Returns:
+        Dict com mediana e p99 da busca em ms e tamanho do banco
+    """
+    import tempfile
+
+    import numpy as np
+
+    import catalog
+
+    directory = None
+    if db_path is None:
+        directory = tempfile.mkdtemp(prefix="story_dedup_")
+        db_path = os.path.join(directory, "bench.db")
+    conn = catalog.connect(db_path)
+    rng = np.random.default_rng(0)
+    signatures = rng.integers(0, 1 << 32, size=(stories, NUM_PERM), dtype=np.uint32)
+
+    print(f"🧱 Indexando {stories} assinaturas sintéticas...")
+    conn.execute("BEGIN")
+    for i, signature in enumerate(signatures):
+        add_signature(conn, f"s{i}", signature)
+    conn.execute("COMMIT")
+
+    # Metade das buscas é de quase repetidas (80% dos valores iguais), metade inéditas
+    timings = []
+    hits = 0
+    for i in range(lookups):
+        query = signatures[rng.integers(stories)].copy()
+        if i % 2:
+            query = rng.integers(0, 1 << 32, size=NUM_PERM, dtype=np.uint32)
+        else:
+            changed = rng.choice(NUM_PERM, size=NUM_PERM // 5, replace=False)
+            query[changed] = rng.integers(0, 1 << 32, size=len(changed), dtype=np.uint32)
+        start = time.perf_counter()
+        hits += bool(find_similar(conn, query))
+        timings.append((time.perf_counter() - start) * 1000)
+    conn.close()
+
+    timings.sort()
+    result = {
+        "stories": stories,
+        "median_ms": round(timings[len(timings) // 2], 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 3),
+        "hits": hits,
+        "db_mb": round(os.path.getsize(db_path) / 1e6, 1)
+    }
+    if directory:
+        import shutil
+        shutil.rmtree(directory, ignore_errors=True)
+    return result
+
+def main():
+    """CLI do índice de histórias repetidas"""
+    import catalog
+
+    parser = argparse.ArgumentParser(description="Índice de histórias quase repetidas")
+    parser.add_argument("--db", default=catalog.CATALOG_PATH, help="Caminho do catálogo SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Reindexa os posts publicados do catálogo")
+    check = commands.add_parser("check", help="Histórias parecidas com um post do catálogo")
+    check.add_argument("post_id")
+    check.add_argument("--threshold", type=float, default=0.3, help="Jaccard estimado mínimo")
+    commands.add_parser("stats", help="Tamanho do índice")
+    bench_cmd = commands.add_parser("bench", help="Tempo de busca num índice sintético")
+    bench_cmd.add_argument("--stories", type=int, default=200000)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        result = bench(args.stories)
+        print(f"⏱️ {result['stories']} histórias ({result['db_mb']} MB): busca mediana {result['median_ms']} ms, "
+              f"p99 {result['p99_ms']} ms, {result['hits']} repetidas encontradas")
+        return
+
+    conn = catalog.connect(args.db)
+    try:
+        if args.command == "rebuild":
+            print(f"✅ {rebuild(conn)} histórias indexadas")
+
+        elif args.command == "check":
+            row = conn.execute("SELECT body FROM posts WHERE post_id = ? LIMIT 1", (args.post_id,)).fetchone()
+            if not row:
+                print(f"❌ Post {args.post_id} não encontrado no catálogo")
+                return
+            signature = minhash(row["body"] or "")
+            matches = find_similar(conn, signature, args.threshold, exclude_id=args.post_id) if signature is not None else []
+            if not matches:
+                print("📭 Nenhuma história parecida")
+            for post_id, score in matches:
+                print(f"   {post_id:<12} {score:.0%}")
+
+        else:
+            stories = conn.execute("SELECT COUNT(*) FROM story_signatures").fetchone()[0]
+            buckets = conn.execute("SELECT COUNT(*) FROM story_buckets").fetchone()[0]
+            print(f"📊 {stories} histórias indexadas, {buckets} baldes ({BANDS} bandas x {ROWS} valores)")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+🧮 Pré-triagem das histórias do Reddit (antes de gastar LLM, TTS e render)
+Regras eliminam o que nunca vira vídeo (corpo removido, post de update/meta,
+idioma não suportado, texto curto demais); o resto recebe uma nota de um
+modelo logístico pequeno sobre tamanho, marcas de narrativa, palavras do
+título e velocidade de votos/comentários. Os pesos iniciais são escolhidos à
+mão e podem ser treinados com as decisões keep/discard do catálogo
+
+Uso:
+    python catalog.py review 20261019_101500 discard   # Marca um vídeo descartado
+    python story_score.py train                         # Treina com as revisões do catálogo
+    python story_score.py show                          # Pesos mais fortes do modelo atual
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+
+MODEL_PATH = "assets/output/story_model.json"
+
+# Candidatos que seguem para o sorteio (os de nota mais alta)
+TOP_K = 3
+
+MIN_WORDS = 80
+LONG_WORDS = 900
+
+REMOVED_BODIES = ("[removed]", "[deleted]", "[removido]", "[excluído]")
+META_TITLE = re.compile(r"\b(update|atualiza[çc][ãa]o|meta|mod ?post|announcement|megathread|psa|rules?)\b", re.IGNORECASE)
+TITLE_MARKERS = re.compile(r"\b(aita|wibta|tifu|aitah)\b", re.IGNORECASE)
+NARRATIVE_MARKERS = re.compile(
+    r"\b(yesterday|today|tonight|last (?:week|month|year|night)|years? ago|when i|so i|then|after that|finally|suddenly|"
+    r"ontem|hoje|semana passada|anos? atr[áa]s|quando eu|ent[ãa]o|depois disso|finalmente|de repente)\b",
+    re.IGNORECASE
+)
+FIRST_PERSON = re.compile(r"\b(i|me|my|mine|i'm|i've|i'd|eu|meu|minha|mim|comigo)\b", re.IGNORECASE)
+TOKEN = re.compile(r"[a-zà-ú']+", re.IGNORECASE)
+
+# Palavras mais comuns de cada idioma suportado (o LLM adapta de inglês ou português)
+STOPWORDS = {
+    "en": {"the", "and", "to", "a", "i", "of", "my", "in", "it", "that", "was", "he", "she", "for", "is", "on", "with", "me", "but", "her", "his", "this", "at", "so", "be", "they", "had", "not", "have", "you"},
+    "pt": {"o", "a", "e", "de", "que", "do", "da", "em", "um", "uma", "eu", "meu", "minha", "com", "não", "para", "pra", "ele", "ela", "mas", "se", "os", "as", "no", "na", "por", "foi", "ele", "isso", "você"}
+}
+MIN_STOPWORD_RATIO = 0.15
+
+# Pesos iniciais (antes de qualquer treino): o que costuma virar um bom Short
+DEFAULT_WEIGHTS = {
+    "bias": -1.0,
+    "log_words": 1.2,
+    "short": -1.0,
+    "long": -0.4,
+    "narrative": 1.0,
+    "first_person": 1.0,
+    "dialogue": 0.3,
+    "title_marker": 0.5,
+    "title_question": 0.2,
+    "edits": -0.2,
+    "links": -0.6,
+    "velocity": 1.5,
+    "comment_velocity": 0.5
+}
+
+def detect_language(text):
+    """
+    Idioma pelo peso das palavras mais comuns (en, pt ou None)
+
+    Returns:
+        Tupla (idioma, fração das palavras que são stopwords dele)
+    """
+    tokens = [token.lower() for token in TOKEN.findall(text[:2000])]
+    if not tokens:
+        return None, 0.0
+    ratios = {lang: sum(1 for token in tokens if token in words) / len(tokens) for lang, words in STOPWORDS.items()}
+    lang = max(ratios, key=ratios.get)
+    return (lang if ratios[lang] >= MIN_STOPWORD_RATIO else None), ratios[lang]
+
+def hard_reject(story):
+    """
+    Motivo para descartar a história sem nota (None = segue para o modelo)
+
+    Args:
+        story: Dict com "title" e "text" (get_story)
+    """
+    text = (story.get("text") or "").strip()
+    if not text or text.lower().startswith(REMOVED_BODIES):
+        return "corpo removido"
+    if META_TITLE.search(story.get("title") or ""):
+        return "update/meta"
+    if len(text.split()) < MIN_WORDS:
+        return "texto curto"
+    if detect_language(text)[0] is None:
+        return "idioma não suportado"
+    return None
+
+def story_features(story, reference_time=None):
+    """
+    Features da história (numéricas, em torno de 0-1) e palavras do título
+
+    A velocidade usa a idade do post em relação a reference_time; sem ele, ao
+    post mais novo da listagem (mesma nota no replay de um job gravado)
+
+    Args:
+        story: Dict com title, text, score, num_comments e created_utc
+        reference_time: Epoch de referência para a idade do post
+
+    Returns:
+        Dict nome -> valor
+    """
+    title = story.get("title") or ""
+    text = story.get("text") or ""
+    words = len(text.split()) or 1
+    tokens = TOKEN.findall(text)
+
+    created = story.get("created_utc") or 0
+    reference = reference_time if reference_time is not None else created
+    age_hours = max(0.0, (reference - created) / 3600) + 1.0
+
+    features = {
+        "bias": 1.0,
+        "log_words": math.log(words) / math.log(1000),
+        "short": 1.0 if words < 150 else 0.0,
+        "long": 1.0 if words > LONG_WORDS else 0.0,
+        "narrative": min(1.0, len(NARRATIVE_MARKERS.findall(text)) * 100 / words / 3),
+        "first_person": min(1.0, len(FIRST_PERSON.findall(text)) / max(1, len(tokens)) * 10),
+        "dialogue": 1.0 if re.search(r"[\"“].{3,}?[\"”]", text) else 0.0,
+        "title_marker": 1.0 if TITLE_MARKERS.search(title) else 0.0,
+        "title_question": 1.0 if "?" in title else 0.0,
+        "edits": 1.0 if re.search(r"\bedit\s*\d*\s*:", text, re.IGNORECASE) else 0.0,
+        "links": 1.0 if "http" in text else 0.0,
+        "velocity": math.log1p(max(0, story.get("score") or 0) / age_hours) / 10,
+        "comment_velocity": math.log1p(max(0, story.get("num_comments") or 0) / age_hours) / 8
+    }
+    for token in set(TOKEN.findall(title.lower())):
+        if len(token) > 2:
+            features[f"t:{token}"] = 1.0
+    return features
+
+def _sigmoid(x):
+    return 1 / (1 + math.exp(-max(-30.0, min(30.0, x))))
+
+def predict(features, weights):
+    """Nota entre 0 e 1 (chance de a história virar um vídeo mantido)"""
+    return _sigmoid(sum(value * weights.get(name, 0.0) for name, value in features.items()))
+
+def load_model(path=MODEL_PATH):
+    """Pesos treinados (ou os iniciais, se não houver modelo)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["weights"]
+    except (OSError, ValueError, KeyError):
+        return dict(DEFAULT_WEIGHTS)
+
+def rank_stories(stories, weights=None, reference_time=None):
+    """
+    Ordena os candidatos pela nota, sem os eliminados pelas regras
+
+    Args:
+        stories: Dicts de história (get_story)
+        weights: Pesos do modelo (None = load_model())
+        reference_time: Epoch para a idade dos posts (None = post mais novo da lista)
+
+    Returns:
+        Lista de (nota, história), da melhor para a pior
+    """
+    weights = weights if weights is not None else load_model()
+    if reference_time is None:
+        reference_time = max((story.get("created_utc") or 0 for story in stories), default=0)
+
+    ranked = []
+    for story in stories:
+        reason = hard_reject(story)
+        if reason:
+            print(f"   🚫 {story.get('id')}: {reason}")
+            continue
+        ranked.append((predict(story_features(story, reference_time), weights), story))
+    # Ordem estável: empate mantém a ordem da listagem
+    ranked.sort(key=lambda item: -item[0])
+    return ranked
+
+def train(examples, epochs=300, learning_rate=0.1, l2=0.01, prior=None):
+    """
+    Regressão logística por gradiente, partindo dos pesos iniciais
+
+    A regularização puxa os pesos de volta para o prior: com poucas revisões o
+    modelo continua perto das regras escolhidas à mão
+
+    Args:
+        examples: Lista de (features, rótulo 1 = keep / 0 = discard)
+        epochs: Passadas pelos exemplos
+        learning_rate: Passo do gradiente
+        l2: Força da regularização
+        prior: Pesos iniciais (None = DEFAULT_WEIGHTS)
+
+    Returns:
+        Dict de pesos
+    """
+    prior = dict(prior or DEFAULT_WEIGHTS)
+    weights = dict(prior)
+    for _ in range(epochs):
+        for features, label in examples:
+            error = predict(features, weights) - label
+            for name, value in features.items():
+                weight = weights.get(name, 0.0)
+                weights[name] = weight - learning_rate * (error * value + l2 * (weight - prior.get(name, 0.0)))
+    return {name: round(weight, 4) for name, weight in weights.items() if abs(weight) > 1e-4 or name in prior}
+
+def train_from_catalog(db_path=None, model_path=MODEL_PATH):
+    """
+    Treina com as revisões keep/discard do catálogo e grava o modelo
+
+    Returns:
+        Dict com exemplos, acertos e caminho do modelo (None sem revisões)
+    """
+    from catalog import CATALOG_PATH, connect, training_examples
+
+    conn = connect(db_path or CATALOG_PATH)
+    try:
+        rows = training_examples(conn)
+    finally:
+        conn.close()
+    if not rows:
+        print("⚠️ Nenhuma revisão no catálogo (python catalog.py review <job> keep|discard)")
+        return None
+
+    examples = [(story_features(row, row.get("ranked_at")), 1.0 if row["verdict"] == "keep" else 0.0) for row in rows]
+    weights = train(examples)
+    correct = sum(1 for features, label in examples if (predict(features, weights) >= 0.5) == (label == 1.0))
+
+    directory = os.path.dirname(model_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(model_path, "w", encoding="utf-8") as f:
+        json.dump({"examples": len(examples), "weights": weights}, f, ensure_ascii=False, indent=2)
+    return {"examples": len(examples), "correct": correct, "model": model_path}
+
+def main():
+    """CLI do modelo de pré-triagem"""
+    parser = argparse.ArgumentParser(description="Pré-triagem das histórias do Reddit")
+    parser.add_argument("--db", help="Caminho do catálogo SQLite")
+    parser.add_argument("--model", default=MODEL_PATH, help="Arquivo do modelo")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("train", help="Treina com as revisões keep/discard do catálogo")
+    commands.add_parser("show", help="Pesos mais fortes do modelo")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        summary = train_from_catalog(args.db, args.model)
+        if summary:
+            print(f"✅ Modelo treinado com {summary['examples']} revisões ({summary['correct']} acertos): {summary['model']}")
+    else:
+        weights = load_model(args.model)
+        for name, weight in sorted(weights.items(), key=lambda item: -abs(item[1]))[:25]:
+            print(f"   {name:<24} {weight:>8.3f}")
+
+if __name__ == "__main__":
+    main()
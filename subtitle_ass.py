@@ -0,0 +1,207 @@
+"""
+Legendas em ASS (Advanced SubStation Alpha) com karaoke \\k
+Converte os chunks com tempo por palavra e os estilos de legenda em um arquivo
+.ass: serve de faixa de legenda para upload e é desenhado pelo ffmpeg (filtro
+ass, libass) durante o encode, sem rasterizar nenhuma legenda em Python
+"""
+
+import os
+
+from PIL import ImageColor
+
+# Altura da caixa da legenda no vídeo base (a mesma das imagens do PIL); o texto fica no meio dela
+BOX_HEIGHT = 300
+ASS_FONT = "Arial"
+
+def ass_color(color, alpha=0):
+    """
+    Cor do PIL ("yellow", (255, 215, 0)...) no formato do ASS (&HAABBGGRR)
+
+    Args:
+        color: Nome ou tupla RGB
+        alpha: Transparência (0 = opaco, 255 = invisível)
+    """
+    r, g, b = ImageColor.getrgb(color)[:3] if isinstance(color, str) else tuple(color)[:3]
+    return f"&H{alpha:02X}{b:02X}{g:02X}{r:02X}"
+
+def ass_time(seconds):
+    """Tempo em segundos para H:MM:SS.cc (centésimos)"""
+    total = max(0, int(round(seconds * 100)))
+    hours, rest = divmod(total, 360000)
+    minutes, rest = divmod(rest, 6000)
+    secs, cents = divmod(rest, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{cents:02d}"
+
+def escape_text(text):
+    """Texto livre sem abrir blocos de override ({...}) nem comandos (\\N...)"""
+    return text.replace("\\", "/").replace("{", "(").replace("}", ")")
+
+def karaoke_text(words, start, end):
+    """
+    Texto do chunk com uma tag \\k por palavra
+
+    Cada palavra acende quando começa a ser falada (o \\k dura até a próxima);
+    as durações saem de fronteiras arredondadas para não acumular erro
+
+    Args:
+        words: Palavras do chunk com "text" e "start"
+        start: Início do evento (s)
+        end: Fim do evento (s)
+    """
+    bounds = [int(round((w["start"] - start) * 100)) for w in words[1:]] + [int(round((end - start) * 100))]
+    parts = []
+    previous = 0
+    for word, bound in zip(words, bounds):
+        parts.append(f"{{\\k{max(0, bound - previous)}}}{escape_text(word['text'])}")
+        previous = max(previous, bound)
+    return " ".join(parts)
+
+def style_line(name, config, box_opacity=0.0):
+    """
+    Linha [V4+ Styles] de um estilo de legenda
+
+    As cores do karaoke: SecondaryColour antes da palavra ser falada,
+    PrimaryColour depois (a palavra acende). Com caixa (BorderStyle 3) o libass
+    desenha um retângulo com a OutlineColour no lugar do contorno
+
+    Args:
+        name: Nome do estilo no arquivo
+        config: Entrada de subtitle_whisper.CAPTION_STYLES
+        box_opacity: Opacidade da caixa escura (0 = contorno normal)
+    """
+    if box_opacity > 0:
+        border_style, outline = 3, config["stroke_width"] * 2
+        outline_color = ass_color((0, 0, 0), alpha=int(round((1 - box_opacity) * 255)))
+    else:
+        border_style, outline = 1, config["stroke_width"]
+        outline_color = ass_color(config["stroke_color"])
+
+    fields = [
+        name, ASS_FONT, config["fontsize"],
+        ass_color(config["active_color"]), ass_color(config["inactive_color"]), outline_color, ass_color((0, 0, 0), alpha=255),
+        -1, 0, 0, 0, 100, 100, 0, 0,
+        border_style, outline, 0, 5, 10, 10, 10, 1
+    ]
+    return "Style: " + ",".join(str(field) for field in fields)
+
+def build_ass(chunks, style="tiktok", play_res=(1080, 1920), placement=None, max_gap=0.3):
+    """
+    Monta o conteúdo de um arquivo .ass
+
+    Args:
+        chunks: Chunks com "words" (tempo por palavra), "start" e "end"
+            (subtitle_chunker.plan_chunks)
+        style: Estilo (chaves de subtitle_whisper.CAPTION_STYLES)
+        play_res: Resolução de referência (o libass escala para o tamanho real)
+        placement: Função t -> (topo da caixa em px, opacidade da caixa);
+            None = caixa no meio da tela, sem fundo
+        max_gap: Buracos menores que isso mantêm a legenda anterior (como na timeline do PIL)
+
+    Returns:
+        Texto do arquivo
+    """
+    from subtitle_whisper import CAPTION_STYLES
+
+    config = CAPTION_STYLES.get(style, CAPTION_STYLES["minimal"])
+    width, height = play_res
+    placement = placement or (lambda t: (height * 0.5, 0.0))
+
+    styles = {0.0: "Caption"}
+    events = []
+    for index, chunk in enumerate(chunks):
+        start, end = chunk["start"], chunk["end"]
+        if index + 1 < len(chunks) and chunks[index + 1]["start"] - end <= max_gap:
+            end = chunks[index + 1]["start"]
+
+        top, opacity = placement(start)
+        if opacity not in styles:
+            styles[opacity] = f"Box{int(round(opacity * 100))}"
+        x, y = width // 2, int(round(top + BOX_HEIGHT / 2))
+        events.append(
+            f"Dialogue: 0,{ass_time(start)},{ass_time(end)},{styles[opacity]},,0,0,0,,"
+            f"{{\\an5\\pos({x},{y})}}{karaoke_text(chunk['words'], start, end)}"
+        )
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding"
+    ]
+    lines += [style_line(name, config, opacity) for opacity, name in styles.items()]
+    lines += [
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+    ]
+    lines += events
+    return "\n".join(lines) + "\n"
+
+def layout_placement(layout, master_height, crop_top=0, crop_height=None, fixed_y=None):
+    """
+    Posição das legendas de um formato a partir do layout por trecho do fundo
+
+    Mesmas regras de export_formats.caption_placements: sem altura fixa, a
+    legenda segue o planejador; com altura fixa, só a caixa vem do layout
+
+    Args:
+        layout: caption_layout.plan_caption_layout (None = padrão sem caixa)
+        master_height: Altura do vídeo base
+        crop_top: Topo do recorte do formato no vídeo base
+        crop_height: Altura do recorte (None = vídeo base inteiro)
+        fixed_y: Altura fixa do formato (fração do recorte) ou None
+
+    Returns:
+        Função t -> (topo da caixa em px do recorte, opacidade)
+    """
+    from caption_layout import caption_placement
+
+    crop_height = crop_height or master_height
+
+    def placement(t):
+        if fixed_y is None:
+            caption_y, opacity = caption_placement(layout, t)
+            return master_height * caption_y - crop_top, opacity
+        box_y = crop_height * fixed_y
+        _, opacity = caption_placement(layout, t, (crop_top + box_y) / master_height)
+        return box_y, opacity
+
+    return placement
+
+def write_ass(path, chunks, style="tiktok", play_res=(1080, 1920), placement=None, max_gap=0.3):
+    """
+    Grava o .ass (gravação atômica, como os vídeos)
+
+    Returns:
+        Caminho do arquivo
+    """
+    from storage import atomic_output
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with atomic_output(path) as temp_path:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(build_ass(chunks, style, play_res, placement, max_gap))
+    return path
+
+def sidecar_path(video_path):
+    """video_123.mp4 -> video_123.ass"""
+    return os.path.splitext(video_path)[0] + ".ass"
+
+def ass_filter(path):
+    """
+    Filtro do ffmpeg que desenha o .ass no vídeo (caminho escapado para o filtergraph)
+
+    Barras invertidas viram "/", ":" é escapado (C:/... no Windows) e aspas
+    simples fecham e reabrem o trecho entre aspas
+    """
+    escaped = path.replace("\\", "/").replace(":", "\\:").replace("'", "'\\''")
+    return f"ass='{escaped}'"
@@ -0,0 +1,229 @@
+"""
+Divisão adaptativa das legendas em chunks
+Usa a largura medida de cada palavra (tabela de larguras dos caracteres da
+fonte, cacheada por tamanho) e os tempos de cada palavra para montar o menor
+número de legendas que cabem na tela e ficam visíveis tempo suficiente para
+serem lidas
+"""
+
+import math
+import re
+from functools import lru_cache
+
+# Fração da caixa que o texto pode ocupar (folga para o contorno e o kerning)
+SAFE_WIDTH = 0.96
+
+# Tempo mínimo de leitura de uma legenda e velocidade máxima de leitura
+MIN_DISPLAY = 0.6
+READING_CPS = 22.0
+
+# Mais que isso na tela entrega as próximas palavras cedo demais
+MAX_DISPLAY = 2.5
+MAX_WORDS = 4
+
+# Pausa na fala que sempre separa legendas (s)
+PAUSE_BREAK = 0.45
+
+# Custos relativos a uma legenda a mais (ver chunk_cost)
+SHORT_WEIGHT = 4.0
+SENTENCE_CROSS = 2.5
+MID_PHRASE_BREAK = 0.1
+DANGLING_BREAK = 0.3
+
+SENTENCE_END = ".!?…"
+CLAUSE_END = ",;:"
+
+# Artigos, preposições e conjunções: legenda terminando neles fica "pendurada"
+DANGLING_WORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "do", "da", "dos", "das",
+    "em", "no", "na", "nos", "nas", "num", "numa", "para", "pra", "pro", "por", "pelo",
+    "pela", "com", "sem", "e", "ou", "mas", "que", "se", "me", "te", "meu", "minha", "seu", "sua"
+}
+
+# Caracteres medidos de uma vez ao criar a tabela (o resto é medido quando aparecer)
+PRELOAD_CHARS = "".join(chr(code) for code in range(32, 127)) + "áàâãéêíóôõúüçÁÀÂÃÉÊÍÓÔÕÚÇ–—…“”‘’"
+
+class GlyphMetrics:
+    """
+    Tabela de larguras (avanço) por caractere de uma fonte
+
+    A largura de um texto é a soma dos avanços mais o contorno dos dois lados,
+    sem desenhar nada; igual ao getlength() do Pillow sem layout complexo
+    """
+
+    def __init__(self, font, stroke_width=0):
+        self.font = font
+        self.stroke_width = stroke_width
+        self.advances = {char: font.getlength(char) for char in PRELOAD_CHARS}
+
+    def advance(self, char):
+        if char not in self.advances:
+            self.advances[char] = self.font.getlength(char)
+        return self.advances[char]
+
+    def width(self, text):
+        """Largura do texto em pixels (com o contorno)"""
+        return sum(self.advance(char) for char in text) + 2 * self.stroke_width
+
+@lru_cache(maxsize=None)
+def caption_metrics(fontsize, stroke_width=0):
+    """
+    Tabela de larguras da fonte das legendas (uma por tamanho/contorno no processo)
+
+    Args:
+        fontsize: Tamanho da fonte
+        stroke_width: Largura do contorno
+
+    Returns:
+        GlyphMetrics
+    """
+    from subtitle_whisper import load_caption_font
+    return GlyphMetrics(load_caption_font(fontsize), stroke_width)
+
+def local_speech_rate(words, index, window=2.0):
+    """
+    Velocidade da fala (palavras/s) em volta de uma palavra
+
+    Args:
+        words: Palavras com "start"/"end"
+        index: Palavra central
+        window: Largura da janela (s)
+
+    Returns:
+        Palavras por segundo (0 se não houver tempo)
+    """
+    center = words[index]["start"]
+    inside = [w for w in words if abs(w["start"] - center) <= window / 2]
+    span = max(w["end"] for w in inside) - min(w["start"] for w in inside)
+    return len(inside) / span if span > 0 else 0.0
+
+def chunk_display(words, i, j, max_gap):
+    """
+    Tempo em que as palavras words[i:j] ficam na tela
+
+    A legenda fica até a próxima começar, a não ser que o buraco seja maior que
+    max_gap (aí some no fim da última palavra), como em build_caption_timeline
+    """
+    end = words[j - 1]["end"]
+    if j < len(words) and words[j]["start"] - end <= max_gap:
+        end = words[j]["start"]
+    return end - words[i]["start"]
+
+def reading_time(text):
+    """Tempo mínimo para ler um texto (s)"""
+    return max(MIN_DISPLAY, len(text) / READING_CPS)
+
+def chunk_cost(words, i, j, max_gap):
+    """
+    Custo de uma legenda com words[i:j], em "legendas a mais"
+
+    Cada legenda custa 1; somam-se as penalidades por ficar pouco tempo na
+    tela, por atravessar um fim de frase e por quebrar no meio de uma oração
+    (empate fica com a quebra na vírgula; quebrar depois de "de", "o", "um"... custa mais)
+    """
+    text = " ".join(w["text"] for w in words[i:j])
+    cost = 1.0
+
+    need = reading_time(text)
+    display = chunk_display(words, i, j, max_gap)
+    if display < need:
+        cost += SHORT_WEIGHT * (need - display) / need
+
+    cost += SENTENCE_CROSS * sum(1 for w in words[i:j - 1] if w["text"][-1:] in SENTENCE_END)
+
+    last = words[j - 1]["text"]
+    if j < len(words) and last[-1:] not in SENTENCE_END + CLAUSE_END:
+        cost += DANGLING_BREAK if last.lower() in DANGLING_WORDS else MID_PHRASE_BREAK
+
+    return cost
+
+def plan_chunks(words, max_width, metrics, max_gap=0.3, max_words=MAX_WORDS):
+    """
+    Divide as palavras no menor número de legendas legíveis (programação dinâmica)
+
+    Restrições fixas: a legenda cabe em max_width (só uma palavra sozinha pode
+    passar), não atravessa pausas maiores que PAUSE_BREAK e não fica mais que
+    MAX_DISPLAY na tela. O limite de palavras sobe quando a fala está rápida,
+    para que a legenda não pisque mais rápido do que dá para ler
+
+    Args:
+        words: Palavras com "text", "start" e "end"
+        max_width: Largura da caixa da legenda (px)
+        metrics: GlyphMetrics da fonte usada na renderização
+        max_gap: Buracos que a linha do tempo preenche com a legenda anterior (s)
+        max_words: Limite de palavras por legenda em fala normal
+
+    Returns:
+        Lista de chunks com "words", "start" e "end" (mesmo formato de
+        group_words_into_chunks)
+    """
+    n = len(words)
+    if not n:
+        return []
+
+    limit = max_width * SAFE_WIDTH
+    space = metrics.advance(" ")
+    widths = [metrics.width(w["text"]) - 2 * metrics.stroke_width for w in words]
+
+    best = [0.0] + [math.inf] * n
+    start_of = [0] * (n + 1)
+
+    for j in range(1, n + 1):
+        rate = local_speech_rate(words, j - 1)
+        cap = max(max_words, math.ceil(rate * MIN_DISPLAY) + 1)
+        width = 2 * metrics.stroke_width - space
+
+        # Legenda words[i:j], crescendo para trás até quebrar uma restrição fixa
+        for i in range(j - 1, -1, -1):
+            width += widths[i] + space
+            count = j - i
+            if count > 1:
+                if width > limit or count > cap:
+                    break
+                if words[i + 1]["start"] - words[i]["end"] > PAUSE_BREAK:
+                    break
+                if chunk_display(words, i, j, max_gap) > MAX_DISPLAY:
+                    break
+
+            cost = best[i] + chunk_cost(words, i, j, max_gap)
+            if cost < best[j]:
+                best[j] = cost
+                start_of[j] = i
+
+    chunks = []
+    j = n
+    while j > 0:
+        i = start_of[j]
+        chunks.append({"words": words[i:j], "start": words[i]["start"], "end": words[j - 1]["end"]})
+        j = i
+    chunks.reverse()
+    return chunks
+
+def estimate_word_timings(text, duration=None, words_per_second=4.5):
+    """
+    Tempos aproximados de cada palavra quando só há o texto (sem Whisper)
+
+    Palavras longas duram mais e fins de frase ganham uma pausa, como na fala
+    real; com duration, tudo é esticado para caber no áudio
+
+    Args:
+        text: Texto narrado
+        duration: Duração do áudio (s); None usa words_per_second
+        words_per_second: Velocidade média da fala
+
+    Returns:
+        Lista de palavras com "text", "start" e "end"
+    """
+    tokens = re.sub(r"\s+", " ", text).strip().split()
+    weights = [(0.55 + 0.08 * min(len(token), 12), 1.2 if token[-1] in SENTENCE_END else 0.25) for token in tokens]
+    total = sum(speak + pause for speak, pause in weights)
+    if not total:
+        return []
+
+    unit = (duration / total) if duration else (1.0 / words_per_second)
+    words = []
+    cursor = 0.0
+    for token, (speak, pause) in zip(tokens, weights):
+        words.append({"text": token, "start": cursor, "end": cursor + speak * unit})
+        cursor += (speak + pause) * unit
+    return words
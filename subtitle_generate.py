@@ -3,42 +3,32 @@ Gerador de legendas sincronizadas para vídeos
 Cria legendas estilo TikTok/Shorts com destaque de palavras
 """
 
-from moviepy.editor import ImageClip, CompositeVideoClip
 from PIL import Image, ImageDraw, ImageFont
-import re
 import os
 import numpy as np
 
-def split_text_into_chunks(text, words_per_chunk=2):
+def split_text_into_chunks(text, audio_duration=None, width=1026, fontsize=80):
     """
     Divide o texto em chunks de palavras para legendas
     
+    Sem transcrição, os tempos de cada palavra são estimados pelo tamanho das
+    palavras (e esticados até audio_duration); a divisão é a mesma das
+    legendas do Whisper: cabe na largura e fica tempo suficiente para ler
+    
     Args:
         text: Texto completo
-        words_per_chunk: Quantidade de palavras por legenda (2-3 ideal para velocidade 1.8x)
+        audio_duration: Duração do áudio (None = velocidade média de 4.5 palavras/s)
+        width: Largura da caixa da legenda (px)
+        fontsize: Tamanho da fonte usada em create_text_image
     
     Returns:
         Lista de chunks de texto
     """
-    # Remove múltiplos espaços e quebras de linha
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # Divide em palavras
-    words = text.split()
-    
-    # Cria chunks de tamanho variável (2-3 palavras)
-    chunks = []
-    i = 0
-    while i < len(words):
-        # Alterna entre 2 e 3 palavras para tornar mais natural
-        chunk_size = 2 if i % 2 == 0 else 3
-        chunk_size = min(chunk_size, len(words) - i)  # Não excede palavras restantes
-        
-        chunk = ' '.join(words[i:i + chunk_size])
-        chunks.append(chunk)
-        i += chunk_size
+    from subtitle_chunker import caption_metrics, estimate_word_timings, plan_chunks
     
-    return chunks
+    words = estimate_word_timings(text, audio_duration)
+    chunks = plan_chunks(words, width, caption_metrics(fontsize, 4))
+    return [' '.join(w["text"] for w in chunk["words"]) for chunk in chunks]
 
 def create_subtitle_timings(chunks, total_duration):
     """
@@ -138,6 +128,8 @@ def create_subtitle_clip(txt, start_time, end_time, video_size):
     Returns:
         ImageClip posicionado e estilizado
     """
+    from moviepy.editor import ImageClip
+    
     # Cria imagem com o texto
     img_width = int(video_size[0] * 0.95)  # 95% da largura
     img_height = 250  # Altura maior para texto maior
@@ -166,8 +158,10 @@ def add_subtitles_to_video(video_clip, text, audio_duration):
     Returns:
         VideoClip com legendas
     """
-    # Divide texto em chunks
-    chunks = split_text_into_chunks(text, words_per_chunk=3)
+    from moviepy.editor import CompositeVideoClip
+    
+    # Divide texto em chunks (mesma largura de create_subtitle_clip)
+    chunks = split_text_into_chunks(text, audio_duration, width=int(video_clip.size[0] * 0.95))
     
     # Cria timings
     subtitle_timings = create_subtitle_timings(chunks, audio_duration)
@@ -205,7 +199,7 @@ def generate_srt_file(text, audio_duration, output_path):
     Returns:
         Caminho do arquivo SRT gerado
     """
-    chunks = split_text_into_chunks(text, words_per_chunk=3)
+    chunks = split_text_into_chunks(text, audio_duration)
     subtitle_timings = create_subtitle_timings(chunks, audio_duration)
     
     # Formato SRT
@@ -247,7 +241,7 @@ if __name__ == "__main__":
     # Teste
     test_text = "Imagine você dirigindo em uma noite de Halloween, apenas algumas horas antes da festa, com seu filho no banco de trás, quando de repente você vê um lixo na rua."
     
-    chunks = split_text_into_chunks(test_text, words_per_chunk=3)
+    chunks = split_text_into_chunks(test_text)
     print("📝 Chunks de legenda:")
     for i, chunk in enumerate(chunks, 1):
         print(f"   {i}. {chunk}")
@@ -0,0 +1,100 @@
+"""
+Armazenamento compacto das imagens de legenda
+Recorta cada imagem no bounding box do canal alpha, elimina duplicatas
+pelo hash do conteúdo e compartilha um único ImageClip por imagem
+"""
+
+import hashlib
+import numpy as np
+
+def crop_to_alpha(image):
+    """
+    Recorta uma imagem RGBA no menor retângulo com pixels visíveis
+
+    Args:
+        image: Array numpy (altura, largura, 4)
+
+    Returns:
+        Tupla (imagem recortada, (offset_x, offset_y)) ou (None, None) se for vazia
+    """
+    alpha = image[:, :, 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if rows.size == 0:
+        return None, None
+    cols = np.flatnonzero(alpha.any(axis=0))
+
+    top, bottom = rows[0], rows[-1] + 1
+    left, right = cols[0], cols[-1] + 1
+
+    # Cópia contígua: libera a imagem cheia original da memória
+    cropped = np.ascontiguousarray(image[top:bottom, left:right])
+    return cropped, (int(left), int(top))
+
+def content_key(image):
+    """
+    Gera a chave de conteúdo de uma imagem (formato + pixels)
+
+    Args:
+        image: Array numpy
+
+    Returns:
+        String hexadecimal
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(image.shape).encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+class SubtitleImageStore:
+    """Imagens de legenda recortadas e deduplicadas, compartilhadas entre os spans"""
+
+    def __init__(self):
+        self.images = {}
+        self._clips = {}
+
+    def add(self, image):
+        """
+        Adiciona uma imagem renderizada ao store
+
+        Args:
+            image: Array RGBA com o tamanho cheio da legenda
+
+        Returns:
+            Tupla (chave, (offset_x, offset_y)) ou (None, None) se a imagem for vazia
+        """
+        cropped, offset = crop_to_alpha(image)
+        if cropped is None:
+            return None, None
+
+        key = content_key(cropped)
+        if key not in self.images:
+            self.images[key] = cropped
+
+        return key, offset
+
+    def get(self, key):
+        """Retorna a imagem recortada de uma chave"""
+        return self.images[key]
+
+    def clip(self, key):
+        """
+        Retorna o ImageClip base de uma imagem (criado uma única vez)
+
+        Os clips de cada span devem derivar deste com set_start/set_duration,
+        assim a imagem e a máscara alpha ficam compartilhadas na memória
+        """
+        if key not in self._clips:
+            try:
+                from moviepy.editor import ImageClip
+            except ImportError:
+                from moviepy import ImageClip
+            self._clips[key] = ImageClip(self.images[key], transparent=True)
+        return self._clips[key]
+
+    @property
+    def nbytes(self):
+        """Memória ocupada pelas imagens únicas recortadas"""
+        return sum(image.nbytes for image in self.images.values())
+
+    def __len__(self):
+        return len(self.images)
@@ -0,0 +1,90 @@
+"""
+Linha do tempo das legendas alinhada aos frames do vídeo
+Quantiza os eventos no fps de saída, preenche buracos curtos, resolve
+sobreposições e junta estados idênticos consecutivos
+"""
+
+def quantize_to_frame(seconds, fps):
+    """
+    Converte um tempo em segundos para o índice de frame mais próximo
+
+    Args:
+        seconds: Tempo em segundos
+        fps: Frames por segundo do vídeo de saída
+
+    Returns:
+        Índice do frame (int)
+    """
+    return int(round(seconds * fps))
+
+def build_caption_timeline(events, fps=30, max_gap=0.3, duration=None):
+    """
+    Monta o conjunto mínimo de estados de legenda para o compositor
+
+    Args:
+        events: Lista de dicts com "key" (identidade da imagem), "image", "start" e "end"
+        fps: Frames por segundo do vídeo de saída
+        max_gap: Buracos menores que isso (segundos) são preenchidos pela legenda anterior
+        duration: Duração total do vídeo (corta spans que passam do fim)
+
+    Returns:
+        Lista de spans ordenados e sem sobreposição, com "key", "image",
+        "start"/"end" (segundos) e "start_frame"/"end_frame" (frames, fim exclusivo)
+    """
+    max_gap_frames = quantize_to_frame(max_gap, fps)
+    last_frame = quantize_to_frame(duration, fps) if duration is not None else None
+
+    # 1. Quantiza tudo para frames inteiros (mínimo de 1 frame por evento)
+    spans = []
+    for event in events:
+        start_frame = quantize_to_frame(event["start"], fps)
+        end_frame = max(quantize_to_frame(event["end"], fps), start_frame + 1)
+        spans.append({
+            "key": event["key"],
+            "image": event["image"],
+            "start_frame": start_frame,
+            "end_frame": end_frame
+        })
+
+    # Ordenação estável: em empate, a ordem original decide
+    spans.sort(key=lambda span: span["start_frame"])
+
+    # 2. Resolve sobreposições: o evento que começa depois "corta" o anterior
+    resolved = []
+    for span in spans:
+        while resolved and resolved[-1]["end_frame"] > span["start_frame"]:
+            previous = resolved[-1]
+            previous["end_frame"] = span["start_frame"]
+            if previous["end_frame"] <= previous["start_frame"]:
+                resolved.pop()  # Anterior ficou vazio, descarta
+            else:
+                break
+        resolved.append(span)
+
+    # 3. Preenche buracos curtos estendendo a legenda anterior
+    for previous, current in zip(resolved, resolved[1:]):
+        gap = current["start_frame"] - previous["end_frame"]
+        if 0 < gap <= max_gap_frames:
+            previous["end_frame"] = current["start_frame"]
+
+    # 4. Junta spans consecutivos com a mesma imagem
+    merged = []
+    for span in resolved:
+        if merged and merged[-1]["key"] == span["key"] and merged[-1]["end_frame"] == span["start_frame"]:
+            merged[-1]["end_frame"] = span["end_frame"]
+        else:
+            merged.append(span)
+
+    # 5. Corta no fim do vídeo
+    timeline = []
+    for span in merged:
+        if last_frame is not None:
+            if span["start_frame"] >= last_frame:
+                break
+            span["end_frame"] = min(span["end_frame"], last_frame)
+
+        span["start"] = span["start_frame"] / fps
+        span["end"] = span["end_frame"] / fps
+        timeline.append(span)
+
+    return timeline
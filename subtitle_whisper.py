@@ -3,11 +3,55 @@ Gerador de legendas sincronizadas usando Whisper AI
 Transcreve o áudio automaticamente e cria legendas estilizadas
 """
 
-import whisper
-from moviepy.editor import ImageClip, CompositeVideoClip
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 import os
+from functools import lru_cache
+
+# Modelos Whisper já carregados (mantidos quentes entre vídeos no mesmo processo)
+_WHISPER_MODELS = {}
+
+# Fonte e cores por estilo de legenda (estilo desconhecido usa "minimal")
+CAPTION_STYLES = {
+    "tiktok": {"fontsize": 90, "stroke_width": 5, "active_color": 'yellow', "inactive_color": 'white', "stroke_color": 'black'},
+    "youtube": {"fontsize": 80, "stroke_width": 4, "active_color": 'yellow', "inactive_color": 'white', "stroke_color": 'black'},
+    "karaoke": {"fontsize": 85, "stroke_width": 5, "active_color": 'yellow', "inactive_color": 'white', "stroke_color": 'black'},
+    "minimal": {"fontsize": 70, "stroke_width": 3, "active_color": (255, 215, 0), "inactive_color": 'white', "stroke_color": (50, 50, 50)}
+}
+
+def load_whisper_model(model_name="base"):
+    """
+    Carrega um modelo Whisper uma única vez por processo
+    
+    Args:
+        model_name: Modelo do Whisper (tiny, base, small, medium, large)
+    
+    Returns:
+        Modelo carregado
+    """
+    if model_name not in _WHISPER_MODELS:
+        import whisper  # Puxa torch: só carrega quando for transcrever
+        _WHISPER_MODELS[model_name] = whisper.load_model(model_name)
+    return _WHISPER_MODELS[model_name]
+
+@lru_cache(maxsize=None)
+def load_caption_font(fontsize):
+    """
+    Carrega a fonte das legendas (cacheada por tamanho)
+    
+    Args:
+        fontsize: Tamanho da fonte
+    
+    Returns:
+        ImageFont carregada
+    """
+    try:
+        return ImageFont.truetype("C:/Windows/Fonts/arialbd.ttf", fontsize)
+    except:
+        try:
+            return ImageFont.truetype("C:/Windows/Fonts/arial.ttf", fontsize)
+        except:
+            return ImageFont.load_default()
 
 def transcribe_audio_with_whisper(audio_path, model_name="base"):
     """
@@ -23,8 +67,8 @@ def transcribe_audio_with_whisper(audio_path, model_name="base"):
     print(f"🎙️ Transcrevendo áudio com Whisper ({model_name})...")
     
     try:
-        # Carrega modelo Whisper
-        model = whisper.load_model(model_name)
+        # Carrega modelo Whisper (reaproveita se já estiver em memória)
+        model = load_whisper_model(model_name)
         
         # Transcreve com word-level timestamps
         result = model.transcribe(
@@ -87,6 +131,25 @@ def group_words_into_chunks(segments, max_words=2):
     
     return chunks
 
+def plan_caption_chunks(segments, box_width, style="tiktok", max_gap=0.3):
+    """
+    Divide as palavras em legendas que cabem na caixa com a fonte do estilo
+    
+    Args:
+        segments: Palavras com timestamps
+        box_width: Largura da caixa da legenda (px)
+        style: Estilo das legendas (define fonte e contorno medidos)
+        max_gap: Buracos que a linha do tempo preenche com a legenda anterior (s)
+    
+    Returns:
+        Lista de chunks (ver subtitle_chunker.plan_chunks)
+    """
+    from subtitle_chunker import caption_metrics, plan_chunks
+    
+    config = CAPTION_STYLES.get(style, CAPTION_STYLES["minimal"])
+    metrics = caption_metrics(config["fontsize"], config["stroke_width"])
+    return plan_chunks(segments, box_width, metrics, max_gap=max_gap)
+
 def create_karaoke_text_image(words_list, current_word_index, width, height, style="tiktok"):
     """
     Cria imagem com efeito karaoke (palavra atual colorida, resto em branco)
@@ -105,40 +168,16 @@ def create_karaoke_text_image(words_list, current_word_index, width, height, sty
     img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
     
-    # Configurações de estilo
-    if style == "tiktok":
-        fontsize = 90
-        stroke_width = 5
-        active_color = 'yellow'  # Palavra sendo falada
-        inactive_color = 'white'  # Outras palavras
-        stroke_color = 'black'
-    elif style == "youtube":
-        fontsize = 80
-        stroke_width = 4
-        active_color = 'yellow'
-        inactive_color = 'white'
-        stroke_color = 'black'
-    elif style == "karaoke":
-        fontsize = 85
-        stroke_width = 5
-        active_color = 'yellow'
-        inactive_color = 'white'
-        stroke_color = 'black'
-    else:  # minimal
-        fontsize = 70
-        stroke_width = 3
-        active_color = (255, 215, 0)  # Dourado
-        inactive_color = 'white'
-        stroke_color = (50, 50, 50)
-    
-    # Carrega fonte
-    try:
-        font = ImageFont.truetype("C:/Windows/Fonts/arialbd.ttf", fontsize)
-    except:
-        try:
-            font = ImageFont.truetype("C:/Windows/Fonts/arial.ttf", fontsize)
-        except:
-            font = ImageFont.load_default()
+    # Configurações de estilo (active_color = palavra sendo falada)
+    config = CAPTION_STYLES.get(style, CAPTION_STYLES["minimal"])
+    fontsize = config["fontsize"]
+    stroke_width = config["stroke_width"]
+    active_color = config["active_color"]
+    inactive_color = config["inactive_color"]
+    stroke_color = config["stroke_color"]
+    
+    # Carrega fonte (cacheada)
+    font = load_caption_font(fontsize)
     
     # Monta texto completo para calcular centralização
     full_text = " ".join([w["text"] for w in words_list])
@@ -178,7 +217,104 @@ def create_karaoke_text_image(words_list, current_word_index, width, height, sty
     
     return np.array(img)
 
-def add_subtitles_to_video(video_clip, audio_path, style="tiktok", position="center", karaoke_mode=True):
+def build_subtitle_track(audio_path, video_size, duration, style="tiktok", karaoke_mode=True, fps=30, max_gap=0.3, segments=None):
+    """
+    Transcreve o áudio e monta a linha do tempo das legendas (sem posição vertical)
+    
+    As imagens são renderizadas uma única vez na largura do vídeo; a posição
+    vertical fica a cargo de quem compõe, então a mesma trilha serve para
+    vários formatos de saída
+    
+    Args:
+        audio_path: Caminho do arquivo de áudio
+        video_size: Tamanho (largura, altura) do vídeo base
+        duration: Duração do vídeo (s)
+        style: Estilo das legendas (tiktok, youtube, minimal, karaoke)
+        karaoke_mode: Se True, destaca palavra sendo falada em amarelo
+        fps: Frames por segundo do vídeo final (legendas alinhadas aos frames)
+        max_gap: Buracos entre palavras menores que isso (s) mantêm a legenda anterior
+        segments: Palavras já transcritas (pula o Whisper; ex: transcrição em lote)
+    
+    Returns:
+        Dict com "store", "timeline", "box_x", "box_width", "box_height" e "events"
+        (None se a transcrição falhar)
+    """
+    from subtitle_timeline import build_caption_timeline
+    from subtitle_store import SubtitleImageStore
+    from tracing import stage
+    
+    # Transcreve áudio
+    if segments is None:
+        with stage("transcribe", model="base"):
+            segments = transcribe_audio_with_whisper(audio_path, model_name="base")
+    
+    if not segments:
+        return None
+    
+    with stage("subtitle_build") as span:
+        img_width = int(video_size[0] * 0.95)
+        img_height = 300
+        
+        # Agrupa em chunks pela largura medida do texto e pelo ritmo da fala
+        print(f"📝 Criando legendas {'com efeito karaoke' if karaoke_mode else 'normais'}...")
+        chunks = plan_caption_chunks(segments, img_width, style, max_gap)
+        span.attrs["chunks"] = len(chunks)
+        print(f"   ✂️ {len(chunks)} chunks ({len(segments) / len(chunks):.1f} palavras por legenda)")
+        
+        # Cria eventos de legenda (imagem + intervalo)
+        events = []
+        
+        # Imagens recortadas e deduplicadas pelo conteúdo (guardadas uma única vez)
+        store = SubtitleImageStore()
+        rendered = {}
+        
+        def render(words, highlight_index):
+            # Mesmo chunk + mesma palavra destacada nem chega a ser renderizado de novo
+            render_key = (tuple(w["text"] for w in words), highlight_index, style)
+            if render_key not in rendered:
+                text_img = create_karaoke_text_image(words, highlight_index, img_width, img_height, style=style)
+                rendered[render_key] = store.add(text_img)
+            return rendered[render_key]
+        
+        def add_event(words, highlight_index, start, end):
+            key, offset = render(words, highlight_index)
+            if key is not None:
+                # Mesma imagem em outra posição é outro estado visual
+                events.append({"key": (key, offset), "image": key, "start": start, "end": end})
+        
+        for chunk in chunks:
+            try:
+                if karaoke_mode and len(chunk["words"]) > 1:
+                    # Modo KARAOKE: um evento para cada palavra do chunk
+                    for word_index, word_info in enumerate(chunk["words"]):
+                        add_event(chunk["words"], word_index, word_info["start"], word_info["end"])
+                else:
+                    # Modo NORMAL: todas as palavras na mesma cor
+                    # Cria imagem com primeira palavra destacada (simples)
+                    add_event(chunk["words"], 0, chunk["start"], chunk["end"])
+            
+            except Exception as e:
+                words_text = " ".join([w["text"] for w in chunk["words"]])
+                print(f"⚠️ Erro ao criar legenda '{words_text[:30]}...': {e}")
+                continue
+        
+        # Alinha aos frames, preenche buracos e junta estados repetidos
+        timeline = build_caption_timeline(events, fps=fps, max_gap=max_gap, duration=duration)
+    
+    print(f"✅ {len(timeline)} legendas criadas ({len(events)} eventos, {len(store)} imagens únicas)!")
+    print(f"   🧠 Memória das legendas: {store.nbytes / 1e6:.1f} MB (sem recorte/dedup: {len(events) * img_width * img_height * 4 / 1e6:.1f} MB)")
+    
+    return {
+        "store": store,
+        "timeline": timeline,
+        # Posição da caixa cheia da legenda; o offset do recorte é somado a ela
+        "box_x": (video_size[0] - img_width) // 2,
+        "box_width": img_width,
+        "box_height": img_height,
+        "events": len(events)
+    }
+
+def add_subtitles_to_video(video_clip, audio_path, style="tiktok", position="center", karaoke_mode=True, fps=30, max_gap=0.3, segments=None, layout=None):
     """
     Adiciona legendas sincronizadas ao vídeo usando Whisper
     
@@ -188,25 +324,28 @@ def add_subtitles_to_video(video_clip, audio_path, style="tiktok", position="cen
         style: Estilo das legendas (tiktok, youtube, minimal, karaoke)
         position: Posição vertical (center, bottom, top)
         karaoke_mode: Se True, destaca palavra sendo falada em amarelo
+        fps: Frames por segundo do vídeo final (legendas alinhadas aos frames)
+        max_gap: Buracos entre palavras menores que isso (s) mantêm a legenda anterior
+        segments: Palavras já transcritas (None = transcreve agora)
+        layout: Altura e caixa por trecho do fundo (caption_layout.py);
+            quando presente substitui position
     
     Returns:
         VideoClip com legendas
     """
-    # Transcreve áudio
-    segments = transcribe_audio_with_whisper(audio_path, model_name="base")
+    try:
+        from moviepy.editor import CompositeVideoClip, ImageClip
+    except ImportError:
+        from moviepy import CompositeVideoClip, ImageClip
+    from caption_layout import caption_placement, make_box_image, BOX_PADDING
     
-    if not segments:
+    video_size = video_clip.size
+    track = build_subtitle_track(audio_path, video_size, video_clip.duration, style, karaoke_mode, fps, max_gap, segments)
+    
+    if not track:
         print("⚠️ Falha na transcrição, vídeo sem legendas")
         return video_clip
     
-    # Agrupa em chunks
-    print(f"📝 Criando legendas {'com efeito karaoke' if karaoke_mode else 'normais'}...")
-    chunks = group_words_into_chunks(segments, max_words=2)
-    
-    # Cria clips de legenda
-    subtitle_clips = []
-    video_size = video_clip.size
-    
     # Define posição Y baseada no parâmetro
     if position == "bottom":
         y_pos = video_size[1] * 0.75
@@ -215,54 +354,30 @@ def add_subtitles_to_video(video_clip, audio_path, style="tiktok", position="cen
     else:  # center
         y_pos = video_size[1] * 0.50
     
-    img_width = int(video_size[0] * 0.95)
-    img_height = 300
-    
-    for chunk in chunks:
-        try:
-            if karaoke_mode and len(chunk["words"]) > 1:
-                # Modo KARAOKE: cria um clip para cada palavra do chunk
-                for word_index, word_info in enumerate(chunk["words"]):
-                    # Cria imagem com palavra atual destacada
-                    text_img = create_karaoke_text_image(
-                        chunk["words"],
-                        word_index,
-                        img_width,
-                        img_height,
-                        style=style
-                    )
-                    
-                    # Cria clip para essa palavra
-                    text_clip = ImageClip(text_img, transparent=True)
-                    text_clip = text_clip.set_position(('center', y_pos))
-                    text_clip = text_clip.set_start(word_info["start"])
-                    text_clip = text_clip.set_duration(word_info["end"] - word_info["start"])
-                    
-                    subtitle_clips.append(text_clip)
-            else:
-                # Modo NORMAL: todas as palavras na mesma cor
-                # Cria imagem com primeira palavra destacada (simples)
-                text_img = create_karaoke_text_image(
-                    chunk["words"],
-                    0,  # Destaca primeira palavra
-                    img_width,
-                    img_height,
-                    style=style
-                )
-                
-                text_clip = ImageClip(text_img, transparent=True)
-                text_clip = text_clip.set_position(('center', y_pos))
-                text_clip = text_clip.set_start(chunk["start"])
-                text_clip = text_clip.set_duration(chunk["end"] - chunk["start"])
-                
-                subtitle_clips.append(text_clip)
-            
-        except Exception as e:
-            words_text = " ".join([w["text"] for w in chunk["words"]])
-            print(f"⚠️ Erro ao criar legenda '{words_text[:30]}...': {e}")
-            continue
-    
-    print(f"✅ {len(subtitle_clips)} legendas criadas!")
+    subtitle_clips = []
+    boxes = {}
+    for span in track["timeline"]:
+        key, (offset_x, offset_y) = span["key"]
+        opacity = 0.0
+        if layout:
+            caption_y, opacity = caption_placement(layout, span["start"])
+            y_pos = video_size[1] * caption_y
+        x, y = track["box_x"] + offset_x, int(y_pos) + offset_y
+        
+        if opacity > 0:
+            # Caixa escura atrás do texto, compartilhada entre spans iguais
+            text_h, text_w = track["store"].get(key).shape[:2]
+            box_key = (text_w, text_h, opacity)
+            if box_key not in boxes:
+                boxes[box_key] = ImageClip(make_box_image(text_w, text_h, opacity), transparent=True)
+            box_clip = boxes[box_key].set_position((x - BOX_PADDING, y - BOX_PADDING))
+            subtitle_clips.append(box_clip.set_start(span["start"]).set_duration(span["end"] - span["start"]))
+        
+        text_clip = track["store"].clip(key)  # Imagem e máscara compartilhadas entre spans
+        text_clip = text_clip.set_position((x, y))
+        text_clip = text_clip.set_start(span["start"])
+        text_clip = text_clip.set_duration(span["end"] - span["start"])
+        subtitle_clips.append(text_clip)
     
     # Compõe vídeo com legendas
     if subtitle_clips:
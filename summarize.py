@@ -1,15 +1,75 @@
-from groq import Groq
 import os
+import re
+import math
 from dotenv import load_dotenv
+from text_normalize import normalize_text
 
 load_dotenv()
 
+# Modelos do Groq em ordem de preferência (o menor responde quando o principal falha ou trava)
+LLM_MODELS = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant"]
+
+# Prazo de uma resposta do LLM (s), por tentativa e no roteador
+LLM_TIMEOUT = 45.0
+LLM_DEADLINE = 90.0
+
+_router = None
+
+# Regras de estilo comuns a todos os roteiros (vídeo único ou série)
+ADAPTATION_RULES = """1. Maximizar o Impacto: Reescreva a história focando nos pontos de virada e emoções. Use uma linguagem que prenda a atenção do ouvinte imediatamente. O objetivo é gerar curiosidade e engajamento.
+
+2. Filtro de Conteúdo (Manter o Sentido): Substitua qualquer conteúdo sensível (gore, cenas sexuais, xingamentos ou linguagem pesada) por versões mais leves. A nova versão deve manter o sentido e a gravidade da cena original.
+
+3. Tom de Voz (Casual): Use sempre o "português do dia a dia". A narração deve soar como um amigo contando uma história. Evite qualquer formalidade.
+
+4. Clareza para Narração: Expanda todas as abreviações para que o texto flua perfeitamente na leitura.
+   - Exemplo 1: "M32" deve virar "uma mulher de 32 anos".
+   - Exemplo 2: "H40" deve virar "um homem de 40 anos".
+   - Exemplo 3: "FDS" deve virar "fim de semana"."""
+
 def init_groq():
     """Inicializa cliente Groq (GRÁTIS!)"""
+    from groq import Groq
+    
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise ValueError("GROQ_API_KEY não encontrada no .env")
-    return Groq(api_key=api_key)
+    return Groq(api_key=api_key, timeout=LLM_TIMEOUT, max_retries=1)
+
+def _model(name):
+    """Provedor do roteador: uma chamada ao Groq com um modelo fixo"""
+    def create(client, **request):
+        return client.chat.completions.create(model=name, timeout=LLM_TIMEOUT, **request)
+    return create
+
+def get_router():
+    """
+    Roteador de modelos do LLM do processo (ver provider_router.py)
+
+    Sem hedge: duas gerações em paralelo gastam o limite grátis do Groq e não
+    são intercambiáveis num bundle de replay; failover, prazo e circuit breaker valem
+    """
+    global _router
+    if _router is None:
+        from provider_router import ProviderRouter
+        _router = ProviderRouter("llm", {name: _model(name) for name in LLM_MODELS}, deadline=LLM_DEADLINE, hedge=False)
+    return _router
+
+def complete(client, **request):
+    """
+    Chat completion com failover entre os modelos de LLM_MODELS
+
+    Args:
+        client: Cliente Groq (init_groq)
+        **request: messages, temperature, max_tokens...
+
+    Returns:
+        Resposta do Groq (exceção se nenhum modelo responder, como uma chamada direta)
+    """
+    model, response = get_router().call(client, **request)
+    if response is None:
+        raise Exception("nenhum modelo do LLM respondeu")
+    return response
 
 def summarize_text(title, text, max_duration=60):
     """
@@ -35,16 +95,7 @@ A partir de agora, você é meu "Roteirista de Impacto". Sua única função é
 
 Regras de Adaptação (Obrigatórias):
 
-1. Maximizar o Impacto: Reescreva a história focando nos pontos de virada e emoções. Use uma linguagem que prenda a atenção do ouvinte imediatamente. O objetivo é gerar curiosidade e engajamento.
-
-2. Filtro de Conteúdo (Manter o Sentido): Substitua qualquer conteúdo sensível (gore, cenas sexuais, xingamentos ou linguagem pesada) por versões mais leves. A nova versão deve manter o sentido e a gravidade da cena original.
-
-3. Tom de Voz (Casual): Use sempre o "português do dia a dia". A narração deve soar como um amigo contando uma história. Evite qualquer formalidade.
-
-4. Clareza para Narração: Expanda todas as abreviações para que o texto flua perfeitamente na leitura.
-   - Exemplo 1: "M32" deve virar "uma mulher de 32 anos".
-   - Exemplo 2: "H40" deve virar "um homem de 40 anos".
-   - Exemplo 3: "FDS" deve virar "fim de semana".
+{ADAPTATION_RULES}
 
 5. História Completa: A narração DEVE ter um início, meio e FIM claro. Não deixe a história em aberto ou cortada no meio. Conte a história completa com sua resolução ou conclusão.
 
@@ -69,8 +120,8 @@ Título: {title}
 {text}
 """
         
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # Modelo grátis e poderoso!
+        response = complete(
+            client,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.8,
             max_tokens=1200  # Aumentado para histórias de 60 segundos (~250 palavras)
@@ -96,12 +147,161 @@ Título: {title}
         # Remove linhas em branco múltiplas, mas mantém parágrafos
         adapted_text = "\n".join([line for line in adapted_text.split("\n") if line.strip()])
         
-        return adapted_text
+        # Abreviações, idades, moedas... que o LLM deixou passar (mesmo texto no TTS e nas legendas)
+        return normalize_text(adapted_text)
     
     except Exception as e:
         print(f"❌ Erro ao resumir texto: {e}")
         return None
 
+def plan_series_parts(text, words_per_part=400, max_parts=3):
+    """
+    Decide em quantas partes uma história deve ser contada
+    
+    Args:
+        text: Texto original da história
+        words_per_part: Palavras do original que cabem em um vídeo de ~60s
+        max_parts: Limite de partes
+    
+    Returns:
+        Quantidade de partes (1 = vídeo único)
+    """
+    words = len(text.split())
+    return max(1, min(max_parts, math.ceil(words / words_per_part)))
+
+def split_script_into_parts(script, parts):
+    """
+    Divide um roteiro em partes de tamanho parecido, sempre no fim de uma frase
+    
+    Args:
+        script: Roteiro completo
+        parts: Quantidade de partes
+    
+    Returns:
+        Lista de textos (pode ter menos partes se houver poucas frases)
+    """
+    sentences = [s for s in re.split(r"(?<=[.!?…])\s+", script.strip()) if s]
+    if parts <= 1 or len(sentences) <= 1:
+        return [script.strip()] if script.strip() else []
+    
+    total = sum(len(s.split()) for s in sentences)
+    result = []
+    current = []
+    words_so_far = 0
+    
+    for sentence in sentences:
+        current.append(sentence)
+        words_so_far += len(sentence.split())
+        # Fecha a parte quando passa da fronteira proporcional (k/parts do total)
+        if len(result) < parts - 1 and words_so_far >= total * (len(result) + 1) / parts:
+            result.append(" ".join(current))
+            current = []
+    
+    if current:
+        result.append(" ".join(current))
+    return result
+
+def parse_series_response(response):
+    """
+    Extrai as partes de uma resposta no formato "PARTE 1: ... PARTE 2: ..."
+    
+    Args:
+        response: Texto devolvido pelo LLM
+    
+    Returns:
+        Lista de textos na ordem das partes (vazia se não houver marcadores)
+    """
+    # Ignora a cópia da história original, se o modelo repetir
+    response = response.split("HISTÓRIA ORIGINAL:")[0]
+    
+    # Aceita "PARTE 1:", "**PARTE 1:**" e "**PARTE 1**:"
+    pieces = re.split(r"\**PARTE\s+(\d+)\s*\**\s*:\**", response, flags=re.IGNORECASE)
+    
+    parts = {}
+    # re.split com um grupo: [antes, número, texto, número, texto, ...]
+    for number, text in zip(pieces[1::2], pieces[2::2]):
+        text = "\n".join(line.strip() for line in text.split("\n") if line.strip())
+        if text:
+            parts[int(number)] = text.strip('"').strip()
+    
+    return [parts[n] for n in sorted(parts)]
+
+def summarize_series(title, text, parts=2, max_duration=60):
+    """
+    Adapta uma história longa em uma série (Parte 1, Parte 2...) com ganchos entre as partes
+    
+    Args:
+        title: Título da história
+        text: Texto completo
+        parts: Quantidade de partes
+        max_duration: Duração de cada parte em segundos
+    
+    Returns:
+        Lista de roteiros, um por parte (None em caso de falha)
+    """
+    if parts <= 1:
+        script = summarize_text(title, text, max_duration=max_duration)
+        return [script] if script else None
+    
+    try:
+        client = init_groq()
+        
+        max_words = int((max_duration / 60) * 250)
+        
+        prompt = f"""
+A partir de agora, você é meu "Roteirista de Impacto". Transforme a história abaixo em uma SÉRIE de {parts} vídeos curtos, narrados em sequência no meu canal de Shorts.
+
+Regras de Adaptação (Obrigatórias):
+
+{ADAPTATION_RULES}
+
+5. Série Completa: Juntas, as partes contam a história INTEIRA, com início, meio e FIM claro na última parte. Não pule acontecimentos importantes: a série existe para aproveitar a história toda.
+
+6. Ganchos entre as Partes:
+   - Cada parte, exceto a última, termina em um momento de suspense que faça o ouvinte querer ver a próxima
+   - A partir da parte 2, comece com uma frase curta relembrando o que aconteceu antes
+   - A última parte termina com um FINAL impactante, surpreendente ou que faça o ouvinte refletir
+
+7. Duração OBRIGATÓRIA: Cada parte DEVE ter aproximadamente {max_words} palavras (cerca de {max_duration} segundos).
+
+8. NÃO use emojis ou markdown na narração.
+
+Formato de Saída (Obrigatório):
+Sua resposta final deve seguir exatamente esta estrutura, com {parts} partes:
+
+PARTE 1:
+[Texto da parte 1]
+
+PARTE 2:
+[Texto da parte 2]
+
+HISTÓRIA ORIGINAL:
+Título: {title}
+
+{text}
+"""
+        
+        response = complete(
+            client,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.8,
+            max_tokens=min(1200 * parts, 6000)
+        )
+        
+        full_response = response.choices[0].message.content.strip()
+        scripts = parse_series_response(full_response)
+        
+        # Sem marcadores: divide o texto nas frases mais próximas das fronteiras
+        if len(scripts) < 2:
+            print("⚠️ Resposta sem marcadores de parte, dividindo pelo tamanho...")
+            scripts = split_script_into_parts(full_response.split("HISTÓRIA ORIGINAL:")[0], parts)
+        
+        return [normalize_text(script) for script in scripts] or None
+    
+    except Exception as e:
+        print(f"❌ Erro ao criar série: {e}")
+        return None
+
 def generate_title_and_hashtags(story_text):
     """
     Gera título chamativo e hashtags para o vídeo
@@ -128,8 +328,8 @@ TÍTULO: [título aqui]
 HASHTAGS: tag1, tag2, tag3, tag4, tag5
 """
         
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        response = complete(
+            client,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=150
@@ -0,0 +1,64 @@
+"""
+🧪 Teste da mixagem de áudio (loudness EBU R128 + ducking)
+"""
+
+import numpy as np
+from audio_mix import (
+    measure_integrated_loudness,
+    normalize_loudness,
+    mix_narration_with_music,
+    SAMPLE_RATE
+)
+
+def make_sine(freq=997, amplitude=1.0, seconds=5.0, channels=2):
+    """Gera um seno estéreo de teste"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    wave = amplitude * np.sin(2 * np.pi * freq * t)
+    return np.repeat(wave[:, np.newaxis], channels, axis=1)
+
+def test_loudness_reference_sine():
+    """Seno de 997 Hz a 0 dBFS em um canal mede -3.01 LUFS (BS.1770)"""
+    print("🔍 Testando medição de loudness...")
+    loudness = measure_integrated_loudness(make_sine(channels=1))
+    print(f"   Medido: {loudness:.2f} LUFS")
+    assert abs(loudness - (-3.01)) < 0.1
+
+def test_loudness_silence():
+    """Silêncio fica abaixo do gate absoluto"""
+    print("🔍 Testando silêncio...")
+    assert measure_integrated_loudness(np.zeros((SAMPLE_RATE * 2, 2))) == float("-inf")
+
+def test_normalize_reaches_target():
+    """Normalização leva o áudio ao alvo sem passar do teto de pico"""
+    print("🔍 Testando normalização...")
+    quiet = make_sine(amplitude=0.05)
+    normalized, gain_db = normalize_loudness(quiet, target_lufs=-14.0, peak_ceiling_db=-1.0)
+    loudness = measure_integrated_loudness(normalized)
+    print(f"   Ganho: {gain_db:+.1f} dB → {loudness:.2f} LUFS")
+    assert abs(loudness - (-14.0)) < 0.1
+    assert np.abs(normalized).max() <= 10 ** (-1.0 / 20) + 1e-9
+
+def test_music_is_ducked_during_speech():
+    """Música fica mais baixa onde há narração do que nas pausas"""
+    print("🔍 Testando ducking...")
+    seconds = 6.0
+    narration = make_sine(freq=300, amplitude=0.3, seconds=seconds)
+    narration[int(2 * SAMPLE_RATE):int(4 * SAMPLE_RATE)] = 0.0  # Pausa no meio
+    music = make_sine(freq=80, amplitude=0.3, seconds=1.0)
+
+    mixed = mix_narration_with_music(narration, music, duck_db=-12.0, fade=0.1)
+    music_only = mixed - narration
+
+    speech = slice(int(0.5 * SAMPLE_RATE), int(1.5 * SAMPLE_RATE))
+    pause = slice(int(2.8 * SAMPLE_RATE), int(3.2 * SAMPLE_RATE))
+    ratio_db = 20 * np.log10(np.abs(music_only[speech]).max() / np.abs(music_only[pause]).max())
+    print(f"   Música na fala vs pausa: {ratio_db:.1f} dB")
+    assert ratio_db < -9.0
+    assert mixed.shape == narration.shape
+
+if __name__ == "__main__":
+    test_loudness_reference_sine()
+    test_loudness_silence()
+    test_normalize_reaches_target()
+    test_music_is_ducked_during_speech()
+    print("\n🎉 Mixagem de áudio funcionando!")
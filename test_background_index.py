@@ -0,0 +1,90 @@
+"""
+🧪 Teste do índice de vídeos de fundo (características + seleção)
+"""
+
+import random
+import subprocess
+
+import numpy as np
+
+import background_index
+from background_index import caption_quality, compute_features, select_backgrounds, update_index
+
+def make_video(path, source, seconds=1):
+    """Vídeo sintético 16:9 gerado pelo ffmpeg (lavfi)"""
+    from imageio_ffmpeg import get_ffmpeg_exe
+    subprocess.run(
+        [get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"{source}:s=160x90:d={seconds}",
+         "-pix_fmt", "yuv420p", str(path)],
+        check=True
+    )
+
+def entry(brightness=0.4, caption_brightness=0.4, motion=0.03, hist=None):
+    hist = hist if hist is not None else [1.0] + [0.0] * 63
+    return {"brightness": brightness, "caption_brightness": caption_brightness, "motion": motion, "histogram": hist}
+
+def test_features_from_synthetic_frames():
+    """Brilho, faixa da legenda, movimento e cor dominante vêm dos pixels"""
+    frames = np.zeros((4, 64, 36, 3), dtype=np.uint8)
+    frames[:, 32:42] = 255          # Faixa da legenda clara
+    frames[1::2, :8] = (200, 0, 0)  # Bloco vermelho piscando = movimento
+
+    features = compute_features(frames)
+
+    assert features["caption_brightness"] > 0.9
+    assert features["brightness"] < 0.3
+    assert features["motion"] > 0
+    assert features["palette"][0][:3] == [32, 32, 32]  # Preto domina
+    assert abs(sum(features["histogram"]) - 1) < 1e-3
+
+def test_update_index_is_incremental(tmp_path, monkeypatch):
+    """Só vídeos novos são decodificados; removidos saem do índice"""
+    make_video(tmp_path / "branco.mp4", "color=c=white")
+    make_video(tmp_path / "teste.mp4", "testsrc=r=25")
+
+    entries = update_index(str(tmp_path), ["branco.mp4", "teste.mp4"])
+    assert entries["branco.mp4"]["brightness"] > 0.9
+    assert entries["teste.mp4"]["motion"] > entries["branco.mp4"]["motion"]
+
+    calls = []
+    original = background_index.sample_frames
+    monkeypatch.setattr(background_index, "sample_frames", lambda path, **kw: calls.append(path) or original(path, **kw))
+
+    make_video(tmp_path / "preto.mp4", "color=c=black")
+    entries = update_index(str(tmp_path), ["teste.mp4", "preto.mp4"])
+
+    assert len(calls) == 1 and calls[0].endswith("preto.mp4")
+    assert sorted(entries) == ["preto.mp4", "teste.mp4"]
+
+def test_caption_quality_penalizes_bright_band_and_dark_video():
+    """Faixa clara apaga legenda branca; vídeo quase preto também perde nota"""
+    assert caption_quality(entry()) == 1.0
+    assert caption_quality(entry(caption_brightness=0.95)) < 0.5
+    assert caption_quality(entry(brightness=0.03)) < 0.5
+
+def test_select_distinct_consistent_backgrounds():
+    """Sem repetir arquivo, evitando fundos ruins e preferindo paletas parecidas"""
+    warm = [1.0] + [0.0] * 63
+    cold = [0.0] * 63 + [1.0]
+    entries = {
+        "a.mp4": entry(hist=warm),
+        "b.mp4": entry(hist=warm),
+        "c.mp4": entry(hist=warm),
+        "frio.mp4": entry(hist=cold),
+        "claro.mp4": entry(caption_brightness=0.95, hist=warm),
+    }
+
+    for seed in range(10):
+        chosen = select_backgrounds(entries, 3, rng=random.Random(seed))
+        assert len(set(chosen)) == 3
+        assert "claro.mp4" not in chosen
+
+    # Só os quentes ficam juntos quando o primeiro sorteado é quente
+    chosen = select_backgrounds({k: v for k, v in entries.items() if k != "claro.mp4"}, 2, rng=random.Random(0))
+    assert ("frio.mp4" in chosen) == (chosen[0] == "frio.mp4")
+
+def test_select_reuses_only_when_needed():
+    """Com menos vídeos que o pedido, repete (o decoder é compartilhado)"""
+    chosen = select_backgrounds({"a.mp4": entry(), "b.mp4": entry()}, 4, rng=random.Random(1))
+    assert sorted(set(chosen)) == ["a.mp4", "b.mp4"]
+    assert chosen[2:] == chosen[:2]
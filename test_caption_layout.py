@@ -0,0 +1,103 @@
+"""
+🧪 Teste do layout das legendas por trecho do fundo
+"""
+
+import os
+
+import numpy as np
+
+from background_index import GRID_BANDS, compute_features
+from caption_layout import caption_placement, plan_caption_layout, segment_stats
+
+def grid_entry(bright_rows=(), busy_rows=(), samples=8, fps=4):
+    """Entrada do índice com faixas claras e/ou agitadas escolhidas"""
+    luma = np.full((samples, GRID_BANDS), 0.2)
+    busy = np.full((samples, GRID_BANDS), 0.02)
+    luma[:, list(bright_rows)] = 0.95
+    busy[:, list(busy_rows)] = 0.3
+    return {"sample_fps": fps, "band_luma": luma.tolist(), "band_busy": busy.tolist()}
+
+def test_band_grid_from_frames():
+    """A grade do índice localiza a faixa clara e a faixa com textura"""
+    frames = np.zeros((2, 64, 36, 3), dtype=np.uint8)
+    frames[:, 32:36] = 255              # Faixa 8 clara
+    frames[:, 48:52, ::2] = 255         # Faixa 12 listrada (agitada)
+
+    features = compute_features(frames)
+    luma = np.array(features["band_luma"])
+    busy = np.array(features["band_busy"])
+
+    assert luma.shape == (2, GRID_BANDS)
+    assert luma[0].argmax() == 8
+    assert busy[0].argmax() == 12
+
+def test_plan_moves_caption_off_bright_band():
+    """Fundo claro no centro empurra a legenda; fundo escuro fica no padrão"""
+    segments = [
+        {"name": "claro.mp4", "source_start": 0, "start": 0, "end": 2},
+        {"name": "escuro.mp4", "source_start": 0, "start": 2, "end": 4},
+        {"name": "sem_indice.mp4", "source_start": 0, "start": 4, "end": 6},
+    ]
+    entries = {"claro.mp4": grid_entry(bright_rows=range(8, 11)), "escuro.mp4": grid_entry()}
+
+    layout = plan_caption_layout(segments, entries)
+
+    assert layout[0]["caption_y"] != 0.50
+    assert layout[0]["box_opacity"] == 0.0
+    assert layout[1]["caption_y"] == 0.50 and layout[1]["box_opacity"] == 0.0
+    assert layout[2]["stats"] is None and layout[2]["caption_y"] == 0.50
+
+def test_box_when_no_clean_band():
+    """Sem faixa legível em lugar nenhum: caixa escura atrás do texto"""
+    segments = [{"name": "claro.mp4", "source_start": 0, "start": 0, "end": 2}]
+    entries = {"claro.mp4": grid_entry(bright_rows=range(GRID_BANDS), busy_rows=range(GRID_BANDS))}
+
+    item = plan_caption_layout(segments, entries)[0]
+    assert item["box_opacity"] > 0
+
+    # Formato com altura fixa também recebe a caixa medida na sua posição
+    assert caption_placement([item], 0.5, fixed_y=0.3) == (0.3, item["box_opacity"])
+    assert caption_placement(None, 0.5) == (0.50, 0.0)
+
+def test_segment_stats_wraps_looped_background():
+    """Trecho além do fim do vídeo de origem volta ao começo (fundo em loop)"""
+    entry = grid_entry(samples=4)
+    entry["band_luma"][0] = [0.9] * GRID_BANDS  # Só a primeira amostra é clara
+
+    looped = segment_stats(entry, source_start=0.5, duration=1.0)   # Amostras 2, 3, 0, 1
+    assert looped["luma"].max() > 0.5
+    inside = segment_stats(entry, source_start=0.25, duration=0.5)  # Amostras 1, 2
+    assert inside["luma"].max() < 0.5
+
+def test_render_formats_uses_layout(tmp_path):
+    """Formato automático segue o layout e desenha a caixa escura sob o texto"""
+    from moviepy.editor import ColorClip, VideoFileClip
+    from export_formats import render_formats
+    from subtitle_store import SubtitleImageStore
+
+    clip = ColorClip((64, 128), color=(255, 255, 255), duration=0.2)
+
+    caption = np.zeros((40, 60, 4), dtype=np.uint8)
+    caption[10:14, 10:30] = (255, 0, 0, 255)
+    store = SubtitleImageStore()
+    key, offset = store.add(caption)
+    track = {
+        "store": store,
+        "timeline": [{"key": (key, offset), "start_frame": 0, "end_frame": 6}],
+        "box_x": 2, "box_width": 60, "box_height": 40
+    }
+    specs = {"auto": {"crop": (64, 128), "size": (64, 128), "caption_y": None, "crf": 18, "bitrate": None}}
+    layout = [{"start": 0, "end": 1, "caption_y": 0.25, "box_opacity": 0.6, "stats": None}]
+
+    outputs = render_formats(clip, None, str(tmp_path / "video.mp4"), ["auto"], track=track, fps=30, preset="ultrafast", threads=1, specs=specs, layout=layout)
+
+    result = VideoFileClip(outputs["auto"])
+    first = result.get_frame(0)
+    result.close()
+    assert os.path.exists(outputs["auto"])
+
+    # Texto em y = 0.25 * 128 + 10; caixa escurece logo acima dele
+    text_y = 32 + 10
+    assert first[text_y + 1, 25, 0] > 200 and first[text_y + 1, 25, 1] < 80
+    assert first[text_y - 5, 25].max() < 160
+    assert first[5, 5].min() > 200  # Fora da caixa o fundo continua branco
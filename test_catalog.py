@@ -0,0 +1,114 @@
+"""
+🧪 Teste do catálogo de vídeos (SQLite com histórico e métricas)
+"""
+
+import os
+
+import catalog
+import tracing
+
+STORY = {"id": "fx0002", "subreddit": "tifu", "title": "TIFU com um meme", "score": 9320, "url": "https://reddit.com/fx0002"}
+
+def traced_job(job_id, trace_dir, backgrounds=("bg1.mp4", "bg2.mp4"), duration=42.5):
+    """Tracer com as etapas que o pipeline grava (sem rodar o pipeline)"""
+    tracer = tracing.JobTracer(job_id, trace_dir=trace_dir)
+    with tracer.stage("fetch"):
+        pass
+    with tracer.stage("background_prep", videos_count=len(backgrounds)) as span:
+        span.attrs["backgrounds"] = list(backgrounds)
+        span.attrs["duration"] = duration
+    with tracer.stage("encode"):
+        pass
+    return tracer
+
+def test_record_and_query(tmp_path):
+    """Linha do job com post, voz, fundos, duração, arquivos e etapas; consultas por post e subreddit"""
+    db_path = str(tmp_path / "catalog.db")
+    tracer = traced_job("job1", str(tmp_path))
+    job = {
+        "job_id": "job1",
+        "story": STORY,
+        "metadata": {"title": "Mandei o meme pro chefe", "hashtags": ["shorts", "tifu"]},
+        "voice": {"provider": "edge", "voice": "adam"},
+        "result": {"video": "video_job1.mp4", "thumbnail": "video_job1_thumb.jpg", "formats": {"shorts": "video_job1.mp4", "lowres": "video_job1_lowres.mp4"}}
+    }
+
+    assert catalog.record_job(job, tracer, "ok", db_path=db_path) == "job1"
+
+    conn = catalog.connect(db_path)
+    video = catalog.get_video(conn, "job1")
+    assert video["post_id"] == "fx0002" and video["subreddit"] == "tifu"
+    assert video["voice"] == "adam"
+    assert video["backgrounds"] == ["bg1.mp4", "bg2.mp4"]
+    assert video["audio_duration"] == 42.5
+    assert video["hashtags"] == ["shorts", "tifu"]
+    assert video["outputs"] == ["video_job1.mp4", "video_job1_lowres.mp4", "video_job1_thumb.jpg"]
+    assert [stage["stage"] for stage in video["stages"]] == ["fetch", "background_prep", "encode"]
+
+    assert [row["job_id"] for row in catalog.find_post(conn, "fx0002")] == ["job1"]
+    assert catalog.list_videos(conn, subreddit="confessions") == []
+    assert {row["stage"] for row in catalog.stage_stats(conn)} == {"fetch", "background_prep", "encode"}
+    conn.close()
+
+def test_rerecord_replaces_job(tmp_path):
+    """Gravar o mesmo job de novo não duplica linha nem etapas"""
+    db_path = str(tmp_path / "catalog.db")
+    tracer = traced_job("job2", str(tmp_path))
+    catalog.record_job({"job_id": "job2", "story": STORY}, tracer, "failed", db_path=db_path)
+    catalog.record_job({"job_id": "job2", "story": STORY, "result": {"video": "v.mp4"}}, tracer, "ok", db_path=db_path)
+
+    conn = catalog.connect(db_path)
+    assert [row["status"] for row in catalog.list_videos(conn)] == ["ok"]
+    assert conn.execute("SELECT COUNT(*) FROM stages").fetchone()[0] == 3
+    assert catalog.subreddit_stats(conn)[0]["failed"] == 0
+    conn.close()
+
+def test_main_records_failed_job(tmp_path, monkeypatch):
+    """main() grava o job no fim mesmo quando o pipeline falha no meio"""
+    import main
+
+    def failing_pipeline(*args, job=None, **kwargs):
+        job["story"] = STORY
+        return None
+
+    db_path = str(tmp_path / "catalog.db")
+    monkeypatch.setattr(catalog, "CATALOG_PATH", db_path)
+    monkeypatch.setattr(main, "run_pipeline", failing_pipeline)
+    tracing.configure(trace_dir=str(tmp_path))
+    try:
+        assert main.main(output_dir=str(tmp_path)) is None
+    finally:
+        tracing.configure(trace_dir=tracing.TRACE_DIR)
+
+    conn = catalog.connect(db_path)
+    rows = catalog.list_videos(conn)
+    assert len(rows) == 1
+    assert rows[0]["status"] == "failed" and rows[0]["post_id"] == "fx0002"
+    assert rows[0]["outputs"] == []
+    conn.close()
+    assert os.path.exists(db_path)
+
+def test_catalog_follows_output_dir(tmp_path, monkeypatch):
+    """Pasta de saída própria (benchmark, testes) = catálogo próprio; o padrão não é tocado"""
+    import main
+
+    def pipeline(*args, job=None, **kwargs):
+        job["story"] = dict(STORY, text="Hoje eu estraguei tudo com um meme no grupo da família inteira. " * 5)
+        return {"video": "video.mp4"}
+
+    default_path = str(tmp_path / "producao" / "catalog.db")
+    monkeypatch.setattr(catalog, "CATALOG_PATH", default_path)
+    monkeypatch.setattr(main, "run_pipeline", pipeline)
+    tracing.configure(trace_dir=str(tmp_path / "traces"))
+    try:
+        assert main.main(output_dir=str(tmp_path / "saida"))
+    finally:
+        tracing.configure(trace_dir=tracing.TRACE_DIR)
+
+    assert not os.path.exists(default_path)
+    assert catalog.catalog_path(str(tmp_path / "saida")) == str(tmp_path / "saida" / "catalog.db")
+    assert catalog.catalog_path("assets/output/") == default_path
+    conn = catalog.connect(str(tmp_path / "saida" / "catalog.db"))
+    assert [row["post_id"] for row in catalog.list_videos(conn)] == ["fx0002"]
+    assert conn.execute("SELECT COUNT(*) FROM story_signatures").fetchone()[0] == 1
+    conn.close()
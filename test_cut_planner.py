@@ -0,0 +1,101 @@
+"""
+🧪 Teste dos pontos de corte entre vídeos de fundo
+"""
+
+import random
+
+import numpy as np
+
+from background_index import compute_features
+from cut_planner import choose_source_start, plan_background_segments, plan_boundaries, sentence_boundaries
+
+def words_from(text, start=0.0, step=0.4, pauses=None):
+    """Palavras com timestamps fixos; pauses = {índice da palavra: pausa extra depois dela}"""
+    words = []
+    t = start
+    for index, token in enumerate(text.split()):
+        words.append({"text": token, "start": t, "end": t + step - 0.05})
+        t += step + (pauses or {}).get(index, 0)
+    return words
+
+def test_sentence_boundaries():
+    """Ponto final vale mais que pausa; palavras coladas não são quebra"""
+    words = words_from("Eu saí cedo. Ela ficou em casa", pauses={4: 0.5})
+    boundaries = sentence_boundaries(words)
+
+    assert boundaries[0][1] == 1.0 and 1.1 < boundaries[0][0] < 1.2   # Depois de "cedo."
+    assert boundaries[1][1] == 0.5                                     # Pausa depois de "ficou"
+    assert len(boundaries) == 2
+
+def test_plan_boundaries_snaps_to_sentence_end():
+    """Troca vai para o fim de frase mais próximo dentro da janela"""
+    assert plan_boundaries(30, 3) == [0.0, 10.0, 20.0, 30]
+
+    cuts = plan_boundaries(30, 3, [(8.5, 1.0), (11.0, 0.5), (25.0, 1.0), (21.0, 1.0)])
+    assert cuts == [0.0, 8.5, 21.0, 30]
+
+    # Quebra fora da janela é ignorada
+    assert plan_boundaries(30, 3, [(3.0, 1.0)])[1] == 10.0
+
+def test_scene_cuts_and_motion_in_index():
+    """Troca brusca de cena vira scene_cut; movimento por amostra vem das diferenças"""
+    frames = np.zeros((8, 64, 36, 3), dtype=np.uint8)
+    frames[4:] = 230  # Cena clara a partir da amostra 4 (1s a 4 fps)
+
+    features = compute_features(frames)
+
+    assert features["scene_cuts"] == [1.0]
+    assert features["sample_motion"][4] > 0.8
+    assert max(features["sample_motion"][:4]) == 0
+
+def test_choose_source_start_avoids_motion_and_flashes():
+    """Entrada e saída em momentos calmos, sem cortar logo antes/depois de troca de cena"""
+    motion = [0.2] * 40
+    motion[8:11] = [0.0] * 3    # Calmo em 2-2.5s
+    motion[28:31] = [0.0] * 3   # Calmo em 7-7.5s
+    entry = {"sample_fps": 4, "sample_motion": motion, "scene_cuts": []}
+
+    for seed in range(5):
+        start = choose_source_start(entry, 10.0, 5.0, rng=random.Random(seed), choices=1)
+        assert 2.0 <= start <= 2.5
+
+    entry["scene_cuts"] = [2.5]  # Troca de cena logo depois da entrada calma
+    start = choose_source_start(entry, 10.0, 5.0, rng=random.Random(0), choices=1)
+    assert not 1.75 < start < 2.5
+
+    # Sem índice: sorteio dentro do vídeo
+    assert 0 <= choose_source_start(None, 10.0, 5.0, rng=random.Random(0)) <= 5.0
+
+def test_segments_cover_duration_with_overlap():
+    """Trechos contíguos; todos menos o último continuam durante o crossfade"""
+    sources = [("a/um.mp4", 20.0), ("a/dois.mp4", 20.0), ("a/tres.mp4", 3.0)]
+    words = words_from("Primeira frase aqui. Segunda frase longa agora. Fim.", step=1.2)
+
+    segments = plan_background_segments(sources, 9.0, words=words, overlap=0.5, rng=random.Random(0))
+
+    assert [s["name"] for s in segments] == ["um.mp4", "dois.mp4", "tres.mp4"]
+    assert segments[0]["start"] == 0 and segments[-1]["end"] == 9.0
+    assert all(a["end"] == b["start"] for a, b in zip(segments, segments[1:]))
+    assert abs(segments[0]["end"] - 3.575) < 1e-6  # Pausa depois de "aqui."
+    assert segments[0]["length"] == segments[0]["end"] + 0.5
+    assert segments[-1]["length"] == segments[-1]["end"] - segments[-1]["start"]
+
+def test_crossfade_only_on_overlap():
+    """Com crossfade, só os frames da transição misturam os dois fundos"""
+    from moviepy.editor import ColorClip
+    from video_generate import join_backgrounds
+
+    segments = [{"start": 0, "end": 1.0}, {"start": 1.0, "end": 2.0}]
+    clips = [ColorClip((16, 16), color=(0, 0, 0), duration=1.5), ColorClip((16, 16), color=(200, 200, 200), duration=1.0)]
+
+    joined = join_backgrounds(clips, segments, crossfade=0.5)
+
+    assert abs(joined.duration - 2.0) < 1e-6
+    assert joined.get_frame(0.5).max() == 0
+    assert 50 < joined.get_frame(1.25)[0, 0, 0] < 150  # Meio da transição
+    assert joined.get_frame(1.75).min() == 200
+
+def test_short_audio_splits_evenly():
+    """Áudio menor que o mínimo por trecho: divisão igual em vez de trecho encolhido"""
+    cuts = plan_boundaries(4.0, 3)
+    assert [round(c, 3) for c in cuts] == [0.0, 1.333, 2.667, 4.0]
@@ -0,0 +1,117 @@
+"""
+🧪 Teste da exportação multi-formato (uma decodificação, vários encoders)
+"""
+
+import os
+import numpy as np
+import pytest
+
+from export_formats import crop_box, format_output_path, parse_formats, paste_rgba, render_formats
+from subtitle_store import SubtitleImageStore
+
+def test_parse_formats():
+    """Nomes válidos, sem repetição, e erro para formato desconhecido"""
+    assert parse_formats("shorts, square,shorts") == ["shorts", "square"]
+    assert parse_formats(["lowres"]) == ["lowres"]
+    with pytest.raises(ValueError):
+        parse_formats("shorts,vhs")
+
+def test_output_path_and_crop_box():
+    """Caminho por formato e recorte centralizado no vídeo base"""
+    assert format_output_path("out/video_1.mp4", "square") == "out/video_1_square.mp4"
+    assert crop_box((1080, 1920), (1080, 1080)) == (0, 420, 1080, 1500)
+    assert crop_box((1080, 1920), (1080, 1920)) == (0, 0, 1080, 1920)
+
+def test_paste_rgba_blends_and_clips():
+    """Alpha blending in-place, cortando o que sai do frame"""
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    image = np.zeros((4, 4, 4), dtype=np.uint8)
+    image[:, :, 0] = 255
+    image[:, :2, 3] = 255   # Metade opaca
+    image[:, 2:, 3] = 128   # Metade semi-transparente
+
+    paste_rgba(frame, image, 8, -2)
+
+    assert frame[0, 8, 0] == 255 and frame[1, 9, 0] == 255
+    assert frame[0, 0, 0] == 0
+    assert frame[2:, :, :].sum() == 0
+
+    paste_rgba(frame, image, 20, 20)  # Totalmente fora: nada muda
+
+def test_render_formats_single_pass(tmp_path):
+    """Cada formato sai com seu tamanho e sua legenda, a partir do mesmo clip"""
+    from moviepy.editor import ColorClip, VideoFileClip
+
+    clip = ColorClip((64, 128), color=(0, 0, 255), duration=0.5)
+
+    caption = np.zeros((40, 60, 4), dtype=np.uint8)
+    caption[10:20, 10:30] = (255, 255, 255, 255)
+    store = SubtitleImageStore()
+    key, offset = store.add(caption)
+    track = {
+        "store": store,
+        "timeline": [{"key": (key, offset), "start_frame": 0, "end_frame": 15}],
+        "box_x": 2, "box_width": 60, "box_height": 40
+    }
+    specs = {
+        "tall": {"crop": (64, 128), "size": (64, 128), "caption_y": 0.25, "crf": 18, "bitrate": None},
+        "small": {"crop": (64, 128), "size": (32, 64), "caption_y": 0.25, "crf": None, "bitrate": "200k"},
+        "square": {"crop": (64, 64), "size": (64, 64), "caption_y": 0.50, "crf": 18, "bitrate": None},
+    }
+
+    outputs = render_formats(clip, None, str(tmp_path / "video.mp4"), list(specs), track=track, fps=30, preset="ultrafast", threads=1, specs=specs)
+
+    sizes = {}
+    for name, path in outputs.items():
+        assert os.path.exists(path)
+        result = VideoFileClip(path)
+        sizes[name] = tuple(result.size)
+        first = result.get_frame(0)
+        result.close()
+
+        # Legenda branca aparece na posição do formato (y = caption_y * altura do crop)
+        crop_h = specs[name]["crop"][1]
+        scale = specs[name]["size"][1] / crop_h
+        y = int((int(crop_h * specs[name]["caption_y"]) + 15) * scale)
+        x = int((12 + 10) * scale)
+        assert first[y, x].min() > 200, name
+        assert first[2, 2, 2] > 200 and first[2, 2, 0] < 60, name  # Fundo azul
+
+    assert sizes == {"tall": (64, 128), "small": (32, 64), "square": (64, 64)}
+
+def test_create_video_formats_releases_clips_on_error(tmp_path, monkeypatch):
+    """Falha no render multi-formato fecha a narração e os vídeos de fundo (sem leitores do ffmpeg sobrando)"""
+    from moviepy.editor import AudioFileClip, ColorClip, VideoFileClip
+    import export_formats
+    from offline_providers import synthesize_speech
+    from video_generate import create_video_formats
+
+    background_dir = tmp_path / "fundos"
+    background_dir.mkdir()
+    ColorClip((64, 128), color=(0, 0, 255), duration=3.0).write_videofile(str(background_dir / "azul.mp4"), fps=10, preset="ultrafast", logger=None)
+    audio_path, _ = synthesize_speech("Uma narração curta para o teste.", str(tmp_path / "audio_1.wav"))
+
+    opened, closed = [], []
+    for cls in (AudioFileClip, VideoFileClip):
+        original_init, original_close = cls.__init__, cls.close
+
+        def init(self, *args, _init=original_init, **kwargs):
+            _init(self, *args, **kwargs)
+            opened.append(self)
+
+        def close(self, _close=original_close):
+            closed.append(self)
+            _close(self)
+
+        monkeypatch.setattr(cls, "__init__", init)
+        monkeypatch.setattr(cls, "close", close)
+
+    def disk_full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(export_formats, "render_formats", disk_full)
+
+    outputs = create_video_formats(audio_path, str(tmp_path / "saida" / "video_1.mp4"), formats=("square",), background_dir=str(background_dir),
+                                   videos_count=1, add_subtitles=False, normalize_audio=False, music_dir=None, extras=False)
+    assert outputs is None
+    assert opened and all(clip in closed for clip in opened)
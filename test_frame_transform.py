@@ -0,0 +1,51 @@
+"""
+🧪 Teste do recorte 9:16 + redimensionamento vetorizado
+"""
+
+import numpy as np
+
+from frame_transform import VerticalFrameTransformer, vertical_crop_box
+
+def smooth_frame(width, height):
+    """Gradientes suaves (bilinear de implementações diferentes deve bater)"""
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    return np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2).astype(np.uint8)
+
+def test_crop_box():
+    """Largo corta nas laterais, alto corta em cima/embaixo, 9:16 fica inteiro"""
+    assert vertical_crop_box((1280, 720)) == (437, 0, 405, 720)
+    assert vertical_crop_box((1080, 2400)) == (0, 240, 1080, 1920)
+    assert vertical_crop_box((576, 1024)) == (0, 0, 576, 1024)
+
+def test_numpy_matches_pillow():
+    """Os dois kernels dão a mesma imagem, no tamanho do Shorts"""
+    frame = smooth_frame(1280, 720)
+    numpy_out = VerticalFrameTransformer((1280, 720), method="numpy")(frame)
+    pillow_out = VerticalFrameTransformer((1280, 720), method="pillow")(frame)
+
+    assert numpy_out.shape == pillow_out.shape == (1920, 1080, 3)
+    assert np.abs(numpy_out.astype(np.int16) - pillow_out)[2:-2, 2:-2].max() <= 2
+
+def test_reuses_output_buffer():
+    """Com out= o resultado é escrito no buffer dado, frame após frame"""
+    transformer = VerticalFrameTransformer((640, 480), method="numpy")
+    out = np.empty((1920, 1080, 3), dtype=np.uint8)
+
+    first = transformer(np.full((480, 640, 3), 10, dtype=np.uint8), out)
+    second = transformer(np.full((480, 640, 3), 200, dtype=np.uint8), out)
+
+    assert first is out and second is out
+    assert out.min() == out.max() == 200
+
+def test_create_vertical_video_uses_transformer():
+    """Clip vertical sai em 1080x1920 sem passar pelo resize do MoviePy"""
+    from moviepy.editor import ColorClip
+    from video_generate import create_vertical_video
+
+    source = ColorClip((1280, 720), color=(30, 120, 220), duration=2)
+    clip = create_vertical_video("colorido.mp4", 1.0, source=source, start_time=0.5)
+
+    assert tuple(clip.size) == (1080, 1920)
+    assert abs(clip.duration - 1.0) < 1e-6
+    assert tuple(clip.get_frame(0.2)[960, 540]) == (30, 120, 220)
@@ -0,0 +1,61 @@
+"""
+🧪 Teste do tempo de inicialização da CLI (python -X importtime)
+Falha se `python main.py --help` passar do orçamento ou carregar dependências pesadas
+"""
+
+import os
+import subprocess
+import sys
+
+# Orçamento de import da CLI em milissegundos (ajustável por variável de ambiente)
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "300"))
+
+HEAVY_MODULES = ("moviepy", "whisper", "torch", "numpy", "praw", "groq", "edge_tts", "gtts", "requests")
+
+def measure_cli_imports(*args):
+    """
+    Roda a CLI com -X importtime e lê o relatório do stderr
+
+    Returns:
+        Tupla (tempo total de import em ms, lista de módulos importados)
+    """
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", *args],
+        cwd=project_dir,
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stderr[-500:]
+
+    total_us = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append(name.strip())
+        # Só os imports de primeiro nível (sem indentação) somam no total
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+
+    return total_us / 1000, modules
+
+def test_help_within_budget():
+    """--help não pode estourar o orçamento de import"""
+    print("🔍 Medindo imports de 'python main.py --help'...")
+    total_ms, _ = measure_cli_imports("--help")
+    print(f"   ⏱️ {total_ms:.1f} ms (orçamento: {IMPORT_BUDGET_MS:.0f} ms)")
+    assert total_ms <= IMPORT_BUDGET_MS
+
+def test_help_skips_heavy_modules():
+    """--help não importa moviepy, whisper/torch, numpy nem clientes de API"""
+    print("🔍 Verificando dependências pesadas...")
+    _, modules = measure_cli_imports("--help")
+    loaded = [m for m in modules if m.split(".")[0] in HEAVY_MODULES]
+    assert not loaded, f"Importados no cold start: {loaded}"
+
+if __name__ == "__main__":
+    test_help_within_budget()
+    test_help_skips_heavy_modules()
+    print("\n🎉 Cold start da CLI dentro do orçamento!")
@@ -3,36 +3,24 @@
 """
 
 import os
-from subtitle_whisper import transcribe_audio_with_whisper, group_words_into_chunks, create_karaoke_text_image
+import tempfile
+from subtitle_whisper import group_words_into_chunks, create_karaoke_text_image
+from offline_providers import synthesize_speech
 from PIL import Image
 
-def test_karaoke_effect():
-    """Testa criação de imagens com efeito karaoke"""
+def test_karaoke_effect(tmp_path):
+    """Testa criação de imagens com efeito karaoke (narração e imagens em tmp_path)"""
     print("=" * 60)
     print("🎤 TESTE DO EFEITO KARAOKE")
     print("=" * 60)
     
-    # Procura áudio de teste
-    output_dir = "assets/output"
-    if not os.path.exists(output_dir):
-        print("⚠️ Pasta assets/output não existe")
-        return False
-    
-    audio_files = [f for f in os.listdir(output_dir) if f.endswith('.mp3')]
-    if not audio_files:
-        print("⚠️ Nenhum arquivo de áudio encontrado")
-        print("💡 Execute: python main.py")
-        return False
-    
-    audio_file = os.path.join(output_dir, sorted(audio_files)[-1])
-    print(f"📁 Usando: {os.path.basename(audio_file)}\n")
-    
-    # Transcreve
-    print("🎙️ Transcrevendo áudio...")
-    segments = transcribe_audio_with_whisper(audio_file, model_name="tiny")
+    # Narração sintética com tempos conhecidos (não depende de áudio em assets/output)
+    test_text = "Imagina estar dirigindo numa noite de Halloween quando de repente algo aparece na estrada."
+    audio_file, segments = synthesize_speech(test_text, os.path.join(tmp_path, "fixture.wav"))
+    print(f"📁 Usando narração sintética: {len(segments)} palavras\n")
     
     if not segments or len(segments) < 4:
-        print("❌ Transcrição falhou")
+        print("❌ Fixture de narração inválida")
         return False
     
     # Agrupa em chunks
@@ -48,7 +36,8 @@ def test_karaoke_effect():
     print(f"   Palavras: {len(first_chunk['words'])}")
     
     # Testa criação de imagens com cada palavra destacada
-    test_dir = "assets/output/karaoke_test"
+    # (assets/output/karaoke_test guarda exemplos versionados: o teste não sobrescreve)
+    test_dir = os.path.join(tmp_path, "karaoke_test")
     os.makedirs(test_dir, exist_ok=True)
     
     print(f"\n🎨 Gerando imagens de teste...\n")
@@ -88,7 +77,7 @@ def test_karaoke_effect():
     return True
 
 if __name__ == "__main__":
-    success = test_karaoke_effect()
+    success = test_karaoke_effect(tempfile.mkdtemp(prefix="karaoke_"))
     
     if success:
         print("\n✨ Sistema de karaoke funcionando!")
@@ -0,0 +1,53 @@
+"""
+Testes dos provedores offline e das estatísticas do benchmark
+"""
+
+import os
+import wave
+
+from offline_providers import FakeGroq, FakeReddit, OfflineProviders, synthesize_speech
+from bench_pipeline import latency_stats
+from provider_router import percentile
+
+def test_synthesize_speech_timings(tmp_path):
+    path, timings = synthesize_speech("Uma história curta. Com duas frases!", str(tmp_path / "fala.wav"))
+
+    assert [w["text"] for w in timings] == ["Uma", "história", "curta.", "Com", "duas", "frases!"]
+    for previous, current in zip(timings, timings[1:]):
+        assert previous["end"] < current["start"]
+
+    with wave.open(path) as f:
+        duration = f.getnframes() / f.getframerate()
+    assert duration >= timings[-1]["end"]
+
+def test_fake_groq_routes_prompts():
+    groq = FakeGroq(responses={"summaries": ["roteiro"], "metadata": ["TÍTULO: x"]})
+    summary = groq.chat.completions.create(messages=[{"role": "user", "content": "HISTÓRIA ADAPTADA:"}])
+    metadata = groq.chat.completions.create(messages=[{"role": "user", "content": "Gere um título"}])
+
+    assert summary.choices[0].message.content == "roteiro"
+    assert metadata.choices[0].message.content == "TÍTULO: x"
+    assert groq.calls == {"summaries": 1, "metadata": 1}
+
+def test_offline_providers_patch_and_restore(tmp_path):
+    import reddit_fetch
+    import tts_generate
+
+    original = tts_generate.generate_voice
+    with OfflineProviders() as providers:
+        assert isinstance(reddit_fetch.init_reddit(), FakeReddit)
+        audio = tts_generate.generate_voice("Olá mundo.", str(tmp_path / "audio.mp3"))
+        assert audio.endswith(".wav") and os.path.exists(audio)
+        assert providers.transcribe(audio)[0]["text"] == "Olá"
+
+    assert tts_generate.generate_voice is original
+
+def test_percentile_and_stats():
+    samples = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(samples, 50) == 2.5
+    assert percentile(samples, 100) == 4.0
+    assert percentile([], 50) is None
+
+    stats = latency_stats(samples)
+    assert stats["n"] == 4 and stats["p50"] == 2.5
+    assert stats["throughput_per_s"] == 0.4
@@ -0,0 +1,158 @@
+"""
+🧪 Teste do prefetch (próximo job adiantado durante o render) e do pool de histórias
+"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import prefetch
+from offline_providers import OfflineProviders, load_fixture
+
+def add_fake_entry(pool, post_id, created_at=None):
+    """Entrada pronta com uma narração falsa"""
+    tmp_dir = prefetch.new_entry_dir(pool)
+    audio_file = os.path.join(tmp_dir, "audio.wav")
+    with open(audio_file, "wb") as f:
+        f.write(b"RIFF")
+    inputs = {"story": {"id": post_id, "subreddit": "tifu", "title": "t"}, "adapted_text": "texto",
+              "metadata": {"title": "t", "hashtags": []}, "voice": {"provider": "edge"}, "audio_file": audio_file}
+    path = prefetch.publish_entry(tmp_dir, inputs)
+    if created_at is not None:
+        entry_file = os.path.join(path, prefetch.ENTRY_FILE)
+        with open(entry_file, encoding="utf-8") as f:
+            entry = json.load(f)
+        entry["created_at"] = created_at
+        with open(entry_file, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+    return path
+
+def test_pool_claim_and_prune(tmp_path):
+    """Entradas saem da mais antiga para a mais nova, com a narração no nome do job; velhas expiram"""
+    pool = prefetch.pool_dir(str(tmp_path))
+    os.makedirs(pool)
+    add_fake_entry(pool, "p1", created_at=time.time() - 10)
+    add_fake_entry(pool, "p2")
+    os.makedirs(os.path.join(pool, ".tmp_abandonada"))
+
+    inputs = prefetch.claim_entry(pool, str(tmp_path / "audio_123.mp3"))
+    assert inputs["story"]["id"] == "p1" and inputs["age_s"] >= 10
+    assert inputs["audio_file"] == str(tmp_path / "audio_123.wav") and os.path.exists(inputs["audio_file"])
+    assert [entry["story"]["id"] for entry in prefetch.pool_entries(pool)] == ["p2"]
+
+    # Temporária de um crash e entrada de 4 dias atrás somem; a de agora fica
+    add_fake_entry(pool, "p3", created_at=time.time() - 4 * 86400)
+    removed = prefetch.prune_pool(pool, now=time.time() + 2 * prefetch.STALE_TMP_S)
+    assert len(removed) == 2
+    assert [entry["story"]["id"] for entry in prefetch.pool_entries(pool)] == ["p2"]
+
+@pytest.fixture
+def isolated_batch(tmp_path, monkeypatch):
+    """Catálogo e traces em tmp_path, histórias em ordem fixa e um render falso que demora"""
+    import catalog
+    import reddit_fetch
+    import tracing
+    import video_generate
+
+    monkeypatch.setattr(catalog, "CATALOG_PATH", str(tmp_path / "catalog.db"))
+    tracing.configure(trace_dir=str(tmp_path / "traces"))
+
+    # A 1ª história volta na 2ª busca: o prefetch tem que pular a que está em uso
+    stories = [{"id": s["id"], "title": s["title"], "text": s["selftext"], "url": s["url"], "score": s["score"], "subreddit": s["subreddit"]}
+               for s in load_fixture("stories.json")]
+    queue = [stories[0], stories[0], stories[1], stories[2]]
+    lock = threading.Lock()
+
+    def next_story(*args, **kwargs):
+        with lock:
+            return dict(queue.pop(0)) if queue else None
+
+    rendered = []
+
+    def fake_create_video(audio_path, output_path, **options):
+        words = video_generate.transcribe_narration(audio_path)
+        time.sleep(1.1)  # Render (tempo para o prefetch adiantar o próximo)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(" ".join(word["text"] for word in words))
+        rendered.append(output_path)
+        return output_path
+
+    monkeypatch.setattr(reddit_fetch, "get_story_from_multiple_subs", next_story)
+    monkeypatch.setattr(video_generate, "create_video", fake_create_video)
+    yield tmp_path, rendered
+    tracing.configure(trace_dir=tracing.TRACE_DIR)
+
+def test_batch_uses_prefetched_story(isolated_batch):
+    """O 2º vídeo usa a história adiantada no render do 1º; a que sobra fica no pool"""
+    import tracing
+    from main import batch_generate
+
+    tmp_path, rendered = isolated_batch
+    output_dir = str(tmp_path / "saida")
+
+    with OfflineProviders():
+        batch_generate(2, prefetch=1, output_dir=output_dir)
+
+    first, second = tracing.job_history()
+    first_stages = {record["stage"]: record for record in first.records}
+    second_stages = {record["stage"]: record for record in second.records}
+    assert first_stages["prefetch"]["hit"] is False and "fetch" in first_stages
+    assert second_stages["prefetch"]["hit"] is True and second_stages["prefetch"]["post_id"] == "fx0002"
+    assert "fetch" not in second_stages and "tts" not in second_stages
+
+    # Narração do pool transcrita normalmente (legendas com o texto falado)
+    assert len(rendered) == 2 and all(os.path.getsize(path) > 0 for path in rendered)
+
+    # Preparada durante o render do último vídeo: guardada para a próxima execução
+    leftover = prefetch.pool_entries(prefetch.pool_dir(output_dir))
+    assert [entry["story"]["id"] for entry in leftover] == ["fx0003"]
+    assert os.path.exists(os.path.join(leftover[0]["path"], leftover[0]["audio"]))
+    assert len([name for name in os.listdir(tmp_path / "traces") if name.startswith("trace_prefetch_")]) == 2
+
+def test_prefetch_failure_never_blocks_take(tmp_path, monkeypatch):
+    """Erro ao publicar libera take() na hora; preparo travado só segura até o prazo"""
+    import main
+    import tracing
+
+    tracing.configure(trace_dir=str(tmp_path / "traces"))
+    stuck, release = threading.Event(), threading.Event()
+
+    def fake_prepare(audio_path, job=None, exclude=(), db_path=None):
+        if stuck.is_set():
+            release.wait(timeout=30)
+        with open(audio_path, "wb") as f:
+            f.write(b"ID3")
+        return {"story": {"id": "p1", "subreddit": "tifu", "title": "t"}, "adapted_text": "texto",
+                "metadata": {"title": "t", "hashtags": []}, "voice": {"provider": "edge"}, "audio_file": audio_path}
+
+    def disk_full(tmp_dir, inputs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(main, "prepare_inputs", fake_prepare)
+    monkeypatch.setattr(prefetch, "publish_entry", disk_full)
+    prefetcher = prefetch.Prefetcher(str(tmp_path), depth=1, take_timeout=5)
+    try:
+        prefetcher.render_started()
+        start = time.monotonic()
+        assert prefetcher.take(str(tmp_path / "audio_1.mp3")) is None
+        assert time.monotonic() - start < 4  # Liberado pelo erro, não pelo prazo
+        assert os.listdir(prefetcher.pool) == []  # Pasta temporária removida
+
+        # A thread continua viva: com o disco de volta, o próximo render adianta normalmente
+        monkeypatch.undo()
+        monkeypatch.setattr(main, "prepare_inputs", fake_prepare)
+        prefetcher.render_started()
+        assert prefetcher.take(str(tmp_path / "audio_2.mp3"))["story"]["id"] == "p1"
+
+        # Preparo que não volta: take() desiste no prazo e o job prepara a sua
+        stuck.set()
+        prefetcher.take_timeout = 0.3
+        prefetcher.render_started()
+        assert prefetcher.take(str(tmp_path / "audio_3.mp3")) is None
+    finally:
+        release.set()
+        prefetcher.close()
+        tracing.configure(trace_dir=tracing.TRACE_DIR)
@@ -0,0 +1,109 @@
+"""
+🧪 Teste do roteador de provedores (prazo, hedge, failover e circuit breaker)
+"""
+
+import os
+import time
+
+from offline_providers import FlakyProvider
+from provider_router import ProviderRouter, MIN_SAMPLES
+
+def test_failover_and_stats():
+    """Erro no primeiro provedor passa na hora para o próximo; erros e latências ficam registrados"""
+    primary, backup = FlakyProvider("primary", fail_first=1), FlakyProvider("backup")
+    router = ProviderRouter("teste", {"primary": primary, "backup": backup}, deadline=2.0)
+
+    assert router.call("texto") == ("backup", "backup:1")
+    assert router.call("texto") == ("primary", "primary:2")
+    health = router.health()
+    assert health["primary"]["calls"] == 2 and health["primary"]["error_rate"] == 0.5
+    assert health["backup"]["circuit"] == "closed"
+
+def test_hedge_after_percentile():
+    """Chamada mais lenta que o p90 do provedor dispara o próximo; o resultado atrasado é descartado"""
+    discarded = []
+    slow = FlakyProvider("slow", latency=[0.02] * MIN_SAMPLES + [0.8])
+    fast = FlakyProvider("fast", latency=0.05)
+    router = ProviderRouter("teste", {"slow": slow, "fast": fast}, deadline=5.0, min_hedge=0.1,
+                            on_discard=lambda provider, result: discarded.append(result))
+
+    for _ in range(MIN_SAMPLES):
+        assert router.call()[0] == "slow"
+
+    started = time.monotonic()
+    assert router.call() == ("fast", "fast:1")
+    assert time.monotonic() - started < 0.5
+
+    time.sleep(1.0)
+    assert discarded == [f"slow:{MIN_SAMPLES + 1}"]
+
+def test_deadline_and_circuit_breaker():
+    """Provedor travado estoura o prazo; falhas seguidas abrem o circuito até o cooldown"""
+    hung = FlakyProvider("hung", latency=[0.4, 0.4, 0.4, 0.0])
+    router = ProviderRouter("teste", {"hung": hung}, deadline=0.1, hedge=False, threshold=3, cooldown=0.5)
+
+    for _ in range(3):
+        started = time.monotonic()
+        assert router.call() == (None, None)
+        assert time.monotonic() - started < 0.3
+    assert router.health()["hung"]["circuit"] == "open"
+
+    # Aberto: falha na hora, sem chamar o provedor
+    assert router.call() == (None, None) and hung.calls == 3
+
+    time.sleep(0.6)
+    assert router.health()["hung"]["circuit"] == "half_open"
+    assert router.call() == ("hung", "hung:4")
+    assert router.health()["hung"]["circuit"] == "closed"
+
+def test_tts_falls_back_to_gtts(tmp_path, monkeypatch):
+    """Edge fora do ar: a narração sai pelo gTTS no caminho pedido, sem sobrar o arquivo parcial do Edge; ElevenLabs sem chave também cai no gTTS"""
+    import tts_generate
+
+    def broken_edge(text, output_path, *args, **kwargs):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write("parcial")  # Caiu no meio do download
+        return None
+
+    def fake_gtts(text, output_path, lang="pt-br", slow=False, speed=1.8):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(f"{text}@{speed}")
+        return output_path
+
+    monkeypatch.setattr(tts_generate, "_router", None)
+    monkeypatch.setattr(tts_generate, "generate_voice_edge", broken_edge)
+    monkeypatch.setattr(tts_generate, "generate_voice_gtts_fallback", fake_gtts)
+    monkeypatch.delenv("ELEVEN_API_KEY", raising=False)
+
+    audio = tts_generate.generate_voice("Olá", str(tmp_path / "audio_1.mp3"), provider="edge", rate="+50%")
+    assert audio == str(tmp_path / "audio_1.mp3")
+    assert sorted(os.listdir(tmp_path)) == ["audio_1.mp3"]
+    with open(audio, encoding="utf-8") as f:
+        assert f.read() == "Olá@1.5"
+
+    audio = tts_generate.generate_voice_elevenlabs("Oi", str(tmp_path / "audio_2.mp3"))
+    assert audio == str(tmp_path / "audio_2.mp3") and os.path.exists(audio)
+
+def test_job_records_winning_tts_provider(tmp_path, monkeypatch):
+    """Com o Edge fora do ar o job (catálogo, prefetch) registra o gTTS, não o provider pedido"""
+    import main
+    import tts_generate
+    from offline_providers import OfflineProviders
+
+    def fake_gtts(text, output_path, lang="pt-br", slow=False, speed=1.8):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return output_path
+
+    monkeypatch.setattr(tts_generate, "_router", None)
+    monkeypatch.setattr(tts_generate, "generate_voice_edge", lambda *args, **kwargs: None)
+    monkeypatch.setattr(tts_generate, "generate_voice_gtts_fallback", fake_gtts)
+
+    real_generate_voice = tts_generate.generate_voice
+    with OfflineProviders():
+        tts_generate.generate_voice = real_generate_voice  # Reddit e LLM offline, TTS pelo roteador
+        job = {}
+        inputs = main.prepare_inputs(str(tmp_path / "audio_1.mp3"), job=job)
+
+    assert inputs["voice"] == {"provider": "gtts", "voice": "adam"} and job["voice"] == inputs["voice"]
+    assert tts_generate.generate_voice("Oi", str(tmp_path / "audio_2.mp3"), return_provider=True) == (str(tmp_path / "audio_2.mp3"), "gtts")
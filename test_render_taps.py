@@ -0,0 +1,116 @@
+"""
+🧪 Teste da thumbnail e da prévia tiradas do encode
+"""
+
+import os
+
+import numpy as np
+
+from render_taps import RenderTap, extra_paths, thumbnail_score, wrap_title
+
+def frame_with(title_band=40, rest=90, noise=0, size=(64, 128), seed=0):
+    """Frame cinza com a faixa do título em outro tom (e ruído opcional no resto)"""
+    width, height = size
+    frame = np.full((height, width, 3), rest, dtype=np.uint8)
+    frame[int(height * 0.08):int(height * 0.30)] = title_band
+    if noise:
+        rng = np.random.default_rng(seed)
+        frame[int(height * 0.4):] = rng.integers(0, noise, (height - int(height * 0.4), width, 3))
+    return frame
+
+def test_score_prefers_dark_calm_title_band():
+    """Faixa do título escura e lisa ganha de faixa clara; frame borrado perde para frame com detalhe"""
+    dark = thumbnail_score(frame_with(title_band=30, noise=200))
+    bright = thumbnail_score(frame_with(title_band=250, noise=200))
+    flat = thumbnail_score(frame_with(title_band=30, noise=0))
+    assert dark > bright
+    assert dark > flat
+
+def test_wrap_title():
+    """Título longo vira no máximo 3 linhas, com reticências"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    draw = ImageDraw.Draw(Image.new("RGB", (10, 10)))
+    font = ImageFont.load_default()
+    lines = wrap_title("Eu descobri que meu vizinho usava meu wifi há cinco anos inteiros", font, 80, draw)
+
+    assert len(lines) == 3
+    assert lines[-1].endswith("…")
+    assert all(draw.textlength(line[:-1], font=font) <= 80 for line in lines)
+
+def test_tap_picks_thumbnail_and_writes_preview(tmp_path):
+    """Frames antes do start() não contam; thumbnail vem da janela do gancho; prévia tem a duração pedida"""
+    from moviepy.editor import VideoFileClip
+    from PIL import Image
+
+    output_path = str(tmp_path / "video_1.mp4")
+    tap = RenderTap(output_path, fps=10, title="Título de teste", preview_seconds=1.0, preview_size=(32, 64))
+
+    tap.output(0, frame_with())  # Frame 0 pedido na montagem dos clips: ignorado
+    tap.start()
+
+    for index in range(40):
+        # Frame 6 (0.6s) é o melhor candidato: faixa do título escura, resto com detalhe
+        background = frame_with(title_band=30, noise=200, seed=index) if index == 6 else frame_with(title_band=220)
+        tap.background(index, background)
+        tap.background(index, background)  # Repetido: ignorado
+        tap.output(index, background)
+
+    outputs = tap.finish()
+
+    assert tap.best_index == 6
+    assert outputs == extra_paths(output_path)
+    assert Image.open(outputs["thumbnail"]).size == (64, 128)
+
+    preview = VideoFileClip(outputs["preview"])
+    assert tuple(preview.size) == (32, 64)
+    assert abs(preview.duration - 1.0) < 0.15
+    preview.close()
+
+def test_render_formats_feeds_tap(tmp_path):
+    """No render multi-formato a prévia sai do primeiro formato, na mesma passada"""
+    from moviepy.editor import ColorClip, VideoFileClip
+    from export_formats import render_formats
+
+    specs = {
+        "square": {"crop": (64, 64), "size": (64, 64), "caption_y": 0.5, "crf": 18, "bitrate": None},
+        "tall": {"crop": (64, 128), "size": (64, 128), "caption_y": 0.5, "crf": 18, "bitrate": None},
+    }
+    clip = ColorClip((64, 128), color=(0, 0, 255), duration=1.0)
+    output_path = str(tmp_path / "video.mp4")
+    tap = RenderTap(output_path, fps=10, title=None, preview_seconds=0.5, preview_size=(32, 32))
+
+    render_formats(clip, None, output_path, list(specs), fps=10, preset="ultrafast", threads=1, specs=specs, tap=tap)
+
+    assert os.path.exists(extra_paths(output_path)["thumbnail"])
+    preview = VideoFileClip(extra_paths(output_path)["preview"])
+    assert tuple(preview.size) == (32, 32)
+    preview.close()
+
+def test_create_video_releases_tap_on_encode_error(tmp_path, monkeypatch):
+    """Encode que falha fecha o tap (prévia parcial e áudio temporário) e os clips"""
+    from moviepy.editor import ColorClip, VideoClip
+    import render_taps
+    from offline_providers import synthesize_speech
+    from video_generate import create_video
+
+    background_dir = tmp_path / "fundos"
+    background_dir.mkdir()
+    ColorClip((64, 128), color=(0, 0, 255), duration=3.0).write_videofile(str(background_dir / "azul.mp4"), fps=10, preset="ultrafast", logger=None)
+    audio_path, _ = synthesize_speech("Uma narração curta para o teste.", str(tmp_path / "audio_1.wav"))
+
+    closed = []
+    original_close = render_taps.RenderTap.close
+    monkeypatch.setattr(render_taps.RenderTap, "close", lambda self: (closed.append(self), original_close(self)))
+
+    def disk_full(self, *args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(VideoClip, "write_videofile", disk_full)
+    output_path = str(tmp_path / "saida" / "video_1.mp4")
+
+    assert create_video(audio_path, output_path, background_dir=str(background_dir), videos_count=1, add_subtitles=False,
+                        normalize_audio=False, music_dir=None, title="Teste") is None
+    assert len(closed) == 1
+    assert not os.path.exists(output_path)
+    assert not [name for name in os.listdir(tmp_path / "saida") if "preview" in name]
@@ -0,0 +1,140 @@
+"""
+🧪 Teste da fila de renderização (vários workers, sem jobs duplicados)
+"""
+
+import os
+import tempfile
+import threading
+import time
+from render_worker import (connect, submit_job, claim_job, process_next_job, queue_summary, get_job,
+                           finish_job, heartbeat, MAX_ATTEMPTS)
+
+def test_claim_is_fifo():
+    """Jobs saem na ordem em que entraram e a fila vazia retorna None"""
+    print("🔍 Testando ordem da fila...")
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    conn = connect(db_path)
+    first = submit_job(conn, {"subtitle_style": "tiktok"})
+    second = submit_job(conn)
+
+    assert claim_job(conn, "w1")["id"] == first
+    assert claim_job(conn, "w1")["id"] == second
+    assert claim_job(conn, "w1") is None
+    conn.close()
+
+def test_workers_never_share_jobs():
+    """Vários workers concorrentes processam cada job exatamente uma vez"""
+    print("🔍 Testando workers concorrentes...")
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    conn = connect(db_path)
+    for i in range(60):
+        submit_job(conn, {"index": i})
+
+    processed = []
+    lock = threading.Lock()
+
+    def handler(index):
+        with lock:
+            processed.append(index)
+        return {"video": f"video_{index}.mp4"}
+
+    def worker(name):
+        worker_conn = connect(db_path)
+        while process_next_job(worker_conn, name, handler) is not None:
+            pass
+        worker_conn.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(processed) == list(range(60))
+    assert queue_summary(conn) == {"done": 60}
+    conn.close()
+
+def test_failed_job_is_recorded():
+    """Exceções no pipeline marcam o job como failed com a mensagem"""
+    print("🔍 Testando job com falha...")
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    conn = connect(db_path)
+    job_id = submit_job(conn)
+
+    def handler():
+        raise RuntimeError("sem vídeos de fundo")
+
+    process_next_job(conn, "w1", handler)
+    job = get_job(conn, job_id)
+    assert job["status"] == "failed"
+    assert "sem vídeos de fundo" in job["error"]
+    conn.close()
+
+def test_dead_worker_job_is_requeued():
+    """Job de worker sem heartbeat volta para a fila; o de worker vivo fica com ele"""
+    print("🔍 Testando job de worker morto...")
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    conn = connect(db_path)
+    dead = submit_job(conn, {"index": 0})
+    alive = submit_job(conn, {"index": 1})
+
+    assert claim_job(conn, "morto")["id"] == dead
+    assert claim_job(conn, "vivo")["id"] == alive
+    time.sleep(0.3)
+    assert heartbeat(conn, alive, "vivo")
+
+    # Lease curto: só o job sem heartbeat recente é devolvido
+    job = claim_job(conn, "novo", lease=0.2)
+    assert job["id"] == dead and job["payload"] == {"index": 0}
+    assert get_job(conn, alive)["worker"] == "vivo"
+
+    # O worker que "morreu" volta e tenta concluir: não sobrescreve o job do novo dono
+    assert not heartbeat(conn, dead, "morto")
+    finish_job(conn, dead, error="atrasado", worker_id="morto")
+    assert get_job(conn, dead)["status"] == "running"
+    conn.close()
+
+def test_job_that_keeps_killing_workers_fails():
+    """Depois de MAX_ATTEMPTS workers mortos o job fica failed em vez de voltar para a fila"""
+    print("🔍 Testando limite de tentativas...")
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    conn = connect(db_path)
+    job_id = submit_job(conn)
+
+    for attempt in range(MAX_ATTEMPTS):
+        assert claim_job(conn, f"w{attempt}", lease=0.05)["id"] == job_id
+        time.sleep(0.1)
+
+    assert claim_job(conn, "w_final", lease=0.05) is None
+    job = get_job(conn, job_id)
+    assert job["status"] == "failed" and "tentativas" in job["error"]
+    conn.close()
+
+def test_heartbeat_keeps_long_job():
+    """Enquanto o handler roda o heartbeat é renovado e outro worker não pega o job"""
+    print("🔍 Testando heartbeat de job longo...")
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    conn = connect(db_path)
+    job_id = submit_job(conn)
+    stolen = []
+
+    def handler():
+        other = connect(db_path)
+        time.sleep(0.5)
+        stolen.append(claim_job(other, "w2", lease=0.3))
+        other.close()
+        return {"video": "v.mp4"}
+
+    process_next_job(conn, "w1", handler, heartbeat_interval=0.05, lease=0.3)
+    assert stolen == [None]
+    assert get_job(conn, job_id)["status"] == "done"
+    conn.close()
+
+if __name__ == "__main__":
+    test_claim_is_fifo()
+    test_workers_never_share_jobs()
+    test_failed_job_is_recorded()
+    test_dead_worker_job_is_requeued()
+    test_job_that_keeps_killing_workers_fails()
+    test_heartbeat_keeps_long_job()
+    print("\n🎉 Fila de renderização funcionando!")
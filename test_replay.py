@@ -0,0 +1,86 @@
+"""
+🧪 Teste de seed e replay (mesmo job refeito offline, com as mesmas escolhas)
+"""
+
+import json
+import os
+import random
+
+import pytest
+
+import replay
+
+def test_decisions_ignore_part_order():
+    """Partes em paralelo terminam em qualquer ordem; as escolhas comparadas são as mesmas"""
+    first = [{"stage": "background_prep", "backgrounds": ["a.mp4"], "source_starts": [1.0]},
+             {"stage": "background_prep", "backgrounds": ["b.mp4"], "source_starts": [2.0]},
+             {"stage": "encode"}]
+    second = [first[1], first[0], first[2]]
+
+    assert replay.job_decisions(first) == replay.job_decisions(second)
+    assert replay.compare_decisions(replay.job_decisions(first), {}) != []
+
+@pytest.fixture
+def isolated_job(tmp_path, monkeypatch):
+    """Catálogo, traces e bundles em tmp_path; vídeo trocado por um fake que sorteia como o real"""
+    import catalog
+    import tracing
+    import video_generate
+    from tracing import stage
+
+    monkeypatch.setattr(catalog, "CATALOG_PATH", str(tmp_path / "catalog.db"))
+    monkeypatch.setattr(replay, "REPLAY_DIR", str(tmp_path / "replays"))
+    tracing.configure(trace_dir=str(tmp_path / "traces"))
+
+    def fake_create_video(audio_path, output_path, **options):
+        words = video_generate.transcribe_narration(audio_path)
+        with stage("background_prep") as span:
+            span.attrs["backgrounds"] = random.sample(["a.mp4", "b.mp4", "c.mp4", "d.mp4"], 2)
+            span.attrs["source_starts"] = [round(random.uniform(0, 30), 3) for _ in range(2)]
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(" ".join(word["text"] for word in words))
+        return output_path
+
+    monkeypatch.setattr(video_generate, "create_video", fake_create_video)
+    yield tmp_path
+    tracing.configure(trace_dir=tracing.TRACE_DIR)
+
+def test_record_and_replay(isolated_job):
+    """Job gravado com --record é refeito sem os provedores e faz o mesmo trabalho"""
+    from main import main
+    from offline_providers import OfflineProviders
+
+    with OfflineProviders():
+        recorded = main(output_dir=str(isolated_job / "gravado"), seed=1234, record=True)
+    assert recorded
+
+    bundles = replay.list_bundles(str(isolated_job / "replays"))
+    assert len(bundles) == 1
+    bundle_dir, bundle = bundles[0]
+    assert bundle["seed"] == 1234 and bundle["status"] == "ok"
+    assert bundle["listings"] and bundle["llm"]["summaries"] and bundle["tts"] and bundle["transcripts"]
+    assert set(bundle["decisions"]) == {"fetch", "background_prep"}
+
+    # Sem OfflineProviders: tudo que é externo vem do bundle
+    result, differences = replay.replay_job(bundle_dir, output_dir=str(isolated_job / "replay"))
+
+    assert differences == []
+    assert result["title"] == recorded["title"]
+    with open(recorded["video"], encoding="utf-8") as f1, open(result["video"], encoding="utf-8") as f2:
+        assert f1.read() == f2.read()  # Mesma narração transcrita
+
+def test_replay_detects_divergence(isolated_job):
+    """Escolha diferente da gravada (ex: índice de fundos mudou) é denunciada no fim do replay"""
+    from main import main
+    from offline_providers import OfflineProviders
+
+    with OfflineProviders():
+        main(output_dir=str(isolated_job / "gravado"), seed=1, record=True)
+    bundle_dir, bundle = replay.list_bundles(str(isolated_job / "replays"))[0]
+    bundle["decisions"]["background_prep"][0]["source_starts"] = [-1.0, -1.0]
+
+    with open(os.path.join(bundle_dir, replay.BUNDLE_FILE), "w", encoding="utf-8") as f:
+        json.dump(bundle, f)
+
+    _, differences = replay.replay_job(bundle_dir, output_dir=str(isolated_job / "replay"))
+    assert differences and differences[0].startswith("background_prep")
@@ -0,0 +1,70 @@
+"""
+🧪 Teste do modo série (partes com ganchos, assets compartilhados)
+"""
+
+import threading
+
+from offline_providers import OfflineProviders
+from summarize import parse_series_response, plan_series_parts, split_script_into_parts
+
+LONG_STORY = {
+    "id": "serie01",
+    "subreddit": "tifu",
+    "title": "Fingi que cozinhava por três anos",
+    "selftext": "Eu fingi que sabia cozinhar durante muito tempo. " * 120,
+    "score": 900,
+    "url": "https://reddit.com/r/tifu/serie01"
+}
+
+def test_plan_series_parts():
+    """Quantidade de partes cresce com o texto e respeita o limite"""
+    assert plan_series_parts("palavra " * 150) == 1
+    assert plan_series_parts("palavra " * 700) == 2
+    assert plan_series_parts("palavra " * 5000, max_parts=3) == 3
+
+def test_parse_series_response():
+    """Marcadores com e sem markdown, ignorando a história original repetida"""
+    response = "**PARTE 1:**\nComeço da história.\n\nPARTE 2:\nFinal.\n\nHISTÓRIA ORIGINAL:\nTítulo: x\nPARTE 3: não"
+    assert parse_series_response(response) == ["Começo da história.", "Final."]
+    assert parse_series_response("Sem marcadores.") == []
+
+def test_split_script_keeps_sentences():
+    """Fallback divide no fim de frases com tamanhos parecidos"""
+    script = "Um dois três quatro. Cinco seis. Sete oito nove dez. Onze doze."
+    parts = split_script_into_parts(script, 2)
+    assert parts == ["Um dois três quatro. Cinco seis.", "Sete oito nove dez. Onze doze."]
+    assert split_script_into_parts("Frase única sem fim", 3) == ["Frase única sem fim"]
+
+def test_run_series_shares_assets(tmp_path, monkeypatch):
+    """Partes narradas/transcritas em lote e renderizadas com os mesmos fundos e trilha"""
+    import video_generate
+    import audio_mix
+    from series import run_series
+
+    calls = []
+    lock = threading.Lock()
+
+    def fake_create_video(**options):
+        with lock:
+            calls.append(options)
+        return options["output_path"]
+
+    monkeypatch.setattr(video_generate, "create_video", fake_create_video)
+    monkeypatch.setattr(video_generate, "get_random_backgrounds", lambda d, c: ["bg1.mp4", "bg2.mp4"])
+    monkeypatch.setattr(audio_mix, "pick_music_track", lambda d: "trilha.mp3")
+
+    with OfflineProviders(stories=[LONG_STORY]) as providers:
+        result = run_series("teste", output_dir=str(tmp_path), max_parts=2)
+
+    assert providers.groq.calls["series"] == 1
+    assert [part["part"] for part in result["parts"]] == [1, 2]
+    assert result["parts"][1]["title"].endswith("(Parte 2/2)")
+
+    assert len(calls) == 2
+    for options in calls:
+        assert options["background_paths"] == ["bg1.mp4", "bg2.mp4"]
+        assert options["music_path"] == "trilha.mp3"
+        assert options["segments"]  # Transcrição já feita em lote
+
+    first = sorted(calls, key=lambda o: o["output_path"])[0]
+    assert first["segments"][0]["text"] == "Há"
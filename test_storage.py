@@ -0,0 +1,130 @@
+"""
+🧪 Teste do ciclo de vida dos arquivos de saída (retenção, orçamento, gravação atômica)
+"""
+
+import os
+import time
+
+import pytest
+
+import storage
+
+DAY = 86400
+
+def touch(path, size=1000, age_days=0.0):
+    """Cria um arquivo com tamanho e idade (mtime) dados"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+def test_classify():
+    """Cada arquivo do pipeline cai na sua camada; o resto nunca é tocado"""
+    assert storage.classify("video_20261019_101500.mp4") == "final"
+    assert storage.classify("video_20261019_101500_lowres.mp4") == "final"
+    assert storage.classify("video_20261019_101500_preview.mp4") == "preview"
+    assert storage.classify("video_20261019_101500_thumb.jpg") == "thumbnail"
+    assert storage.classify("video_20261019_101500_square.ass") == "captions"
+    assert storage.classify("audio_20261019_101500_parte2.mp3") == "intermediate"
+    assert storage.classify("video_20261019_101500_preview_audio.m4a") == "intermediate"
+    assert storage.classify("video_20261019_101500.partial.mp4") == "partial"
+    assert storage.classify("video_1.partialTEMP_MPY_wvf_snd.mp3") == "partial"
+    assert storage.classify("catalog.db") is None
+    assert storage.classify("karaoke_palavra_0_Imagina.png") is None
+
+def test_retention_by_age(tmp_path):
+    """Finais antigos vão para o arquivo, intermediários e arquivo expirados são apagados"""
+    out = str(tmp_path)
+    touch(os.path.join(out, "video_old.mp4"), age_days=20)
+    touch(os.path.join(out, "video_old_thumb.jpg"), age_days=20)
+    touch(os.path.join(out, "video_old_preview.mp4"), age_days=20)
+    touch(os.path.join(out, "video_new.mp4"), age_days=1)
+    touch(os.path.join(out, "audio_old.mp3"), age_days=3)
+    touch(os.path.join(out, "audio_new.mp3"), age_days=0.5)
+    touch(os.path.join(out, "archive", "2026-01", "video_ancient.mp4"), age_days=120)
+    touch(os.path.join(out, "LEIA-ME.txt"), age_days=400)
+
+    actions = {(action, os.path.basename(a["path"])) for action, a in storage.plan_retention(storage.scan(out))}
+
+    assert actions == {
+        ("archive", "video_old.mp4"),
+        ("archive", "video_old_thumb.jpg"),
+        ("delete", "video_old_preview.mp4"),
+        ("delete", "audio_old.mp3"),
+        ("delete", "video_ancient.mp4")
+    }
+
+def test_budget_frees_cheapest_first(tmp_path):
+    """Acima do orçamento: primeiro intermediários, depois arquiva finais antigos, nunca apaga final"""
+    out = str(tmp_path)
+    touch(os.path.join(out, "audio_a.mp3"), size=1000, age_days=0.2)
+    touch(os.path.join(out, "video_a.mp4"), size=10000, age_days=3)
+    touch(os.path.join(out, "video_b.mp4"), size=10000, age_days=2)
+    touch(os.path.join(out, "video_c.mp4"), size=10000, age_days=1)
+    artifacts = storage.scan(out)
+
+    small = storage.plan_budget(artifacts, budget_bytes=30500)
+    assert [(action, os.path.basename(a["path"])) for action, a in small] == [("delete", "audio_a.mp3")]
+
+    large = storage.plan_budget(artifacts, budget_bytes=20000)
+    assert [(action, os.path.basename(a["path"])) for action, a in large] == [
+        ("delete", "audio_a.mp3"), ("archive", "video_a.mp4"), ("archive", "video_b.mp4")
+    ]
+    assert all(action != "delete" or a["kind"] != "final" for action, a in large)
+
+def test_atomic_output(tmp_path):
+    """O nome final só aparece quando a gravação termina; erro no meio não deixa lixo"""
+    path = str(tmp_path / "video_1.mp4")
+
+    with storage.atomic_output(path) as temp_path:
+        assert temp_path.endswith(".partial.mp4")
+        with open(temp_path, "wb") as f:
+            f.write(b"ok")
+        assert not os.path.exists(path)
+    assert open(path, "rb").read() == b"ok"
+
+    broken = str(tmp_path / "video_2.mp4")
+    with pytest.raises(RuntimeError):
+        with storage.atomic_output(broken) as temp_path:
+            with open(temp_path, "wb") as f:
+                f.write(b"metade")
+            raise RuntimeError("encode falhou")
+    assert os.listdir(tmp_path) == ["video_1.mp4"]
+
+def test_archive_updates_catalog(tmp_path, monkeypatch):
+    """Arquivar reencoda o final na versão compacta e corrige o caminho no catálogo"""
+    import catalog
+    from moviepy.editor import ColorClip
+
+    out = str(tmp_path)
+    db_path = os.path.join(out, "catalog.db")
+    monkeypatch.setattr(catalog, "CATALOG_PATH", db_path)
+
+    video = os.path.join(out, "video_job.mp4")
+    ColorClip((108, 192), color=(200, 0, 0), duration=0.5).write_videofile(video, fps=10, preset="ultrafast", logger=None)
+    catalog.record_job({"job_id": "job", "result": {"video": video}}, status="ok")
+    os.utime(video, (time.time() - 30 * DAY,) * 2)
+
+    storage.prepare_space(out, budget_gb=None, min_free_gb=0)
+
+    archived = storage.archive_path(video, out, time.time() - 30 * DAY)
+    assert not os.path.exists(video) and os.path.exists(archived)
+    conn = catalog.connect(db_path)
+    assert catalog.get_video(conn, "job")["video_path"] == archived
+    assert catalog.get_video(conn, "job")["outputs"] == [archived]
+    conn.close()
+
+def test_purge_job_intermediates(tmp_path):
+    """Job com sucesso leva embora só a própria narração e temporários"""
+    out = str(tmp_path)
+    touch(os.path.join(out, "audio_job1.mp3"))
+    touch(os.path.join(out, "audio_job1_parte2.mp3"))
+    touch(os.path.join(out, "audio_job2.mp3"))
+    touch(os.path.join(out, "video_job1.mp4"))
+
+    removed = storage.purge_job_intermediates("job1", out)
+
+    assert sorted(os.path.basename(path) for path in removed) == ["audio_job1.mp3", "audio_job1_parte2.mp3"]
+    assert sorted(os.listdir(out)) == ["audio_job2.mp3", "video_job1.mp4"]
@@ -0,0 +1,53 @@
+"""
+🧪 Teste do índice de histórias quase repetidas (MinHash + LSH no catálogo)
+"""
+
+import catalog
+import reddit_fetch
+import story_dedup
+from offline_providers import FakeReddit, load_fixture
+
+POSTS = load_fixture("stories.json")
+STORIES = [dict(post, text=post["selftext"]) for post in POSTS]
+
+def repost(story, post_id):
+    """Cross-post com outro id e título, sem a primeira frase, pontuação diferente e um EDIT no fim"""
+    text = story["selftext"].split(". ", 1)[1].replace(". ", "! ", 2).lower() + "\n\nEDIT: wow, thanks everyone for the comments."
+    return dict(story, id=post_id, title="Reposting this here, " + story["title"], text=text, selftext=text)
+
+def test_minhash_similarity():
+    """Repost editado fica acima do limite; histórias diferentes ficam bem abaixo"""
+    original = story_dedup.minhash(STORIES[0]["text"])
+    assert story_dedup.similarity(original, story_dedup.minhash(repost(STORIES[0], "x")["text"])) >= story_dedup.DUPLICATE_THRESHOLD
+    assert story_dedup.similarity(original, story_dedup.minhash(STORIES[1]["text"])) < 0.1
+    assert story_dedup.minhash("") is None
+
+def test_record_job_indexes_published_posts(tmp_path):
+    """Só jobs concluídos entram no histórico; o repost é achado pelo balde LSH"""
+    db_path = str(tmp_path / "catalog.db")
+    catalog.record_job({"job_id": "job1", "story": STORIES[0]}, status="ok", db_path=db_path)
+    catalog.record_job({"job_id": "job2", "story": STORIES[1]}, status="failed", db_path=db_path)
+
+    conn = catalog.connect(db_path)
+    assert story_dedup.find_duplicate(conn, STORIES[0]) == ("fx0001", 1.0)
+    post_id, score = story_dedup.find_duplicate(conn, repost(STORIES[0], "xp001"))
+    assert post_id == "fx0001" and score >= story_dedup.DUPLICATE_THRESHOLD
+    assert story_dedup.find_duplicate(conn, STORIES[1]) is None
+
+    # Reindexar a partir dos posts gravados dá o mesmo resultado
+    assert story_dedup.rebuild(conn) == 1
+    assert story_dedup.find_duplicate(conn, repost(STORIES[0], "xp001"))[0] == "fx0001"
+    conn.close()
+
+def test_get_story_skips_reposts(tmp_path, monkeypatch):
+    """get_story nunca sorteia uma história já publicada nem um cross-post dela"""
+    db_path = str(tmp_path / "catalog.db")
+    monkeypatch.setattr(catalog, "CATALOG_PATH", db_path)
+    catalog.record_job({"job_id": "job1", "story": STORIES[0]}, status="ok")
+    monkeypatch.setattr(reddit_fetch, "init_reddit", lambda: FakeReddit(POSTS + [repost(POSTS[0], "xp001")]))
+
+    for _ in range(10):
+        assert reddit_fetch.get_story("AmItheAsshole")["id"] in ("fx0002", "fx0003")
+
+    # Sem catálogo (primeira execução) todos os candidatos seguem
+    assert story_dedup.filter_duplicates(STORIES, db_path=str(tmp_path / "nada.db")) == STORIES
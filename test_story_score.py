@@ -0,0 +1,76 @@
+"""
+🧪 Teste da pré-triagem das histórias (regras, ranking e treino com as revisões do catálogo)
+"""
+
+import catalog
+import reddit_fetch
+import story_score
+from offline_providers import FakeReddit, load_fixture
+
+STORIES = [dict(post, text=post["selftext"]) for post in load_fixture("stories.json")]
+
+def test_hard_reject():
+    """Corpo removido, update/meta, texto curto e idioma não suportado não chegam ao modelo"""
+    story = STORIES[0]
+    assert story_score.hard_reject(story) is None
+    assert story_score.hard_reject(dict(story, text="[removed]")) == "corpo removido"
+    assert story_score.hard_reject(dict(story, title="UPDATE: AITA for the car thing")) == "update/meta"
+    assert story_score.hard_reject(dict(story, text="I did a thing. " * 10)) == "texto curto"
+    assert story_score.hard_reject(dict(story, text="Ich habe gestern etwas Dummes gemacht. " * 30)) == "idioma não suportado"
+    assert story_score.detect_language("Eu não sabia que a minha sogra ia fazer isso comigo")[0] == "pt"
+
+def test_rank_prefers_narratives():
+    """Relato em primeira pessoa com votos rápidos fica acima de texto solto sem engajamento"""
+    flat = dict(STORIES[2], id="flat", text="The list of the items is long and the list is in the order of the price. " * 12, score=3, num_comments=0)
+    ranked = story_score.rank_stories([flat, STORIES[0], dict(STORIES[1], text="[deleted]")], weights=story_score.DEFAULT_WEIGHTS)
+
+    assert [story["id"] for _, story in ranked] == ["fx0001", "flat"]
+    assert 0 < ranked[1][0] < ranked[0][0] < 1
+
+def test_train_from_catalog_reviews(tmp_path):
+    """Revisões keep/discard do catálogo mudam a nota de posts parecidos"""
+    db_path = str(tmp_path / "catalog.db")
+    model_path = str(tmp_path / "model.json")
+    for job_id, story, verdict in (("job1", STORIES[0], "discard"), ("job2", STORIES[1], "keep"), ("job3", STORIES[2], "discard")):
+        catalog.record_job({"job_id": job_id, "story": dict(story, ranked_at=1760007200)}, db_path=db_path)
+        assert catalog.review_job(job_id, verdict, db_path=db_path)
+    assert catalog.review_job("job9", "keep", db_path=db_path) is None
+
+    summary = story_score.train_from_catalog(db_path, model_path)
+    assert summary["examples"] == 3 and summary["correct"] == 3
+
+    weights = story_score.load_model(model_path)
+    before = story_score.predict(story_score.story_features(STORIES[0], 1760007200), story_score.DEFAULT_WEIGHTS)
+    after = story_score.predict(story_score.story_features(STORIES[0], 1760007200), weights)
+    assert after < before
+    assert weights["t:tifu"] > 0 > weights["t:aita"]
+
+def test_get_story_draws_from_top_ranked(monkeypatch):
+    """get_story sorteia só entre os melhores e devolve a nota e os números do post"""
+    posts = load_fixture("stories.json") + [dict(load_fixture("stories.json")[0], id="gone", selftext="[removed]" + " " * 300)]
+    monkeypatch.setattr(reddit_fetch, "init_reddit", lambda: FakeReddit(posts))
+    monkeypatch.setattr(story_score, "load_model", lambda: dict(story_score.DEFAULT_WEIGHTS))
+
+    story = reddit_fetch.get_story("AmItheAsshole", top_k=1)
+    assert story["id"] == "fx0001"
+    assert story["num_comments"] == 612 and story["ranked_at"] == 1760007200
+    assert 0 < story["quality"] < 1
+
+def test_catalog_trains_on_ranked_text(tmp_path, monkeypatch):
+    """O LLM recebe o texto cortado, mas o catálogo guarda o texto inteiro que a nota pontuou"""
+    monkeypatch.setattr(reddit_fetch, "init_reddit", lambda: FakeReddit(load_fixture("stories.json")))
+    monkeypatch.setattr(story_score, "load_model", lambda: dict(story_score.DEFAULT_WEIGHTS))
+    db_path = str(tmp_path / "catalog.db")
+    monkeypatch.setattr(catalog, "CATALOG_PATH", db_path)
+
+    story = reddit_fetch.get_story("AmItheAsshole", top_k=1, max_chars=300)
+    assert len(story["text"]) == 300 and len(story["selftext"]) > 300
+    catalog.record_job({"job_id": "job1", "story": story})
+    assert catalog.review_job("job1", "keep")
+
+    conn = catalog.connect(db_path)
+    example, = catalog.training_examples(conn)
+    conn.close()
+    assert example["text"] == story["selftext"]
+    ranked_features = story_score.story_features(dict(story, text=story["selftext"]), story["ranked_at"])
+    assert story_score.story_features(example, example["ranked_at"]) == ranked_features
@@ -0,0 +1,92 @@
+"""
+🧪 Teste das legendas em ASS (karaoke \\k, estilos e desenho pelo ffmpeg/libass)
+"""
+
+import os
+import re
+
+import subtitle_ass
+
+WORDS = [
+    {"text": "Eu", "start": 0.0, "end": 0.2},
+    {"text": "nunca", "start": 0.25, "end": 0.6},
+    {"text": "{menti}", "start": 0.7, "end": 1.1},
+    {"text": "pra", "start": 1.6, "end": 1.8},
+    {"text": "ela.", "start": 1.85, "end": 2.3}
+]
+CHUNKS = [
+    {"words": WORDS[:3], "start": 0.0, "end": 1.1},
+    {"words": WORDS[3:], "start": 1.6, "end": 2.3}
+]
+
+def dialogues(content):
+    return [line for line in content.splitlines() if line.startswith("Dialogue:")]
+
+def test_build_ass():
+    """Um evento por chunk, \\k somando a duração do evento, cores do estilo e caixa do layout"""
+    placement = lambda t: (960.0, 0.0) if t < 1.0 else (576.0, 0.35)
+    content = subtitle_ass.build_ass(CHUNKS, "tiktok", (1080, 1920), placement)
+
+    assert "PlayResX: 1080" in content and "PlayResY: 1920" in content
+    # Amarelo acende, branco antes de falar, contorno preto; caixa de 35% vira estilo próprio
+    assert "Style: Caption,Arial,90,&H0000FFFF,&H00FFFFFF,&H00000000," in content
+    assert re.search(r"Style: Box35,.*,3,10,0,5,", content)
+
+    first, second = dialogues(content)
+    assert first.startswith("Dialogue: 0,0:00:00.00,0:00:01.10,Caption,")
+    assert second.startswith("Dialogue: 0,0:00:01.60,0:00:02.30,Box35,")
+    assert "\\pos(540,1110)" in first and "\\pos(540,726)" in second
+    assert sum(int(k) for k in re.findall(r"\\k(\d+)", first)) == 110
+    assert "(menti)" in first and "{menti}" not in first  # Chaves do texto não abrem override
+
+def test_gap_fill_and_time_format():
+    """Buraco curto mantém a legenda anterior (como a timeline do PIL); tempos em centésimos"""
+    chunks = [dict(CHUNKS[0]), dict(CHUNKS[1], start=1.25)]
+    first, _ = dialogues(subtitle_ass.build_ass(chunks, "minimal"))
+    assert ",0:00:01.25," in first
+    assert subtitle_ass.ass_time(3725.456) == "1:02:05.46"
+    assert subtitle_ass.ass_filter("C:\\videos\\it's.ass") == "ass='C\\:/videos/it'\\''s.ass'"
+
+def test_burn_in_during_encode(tmp_path):
+    """O ffmpeg desenha as legendas no encode; o .ass fica ao lado do vídeo para upload"""
+    from moviepy.editor import ColorClip
+    from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+    from export_formats import render_formats
+
+    specs = {"tiny": {"crop": (270, 480), "size": (270, 480), "caption_y": 0.4, "crf": 30, "bitrate": None}}
+    clip = ColorClip((270, 480), color=(0, 0, 0), duration=2.4)
+    ass_track = {"chunks": CHUNKS, "style": "minimal", "burn": True}
+
+    outputs = render_formats(clip, None, str(tmp_path / "video_1.mp4"), ["tiny"], specs=specs, preset="ultrafast", ass_track=ass_track)
+
+    video = outputs["tiny"]
+    assert sorted(os.listdir(tmp_path)) == ["video_1_tiny.ass", "video_1_tiny.mp4"]
+    reader = FFMPEG_VideoReader(video)
+    frame = reader.get_frame(0.5)
+    reader.close()
+    # Texto no meio da caixa na altura fixa do formato (40%), fundo preto no resto
+    band = frame[300:390].reshape(-1, 3).astype(int)
+    assert band.max() > 200 and frame[:250].max() < 30
+    # Palavras já faladas em dourado (karaoke), as outras em branco
+    assert ((band[:, 0] > 200) & (band[:, 2] < 80)).any()
+    assert ((band[:, 0] > 200) & (band[:, 2] > 200)).any()
+
+def test_preview_has_burned_captions(tmp_path):
+    """Com captions="ass" o tap vê os frames sem legenda; a prévia desenha o .ass do formato"""
+    from moviepy.editor import ColorClip
+    from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+    from export_formats import render_formats
+    from render_taps import RenderTap, extra_paths
+
+    specs = {"tiny": {"crop": (270, 480), "size": (270, 480), "caption_y": 0.4, "crf": 30, "bitrate": None}}
+    clip = ColorClip((270, 480), color=(0, 0, 0), duration=1.2)
+    output_path = str(tmp_path / "video_1.mp4")
+    tap = RenderTap(output_path, fps=30, preview_seconds=1.0, preview_size=(136, 240))
+
+    render_formats(clip, None, output_path, ["tiny"], specs=specs, preset="ultrafast", tap=tap,
+                   ass_track={"chunks": CHUNKS, "style": "minimal", "burn": True})
+
+    reader = FFMPEG_VideoReader(extra_paths(output_path)["preview"])
+    frame = reader.get_frame(0.5)
+    reader.close()
+    assert frame[150:195].max() > 200 and frame[:125].max() < 30
@@ -0,0 +1,92 @@
+"""
+🧪 Teste da divisão adaptativa das legendas (largura medida e ritmo da fala)
+"""
+
+import pytest
+from PIL import ImageFont
+
+from offline_providers import load_fixture
+from subtitle_chunker import GlyphMetrics, chunk_display, plan_chunks, reading_time, PAUSE_BREAK, SAFE_WIDTH
+from subtitle_whisper import group_words_into_chunks
+
+# Caixa da legenda em 1080p e fonte do estilo tiktok (fonte embutida do Pillow: igual em qualquer máquina)
+BOX_WIDTH = 1026
+METRICS = GlyphMetrics(ImageFont.load_default(size=90), stroke_width=5)
+CORPUS = load_fixture("transcripts.json")
+
+def spans(words, chunks):
+    """Intervalos (i, j) de cada chunk em words"""
+    result = []
+    start = 0
+    for chunk in chunks:
+        result.append((start, start + len(chunk["words"])))
+        start += len(chunk["words"])
+    return result
+
+def short_chunks(words, chunks):
+    """Chunks que saem da tela antes de dar tempo de ler"""
+    return sum(
+        1 for i, j in spans(words, chunks)
+        if chunk_display(words, i, j, 0.3) < reading_time(" ".join(w["text"] for w in words[i:j]))
+    )
+
+def overflowing(chunks):
+    """Chunks de mais de uma palavra mais largos que a caixa"""
+    return [c for c in chunks if len(c["words"]) > 1 and METRICS.width(" ".join(w["text"] for w in c["words"])) > BOX_WIDTH]
+
+def test_metrics_match_font():
+    """A tabela de larguras dá o mesmo que medir o texto com a fonte"""
+    font = ImageFont.load_default(size=90)
+    metrics = GlyphMetrics(font)
+    for text in ("Imagina você", "responsabilidade administrativa", "pão, coração e ação!"):
+        assert metrics.width(text) == pytest.approx(font.getlength(text), rel=0.01)
+
+@pytest.mark.parametrize("transcript", CORPUS, ids=[t["name"] for t in CORPUS])
+def test_corpus_chunks(transcript):
+    """Toda palavra aparece uma vez, em ordem; nada estoura a tela; menos legendas e menos piscadas"""
+    words = transcript["words"]
+    chunks = plan_chunks(words, BOX_WIDTH, METRICS)
+    fixed = group_words_into_chunks(words, max_words=2)
+
+    assert [w for c in chunks for w in c["words"]] == words
+    assert all(c["start"] == c["words"][0]["start"] and c["end"] == c["words"][-1]["end"] for c in chunks)
+    assert all(METRICS.width(" ".join(w["text"] for w in c["words"])) <= BOX_WIDTH * SAFE_WIDTH for c in chunks if len(c["words"]) > 1)
+
+    assert not overflowing(chunks)
+    if not overflowing(fixed):
+        # Com as duas cabendo na tela, a adaptativa ganha em quantidade e em tempo de leitura
+        assert len(chunks) < len(fixed)
+        assert short_chunks(words, chunks) <= short_chunks(words, fixed)
+
+def test_long_words_get_their_own_line():
+    """Palavras longas que estouravam com 2 por legenda ficam em legendas menores"""
+    words = next(t for t in CORPUS if t["name"] == "palavras_longas")["words"]
+    assert overflowing(group_words_into_chunks(words, max_words=2))
+    assert any(len(c["words"]) == 1 for c in plan_chunks(words, BOX_WIDTH, METRICS))
+
+def test_pauses_and_sentences_split():
+    """Silêncio longo sempre separa legendas; fim de frase separa quando os dois lados são legíveis"""
+    words = next(t for t in CORPUS if t["name"] == "pausas_longas")["words"]
+    for i, j in spans(words, plan_chunks(words, BOX_WIDTH, METRICS)):
+        assert all(words[k + 1]["start"] - words[k]["end"] <= PAUSE_BREAK for k in range(i, j - 1))
+
+    words = next(t for t in CORPUS if t["name"] == "narracao_lenta")["words"]
+    for chunk in plan_chunks(words, BOX_WIDTH, METRICS):
+        assert all(w["text"][-1] not in ".!?" for w in chunk["words"][:-1])
+
+def test_fast_speech_gets_more_words():
+    """A mesma frase falada mais rápido vira legendas maiores (cada uma fica o suficiente na tela)"""
+    words = CORPUS[0]["words"]
+    fast = [{"text": w["text"], "start": w["start"] / 2, "end": w["end"] / 2} for w in words]
+
+    assert len(plan_chunks(fast, BOX_WIDTH, METRICS)) < len(plan_chunks(words, BOX_WIDTH, METRICS))
+
+def test_split_text_into_chunks():
+    """Sem transcrição: os tempos são estimados pelo texto e as legendas juntam mais de 2 palavras"""
+    from subtitle_generate import split_text_into_chunks
+
+    text = " ".join(w["text"] for w in CORPUS[0]["words"])
+    chunks = split_text_into_chunks(text, audio_duration=CORPUS[0]["words"][-1]["end"])
+
+    assert " ".join(chunks) == text
+    assert len(chunks) < len(text.split()) / 2
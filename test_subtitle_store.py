@@ -0,0 +1,47 @@
+"""
+🧪 Teste do store de imagens de legenda (recorte + deduplicação)
+"""
+
+import numpy as np
+from subtitle_store import SubtitleImageStore, crop_to_alpha
+
+def make_caption(x, y, w=40, h=20, color=(255, 255, 0)):
+    """Imagem 972x300 transparente com um retângulo visível"""
+    img = np.zeros((300, 972, 4), dtype=np.uint8)
+    img[y:y + h, x:x + w, :3] = color
+    img[y:y + h, x:x + w, 3] = 255
+    return img
+
+def test_crop_to_alpha():
+    """Recorte fica no bounding box visível e devolve o offset"""
+    print("🔍 Testando recorte pelo alpha...")
+    cropped, offset = crop_to_alpha(make_caption(100, 50))
+    assert cropped.shape == (20, 40, 4)
+    assert offset == (100, 50)
+
+def test_empty_image():
+    """Imagem totalmente transparente não entra no store"""
+    print("🔍 Testando imagem vazia...")
+    store = SubtitleImageStore()
+    assert store.add(np.zeros((300, 972, 4), dtype=np.uint8)) == (None, None)
+    assert len(store) == 0
+
+def test_deduplicates_by_content():
+    """Mesmo conteúdo é guardado uma vez, mesmo em posições diferentes"""
+    print("🔍 Testando deduplicação...")
+    store = SubtitleImageStore()
+    key_a, offset_a = store.add(make_caption(100, 50))
+    key_b, offset_b = store.add(make_caption(300, 80))
+    key_c, _ = store.add(make_caption(100, 50, color=(255, 255, 255)))
+
+    assert key_a == key_b
+    assert offset_a != offset_b
+    assert key_c != key_a
+    assert len(store) == 2
+    assert store.nbytes == 2 * 20 * 40 * 4
+
+if __name__ == "__main__":
+    test_crop_to_alpha()
+    test_empty_image()
+    test_deduplicates_by_content()
+    print("\n🎉 Store de legendas funcionando!")
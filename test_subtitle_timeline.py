@@ -0,0 +1,70 @@
+"""
+🧪 Teste da linha do tempo das legendas (quantização, buracos e sobreposições)
+"""
+
+from subtitle_timeline import build_caption_timeline
+
+def event(key, start, end):
+    """Cria um evento de legenda de teste"""
+    return {"key": key, "image": f"img_{key}", "start": start, "end": end}
+
+def test_quantizes_to_frames():
+    """Início e fim caem exatamente em frames do vídeo"""
+    print("🔍 Testando quantização...")
+    timeline = build_caption_timeline([event("a", 0.012, 0.49)], fps=30)
+    assert timeline[0]["start_frame"] == 0
+    assert timeline[0]["end_frame"] == 15
+    assert timeline[0]["end"] == 0.5
+
+def test_fills_short_gaps():
+    """Buraco curto entre palavras é coberto pela legenda anterior"""
+    print("🔍 Testando preenchimento de buracos...")
+    timeline = build_caption_timeline([event("a", 0.0, 0.4), event("b", 0.5, 1.0)], fps=30, max_gap=0.3)
+    assert timeline[0]["end_frame"] == timeline[1]["start_frame"]
+
+def test_keeps_long_gaps():
+    """Pausas longas continuam sem legenda"""
+    print("🔍 Testando pausas longas...")
+    timeline = build_caption_timeline([event("a", 0.0, 0.4), event("b", 2.0, 2.5)], fps=30, max_gap=0.3)
+    assert timeline[0]["end_frame"] == 12
+    assert timeline[1]["start_frame"] == 60
+
+def test_resolves_overlaps():
+    """Nunca há duas legendas no mesmo frame"""
+    print("🔍 Testando sobreposições...")
+    timeline = build_caption_timeline([event("a", 0.0, 1.0), event("b", 0.5, 1.5)], fps=30)
+    assert [span["key"] for span in timeline] == ["a", "b"]
+    assert timeline[0]["end_frame"] == timeline[1]["start_frame"] == 15
+    for previous, current in zip(timeline, timeline[1:]):
+        assert previous["end_frame"] <= current["start_frame"]
+
+def test_drops_fully_covered_events():
+    """Evento que some após a resolução não gera span vazio"""
+    print("🔍 Testando eventos engolidos...")
+    timeline = build_caption_timeline([event("a", 1.0, 1.2), event("b", 1.0, 2.0)], fps=30)
+    assert [span["key"] for span in timeline] == ["b"]
+
+def test_collapses_identical_states():
+    """Estados idênticos consecutivos viram um único span"""
+    print("🔍 Testando junção de estados iguais...")
+    events = [event("a", 0.0, 0.3), event("a", 0.35, 0.6), event("b", 0.6, 0.9)]
+    timeline = build_caption_timeline(events, fps=30, max_gap=0.1)
+    assert [span["key"] for span in timeline] == ["a", "b"]
+    assert timeline[0]["start_frame"] == 0 and timeline[0]["end_frame"] == 18
+
+def test_clamps_to_duration():
+    """Spans que passam do fim do vídeo são cortados"""
+    print("🔍 Testando corte no fim...")
+    timeline = build_caption_timeline([event("a", 0.0, 1.0), event("b", 1.0, 3.0), event("c", 3.0, 4.0)], fps=30, duration=2.0)
+    assert [span["key"] for span in timeline] == ["a", "b"]
+    assert timeline[-1]["end_frame"] == 60
+
+if __name__ == "__main__":
+    test_quantizes_to_frames()
+    test_fills_short_gaps()
+    test_keeps_long_gaps()
+    test_resolves_overlaps()
+    test_drops_fully_covered_events()
+    test_collapses_identical_states()
+    test_clamps_to_duration()
+    print("\n🎉 Linha do tempo das legendas funcionando!")
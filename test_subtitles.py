@@ -5,6 +5,8 @@
 import os
 import sys
 
+import pytest
+
 def test_whisper_installation():
     """Testa se Whisper está instalado corretamente"""
     print("🔍 Testando instalação do Whisper...")
@@ -72,24 +74,20 @@ def test_image_generation():
         return False
 
 def test_with_sample_audio():
-    """Testa transcrição com áudio existente"""
+    """Testa transcrição com a narração mais recente (fala de verdade, gerada pelo TTS)"""
     print("\n🔍 Testando transcrição com áudio existente...")
     
-    # Procura por arquivos de áudio na pasta output
-    output_dir = "assets/output"
-    
-    if not os.path.exists(output_dir):
-        print(f"⚠️ Pasta {output_dir} não existe")
-        print("💡 Gere um vídeo primeiro com: python main.py")
-        return False
+    # Tom sintético não tem palavras para o Whisper: precisa de uma narração real
+    try:
+        import whisper
+    except ImportError:
+        pytest.skip("Whisper não instalado (pip install openai-whisper torch torchaudio)")
     
-    # Procura arquivos de áudio
-    audio_files = [f for f in os.listdir(output_dir) if f.endswith('.mp3')]
+    output_dir = "assets/output"
+    audio_files = [f for f in os.listdir(output_dir) if f.endswith('.mp3')] if os.path.isdir(output_dir) else []
     
     if not audio_files:
-        print(f"⚠️ Nenhum arquivo de áudio encontrado em {output_dir}")
-        print("💡 Gere um vídeo primeiro com: python main.py")
-        return False
+        pytest.skip(f"Nenhuma narração em {output_dir} (gere um vídeo primeiro com: python main.py)")
     
     # Usa o áudio mais recente
     audio_file = os.path.join(output_dir, sorted(audio_files)[-1])
@@ -134,6 +132,9 @@ def main():
         try:
             result = test_func()
             results.append((test_name, result))
+        except pytest.skip.Exception as e:
+            print(f"⏭️ '{test_name}' pulado: {e}")
+            results.append((test_name, None))
         except Exception as e:
             print(f"❌ Erro inesperado em '{test_name}': {e}")
             results.append((test_name, False))
@@ -144,10 +145,10 @@ def main():
     print("=" * 60)
     
     passed = sum(1 for _, result in results if result)
-    total = len(results)
+    total = sum(1 for _, result in results if result is not None)
     
     for test_name, result in results:
-        status = "✅ PASSOU" if result else "❌ FALHOU"
+        status = "⏭️ PULOU" if result is None else "✅ PASSOU" if result else "❌ FALHOU"
         print(f"{status}: {test_name}")
     
     print(f"\n🎯 Resultado: {passed}/{total} testes passaram")
@@ -0,0 +1,62 @@
+"""
+🧪 Teste da normalização do roteiro (abreviações, idades, moedas...) e do alinhamento com o Whisper
+"""
+
+import pytest
+
+from text_normalize import align_words, normalize_text
+
+@pytest.mark.parametrize("text, expected", [
+    ("M32 aqui e meu marido H40 no FDS.", "Uma mulher de 32 anos aqui e meu marido um homem de 40 anos no fim de semana."),
+    ("Eu (28F) e meu namorado (30M) fomos.", "Eu, uma mulher de 28 anos, e meu namorado, um homem de 30 anos, fomos."),
+    ("Minha filha (5F) chorou", "Minha filha, uma menina de 5 anos, chorou"),
+    ("Vc viu? Tbm achei, pq q ele fez isso", "Você viu? Também achei, porque que ele fez isso"),
+    ("Paguei R$ 1.500,00, depois R$ 12,5 e $1.", "Paguei 1.500 reais, depois 12 reais e 50 centavos e 1 dólar."),
+    ("Ganhou R$ 2 mil e 10k seguidores", "Ganhou 2 mil reais e 10 mil seguidores"),
+    ("Era o 3º encontro, às 14h30 ou 21:00, 50% de chance", "Era o terceiro encontro, às 14 e 30 ou 21 horas, 50 por cento de chance"),
+    ("AITA? O OP postou em r/tifu https://redd.it/abc", "Eu sou o babaca? O autor do post postou no subreddit tifu"),
+    ("Que vergonha 😭😭 kkkkk **sério**", "Que vergonha sério"),
+    ("TL;DR: minha MIL surtou com meu FIL", "Resumo: minha sogra surtou com meu sogro"),
+    # Português em maiúsculas não vira sigla do Reddit nem idade
+    ("Ele me devia R$ 5 MIL.", "Ele me devia 5 mil reais."),
+    ("Foram MIL reais!", "Foram MIL reais!"),
+    ("Tinha 18M de seguidores e 2M views", "Tinha 18 milhões de seguidores e 2 milhões de views"),
+    ("Eu 30M e ela 28F, mas ele 25M mas não", "Eu um homem de 30 anos e ela uma mulher de 28 anos, mas ele um homem de 25 anos mas não"),
+    ("Li isso em r/brasil. Em r/tifu e de u/fulano", "Li isso no subreddit brasil. No subreddit tifu e do usuário fulano"),
+    # Dólar de post em inglês no formato americano; valor que não dá para ler fica igual
+    ("Custou $1,200", "Custou 1.200 dólares"),
+    ("Paguei US$ 2.50", "Paguei 2 dólares e 50 centavos"),
+    ("Só $5.99.", "Só 5 dólares e 99 centavos."),
+    ("Uns $1,234,567.8 e $1.2345 e $1.500", "Uns 1.234.567 dólares e 80 centavos e $1.2345 e 1.500 dólares"),
+    # Link some, a pontuação da frase fica
+    ("Postei o link www.reddit.com/r/x. Depois ele sumiu.", "Postei o link. Depois ele sumiu."),
+    ("Veja https://imgur.com/a/b, depois conto.", "Veja, depois conto.")
+])
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+def test_keeps_plain_text_and_paragraphs():
+    """Texto sem nada para trocar passa igual; parágrafos continuam separados"""
+    text = "Eu nunca menti pra ela.\nMas naquele dia, tudo mudou!"
+    assert normalize_text(text) == text
+    # "Mt" e "q" só como palavra inteira
+    assert normalize_text("Mtv e quero") == "Mtv e quero"
+
+def test_align_words_uses_script_text():
+    """As legendas mostram o roteiro; os tempos vêm do Whisper, mesmo onde ele ouviu diferente"""
+    heard = [
+        {"text": "uma", "start": 0.0, "end": 0.2}, {"text": "mulher", "start": 0.2, "end": 0.5},
+        {"text": "de", "start": 0.5, "end": 0.6}, {"text": "trinta", "start": 0.6, "end": 0.9},
+        {"text": "e", "start": 0.9, "end": 1.0}, {"text": "dois", "start": 1.0, "end": 1.2},
+        {"text": "anos", "start": 1.2, "end": 1.5}, {"text": "voce", "start": 1.7, "end": 2.0}
+    ]
+    words = align_words(heard, "Uma mulher de 32 anos, você acredita?")
+
+    assert [w["text"] for w in words] == ["Uma", "mulher", "de", "32", "anos,", "você", "acredita?"]
+    assert words[3]["start"] == 0.6 and words[3]["end"] == 1.2
+    assert words[5]["start"] == 1.7
+    # Palavra que o Whisper não ouviu fica depois da anterior
+    assert words[6]["start"] >= words[5]["end"]
+
+    # Roteiro que não é essa narração: fica o que o Whisper ouviu
+    assert align_words(heard, "Outra história completamente diferente aqui") is heard
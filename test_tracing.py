@@ -0,0 +1,127 @@
+"""
+🧪 Teste da instrumentação por etapa (JSON lines, Chrome trace e resumo)
+"""
+
+import json
+import os
+import tempfile
+import tracing
+
+def test_stage_records_metrics():
+    """Cada etapa gera uma linha JSON com tempo, CPU, RSS e bytes gravados"""
+    print("🔍 Testando registro de etapas...")
+    trace_dir = tempfile.mkdtemp()
+    tracer = tracing.JobTracer("job1", trace_dir=trace_dir, chrome_trace=True)
+
+    output = os.path.join(trace_dir, "audio.mp3")
+    with tracer.stage("tts", provider="edge") as span:
+        with open(output, "wb") as f:
+            f.write(b"\0" * 2048)
+        span.record_output(output)
+    tracer.close()
+
+    with open(tracer.jsonl_path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+
+    record = lines[0]
+    assert record["stage"] == "tts"
+    assert record["provider"] == "edge"
+    assert record["bytes_written"] == 2048
+    assert record["wall_s"] >= 0 and record["cpu_s"] >= 0
+    assert lines[-1] == {"job": "job1", "stage": "job", "status": "ok", "wall_s": lines[-1]["wall_s"]}
+
+    with open(os.path.join(trace_dir, "trace_job1.json"), encoding="utf-8") as f:
+        chrome = json.load(f)
+    assert chrome["traceEvents"][0]["ph"] == "X"
+    assert chrome["traceEvents"][0]["name"] == "tts"
+
+def test_stage_metrics_are_per_stage():
+    """RSS e CPU são da etapa: memória liberada antes e CPU de outra thread não entram"""
+    import threading
+    import time
+
+    print("🔍 Testando métricas por etapa...")
+    tracer = tracing.JobTracer("job_metrics", trace_dir=tempfile.mkdtemp())
+
+    with tracer.stage("render"):
+        block = bytearray(200 * 1024 * 1024)  # 200 MB tocados
+        block[::4096] = b"\1" * len(block[::4096])
+        time.sleep(0.2)
+    del block
+
+    stop = threading.Event()
+
+    def burn():
+        while not stop.is_set():
+            sum(range(10000))
+
+    worker = threading.Thread(target=burn)
+    worker.start()
+    try:
+        with tracer.stage("fetch"):
+            time.sleep(0.3)
+    finally:
+        stop.set()
+        worker.join()
+
+    render, fetch = tracer.records
+    if render["peak_rss_mb"] is not None:
+        assert render["peak_rss_mb"] - fetch["peak_rss_mb"] > 150
+        assert render["process_peak_rss_mb"] > 150
+    assert fetch["cpu_s"] < 0.1 < fetch["process_cpu_s"]
+
+def test_failed_stage_is_recorded():
+    """Exceções passam adiante, mas a etapa fica registrada com o erro"""
+    print("🔍 Testando etapa com erro...")
+    tracer = tracing.JobTracer("job2", trace_dir=tempfile.mkdtemp())
+    try:
+        with tracer.stage("fetch"):
+            raise RuntimeError("reddit fora do ar")
+    except RuntimeError:
+        pass
+    assert "reddit fora do ar" in tracer.records[0]["error"]
+
+def test_stage_without_job_is_noop():
+    """Sem job ativo, stage() apenas executa o bloco"""
+    print("🔍 Testando stage sem job...")
+    with tracing.stage("encode") as span:
+        span.record_output("inexistente.mp4")
+
+def test_batch_summary_aggregates_jobs():
+    """O resumo do batch soma as etapas de todos os jobs"""
+    print("🔍 Testando resumo do batch...")
+    trace_dir = tempfile.mkdtemp()
+    tracing.reset_history()
+    for job in ("a", "b"):
+        tracing.start_job(job, trace_dir=trace_dir)
+        with tracing.stage("fetch"):
+            pass
+        with tracing.stage("encode"):
+            pass
+        tracing.end_job()
+
+    rows = tracing.summarize_history()
+    assert [row["stage"] for row in rows] == ["fetch", "encode"]
+    assert all(row["count"] == 2 for row in rows)
+    tracing.print_summary()
+    tracing.reset_history()
+
+def test_history_is_capped(tmp_path, monkeypatch):
+    """Processo longo (worker) guarda só os últimos HISTORY_LIMIT jobs"""
+    print("🔍 Testando limite do histórico...")
+    trace_dir = str(tmp_path)
+    monkeypatch.setattr(tracing, "HISTORY_LIMIT", 2)
+    tracing.reset_history()
+    for job in ("a", "b", "c"):
+        tracing.start_job(job, trace_dir=trace_dir)
+        tracing.end_job()
+
+    assert [tracer.job_id for tracer in tracing.job_history()] == ["b", "c"]
+    tracing.reset_history()
+
+if __name__ == "__main__":
+    test_stage_records_metrics()
+    test_failed_stage_is_recorded()
+    test_stage_without_job_is_noop()
+    test_batch_summary_aggregates_jobs()
+    print("\n🎉 Instrumentação funcionando!")
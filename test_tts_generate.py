@@ -0,0 +1,83 @@
+"""
+🧪 Teste do ElevenLabs em streaming contra um servidor HTTP local (keep-alive e gravação por pedaços)
+"""
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import tts_generate
+
+class FakeElevenLabs(BaseHTTPRequestHandler):
+    """Endpoint /stream que manda o MP3 em pedaços e só termina depois que o cliente recebeu o primeiro"""
+
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+    first_chunk_received = threading.Event()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests_seen.append({"path": self.path, "port": self.client_address[1], "key": self.headers["xi-api-key"], "text": body["text"]})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.write_chunk(b"ID3" + b"a" * 1000)
+        # Cliente que espera a resposta inteira não recebe nada até aqui: o stream mandou antes
+        self.server.streamed = self.first_chunk_received.wait(timeout=2.0)
+        self.write_chunk(b"b" * 1000)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def eleven_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeElevenLabs)
+    FakeElevenLabs.requests_seen = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(tts_generate, "ELEVEN_API_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(tts_generate, "_session", None)
+    monkeypatch.setenv("ELEVEN_API_KEY", "chave-teste")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_streams_to_disk_with_pooled_connection(eleven_server, tmp_path):
+    """Os pedaços chegam antes do fim da síntese; a segunda narração reaproveita a conexão"""
+    chunks = []
+
+    def on_chunk(chunk):
+        chunks.append(chunk)
+        FakeElevenLabs.first_chunk_received.set()
+
+    FakeElevenLabs.first_chunk_received.clear()
+    audio = tts_generate.generate_voice_elevenlabs("Olá", str(tmp_path / "audio_1.mp3"), voice_id="Josh", fallback=False, on_chunk=on_chunk)
+
+    assert audio == str(tmp_path / "audio_1.mp3")
+    assert eleven_server.streamed
+    with open(audio, "rb") as f:
+        assert f.read() == b"".join(chunks) and len(b"".join(chunks)) == 2003
+    assert sorted(os.listdir(tmp_path)) == ["audio_1.mp3"]
+
+    tts_generate.generate_voice_elevenlabs("De novo", str(tmp_path / "audio_2.mp3"), fallback=False)
+    first, second = FakeElevenLabs.requests_seen
+    assert first["path"] == "/v1/text-to-speech/TxGEqnHWrfWFTfGW9XjX/stream" and first["key"] == "chave-teste"
+    assert first["port"] == second["port"]  # Mesma conexão TCP (keep-alive)
+
+def test_error_leaves_no_file(eleven_server, tmp_path, monkeypatch):
+    """Erro da API não deixa MP3 pela metade"""
+    monkeypatch.setattr(tts_generate, "ELEVEN_API_URL", "http://127.0.0.1:9")  # Porta fechada
+    assert tts_generate.generate_voice_elevenlabs("Olá", str(tmp_path / "audio.mp3"), fallback=False) is None
+    assert os.listdir(tmp_path) == []
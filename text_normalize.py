@@ -0,0 +1,300 @@
+"""
+Normalização do roteiro para narração e legendas
+Expande abreviações do Reddit e do português de internet, idades/gêneros
+("M32", "(28F)"), moedas, porcentagens, ordinais, horários, links e emojis em
+uma única passada de uma regex pré-compilada. O texto normalizado é o que o TTS
+lê e também o texto canônico das legendas: align_words coloca os tempos do
+Whisper nas palavras do roteiro
+"""
+
+import difflib
+import re
+import unicodedata
+
+# Abreviações do português de internet (sem diferenciar maiúsculas)
+CHAT_ABBREVIATIONS = {
+    "fds": "fim de semana", "vc": "você", "vcs": "vocês", "pq": "porque", "tb": "também",
+    "tbm": "também", "mt": "muito", "mto": "muito", "mta": "muita", "msg": "mensagem",
+    "msgs": "mensagens", "cmg": "comigo", "ctg": "contigo", "ctz": "certeza", "blz": "beleza",
+    "obg": "obrigado", "hj": "hoje", "qdo": "quando", "qnd": "quando", "td": "tudo",
+    "tds": "todos", "vdd": "verdade", "dps": "depois", "mds": "meu Deus", "pfv": "por favor",
+    "sdds": "saudades", "q": "que", "ngm": "ninguém", "nd": "nada", "agr": "agora"
+}
+
+# Siglas do Reddit (só em maiúsculas: "op", "so"... podem ser palavras)
+REDDIT_ACRONYMS = {
+    "AITA": "eu sou o babaca", "WIBTA": "eu seria o babaca", "TIFU": "hoje eu estraguei tudo",
+    "NTA": "você não é o babaca", "YTA": "você é o babaca", "ESH": "todo mundo errou",
+    "OP": "autor do post", "TL;DR": "resumo", "TLDR": "resumo", "BF": "namorado",
+    "GF": "namorada"
+}
+
+# Parentes: "MIL" em maiúsculas também é o numeral ("Foram MIL reais!"), então só
+# depois de um possessivo ("minha MIL")
+KINSHIP_ACRONYMS = {"MIL": "sogra", "FIL": "sogro", "SIL": "cunhada", "BIL": "cunhado"}
+POSSESSIVES = ["minha", "meu", "sua", "seu", "nossa", "nosso"]
+
+# Preposição + artigo que a menção "r/x" -> "o subreddit x" introduz ("em r/x" -> "no subreddit x")
+CONTRACTIONS = {"em": "no", "de": "do", "por": "pelo"}
+
+CURRENCIES = {"R$": ("real", "reais"), "US$": ("dólar", "dólares"), "$": ("dólar", "dólares"), "€": ("euro", "euros"), "£": ("libra", "libras")}
+
+# Moedas escritas no formato americano nos posts em inglês ("$1,200", "US$ 2.50")
+US_CURRENCIES = ("US$", "$", "£")
+
+ORDINAL_UNITS = ["", "primeir", "segund", "terceir", "quart", "quint", "sext", "sétim", "oitav", "non"]
+ORDINAL_TENS = ["", "décim", "vigésim", "trigésim", "quadragésim", "quinquagésim", "sexagésim", "septuagésim", "octogésim", "nonagésim"]
+
+# Menos que isso de palavras batendo com o Whisper: a narração não é esse texto
+MIN_ALIGNMENT = 0.5
+
+# Duração dada a palavras do roteiro que o Whisper não ouviu no começo/fim do áudio (s)
+INSERTED_WORD_S = 0.3
+
+_NUMBER = r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?"
+
+# Valor em formato americano (vírgula separa milhares, ponto separa centavos)
+_US_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+\.\d{1,2}"
+
+# Número que continua depois do valor ("$1.2345"): formato desconhecido, fica como está
+_NUMBER_END = r"(?![.,]?\d)"
+
+# Depois de "18M": "de" ou um substantivo no plural ("seguidores", "views"), menos "mas"
+_MILLIONS_OF = r"\s+(?:de\b|(?!mas\b)[a-zà-úç]{3,}s\b)"
+
+def _alternation(words):
+    """Alternativa de regex com as palavras mais longas primeiro (o prefixo comum não rouba o match)"""
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+def _initials(words, ignore_case=False):
+    """Primeiras letras possíveis de um conjunto de palavras"""
+    return "".join(sorted({char for word in words for char in ((word[0], word[0].upper()) if ignore_case else (word[0],))}))
+
+_DIGITS = "0123456789"
+
+# (nome, primeiros caracteres possíveis, regex); a primeira regra que casar em uma posição ganha
+_WORD_RULES = [
+    # Pontuação colada no fim do link é do texto ("veja www.x.com/y." mantém o ponto)
+    ("url", "hw", r"(?:https?://|www\.)\S+?(?=[.,;:!?)\]\"'”]*(?:\s|$))"),
+    ("mention", "ru" + _initials(CONTRACTIONS, ignore_case=True), rf"(?:(?P<mention_prep>(?i:{_alternation(CONTRACTIONS)}))\s+)?(?P<mention_kind>[ru])/(?P<mention_name>\w+)"),
+    ("currency", "RU$€£", rf"(?:(?P<currency_us>US\$|\$|£)\s?(?P<currency_us_value>{_US_NUMBER}){_NUMBER_END}|(?P<currency_symbol>R\$|US\$|\$|€|£)\s?(?P<currency_value>{_NUMBER}){_NUMBER_END})(?:\s(?P<currency_scale>(?i:mil|milhões|milhão|bilhões|bilhão))\b)?"),
+    ("age_paren", "(", r"\(\s*(?:(?P<age_paren_n1>\d{1,2})\s?(?P<age_paren_g1>[MFH])|(?P<age_paren_g2>[MFH])\s?(?P<age_paren_n2>\d{1,2}))\s*\)"),
+    # "30M" solto só é idade se não vier um substantivo depois ("18M de seguidores" são milhões)
+    ("age", _DIGITS + "MFH", rf"(?:(?P<age_n1>\d{{2}})(?P<age_g1>[MFH])\b(?!{_MILLIONS_OF})|(?P<age_g2>[MFH])(?P<age_n2>\d{{2}})\b)"),
+    ("millions", _DIGITS, rf"(?P<millions_value>{_NUMBER})M(?={_MILLIONS_OF})"),
+    ("percent", _DIGITS, rf"(?P<percent_value>{_NUMBER})\s?%"),
+    ("ordinal", _DIGITS, r"(?P<ordinal_value>\d{1,2})(?P<ordinal_mark>[ºª°])"),
+    ("time", _DIGITS, r"(?P<time_hour>\d{1,2})(?:h(?P<time_min_h>[0-5]\d)?|:(?P<time_min>[0-5]\d))(?!\w)"),
+    ("thousands", _DIGITS, rf"(?P<thousands_value>{_NUMBER})k\b"),
+    ("acronym", _initials(REDDIT_ACRONYMS), rf"(?:{_alternation(REDDIT_ACRONYMS)})(?![\w;])"),
+    ("kinship", _initials(POSSESSIVES, ignore_case=True), rf"(?P<kinship_owner>(?i:{_alternation(POSSESSIVES)}))\s+(?P<kinship_name>{_alternation(KINSHIP_ACRONYMS)})(?![\w;])"),
+    ("chat", _initials(CHAT_ABBREVIATIONS, ignore_case=True), rf"(?i:(?:{_alternation(CHAT_ABBREVIATIONS)})\b)"),
+    ("laugh", "kKhHrR", r"(?i:(?:k{3,}|(?:ha){2,}h?|rs(?:rs)+)\b)")
+]
+
+# Valem em qualquer posição (grudados em uma palavra)
+_ANYWHERE_RULES = [
+    ("emoji", r"[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]+"),
+    ("markdown", r"\*+|_{2,}|~~|^#+\s*")
+]
+
+def _compile():
+    """
+    Junta todas as regras em uma regex só
+
+    As regras de palavra só são tentadas no início de uma palavra cujo primeiro
+    caractere pode abrir alguma delas (o resto do texto é pulado sem testar as alternativas)
+    """
+    first_chars = "".join(sorted({char for _, chars, _ in _WORD_RULES for char in chars}))
+    word_rules = "|".join(f"(?P<{name}>{pattern})" for name, _, pattern in _WORD_RULES)
+    anywhere_rules = "|".join(f"(?P<{name}>{pattern})" for name, pattern in _ANYWHERE_RULES)
+    return re.compile(rf"(?<![\w;])(?=[{re.escape(first_chars)}])(?:{word_rules})|{anywhere_rules}", re.MULTILINE)
+
+_PATTERN = _compile()
+
+def _plural(value, singular, plural):
+    return singular if value in ("1", "1,0", "1,00") else plural
+
+def _ordinal(value, mark):
+    """3º -> terceiro, 2ª -> segunda (até 99)"""
+    tens, units = divmod(int(value), 10)
+    ending = "a" if mark == "ª" else "o"
+    words = [stem + ending for stem in (ORDINAL_TENS[tens], ORDINAL_UNITS[units]) if stem]
+    return " ".join(words) if words else value
+
+def _age(number, gender, english=False):
+    """
+    (28, "F") -> uma mulher de 28 anos; menores de 18 viram menino/menina
+
+    Número antes da letra é o padrão do Reddit em inglês ("30M" = male); letra
+    antes do número é o do roteiro ("M32" = mulher, "H40" = homem)
+    """
+    female = gender == "F" or (gender == "M" and not english)
+    if int(number) < 18:
+        person = "uma menina" if female else "um menino"
+    else:
+        person = "uma mulher" if female else "um homem"
+    return f"{person} de {number} {_plural(number, 'ano', 'anos')}"
+
+def _currency(m):
+    if m.group("currency_us"):
+        # $1,200.50 -> 1.200,50 (o resto segue o formato brasileiro)
+        whole, _, cents = m.group("currency_us_value").partition(".")
+        symbol, value = m.group("currency_us"), whole.replace(",", ".") + ("," + cents if cents else "")
+    else:
+        symbol, value = m.group("currency_symbol"), m.group("currency_value")
+    singular, plural = CURRENCIES[symbol]
+    scale = m.group("currency_scale")
+    if scale:
+        # R$ 2 mil -> 2 mil reais; R$ 3 milhões -> 3 milhões de reais
+        scale = scale.lower()
+        return f"{value} {scale} {'de ' if scale != 'mil' else ''}{plural}"
+    whole, _, cents = value.partition(",")
+    text = f"{whole} {_plural(whole, singular, plural)}"
+    if cents.strip("0"):
+        cents = (cents + "0")[:2].lstrip("0")
+        text += f" e {cents} {_plural(cents, 'centavo', 'centavos')}"
+    return text
+
+def _time(m):
+    hour = m.group("time_hour")
+    minutes = m.group("time_min_h") or m.group("time_min")
+    if minutes and minutes != "00":
+        return f"{hour} e {minutes.lstrip('0') or '0'}"
+    return f"{hour} {_plural(hour, 'hora', 'horas')}"
+
+def _replacement(m):
+    """Texto que substitui o trecho casado (antes de acertar maiúsculas e espaços)"""
+    rule = m.lastgroup
+    if rule == "url" or rule == "emoji" or rule == "markdown" or rule == "laugh":
+        return ""
+    if rule == "mention":
+        kind = "subreddit" if m.group("mention_kind") == "r" else "usuário"
+        prep = m.group("mention_prep")
+        if prep:
+            article = CONTRACTIONS[prep.lower()]
+            article = article.capitalize() if prep[0].isupper() else article
+        else:
+            article = "o"
+        return f"{article} {kind} {m.group('mention_name')}"
+    if rule == "currency":
+        return _currency(m)
+    if rule == "age_paren":
+        number = m.group("age_paren_n1") or m.group("age_paren_n2")
+        gender = m.group("age_paren_g1") or m.group("age_paren_g2")
+        return f", {_age(number, gender, english=bool(m.group('age_paren_n1')))},"
+    if rule == "age":
+        return _age(m.group("age_n1") or m.group("age_n2"), m.group("age_g1") or m.group("age_g2"), english=bool(m.group("age_n1")))
+    if rule == "percent":
+        return f"{m.group('percent_value')} por cento"
+    if rule == "ordinal":
+        return _ordinal(m.group("ordinal_value"), m.group("ordinal_mark"))
+    if rule == "time":
+        return _time(m)
+    if rule == "thousands":
+        return f"{m.group('thousands_value')} mil"
+    if rule == "millions":
+        # 18M de seguidores -> 18 milhões de seguidores; 2M views -> 2 milhões de views
+        value = m.group("millions_value")
+        of = "" if re.match(r"\s+de\b", m.string[m.end():]) else " de"
+        return f"{value} {_plural(value, 'milhão', 'milhões')}{of}"
+    if rule == "acronym":
+        return REDDIT_ACRONYMS[m.group(0)]
+    if rule == "kinship":
+        return f"{m.group('kinship_owner')} {KINSHIP_ACRONYMS[m.group('kinship_name')]}"
+    return CHAT_ABBREVIATIONS[m.group(0).lower()]
+
+def _sentence_start(text, index, window=20):
+    before = text[max(0, index - window):index].rstrip(" \t(\"'“")
+    return (not before and index <= window) or (before and before[-1] in ".!?\n")
+
+def _cleanup(text):
+    """Espaços e vírgulas que sobram das substituições"""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" +([,.!?;:])", r"\1", text)
+    text = re.sub(r",(?=[,.!?;:])", "", text)
+    text = re.sub(r"(^|\n) *,? *", r"\1", text)
+    text = re.sub(r"([,.!?;:])(?=[^\s\d.!?\"”'),])", r"\1 ", text)
+    lines = [line.strip() for line in text.split("\n")]
+    # Parágrafo que começava com "(28F)" ou um emoji
+    return "\n".join(line[:1].upper() + line[1:] for line in lines).strip()
+
+def normalize_text(text):
+    """
+    Normaliza o roteiro para o TTS e para as legendas
+
+    Números ficam em algarismos (o TTS lê bem e a legenda fica mais estreita);
+    o que vira palavras são símbolos e abreviações que o TTS lê errado
+
+    Args:
+        text: Texto adaptado pelo LLM
+
+    Returns:
+        Texto normalizado (mesma quebra de parágrafos)
+    """
+    if not text:
+        return text
+
+    def replace(m):
+        result = _replacement(m)
+        if result and result[0].isalpha() and _sentence_start(m.string, m.start()):
+            result = result[0].upper() + result[1:]
+        elif result and m.lastgroup in ("chat", "acronym") and m.group(0)[0].isupper() and len(m.group(0)) > 1 and m.group(0)[1:].islower():
+            result = result[0].upper() + result[1:]  # "Vc" no meio de uma citação
+        return result
+
+    return _cleanup(_PATTERN.sub(replace, text))
+
+def word_key(word):
+    """Forma de comparação de uma palavra (sem acento, pontuação e maiúsculas)"""
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(char for char in decomposed if char.isalnum())
+
+def align_words(words, text):
+    """
+    Troca o texto das palavras do Whisper pelas palavras do roteiro, mantendo os tempos
+
+    Trechos iguais copiam o tempo da palavra; trechos diferentes repartem o
+    tempo do trecho do Whisper pelo tamanho das palavras do roteiro; palavras
+    que o Whisper não ouviu ocupam o buraco entre as vizinhas
+
+    Args:
+        words: Palavras do Whisper com "text", "start" e "end"
+        text: Roteiro normalizado (normalize_text)
+
+    Returns:
+        Palavras do roteiro com tempos (as do Whisper, se o roteiro não bater com a fala)
+    """
+    tokens = text.split()
+    if not words or not tokens:
+        return words
+
+    heard = [word_key(w["text"]) for w in words]
+    script = [word_key(token) for token in tokens]
+    matcher = difflib.SequenceMatcher(None, heard, script, autojunk=False)
+    if sum(block.size for block in matcher.get_matching_blocks()) < MIN_ALIGNMENT * len(tokens):
+        return words
+
+    aligned = []
+
+    def spread(j1, j2, start, end):
+        weights = [max(1, len(script[j])) for j in range(j1, j2)]
+        total = sum(weights)
+        cursor = start
+        for j, weight in zip(range(j1, j2), weights):
+            step = (end - start) * weight / total
+            aligned.append({"text": tokens[j], "start": round(cursor, 3), "end": round(cursor + step, 3)})
+            cursor += step
+
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                aligned.append({"text": tokens[j], "start": words[i]["start"], "end": words[i]["end"]})
+        elif op == "replace":
+            spread(j1, j2, words[i1]["start"], words[i2 - 1]["end"])
+        elif op == "insert":
+            # Entre as vizinhas; no começo/fim do áudio, um tempo curto antes/depois
+            end = words[i1]["start"] if i1 < len(words) else words[-1]["end"] + INSERTED_WORD_S * (j2 - j1)
+            start = words[i1 - 1]["end"] if i1 > 0 else max(0.0, end - INSERTED_WORD_S * (j2 - j1))
+            spread(j1, j2, start, max(start, end))
+    return aligned
@@ -0,0 +1,368 @@
+"""
+Instrumentação do pipeline por etapa
+Mede tempo de parede, tempo de CPU (incluindo ffmpeg), pico de RSS e bytes
+gravados de cada etapa, grava JSON lines por job e, opcionalmente, um
+arquivo Chrome trace (abre em chrome://tracing ou ui.perfetto.dev)
+
+Por etapa: cpu_s é a CPU da thread que roda a etapa (o prefetch em paralelo não
+entra) e peak_rss_mb o maior RSS do processo amostrado enquanto ela estava
+aberta. Os campos process_* e children_* são do processo inteiro: CPU de todas
+as threads no intervalo, pico de RSS desde o início do processo e ffmpeg/filhos
+já finalizados
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_DIR = "assets/output/traces"
+
+# Intervalo de amostragem do RSS durante as etapas (s)
+RSS_SAMPLE_S = 0.05
+
+# Jobs guardados no histórico; processos longos (render_worker) descartam os mais antigos
+HISTORY_LIMIT = 100
+
+# Configuração global (ajustada pela CLI)
+_config = {"chrome_trace": False, "trace_dir": TRACE_DIR}
+
+# Tracer do job em andamento e histórico dos jobs concluídos (para o resumo do batch)
+_current = None
+_history = []
+_lock = threading.Lock()
+
+# Tracer próprio de uma thread (ex: prefetch em segundo plano), no lugar do job atual
+_thread = threading.local()
+
+def configure(chrome_trace=None, trace_dir=None):
+    """
+    Ajusta a instrumentação
+
+    Args:
+        chrome_trace: Se True, grava também um arquivo Chrome trace por job
+        trace_dir: Diretório dos arquivos de trace
+    """
+    if chrome_trace is not None:
+        _config["chrome_trace"] = chrome_trace
+    if trace_dir is not None:
+        _config["trace_dir"] = trace_dir
+
+def current_rss_mb():
+    """Memória residente atual do processo em MB (None se indisponível)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+class RssSampler:
+    """
+    Pico de RSS por etapa: uma thread amostra o processo enquanto houver etapa
+    aberta e cada etapa fica com o maior valor visto entre o seu início e fim
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_S):
+        self.interval = interval
+        self._peaks = {}
+        self._next = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def begin(self):
+        """Começa a medir uma etapa; retorna o token para end() (None sem RSS disponível)"""
+        rss = current_rss_mb()
+        if rss is None:
+            return None
+        with self._cond:
+            self._next += 1
+            token = self._next
+            self._peaks[token] = rss
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return token
+
+    def end(self, token):
+        """Maior RSS visto durante a etapa em MB (None se não medida)"""
+        if token is None:
+            return None
+        rss = current_rss_mb() or 0
+        with self._cond:
+            return max(self._peaks.pop(token), rss)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._peaks)
+            rss = current_rss_mb() or 0
+            with self._cond:
+                for token, peak in self._peaks.items():
+                    self._peaks[token] = max(peak, rss)
+            time.sleep(self.interval)
+
+_rss_sampler = RssSampler()
+
+def peak_rss_mb():
+    """
+    Pico de memória residente do processo (e dos filhos, como o ffmpeg) em MB
+    desde o início do processo (ru_maxrss)
+
+    Returns:
+        Tupla (pico do processo, pico dos filhos) ou (None, None) se indisponível
+    """
+    if resource is not None:
+        # Linux reporta em KB, macOS em bytes
+        scale = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+        return own, children
+
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024), None
+    except Exception:
+        return None, None
+
+def _cpu_seconds():
+    """CPU (usuário + sistema) da thread atual, do processo e dos filhos já finalizados"""
+    times = os.times()
+    return time.thread_time(), times.user + times.system, times.children_user + times.children_system
+
+class Span:
+    """Uma etapa medida; registre arquivos gerados com record_output()"""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.outputs = []
+
+    def record_output(self, path):
+        """Registra um arquivo gerado pela etapa (conta nos bytes gravados)"""
+        if path:
+            self.outputs.append(path)
+
+class JobTracer:
+    """Coleta as etapas de um job e grava os arquivos de trace"""
+
+    def __init__(self, job_id, trace_dir=None, chrome_trace=None):
+        self.job_id = job_id
+        self.trace_dir = trace_dir or _config["trace_dir"]
+        self.chrome_trace = _config["chrome_trace"] if chrome_trace is None else chrome_trace
+        self.records = []
+        self._origin = time.perf_counter()
+        self.started_at = time.time()
+
+        os.makedirs(self.trace_dir, exist_ok=True)
+        self.jsonl_path = os.path.join(self.trace_dir, f"trace_{job_id}.jsonl")
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        """
+        Mede uma etapa do pipeline
+
+        Args:
+            name: Nome da etapa (fetch, summarize, tts, encode...)
+            **attrs: Atributos extras gravados junto (ex: provider="edge")
+        """
+        span = Span(name, attrs)
+        wall_start = time.perf_counter()
+        thread_start, cpu_start, children_start = _cpu_seconds()
+        rss_token = _rss_sampler.begin()
+        error = None
+
+        try:
+            yield span
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            wall_end = time.perf_counter()
+            thread_end, cpu_end, children_end = _cpu_seconds()
+            rss = _rss_sampler.end(rss_token)
+            process_rss, children_rss = peak_rss_mb()
+
+            bytes_written = 0
+            for path in span.outputs:
+                if os.path.exists(path):
+                    bytes_written += os.path.getsize(path)
+
+            record = {
+                "job": self.job_id,
+                "stage": name,
+                "start": round(wall_start - self._origin, 6),
+                "wall_s": round(wall_end - wall_start, 6),
+                "cpu_s": round(thread_end - thread_start, 6),
+                "process_cpu_s": round(cpu_end - cpu_start, 6),
+                "children_cpu_s": round(children_end - children_start, 6),
+                "peak_rss_mb": round(rss, 1) if rss is not None else None,
+                "process_peak_rss_mb": round(process_rss, 1) if process_rss is not None else None,
+                "children_peak_rss_mb": round(children_rss, 1) if children_rss is not None else None,
+                "bytes_written": bytes_written,
+                "thread": threading.get_ident(),
+                "error": error,
+                **span.attrs
+            }
+            self._write(record)
+
+    def _write(self, record):
+        """Guarda o registro e o anexa ao JSON lines do job"""
+        with _lock:
+            self.records.append(record)
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self, status="ok"):
+        """
+        Finaliza o job: grava a linha de resumo e o Chrome trace (se ativado)
+
+        Args:
+            status: Resultado do job (ok, failed...)
+        """
+        total = time.perf_counter() - self._origin
+        with _lock:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"job": self.job_id, "stage": "job", "status": status, "wall_s": round(total, 6)}) + "\n")
+
+        if self.chrome_trace:
+            events = [{
+                "name": record["stage"],
+                "cat": "pipeline",
+                "ph": "X",
+                "ts": record["start"] * 1e6,
+                "dur": record["wall_s"] * 1e6,
+                "pid": os.getpid(),
+                "tid": record["thread"],
+                "args": {k: v for k, v in record.items() if k not in ("stage", "start", "wall_s", "thread")}
+            } for record in self.records]
+
+            chrome_path = os.path.join(self.trace_dir, f"trace_{self.job_id}.json")
+            with open(chrome_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+def start_job(job_id, **kwargs):
+    """
+    Inicia a instrumentação de um job (vira o tracer atual)
+
+    Args:
+        job_id: Identificador do job (ex: timestamp)
+
+    Returns:
+        JobTracer do job
+    """
+    global _current
+    _current = JobTracer(job_id, **kwargs)
+    return _current
+
+def end_job(status="ok"):
+    """Finaliza o job atual e o adiciona ao histórico do batch (até HISTORY_LIMIT jobs)"""
+    global _current
+    if _current is None:
+        return
+    _current.close(status)
+    _history.append(_current)
+    del _history[:-HISTORY_LIMIT]
+    _current = None
+
+def current_tracer():
+    """Retorna o tracer do job em andamento (ou None)"""
+    return _current
+
+@contextmanager
+def use_tracer(tracer):
+    """
+    Etapas desta thread vão para outro tracer em vez do job atual
+
+    Usado por trabalho em segundo plano que não pertence ao job em andamento
+    (ex: prefetch do próximo job durante o encode)
+
+    Args:
+        tracer: JobTracer que recebe as etapas
+    """
+    previous = getattr(_thread, "tracer", None)
+    _thread.tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _thread.tracer = previous
+
+@contextmanager
+def stage(name, **attrs):
+    """
+    Mede uma etapa no job atual (sem job ativo, apenas executa o bloco)
+
+    Args:
+        name: Nome da etapa
+        **attrs: Atributos extras
+    """
+    tracer = getattr(_thread, "tracer", None) or _current
+    if tracer is None:
+        yield Span(name, attrs)
+        return
+    with tracer.stage(name, **attrs) as span:
+        yield span
+
+def job_history():
+    """Retorna os tracers dos jobs concluídos desde o último reset_history()"""
+    return list(_history)
+
+def reset_history():
+    """Limpa o histórico de jobs (início de um batch)"""
+    _history.clear()
+
+def summarize_history(tracers=None):
+    """
+    Agrega as etapas de vários jobs
+
+    Args:
+        tracers: Lista de JobTracer (padrão: histórico do batch)
+
+    Returns:
+        Lista de dicts por etapa, na ordem em que aparecem
+    """
+    stages = {}
+    for tracer in (_history if tracers is None else tracers):
+        for record in tracer.records:
+            entry = stages.setdefault(record["stage"], {
+                "stage": record["stage"], "count": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                "max_wall_s": 0.0, "peak_rss_mb": None, "bytes_written": 0
+            })
+            entry["count"] += 1
+            entry["wall_s"] += record["wall_s"]
+            entry["cpu_s"] += record["cpu_s"] + record["children_cpu_s"]
+            entry["max_wall_s"] = max(entry["max_wall_s"], record["wall_s"])
+            entry["bytes_written"] += record["bytes_written"]
+            if record["peak_rss_mb"] is not None:
+                entry["peak_rss_mb"] = max(entry["peak_rss_mb"] or 0, record["peak_rss_mb"])
+    return list(stages.values())
+
+def print_summary(tracers=None):
+    """Imprime a tabela de tempos por etapa (fim do batch)"""
+    rows = summarize_history(tracers)
+    if not rows:
+        return
+
+    total_wall = sum(row["wall_s"] for row in rows) or 1.0
+
+    print("\n📊 TEMPO POR ETAPA")
+    print(f"{'Etapa':<16} {'N':>3} {'Média (s)':>10} {'Máx (s)':>9} {'CPU (s)':>9} {'% total':>8} {'RSS (MB)':>9} {'Gravado (MB)':>13}")
+    print("-" * 84)
+    for row in rows:
+        rss = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "-"
+        print(
+            f"{row['stage']:<16} {row['count']:>3} {row['wall_s'] / row['count']:>10.2f} {row['max_wall_s']:>9.2f} "
+            f"{row['cpu_s']:>9.2f} {100 * row['wall_s'] / total_wall:>7.1f}% {rss:>9} {row['bytes_written'] / 1e6:>13.2f}"
+        )
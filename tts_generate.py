@@ -1,24 +1,73 @@
-import requests
 import os
 from dotenv import load_dotenv
-from gtts import gTTS
-import asyncio
-import edge_tts
 
 load_dotenv()
 
-def generate_voice_elevenlabs(text, output_path="assets/output/audio.mp3", voice_id="Rachel"):
+# Prazos das APIs (s): conexão e leitura do ElevenLabs, síntese inteira do Edge
+ELEVEN_TIMEOUT = (10, 90)
+EDGE_TIMEOUT = 90
+
+# API do ElevenLabs (ELEVEN_API_URL aponta para outro servidor, ex: nos testes) e tamanho dos pedaços do stream
+ELEVEN_API_URL = os.getenv("ELEVEN_API_URL", "https://api.elevenlabs.io")
+STREAM_CHUNK = 16 * 1024
+
+# Prazo de uma narração no roteador (todas as tentativas) e espera pelo hedge sem histórico
+TTS_DEADLINE = 120.0
+TTS_HEDGE_AFTER = 30.0
+
+# Vozes do Edge TTS por nome amigável
+EDGE_VOICES = {
+    "adam": "pt-BR-AntonioNeural",       # Masculina brasileira
+    "antonio": "pt-BR-AntonioNeural",    # Masculina brasileira
+    "francisca": "pt-BR-FranciscaNeural", # Feminina brasileira
+    "female": "pt-BR-FranciscaNeural",
+    "male": "pt-BR-AntonioNeural"
+}
+
+_router = None
+_session = None
+
+def get_session():
+    """
+    Sessão HTTP do processo (keep-alive: o TLS é negociado uma vez por conexão)
+
+    Returns:
+        requests.Session com pool de conexões
+    """
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        _session = requests.Session()
+        # Hedge e prefetch podem pedir narrações ao mesmo tempo
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+def generate_voice_elevenlabs(text, output_path="assets/output/audio.mp3", voice_id="Rachel", fallback=True, on_chunk=None):
     """
     Gera áudio usando ElevenLabs API
     
+    Usa o endpoint de streaming: o MP3 é gravado em disco à medida que chega
+    (sem guardar a resposta inteira na memória) e on_chunk recebe cada pedaço,
+    para quem quiser começar a usar o áudio antes do fim da síntese
+    
     Args:
         text: Texto para converter em voz
         output_path: Caminho do arquivo de saída
         voice_id: ID da voz (Rachel, Josh, etc)
+        fallback: Se True, tenta o Google TTS quando falhar (o roteador usa False)
+        on_chunk: Função chamada com cada pedaço de bytes recebido (opcional)
     
     Returns:
         Caminho do arquivo gerado
     """
+    import time
+    from storage import commit_output, discard_output, partial_path
+    
+    temp_path = None
     try:
         api_key = os.getenv("ELEVEN_API_KEY")
         if not api_key:
@@ -34,7 +83,7 @@ def generate_voice_elevenlabs(text, output_path="assets/output/audio.mp3", voice
         
         voice_id_real = voice_map.get(voice_id, voice_id)
         
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id_real}"
+        url = f"{ELEVEN_API_URL}/v1/text-to-speech/{voice_id_real}/stream"
         
         headers = {
             "xi-api-key": api_key,
@@ -53,26 +102,44 @@ def generate_voice_elevenlabs(text, output_path="assets/output/audio.mp3", voice
         }
         
         print(f"🎙️ Gerando áudio com ElevenLabs (voz: {voice_id})...")
-        response = requests.post(url, headers=headers, json=data)
-        
-        if response.status_code != 200:
-            raise Exception(f"Erro na API: {response.status_code} - {response.text}")
+        started = time.perf_counter()
+        first_byte = None
         
-        # Cria diretório se não existir
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with get_session().post(url, headers=headers, json=data, timeout=ELEVEN_TIMEOUT, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"Erro na API: {response.status_code} - {response.text}")
+            
+            # Cria diretório se não existir
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            
+            # Grava cada pedaço assim que chega (.partial até o fim do stream)
+            temp_path = partial_path(output_path)
+            with open(temp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK):
+                    if not chunk:
+                        continue
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    f.write(chunk)
+                    if on_chunk:
+                        on_chunk(chunk)
         
-        with open(output_path, "wb") as f:
-            f.write(response.content)
+        if first_byte is None:
+            raise Exception("resposta sem áudio")
+        commit_output(temp_path, output_path)
         
-        print(f"✅ Áudio gerado: {output_path}")
+        print(f"✅ Áudio gerado: {output_path} (primeiro byte em {first_byte:.2f}s, total {time.perf_counter() - started:.2f}s)")
         return output_path
     
     except Exception as e:
+        discard_output(temp_path)
         print(f"❌ Erro no ElevenLabs: {e}")
+        if not fallback:
+            return None
         print("⚠️ Tentando com Google TTS (grátis)...")
-        return generate_voice_gtts(text, output_path)
+        return generate_voice_gtts_fallback(text, output_path)
 
-def generate_voice_edge(text, output_path="assets/output/audio.mp3", voice="pt-BR-AntonioNeural", rate="+80%"):
+def generate_voice_edge(text, output_path="assets/output/audio.mp3", voice="pt-BR-AntonioNeural", rate="+80%", fallback=True):
     """
     Gera áudio usando Edge TTS da Microsoft (GRÁTIS!)
     
@@ -81,11 +148,15 @@ def generate_voice_edge(text, output_path="assets/output/audio.mp3", voice="pt-B
         output_path: Caminho do arquivo de saída
         voice: Voz a usar (pt-BR-AntonioNeural = masculina, pt-BR-FranciscaNeural = feminina)
         rate: Velocidade (+80% = 1.8x mais rápido)
+        fallback: Se True, tenta o Google TTS quando falhar (o roteador usa False)
     
     Returns:
         Caminho do arquivo gerado
     """
     try:
+        import asyncio
+        import edge_tts
+        
         print(f"🎙️ Gerando áudio com Edge TTS (voz: {voice}, velocidade: {rate})...")
         
         # Cria diretório se não existir
@@ -94,7 +165,7 @@ def generate_voice_edge(text, output_path="assets/output/audio.mp3", voice="pt-B
         # Gera áudio usando Edge TTS (assíncrono)
         async def gerar():
             communicate = edge_tts.Communicate(text, voice, rate=rate)
-            await communicate.save(output_path)
+            await asyncio.wait_for(communicate.save(output_path), EDGE_TIMEOUT)
         
         # Executa função assíncrona
         asyncio.run(gerar())
@@ -104,6 +175,8 @@ def generate_voice_edge(text, output_path="assets/output/audio.mp3", voice="pt-B
     
     except Exception as e:
         print(f"❌ Erro no Edge TTS: {e}")
+        if not fallback:
+            return None
         print("⚠️ Tentando com Google TTS...")
         return generate_voice_gtts_fallback(text, output_path)
 
@@ -123,6 +196,7 @@ def generate_voice_gtts_fallback(text, output_path="assets/output/audio.mp3", la
     """
     try:
         import subprocess
+        from gtts import gTTS
         
         print(f"🎙️ Gerando áudio com Google TTS (idioma: {lang}, velocidade: {speed}x)...")
         
@@ -158,47 +232,106 @@ def generate_voice_gtts_fallback(text, output_path="assets/output/audio.mp3", la
         print(f"❌ Erro no Google TTS: {e}")
         return None
 
-def generate_voice(text, output_path="assets/output/audio.mp3", provider="edge", **kwargs):
+def rate_to_speed(rate):
+    """Velocidade do Edge ("+80%") como multiplicador (1.8), para o gTTS falar no mesmo ritmo"""
+    try:
+        return 1 + float(str(rate).strip().rstrip("%")) / 100
+    except ValueError:
+        return 1.8
+
+def attempt_path(output_path, provider):
+    """Arquivo de uma tentativa (hedge grava dois provedores ao mesmo tempo)"""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}.{provider}{ext}"
+
+def _attempt(provider, output_path, generate):
+    """Roda a tentativa de um provider no seu arquivo; se falhar, apaga o que ficou pela metade"""
+    path = attempt_path(output_path, provider)
+    result = None
+    try:
+        result = generate(path)
+        return result
+    finally:
+        if result is None:
+            _discard(provider, path)
+
+def _edge(text, output_path, voice="adam", rate="+80%", **kwargs):
+    edge_voice = EDGE_VOICES.get(voice.lower(), "pt-BR-AntonioNeural")
+    return _attempt("edge", output_path, lambda path: generate_voice_edge(text, path, edge_voice, rate, fallback=False))
+
+def _elevenlabs(text, output_path, voice_id="Rachel", **kwargs):
+    return _attempt("elevenlabs", output_path, lambda path: generate_voice_elevenlabs(text, path, voice_id, fallback=False))
+
+def _gtts(text, output_path, lang="pt-br", slow=False, speed=None, rate="+80%", **kwargs):
+    speed = speed if speed is not None else rate_to_speed(rate)
+    return _attempt("gtts", output_path, lambda path: generate_voice_gtts_fallback(text, path, lang, slow, speed))
+
+def _discard(provider, path):
+    """Narração de quem perdeu a corrida (ou tentativa que falhou)"""
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def get_router():
+    """
+    Roteador de TTS do processo (latência e falhas acumulam entre os jobs)
+
+    Returns:
+        provider_router.ProviderRouter com edge, elevenlabs e gtts
+    """
+    global _router
+    if _router is None:
+        from provider_router import ProviderRouter
+        _router = ProviderRouter(
+            "tts",
+            {"edge": _edge, "elevenlabs": _elevenlabs, "gtts": _gtts},
+            deadline=TTS_DEADLINE,
+            hedge_after=TTS_HEDGE_AFTER,
+            on_discard=_discard
+        )
+    return _router
+
+def provider_order(provider):
+    """
+    Ordem de tentativa a partir do provider pedido
+
+    ElevenLabs (pago) só entra quando pedido explicitamente; os grátis (edge,
+    gtts) ficam de reserva
+    """
+    provider = provider if provider in ("edge", "elevenlabs") else "gtts"
+    return [provider] + [name for name in ("edge", "gtts") if name != provider]
+
+def generate_voice(text, output_path="assets/output/audio.mp3", provider="edge", return_provider=False, **kwargs):
     """
     Wrapper que escolhe o provider de TTS
     
+    Passa pelo roteador: prazo por narração, hedge para o próximo provider
+    quando o pedido passa da latência habitual e circuit breaker depois de
+    falhas seguidas (ver provider_router.py)
+    
     Args:
         text: Texto para converter
         output_path: Caminho de saída
         provider: "edge" (Microsoft, grátis), "gtts" (Google, grátis) ou "elevenlabs" (pago)
+        return_provider: Se True, retorna também o provider que gerou a narração
+            (pode não ser o pedido: failover ou hedge)
         **kwargs: Argumentos específicos do provider
     
     Returns:
-        Caminho do arquivo gerado
+        Caminho do arquivo gerado (com return_provider, tupla (caminho, provider))
     """
-    if provider == "elevenlabs":
-        return generate_voice_elevenlabs(text, output_path, kwargs.get("voice_id", "Rachel"))
-    elif provider == "edge":
-        # Usa Edge TTS (Microsoft) - GRÁTIS com vozes masculinas/femininas!
-        voice = kwargs.get("voice", "adam")
-        
-        # Mapeia nomes amigáveis para vozes Edge
-        voice_map = {
-            "adam": "pt-BR-AntonioNeural",      # Masculina brasileira
-            "antonio": "pt-BR-AntonioNeural",    # Masculina brasileira  
-            "francisca": "pt-BR-FranciscaNeural", # Feminina brasileira
-            "female": "pt-BR-FranciscaNeural",
-            "male": "pt-BR-AntonioNeural"
-        }
-        
-        edge_voice = voice_map.get(voice.lower(), "pt-BR-AntonioNeural")
-        rate = kwargs.get("rate", "+80%")  # Velocidade
-        
-        return generate_voice_edge(text, output_path, edge_voice, rate)
-    else:
-        # Usa gTTS por padrão (GRÁTIS!)
-        return generate_voice_gtts_fallback(
-            text, 
-            output_path, 
-            kwargs.get("lang", "pt-br"), 
-            kwargs.get("slow", False),
-            kwargs.get("speed", 1.8)
-        )
+    router = get_router()
+    winner, path = router.call(text, output_path, order=provider_order(provider), **kwargs)
+    # Sobras de quem falhou ou perdeu o hedge não ficam na pasta de saída
+    # (quem ainda está rodando limpa o próprio arquivo ao terminar)
+    for name in router.providers:
+        if name != winner:
+            _discard(name, attempt_path(output_path, name))
+    final_path = None
+    if path:
+        # A narração vencedora fica com o nome pedido
+        final_path = os.path.splitext(output_path)[0] + os.path.splitext(path)[1]
+        os.replace(path, final_path)
+    return (final_path, winner) if return_provider else final_path
 
 if __name__ == "__main__":
     # Teste
@@ -1,54 +1,90 @@
-try:
-    from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, TextClip
-    from moviepy.video.fx import crop, resize
-except ImportError:
-    from moviepy import VideoFileClip, AudioFileClip, CompositeVideoClip, TextClip
-    from moviepy.video.fx.all import crop, resize
 import random
 import os
 
-def get_random_backgrounds(videos_dir="assets/videos/", count=3):
+# moviepy é importado dentro das funções: só quem renderiza paga o custo de import
+
+# Listagem dos vídeos de fundo por diretório (refeita só se a pasta mudar)
+_BACKGROUND_LISTINGS = {}
+
+def list_backgrounds(videos_dir="assets/videos/"):
+    """
+    Lista os vídeos de fundo disponíveis, reaproveitando a última listagem
+    
+    Args:
+        videos_dir: Diretório com vídeos de fundo
+    
+    Returns:
+        Lista de nomes de arquivo
+    """
+    mtime = os.path.getmtime(videos_dir)
+    cached = _BACKGROUND_LISTINGS.get(videos_dir)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    videos = sorted(f for f in os.listdir(videos_dir) if f.endswith(('.mp4', '.mov', '.avi')))
+    _BACKGROUND_LISTINGS[videos_dir] = (mtime, videos)
+    return videos
+
+def get_random_backgrounds(videos_dir="assets/videos/", count=3, smart=True):
     """
-    Seleciona múltiplos vídeos de fundo aleatórios
+    Seleciona múltiplos vídeos de fundo (distintos sempre que possível)
     
     Args:
         videos_dir: Diretório com vídeos de fundo
         count: Quantidade de vídeos para usar
+        smart: Se True, usa o índice de características (background_index.py)
+            para escolher fundos coerentes e bons para legenda
     
     Returns:
         Lista de caminhos dos vídeos escolhidos
     """
     try:
-        videos = [f for f in os.listdir(videos_dir) if f.endswith(('.mp4', '.mov', '.avi'))]
+        videos = list_backgrounds(videos_dir)
         
         if not videos:
             raise Exception(f"Nenhum vídeo encontrado em {videos_dir}")
         
-        # Escolhe vídeos aleatórios (pode repetir se não houver suficientes)
-        selected = []
-        for _ in range(count):
-            selected.append(os.path.join(videos_dir, random.choice(videos)))
+        if smart:
+            try:
+                from background_index import update_index, select_backgrounds
+                entries = update_index(videos_dir, videos)
+                selected = select_backgrounds(entries, count)
+                if selected:
+                    return [os.path.join(videos_dir, name) for name in selected]
+            except Exception as e:
+                print(f"⚠️ Índice de fundos indisponível ({e}), sorteando...")
+        
+        # Sorteio sem repetição; só repete se não houver vídeos suficientes
+        selected = random.sample(videos, min(count, len(videos)))
+        while len(selected) < count:
+            selected.append(selected[len(selected) % len(videos)])
         
-        return selected
+        return [os.path.join(videos_dir, name) for name in selected]
     
     except Exception as e:
         print(f"❌ Erro ao buscar vídeos de fundo: {e}")
         return None
 
-def create_vertical_video(video_path, duration):
+def create_vertical_video(video_path, duration, source=None, start_time=None):
     """
     Corta vídeo para formato vertical 9:16 (Shorts) e garante duração necessária
     
     Args:
         video_path: Caminho do vídeo
         duration: Duração desejada
+        source: VideoFileClip já aberto do mesmo arquivo (compartilha o decoder)
+        start_time: Início do trecho no vídeo (já em loop); None = sorteia
     
     Returns:
         VideoClip processado
     """
-    from moviepy.editor import concatenate_videoclips
+    try:
+        from moviepy.editor import VideoFileClip, concatenate_videoclips
+    except ImportError:
+        from moviepy import VideoFileClip, concatenate_videoclips
+    from frame_transform import VerticalFrameTransformer
     
-    clip = VideoFileClip(video_path)
+    clip = source if source is not None else VideoFileClip(video_path)
     original_duration = clip.duration
     
     # Se o vídeo for mais curto que a duração necessária, faz loop manualmente
@@ -60,36 +96,321 @@ def create_vertical_video(video_path, duration):
     
     # Pega segmento do vídeo com duração exata
     if clip.duration > duration:
-        start_time = random.uniform(0, max(0, clip.duration - duration))
+        if start_time is None:
+            start_time = random.uniform(0, max(0, clip.duration - duration))
         clip = clip.subclip(start_time, start_time + duration)
     else:
         # Se ainda for menor (caso raro), ajusta para duração exata
         clip = clip.set_duration(duration)
     
-    # Calcula dimensões para 9:16
-    target_ratio = 9 / 16
-    w, h = clip.size
-    current_ratio = w / h
-    
-    if current_ratio > target_ratio:
-        # Vídeo muito largo - crop nas laterais
-        new_w = int(h * target_ratio)
-        x_center = w / 2
-        x1 = int(x_center - new_w / 2)
-        clip = clip.crop(x1=x1, width=new_w)
-    else:
-        # Vídeo muito alto - crop em cima/baixo
-        new_h = int(w / target_ratio)
-        y_center = h / 2
-        y1 = int(y_center - new_h / 2)
-        clip = clip.crop(y1=y1, height=new_h)
-    
-    # Redimensiona para 1080x1920 (resolução padrão do Shorts)
-    clip = clip.resize(height=1920)
+    # Recorte 9:16 + 1080x1920 (resolução padrão do Shorts) em uma passada por frame,
+    # com índices/pesos calculados uma vez para a geometria deste vídeo
+    transformer = VerticalFrameTransformer(clip.size)
+    clip = clip.fl_image(transformer)
     
     return clip
 
-def create_video(audio_path, output_path="assets/output/final.mp4", background_dir="assets/videos/", videos_count=3, add_subtitles=True, subtitle_style="tiktok"):
+def join_backgrounds(clips, segments, crossfade=0.0):
+    """
+    Une os trechos do fundo, com crossfade opcional nas trocas
+    
+    Só os frames de sobreposição são compostos (mistura dos dois vídeos); o
+    resto de cada trecho passa direto, sem máscara nem composição
+    
+    Args:
+        clips: Clips verticais de cada trecho (com o crossfade incluído, ver cut_planner)
+        segments: Trechos planejados ("start", "end")
+        crossfade: Duração do crossfade (s); 0 = corte seco
+    
+    Returns:
+        VideoClip do fundo inteiro
+    """
+    try:
+        from moviepy.editor import CompositeVideoClip, concatenate_videoclips
+    except ImportError:
+        from moviepy import CompositeVideoClip, concatenate_videoclips
+    
+    if crossfade <= 0 or len(clips) < 2:
+        return concatenate_videoclips(clips, method="compose")
+    
+    pieces = []
+    for i, (clip, segment) in enumerate(zip(clips, segments)):
+        length = segment["end"] - segment["start"]
+        # Os primeiros segundos de cada trecho (menos o primeiro) ficam na transição anterior
+        pieces.append(clip.subclip(crossfade if i > 0 else 0, length))
+        if i < len(clips) - 1:
+            incoming = clips[i + 1].subclip(0, crossfade).crossfadein(crossfade)
+            pieces.append(CompositeVideoClip([clip.subclip(length, length + crossfade), incoming]).set_duration(crossfade))
+    
+    return concatenate_videoclips(pieces)
+
+def prepare_background(duration, background_dir="assets/videos/", videos_count=3, background_paths=None, words=None, crossfade=0.0, rng=None):
+    """
+    Monta o fundo vertical (vários vídeos concatenados) com a duração do áudio
+    
+    As trocas de vídeo caem nos fins de frase da narração e cada vídeo entra e
+    sai em um momento de pouco movimento (cut_planner.py)
+    
+    Args:
+        duration: Duração desejada (s)
+        background_dir: Diretório com vídeos de fundo
+        videos_count: Quantidade de vídeos diferentes para usar
+        background_paths: Vídeos já escolhidos (ex: mesma seleção para todas as partes de uma série)
+        words: Palavras da narração com timestamps (None = trocas em intervalos iguais)
+        crossfade: Duração do crossfade entre os vídeos (s); 0 = corte seco
+        rng: Gerador das escolhas de trecho (None = random global, fixado pela seed do job)
+    
+    Returns:
+        Tupla (clip do fundo, lista de clips de origem para fechar depois,
+        trechos usados: "name", "source_start", "start" e "end" de cada vídeo)
+    """
+    try:
+        from moviepy.editor import VideoFileClip
+    except ImportError:
+        from moviepy import VideoFileClip
+    from cut_planner import MIN_SEGMENT, plan_background_segments
+    from tracing import stage
+    
+    with stage("background_prep", videos_count=videos_count) as span:
+        # Pega múltiplos vídeos de fundo
+        if not background_paths:
+            background_paths = get_random_backgrounds(background_dir, videos_count)
+        if not background_paths:
+            raise Exception("Nenhum vídeo de fundo disponível")
+        
+        print(f"🎥 Usando {len(set(background_paths))} vídeos de fundo diferentes")
+        
+        # Um decoder por arquivo (arquivo repetido reaproveita o mesmo)
+        sources = {}
+        try:
+            for bg_path in background_paths:
+                if bg_path not in sources:
+                    sources[bg_path] = VideoFileClip(bg_path)
+            
+            try:
+                from background_index import load_index
+                entries = load_index(background_dir)
+            except Exception:
+                entries = {}
+            
+            # Crossfade nunca engole um trecho inteiro
+            shortest = min(MIN_SEGMENT, duration / len(background_paths))
+            crossfade = min(crossfade, shortest / 2) if len(background_paths) > 1 else 0.0
+            segments = plan_background_segments(
+                [(path, sources[path].duration) for path in background_paths],
+                duration,
+                entries=entries,
+                words=words,
+                overlap=crossfade,
+                rng=rng or random
+            )
+            # Vão para o trace (e dali para o catálogo)
+            span.attrs["backgrounds"] = [segment["name"] for segment in segments]
+            span.attrs["source_starts"] = [round(segment["source_start"], 3) for segment in segments]
+            span.attrs["duration"] = round(duration, 3)
+            
+            clips = []
+            for i, segment in enumerate(segments):
+                print(f"   📹 Vídeo {i+1}: {segment['name']} ({segment['start']:.1f}s-{segment['end']:.1f}s, a partir de {segment['source_start']:.1f}s)")
+                clip = create_vertical_video(segment["path"], segment["length"], source=sources[segment["path"]], start_time=segment["source_start"])
+                clips.append(clip)
+            
+            # Concatena todos os vídeos
+            print("🔗 Unindo vídeos..." + (f" (crossfade de {crossfade:.2f}s)" if crossfade else ""))
+            video_clip = join_backgrounds(clips, segments, crossfade)
+            
+            # Garante que o vídeo tenha exatamente a duração do áudio
+            if video_clip.duration < duration:
+                print(f"⚠️ Ajustando duração do vídeo: {video_clip.duration:.1f}s → {duration:.1f}s")
+                video_clip = video_clip.set_duration(duration)
+            elif video_clip.duration > duration:
+                print(f"⚠️ Cortando vídeo: {video_clip.duration:.1f}s → {duration:.1f}s")
+                video_clip = video_clip.subclip(0, duration)
+        except Exception:
+            # Falha no meio da montagem: fecha os decoders já abertos
+            close_clips(sources.values())
+            raise
+    
+    # Os decoders abertos acima vão junto: fechar só os recortes não libera o ffmpeg
+    return video_clip, [*sources.values(), *clips], segments
+
+def plan_background_layout(segments, background_dir="assets/videos/"):
+    """
+    Escolhe a posição das legendas em cada trecho do fundo (caption_layout.py)
+    
+    Usa só o índice de fundos já calculado: nenhum frame é analisado aqui
+    
+    Args:
+        segments: Trechos devolvidos por prepare_background
+        background_dir: Diretório do índice de fundos
+    
+    Returns:
+        Layout das legendas (None se o índice não estiver disponível)
+    """
+    try:
+        from background_index import load_index
+        from caption_layout import plan_caption_layout
+        
+        entries = load_index(background_dir)
+        if not entries:
+            return None
+        
+        layout = plan_caption_layout(segments, entries)
+        for item in layout:
+            box = f", caixa {item['box_opacity']:.0%}" if item["box_opacity"] else ""
+            print(f"   🔤 {item['start']:.1f}s-{item['end']:.1f}s: legenda em {item['caption_y']:.0%}{box}")
+        return layout
+    except Exception as e:
+        print(f"⚠️ Layout das legendas indisponível ({e}), usando posição padrão")
+        return None
+
+def transcribe_narration(audio_path, script=None):
+    """
+    Transcreve a narração antes de montar o fundo (as trocas seguem as frases)
+    
+    Args:
+        audio_path: Caminho do arquivo de áudio
+        script: Roteiro narrado (normalizado); as legendas usam as palavras dele
+            com os tempos do Whisper (text_normalize.align_words)
+    
+    Returns:
+        Palavras com timestamps ([] se a transcrição falhar, sem tentar de novo depois)
+    """
+    from tracing import stage
+    
+    print("🎙️ Transcrevendo narração com Whisper AI...")
+    try:
+        with stage("transcribe", model="base") as span:
+            from subtitle_whisper import transcribe_audio_with_whisper
+            words = transcribe_audio_with_whisper(audio_path, model_name="base") or []
+            if script and words:
+                from text_normalize import align_words
+                aligned = align_words(words, script)
+                span.attrs["aligned"] = aligned is not words
+                words = aligned
+            return words
+    except Exception as e:
+        print(f"⚠️ Erro na transcrição: {e}")
+        return []
+
+def prepare_audio(audio, audio_path, normalize_audio=True, music_dir="assets/music/", target_lufs=-14.0, music_path=None):
+    """
+    Normaliza o loudness da narração e mixa a trilha de fundo
+    
+    Args:
+        audio: AudioFileClip da narração original
+        audio_path: Caminho do arquivo de áudio
+        normalize_audio: Se False, devolve o áudio original
+        music_dir: Biblioteca de músicas de fundo (None = sem trilha)
+        target_lufs: Loudness alvo da narração
+        music_path: Música específica (ignora music_dir)
+    
+    Returns:
+        Clip de áudio final (o original se o processamento falhar)
+    """
+    from tracing import stage
+    
+    with stage("audio_mix") as span:
+        # Normaliza loudness e mixa trilha de fundo antes do mux
+        final_audio = audio
+        if normalize_audio:
+            print("🔊 Processando áudio (loudness + trilha)...")
+            try:
+                from audio_mix import build_audio_track, pick_music_track
+                # Trilha sorteada aqui para a escolha ficar no trace
+                music_path = music_path or pick_music_track(music_dir)
+                span.attrs["music"] = os.path.basename(music_path) if music_path else None
+                final_audio = build_audio_track(audio_path, music_dir=music_dir, target_lufs=target_lufs, music_path=music_path)
+            except Exception as e:
+                print(f"⚠️ Erro ao processar áudio: {e}")
+                print("   Continuando com o áudio original...")
+    
+    return final_audio
+
+def write_caption_sidecar(segments, output_path, video_size, style="tiktok", layout=None):
+    """
+    Grava as legendas em ASS ao lado do vídeo (video_<ts>.ass), sem rasterizar nada
+    
+    Args:
+        segments: Palavras transcritas (None = sem legendas)
+        output_path: Caminho do vídeo
+        video_size: (largura, altura) do vídeo
+        style: Estilo das legendas
+        layout: Altura e caixa por trecho do fundo (caption_layout.py)
+    
+    Returns:
+        Caminho do .ass (None se não houver transcrição ou der erro)
+    """
+    if not segments:
+        print("⚠️ Sem transcrição, vídeo sem legendas")
+        return None
+    
+    try:
+        from subtitle_ass import layout_placement, sidecar_path, write_ass
+        from subtitle_whisper import plan_caption_chunks
+        from tracing import stage
+        
+        with stage("subtitle_build", renderer="ass") as span:
+            chunks = plan_caption_chunks(segments, int(video_size[0] * 0.95), style)
+            span.attrs["chunks"] = len(chunks)
+            ass_path = write_ass(sidecar_path(output_path), chunks, style, tuple(video_size), layout_placement(layout, video_size[1]))
+        print(f"✅ {len(chunks)} legendas em ASS: {ass_path}")
+        return ass_path
+    
+    except Exception as e:
+        print(f"⚠️ Erro ao gerar legendas ASS: {e}")
+        print("   Continuando sem legendas...")
+        return None
+
+def prepare_sources(audio_path, resources, background_dir="assets/videos/", videos_count=3, add_subtitles=True, normalize_audio=True, music_dir="assets/music/", target_lufs=-14.0, background_paths=None, music_path=None, segments=None, crossfade=0.0, rng=None, script=None):
+    """
+    Áudio, transcrição, fundo e áudio final (etapas comuns a create_video e create_video_formats)
+    
+    Cada clip aberto entra em `resources` assim que é criado: quem chama
+    fecha tudo com close_clips no finally, também quando uma etapa falha
+    
+    Args:
+        audio_path: Caminho do arquivo de áudio
+        resources: Lista que recebe os clips abertos
+        (demais argumentos: ver create_video)
+    
+    Returns:
+        Tupla (duração, palavras transcritas, clip de fundo, trechos do fundo, áudio final)
+    """
+    try:
+        from moviepy.editor import AudioFileClip
+    except ImportError:
+        from moviepy import AudioFileClip
+    
+    # Carrega áudio
+    audio = AudioFileClip(audio_path)
+    resources.append(audio)
+    duration = audio.duration
+    
+    print(f"⏱️ Duração do áudio: {duration:.1f}s")
+    
+    # Transcrição antes do fundo: as trocas de vídeo caem nos fins de frase
+    if add_subtitles and segments is None:
+        segments = transcribe_narration(audio_path, script)
+    
+    video_clip, clips, bg_segments = prepare_background(duration, background_dir, videos_count, background_paths, words=segments, crossfade=crossfade, rng=rng)
+    resources.extend([*clips, video_clip])
+    final_audio = prepare_audio(audio, audio_path, normalize_audio, music_dir, target_lufs, music_path)
+    if final_audio is not audio:
+        resources.append(final_audio)
+    
+    return duration, segments, video_clip, bg_segments, final_audio
+
+def close_clips(clips):
+    """Fecha clips (leitores do ffmpeg e arquivos) ignorando erros de quem já foi fechado"""
+    for clip in clips:
+        if clip is not None:
+            try:
+                clip.close()
+            except Exception:
+                pass
+
+def create_video(audio_path, output_path="assets/output/final.mp4", background_dir="assets/videos/", videos_count=3, add_subtitles=True, subtitle_style="tiktok", normalize_audio=True, music_dir="assets/music/", target_lufs=-14.0, background_paths=None, music_path=None, segments=None, crossfade=0.0, title=None, extras=True, rng=None, captions="pil", script=None):
     """
     Cria vídeo final combinando áudio e MÚLTIPLOS vídeos de fundo
     
@@ -100,64 +421,75 @@ def create_video(audio_path, output_path="assets/output/final.mp4", background_d
         videos_count: Quantidade de vídeos diferentes para usar
         add_subtitles: Se True, adiciona legendas com Whisper (padrão: True)
         subtitle_style: Estilo das legendas - tiktok, youtube, minimal (padrão: tiktok)
+        normalize_audio: Se True, normaliza o loudness e mixa a trilha de fundo (padrão: True)
+        music_dir: Biblioteca de músicas de fundo (None = sem trilha)
+        target_lufs: Loudness alvo da narração (padrão: -14 LUFS)
+        background_paths: Vídeos de fundo já escolhidos (None = sorteia em background_dir)
+        music_path: Trilha específica (None = sorteia em music_dir)
+        segments: Palavras já transcritas (None = transcreve com Whisper)
+        crossfade: Crossfade entre os vídeos de fundo (s); 0 = corte seco
+        title: Título desenhado na thumbnail
+        extras: Se True, gera thumbnail e prévia na mesma passada do encode
+            (video_<ts>_thumb.jpg e video_<ts>_preview.mp4, ver render_taps.py)
+        rng: Gerador das escolhas do fundo (None = random global, fixado pela seed do job)
+        captions: Como as legendas são desenhadas - "pil" (imagens compostas em
+            Python), "ass" (video_<ts>.ass desenhado pelo ffmpeg/libass no encode)
+            ou "sidecar" (só o .ass, para subir como faixa de legenda)
+        script: Roteiro narrado; as legendas mostram o texto dele com os tempos do Whisper
     
     Returns:
         Caminho do vídeo gerado
     """
+    # Liberados no finally também quando o encode falha (ffmpeg e arquivos abertos)
+    resources = []
+    tap = None
     try:
-        from moviepy.editor import concatenate_videoclips
+        from tracing import stage
+        from storage import atomic_output
+        from subtitle_ass import ass_filter
         
         print("🎬 Iniciando geração do vídeo...")
         
-        # Carrega áudio
-        audio = AudioFileClip(audio_path)
-        duration = audio.duration
-        
-        print(f"⏱️ Duração do áudio: {duration:.1f}s")
-        
-        # Pega múltiplos vídeos de fundo
-        background_paths = get_random_backgrounds(background_dir, videos_count)
-        if not background_paths:
-            raise Exception("Nenhum vídeo de fundo disponível")
-        
-        print(f"🎥 Usando {len(background_paths)} vídeos de fundo diferentes")
-        
-        # Cria clips de cada vídeo
-        clips = []
-        duration_per_video = duration / videos_count
-        
-        for i, bg_path in enumerate(background_paths):
-            print(f"   📹 Vídeo {i+1}: {os.path.basename(bg_path)}")
-            clip = create_vertical_video(bg_path, duration_per_video)
-            clips.append(clip)
-        
-        # Concatena todos os vídeos
-        print("🔗 Unindo vídeos...")
-        video_clip = concatenate_videoclips(clips, method="compose")
+        duration, segments, video_clip, bg_segments, final_audio = prepare_sources(
+            audio_path, resources, background_dir, videos_count, add_subtitles, normalize_audio, music_dir,
+            target_lufs, background_paths, music_path, segments, crossfade, rng, script
+        )
         
-        # Garante que o vídeo tenha exatamente a duração do áudio
-        if video_clip.duration < duration:
-            print(f"⚠️ Ajustando duração do vídeo: {video_clip.duration:.1f}s → {duration:.1f}s")
-            video_clip = video_clip.set_duration(duration)
-        elif video_clip.duration > duration:
-            print(f"⚠️ Cortando vídeo: {video_clip.duration:.1f}s → {duration:.1f}s")
-            video_clip = video_clip.subclip(0, duration)
+        # Thumbnail e prévia saem dos frames do próprio encode (sem decodificar o MP4 de novo)
+        if extras:
+            from render_taps import RenderTap
+            tap = RenderTap(output_path, fps=30, title=title)
         
         # Adiciona áudio
-        final_clip = video_clip.set_audio(audio)
+        final_clip = (tap.watch_background(video_clip) if tap else video_clip).set_audio(final_audio)
+        resources.append(final_clip)
+        
+        # Legendas em .ass: o ffmpeg desenha durante o encode (ou ficam só no arquivo ao lado)
+        ffmpeg_params = None
+        burned_ass = None
+        if add_subtitles and captions != "pil":
+            ass_path = write_caption_sidecar(segments, output_path, video_clip.size, subtitle_style, plan_background_layout(bg_segments, background_dir))
+            if ass_path and captions == "ass":
+                ffmpeg_params = ["-vf", ass_filter(ass_path)]
+                burned_ass = ass_path
         
         # Adiciona legendas com Whisper se solicitado
-        if add_subtitles:
-            print("🎙️ Gerando legendas com Whisper AI...")
+        elif add_subtitles:
+            print("📝 Montando legendas...")
             try:
                 from subtitle_whisper import add_subtitles_to_video
+                layout = plan_background_layout(bg_segments, background_dir)
                 final_clip = add_subtitles_to_video(
                     final_clip, 
                     audio_path, 
                     style=subtitle_style,
                     position="center",
-                    karaoke_mode=True  # Efeito karaoke: palavra atual em amarelo
+                    karaoke_mode=True,  # Efeito karaoke: palavra atual em amarelo
+                    fps=30,  # Mesmo fps da renderização (legendas alinhadas aos frames)
+                    segments=segments,
+                    layout=layout  # Altura e caixa por trecho do fundo
                 )
+                resources.append(final_clip)
                 print("✅ Legendas sincronizadas adicionadas!")
             except Exception as e:
                 print(f"⚠️ Erro ao adicionar legendas: {e}")
@@ -166,23 +498,28 @@ def create_video(audio_path, output_path="assets/output/final.mp4", background_d
         # Cria diretório de saída se não existir
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # Renderiza vídeo
-        print("⚙️ Renderizando vídeo (isso pode demorar)...")
-        final_clip.write_videofile(
-            output_path,
-            codec="libx264",
-            audio_codec="aac",
-            fps=30,
-            preset="medium",
-            threads=4
-        )
+        if tap:
+            final_clip = tap.watch_output(final_clip)
+            resources.append(final_clip)
+            tap.start(final_audio, ass_path=burned_ass)  # A prévia também desenha o .ass
         
-        # Limpa recursos
-        audio.close()
-        for clip in clips:
-            clip.close()
-        video_clip.close()
-        final_clip.close()
+        # Renderiza vídeo (em .partial.mp4, renomeado só no fim)
+        print("⚙️ Renderizando vídeo (isso pode demorar)...")
+        with stage("encode") as span:
+            with atomic_output(output_path) as temp_path:
+                final_clip.write_videofile(
+                    temp_path,
+                    codec="libx264",
+                    audio_codec="aac",
+                    fps=30,
+                    preset="medium",
+                    threads=4,
+                    ffmpeg_params=ffmpeg_params
+                )
+            span.record_output(output_path)
+            if tap:
+                for path in tap.finish().values():
+                    span.record_output(path)
         
         print(f"✅ Vídeo gerado com sucesso: {output_path}")
         return output_path
@@ -190,6 +527,109 @@ def create_video(audio_path, output_path="assets/output/final.mp4", background_d
     except Exception as e:
         print(f"❌ Erro ao gerar vídeo: {e}")
         return None
+    
+    finally:
+        # Limpa recursos (prévia parcial e áudio temporário do tap incluídos)
+        if tap:
+            tap.close()
+        close_clips(resources)
+
+def create_video_formats(audio_path, output_path="assets/output/final.mp4", formats=("shorts", "lowres", "square"), background_dir="assets/videos/", videos_count=3, add_subtitles=True, subtitle_style="tiktok", normalize_audio=True, music_dir="assets/music/", target_lufs=-14.0, background_paths=None, music_path=None, segments=None, crossfade=0.0, title=None, extras=True, rng=None, captions="pil", script=None):
+    """
+    Cria o mesmo vídeo em vários formatos (Shorts, Reels, TikTok, quadrado...) em uma passada
+    
+    Fundo, áudio e legendas são preparados uma vez; cada frame é decodificado
+    e composto uma única vez e repassado para um encoder por formato (ver
+    export_formats.py)
+    
+    Args:
+        audio_path: Caminho do arquivo de áudio
+        output_path: Caminho base (vira video_shorts.mp4, video_square.mp4...)
+        formats: Nomes dos formatos (chaves de export_formats.OUTPUT_FORMATS)
+        background_dir: Diretório com vídeos de fundo
+        videos_count: Quantidade de vídeos diferentes para usar
+        add_subtitles: Se True, adiciona legendas com Whisper
+        subtitle_style: Estilo das legendas - tiktok, youtube, minimal
+        normalize_audio: Se True, normaliza o loudness e mixa a trilha de fundo
+        music_dir: Biblioteca de músicas de fundo (None = sem trilha)
+        target_lufs: Loudness alvo da narração
+        background_paths: Vídeos de fundo já escolhidos (None = sorteia em background_dir)
+        music_path: Trilha específica (None = sorteia em music_dir)
+        segments: Palavras já transcritas (None = transcreve com Whisper)
+        crossfade: Crossfade entre os vídeos de fundo (s); 0 = corte seco
+        title: Título desenhado na thumbnail
+        extras: Se True, gera thumbnail e prévia (do primeiro formato) na mesma passada
+        rng: Gerador das escolhas do fundo (None = random global, fixado pela seed do job)
+        captions: "pil", "ass" ou "sidecar" (ver create_video); com ASS cada
+            formato ganha o seu .ass (video_<ts>_<formato>.ass)
+        script: Roteiro narrado (texto canônico das legendas, ver create_video)
+    
+    Returns:
+        Dict formato -> caminho do vídeo (None em caso de falha)
+    """
+    # Liberados no finally também quando a transcrição, o áudio ou o encode falham
+    resources = []
+    try:
+        from export_formats import render_formats
+        
+        print(f"🎬 Iniciando geração do vídeo em {len(formats)} formatos ({', '.join(formats)})...")
+        
+        duration, segments, video_clip, bg_segments, final_audio = prepare_sources(
+            audio_path, resources, background_dir, videos_count, add_subtitles, normalize_audio, music_dir,
+            target_lufs, background_paths, music_path, segments, crossfade, rng, script
+        )
+        
+        # Legendas renderizadas uma vez; cada formato só muda a posição
+        track = None
+        ass_track = None
+        layout = None
+        if add_subtitles and captions != "pil":
+            # Só os chunks; cada formato grava o seu .ass e o ffmpeg desenha
+            if segments:
+                from subtitle_whisper import plan_caption_chunks
+                from tracing import stage
+                with stage("subtitle_build", renderer="ass") as span:
+                    chunks = plan_caption_chunks(segments, int(video_clip.size[0] * 0.95), subtitle_style)
+                    span.attrs["chunks"] = len(chunks)
+                ass_track = {"chunks": chunks, "style": subtitle_style, "burn": captions == "ass"}
+                layout = plan_background_layout(bg_segments, background_dir)
+            else:
+                print("⚠️ Sem transcrição, vídeos sem legendas")
+        elif add_subtitles:
+            print("📝 Montando legendas...")
+            try:
+                from subtitle_whisper import build_subtitle_track
+                track = build_subtitle_track(audio_path, video_clip.size, duration, style=subtitle_style, fps=30, segments=segments)
+                if not track:
+                    print("⚠️ Falha na transcrição, vídeos sem legendas")
+                else:
+                    layout = plan_background_layout(bg_segments, background_dir)
+            except Exception as e:
+                print(f"⚠️ Erro ao gerar legendas: {e}")
+                print("   Continuando sem legendas...")
+        
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        
+        print("⚙️ Renderizando formatos (isso pode demorar)...")
+        tap = None
+        if extras:
+            from render_taps import RenderTap
+            tap = RenderTap(output_path, fps=30, title=title)
+        
+        # render_formats fecha o tap (prévia parcial e áudio temporário) no seu finally
+        outputs = render_formats(video_clip, final_audio, output_path, formats, track=track, fps=30, layout=layout, tap=tap, ass_track=ass_track)
+        
+        for name, path in outputs.items():
+            print(f"✅ {name}: {path}")
+        return outputs
+    
+    except Exception as e:
+        print(f"❌ Erro ao gerar vídeos: {e}")
+        return None
+    
+    finally:
+        # Limpa recursos
+        close_clips(resources)
 
 def add_subtitles(video_path, text, output_path):
     """